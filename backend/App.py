@@ -5,19 +5,18 @@ app.py  — Underwriting backend w/ financing modes + comprehensive metrics
 Python 3.10+  |  uvicorn app:app --host 127.0.0.1 --port 8010 --reload
 """
 
-import os, io, json, base64, re, uuid, tempfile, shutil
+import os, io, json, base64, re, uuid, gzip, math, tempfile, shutil, time, asyncio
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, status
-from fastapi.responses import JSONResponse, RedirectResponse
+
+from fastapi import FastAPI, UploadFile, File, Form, Query, HTTPException, Request, BackgroundTasks, status
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
 from cors_config import install_cors
 
-from pypdf import PdfReader, PdfWriter
 from dotenv import load_dotenv
 
 from mistralai import Mistral
-from anthropic import Anthropic
 
 # from protected_routes import router as protected_router  # Moved to after startup
 # Optional advanced parser (parser_v4) for richer underwriting extraction.
@@ -34,6 +33,15 @@ except Exception:
 load_dotenv(dotenv_path=Path(__file__).resolve().with_name(".env"), override=True)
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+OCR_MODEL = os.getenv("OCR_MODEL", "mistral-ocr-latest")
+MISTRAL_OCR_URL = os.getenv("MISTRAL_OCR_URL", "https://api.mistral.ai/v1/ocr")
+MISTRAL_OCR_TIMEOUT_S = float(os.getenv("MISTRAL_OCR_TIMEOUT_S", "300"))
+ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-5-20250929")
+PARSER_STRATEGY_DEFAULT = os.getenv("PARSER_STRATEGY", "hybrid")
+# hybrid mode: "hedged" races om_v4 and claude, "sequential" only tries claude after om_v4 fails
+HYBRID_EXECUTION = os.getenv("HYBRID_EXECUTION", "hedged").lower()
+# seconds to give om_v4 before claude is started alongside it (0 = start both at once)
+HYBRID_HEDGE_DELAY_S = float(os.getenv("HYBRID_HEDGE_DELAY_S", "0"))
 
 # Global LLM client placeholders (set in startup)
 MISTRAL = None
@@ -42,16 +50,45 @@ ANTHROPIC = None
 # Import spreadsheet AI module
 from spreadsheet_ai import process_spreadsheet_command
 from max_prompts import MAX_PARTNER_SYSTEM_PROMPT
+from ocr_cache import OCR_CACHE, page_keys, extract_pages
+from ocr_batches import ocr_in_batches, should_batch, pdf_page_count, BatchPageMismatch
+from pdf_session import PdfSession, open_upload, source_bytes
+from upload_spool import (
+    UPLOAD_BUDGET, UPLOAD_FORM_SLACK_BYTES, UPLOAD_MEMORY_WAIT_S, UploadLimitMiddleware, UploadMeter,
+    data_url_json_body, spool_upload,
+)
+from markdown_scan import LABEL_MAP, RECOVERY_KEYWORDS, scan_pages, scan_ocr_json
+from provider_pool import run_blocking, shutdown_pools
+from provider_clients import close_clients, get_anthropic_client, get_async_http_client, get_http_client
+from ocr_jobs import OCR_JOBS, JobQueueFull
+from admission import ADMISSION, AdmissionMiddleware
+import deal_images
+import deal_opinions
+import deal_metrics
+import returns
+import amortization
+from response_slimming import CompressionMiddleware, project, save_markdown, load_markdown, etag_matches, accepts_gzip
 
 # Allowed document MIME types for uploads and OCR
 ALLOWED_DOC_MIMES = {"application/pdf", "image/png", "image/jpeg", "image/jpg", "image/webp"}
 
+# Uploads accepted by /ocr/underwrite: OCR-able documents plus spreadsheets/text
+ALLOWED_UPLOAD_MIMES = ALLOWED_DOC_MIMES | {
+    "text/csv",
+    "text/plain",
+    "application/vnd.ms-excel",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
 # Maximum allowed upload size (bytes)
 MAX_BYTES = 50 * 1024 * 1024  # 50 MB
 
 
 
 app = FastAPI(title="Underwriting Backend", version="9.0.0")
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(UploadLimitMiddleware, max_bytes=MAX_BYTES + UPLOAD_FORM_SLACK_BYTES)
 install_cors(app)
 
 import logging
@@ -361,17 +398,25 @@ async def _init_clients():
 
     if ANTHROPIC_API_KEY:
         try:
-            ANTHROPIC = Anthropic(api_key=ANTHROPIC_API_KEY)
+            ANTHROPIC = get_anthropic_client(ANTHROPIC_API_KEY)
             log.info(f"ANTHROPIC client initialized successfully: {ANTHROPIC is not None}")
         except Exception as e:
             log.exception("Failed to init Anthropic: %s", e)
     else:
         log.warning("ANTHROPIC_API_KEY/CLAUDE_API_KEY missing")
 
-# ---------------- Utils ----------------
-def _to_data_url(file_bytes: bytes, mime: str) -> str:
-    return f"data:{mime};base64,{base64.b64encode(file_bytes).decode('utf-8')}"
+@app.on_event("startup")
+async def _start_ocr_jobs():
+    OCR_JOBS.set_runner(_run_underwrite_job)
+    await OCR_JOBS.start()
 
+@app.on_event("shutdown")
+async def _shutdown_provider_pools():
+    await OCR_JOBS.stop()
+    shutdown_pools()
+    await close_clients()
+
+# ---------------- Utils ----------------
 def _parse_pages_string(pages: str, total_pages: int) -> List[int]:
     pages = (pages or "").replace(" ", "")
     if not pages:
@@ -392,17 +437,23 @@ def _parse_pages_string(pages: str, total_pages: int) -> List[int]:
             result.add(p - 1)
     return sorted(result)
 
-def _slice_pdf(pdf_bytes: bytes, pages_spec: str) -> bytes:
-    reader = PdfReader(io.BytesIO(pdf_bytes))
-    idxs = _parse_pages_string(pages_spec, len(reader.pages))
+def _slice_pdf(pdf: PdfSession, pages_spec: str) -> PdfSession:
+    """A view of the selected pages; nothing is written until OCR needs the bytes."""
+    idxs = _parse_pages_string(pages_spec, pdf.page_count)
     if not idxs:
-        return pdf_bytes
-    writer = PdfWriter()
-    for i in idxs:
-        writer.add_page(reader.pages[i])
-    out = io.BytesIO()
-    writer.write(out)
-    return out.getvalue()
+        return pdf
+    return pdf.select(idxs)
+
+def _document_size(doc, upload) -> int:
+    """Bytes of `doc` for reporting: the slice if it was written for OCR, else the upload.
+
+    Never writes a slice just to measure it (all-cached pages never need one).
+    """
+    for d in (doc, upload):
+        size = d.built_size if isinstance(d, PdfSession) else len(d)
+        if size is not None:
+            return size
+    return 0
 
 def _num(v) -> Optional[float]:
     if v is None:
@@ -427,20 +478,76 @@ def _as_number(v):
         return None
 
 # ---------------- OCR + Claude ----------------
-def _call_mistral_ocr(doc_bytes: bytes, mime: str) -> dict:
-    if MISTRAL is None:
+def _mistral_ocr_single(doc_bytes, mime: str) -> dict:
+    """One OCR request. The document's data URL is base64-encoded as the
+    body streams out (upload_spool), never built as one string in memory."""
+    if not MISTRAL_API_KEY:
         raise HTTPException(status_code=503, detail="Mistral not configured")
-    
+
+    body, length = data_url_json_body(
+        {"model": OCR_MODEL, "document": {"type": "document_url"}, "include_image_base64": False},
+        ("document", "document_url"), doc_bytes, mime,
+    )
     try:
-        resp = MISTRAL.ocr.process(
-            model=OCR_MODEL,
-            document={"type": "document_url", "document_url": _to_data_url(doc_bytes, mime)},
-            include_image_base64=False,
-        )
-        return json.loads(resp.model_dump_json())
+        resp = get_http_client("mistral").post(MISTRAL_OCR_URL, content=body, timeout=MISTRAL_OCR_TIMEOUT_S, headers={
+            "Authorization": f"Bearer {MISTRAL_API_KEY}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Content-Length": str(length),
+        })
+        resp.raise_for_status()
+        return resp.json()
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Mistral OCR call failed: {e}")
 
+def _mistral_ocr_request(doc, mime: str) -> dict:
+    """OCR a document (bytes or PdfSession); large PDFs go out as concurrent page batches."""
+    if mime == "application/pdf" and should_batch(doc):
+        try:
+            return ocr_in_batches(doc, lambda sub: _mistral_ocr_single(sub, mime), provider="mistral")
+        except BatchPageMismatch as e:
+            log.warning("[OCR batches] %s; retrying as a single request", e)
+    return _mistral_ocr_single(source_bytes(doc), mime)
+
+def _call_mistral_ocr(doc, mime: str) -> dict:
+    """OCR a document, reusing cached page markdown where possible.
+
+    Pages are looked up in the content-addressed OCR cache and only the
+    uncached ones are sent to Mistral (as one sub-PDF, batched in parallel
+    when it is large). The result
+    keeps Mistral's `{pages: [{index, markdown, ...}]}` shape with pages in
+    document order.
+    """
+    try:
+        keys = page_keys(doc, mime, OCR_MODEL)
+    except Exception as e:
+        log.warning("[OCR cache] Could not fingerprint pages, bypassing cache: %s", e)
+        return _mistral_ocr_request(doc, mime)
+    if not keys:
+        return _mistral_ocr_request(doc, mime)
+
+    pages = [OCR_CACHE.get(k) for k in keys]
+    missing = [i for i, p in enumerate(pages) if p is None]
+    resp: Dict[str, Any] = {}
+    if missing:
+        sub = doc if len(missing) == len(keys) else extract_pages(doc, missing)
+        resp = _mistral_ocr_request(sub, mime)
+        fresh = [p for p in (resp.get("pages") or []) if isinstance(p, dict)]
+        if len(fresh) != len(missing):
+            # Page counts disagree; trust Mistral over our own split.
+            log.warning("[OCR cache] Expected %d pages from OCR, got %d", len(missing), len(fresh))
+            return _mistral_ocr_request(doc, mime) if len(missing) != len(keys) else resp
+        for i, page in zip(missing, fresh):
+            OCR_CACHE.put(keys[i], page)
+            pages[i] = page
+
+    log.info("[OCR cache] %d/%d pages served from cache", len(keys) - len(missing), len(keys))
+    out = {k: v for k, v in resp.items() if k != "pages"}
+    out["model"] = out.get("model") or OCR_MODEL
+    out["pages"] = [dict(p, index=i) for i, p in enumerate(pages)]
+    out["cache"] = {"hits": len(keys) - len(missing), "misses": len(missing)}
+    return out
+
 def _call_claude_parse_from_markdown(ocr_text: str, financing_params: Optional[Dict] = None) -> Dict[str, Any]:
     financing_lines = []
     if financing_params:
@@ -623,72 +730,19 @@ def _extract_pricing_detail_from_markdown(md: str) -> Dict[str, Any]:
     if m: out["land_area_acres"] = _num(m.group(2))
     return out
 
-_OP_SUM_RE = re.compile(r"\b(OPERATING SUMMARY|INCOME STATEMENT)\b(?:.|\n){0,3500}", re.IGNORECASE)
-_LABEL_MAP = {
-    "GROSS POTENTIAL RE": "gross_potential_rent",
-    "GROSS POTENTIAL RENT": "gross_potential_rent",
-    "TOTAL ECONOMIC LOSSES": "vacancy_amount",
-    "VACANCY": "vacancy_amount",
-    "OTHER INCOME": "other_income",
-    "EFFECTIVE GROSS INCOME": "effective_gross_income",
-    "REAL ESTATE TAXES": "taxes",
-    "INSURANCE": "insurance",
-    "GENERAL & ADMINISTRATIVE": "admin",
-    "GENERAL AND ADMINISTRATIVE": "admin",
-    "REPAIRS, MAINTENANCE, & CONTRACT SERVICES": "repairs_maintenance",
-    "REPAIRS, MAINTENANCE. & CONTRACT SERVICES": "repairs_maintenance",
-    "REPAIRS & MAINTENANCE": "repairs_maintenance",
-    "REPAIRS": "repairs_maintenance",
-    "UTILITIES": "utilities",
-    "TURNOVER & MARKETING": "marketing",
-    "MARKETING": "marketing",
-    "MANAGEMENT & LEASING": "management",
-    "MANAGEMENT": "management",
-    "RESERVES": "other",
-    "TOTAL OPERATING EXPENSES": "operating_expenses",
-    "NET OPERATING INCOME": "noi",
-}
+# Label table, recovery keywords and the single-pass scanner live in markdown_scan.
+_LABEL_MAP = LABEL_MAP
+
 def _extract_operating_summary_from_markdown(md: str) -> Dict[str, Any]:
-    """Extract high-level P&L and expense lines from markdown.
+    """Extract high-level P&L and expense lines from a single markdown blob.
 
-    This is the legacy helper that operates on a single markdown blob.
-    It is kept as-is for backward compatibility. A new helper
-    `_extract_operating_summary_sources` (defined below) performs a
-    similar extraction but also tracks page/line sources using the full
-    `ocr_json` structure.
+    Uses the first OPERATING SUMMARY / INCOME STATEMENT block if there is
+    one, else every line. When the OCR pages are available, call
+    `scan_ocr_json` instead to get values, sources and keyword pages from
+    one pass.
     """
-    out_pnl: Dict[str, Any] = {}
-    out_exp: Dict[str, Any] = {}
-    block_m = _OP_SUM_RE.search(md or "")
-    text = block_m.group(0) if block_m else (md or "")
-    if not text:
-        return {"pnl": {}, "expenses": {}}
-    for raw in text.splitlines():
-        line = raw.strip()
-        if not line:
-            continue
-        mnum = re.search(r"\$?\(?-?[\d,]+(?:\.\d+)?\)?", line)
-        if not mnum:
-            continue
-        actual = _num(mnum.group(0))
-        label = re.sub(r"\$?\(?-?[\d,]+(?:\.\d+)?\)?.*$", "", line).strip().upper()
-        key = None
-        for k, v in _LABEL_MAP.items():
-            if k in label:
-                key = v; break
-        if key is None:
-            continue
-        if key in {"taxes","insurance","admin","repairs_maintenance","utilities","marketing","management","other"}:
-            out_exp[key] = actual
-        else:
-            out_pnl[key] = actual
-    if out_exp and "operating_expenses" not in out_pnl:
-        out_pnl["operating_expenses"] = sum(v for v in out_exp.values() if isinstance(v, (int, float)))
-    if out_pnl.get("gross_potential_rent") is not None and out_pnl.get("vacancy_amount") is not None:
-        gpr = out_pnl["gross_potential_rent"]; vac = abs(out_pnl["vacancy_amount"])
-        if gpr:
-            out_pnl["vacancy_rate"] = round(vac / gpr, 4)
-    return {"pnl": out_pnl, "expenses": out_exp}
+    scan = scan_pages([md or ""])
+    return {"pnl": scan["pnl"], "expenses": scan["expenses"]}
 
 def _extract_operating_summary_sources(ocr_json: dict) -> Dict[str, Any]:
     """Best-effort mapping of key fields to their OCR page/line.
@@ -704,73 +758,13 @@ def _extract_operating_summary_sources(ocr_json: dict) -> Dict[str, Any]:
     """
     if not isinstance(ocr_json, dict):
         return {}
+    return scan_ocr_json(ocr_json)["sources"]
 
-    pages = ocr_json.get("pages", []) or []
-    if not pages:
-        return {}
-
-    sources: Dict[str, Any] = {}
+def _keyword_pages_or_default(scan: Dict[str, Any]) -> List[int]:
+    return scan["keyword_pages"] or list(range(min(3, scan["page_count"])))
 
-    for page_idx, page in enumerate(pages):
-        md = (page.get("markdown") or "")
-        if not md:
-            continue
-
-        block_m = _OP_SUM_RE.search(md)
-        text = block_m.group(0) if block_m else md
-        if not text:
-            continue
-
-        for line_idx, raw in enumerate(text.splitlines()):
-            line = raw.strip()
-            if not line:
-                continue
-
-            mnum = re.search(r"\$?\(?-?[\d,]+(?:\.\d+)?\)?", line)
-            if not mnum:
-                continue
-
-            label = re.sub(r"\$?\(?-?[\d,]+(?:\.\d+)?\)?.*$", "", line).strip().upper()
-            key = None
-            for k, v in _LABEL_MAP.items():
-                if k in label:
-                    key = v
-                    break
-            if key is None:
-                continue
-
-            # Only record the first occurrence for each field to keep
-            # the mapping simple and deterministic.
-            if key in {"taxes","insurance","admin","repairs_maintenance","utilities","marketing","management","other"}:
-                path = f"expenses.{key}"
-            else:
-                path = f"pnl.{key}"
-
-            if path in sources:
-                continue
-
-            sources[path] = {
-                "page": page_idx + 1,  # 1-based page index for UI
-                "line_index": line_idx,
-                "text": line,
-            }
-
-    return sources
-
-RECOVERY_KEYWORDS = [
-    "PRICING DETAIL","LIST PRICE","ASKING PRICE","OFFERING PRICE","PURCHASE PRICE",
-    "PRICE PER UNIT","PRICE PER SQUARE FOOT","NUMBER OF UNITS","RENTABLE SQUARE FOOT","RBA","LOT SIZE",
-    "OPERATING SUMMARY","INCOME STATEMENT","GROSS POTENTIAL RENT","EFFECTIVE GROSS INCOME",
-    "OTHER INCOME","VACANCY","OPERATING EXPENSES","NET OPERATING INCOME","NOI",
-    "UNIT MIX","RENT ROLL","MARKET RENT","CURRENT RENT","ADDRESS","PROPERTY OVERVIEW"
-]
 def _pages_with_keywords(ocr_json: dict, keywords: List[str]) -> List[int]:
-    hits = []
-    for i, p in enumerate(ocr_json.get("pages", []) or []):
-        md = (p.get("markdown") or "").lower()
-        if any(k.lower() in md for k in keywords):
-            hits.append(i)
-    return sorted(set(hits)) or list(range(min(3, len(ocr_json.get("pages", [])))))
+    return _keyword_pages_or_default(scan_ocr_json(ocr_json, keywords))
 
 def _merge_truthy(dst: Dict[str, Any], src: Dict[str, Any], fields: List[str]):
     for f in fields:
@@ -972,23 +966,6 @@ def _validate_and_enrich(data: Dict[str, Any]) -> Dict[str, Any]:
     })
     return data
 
-def _pmti(principal: float, annual_rate_pct: float, n_months: int) -> float:
-    if principal is None or principal <= 0 or annual_rate_pct is None or n_months is None or n_months <= 0:
-        return 0.0
-    r = (annual_rate_pct / 100.0) / 12.0
-    if r == 0:
-        return principal / n_months
-    return principal * (r / (1 - (1 + r) ** (-n_months)))
-
-def _remaining_balance(principal: float, annual_rate_pct: float, amort_months: int, payments_made: int) -> float:
-    if principal is None or principal <= 0:
-        return 0.0
-    r = (annual_rate_pct / 100.0) / 12.0
-    if r == 0:
-        paid = principal * payments_made / amort_months
-        return max(0.0, principal - paid)
-    return principal * (((1 + r) ** amort_months - (1 + r) ** payments_made) / ((1 + r) ** amort_months - 1))
-
 def _compute_underwriting(d: Dict[str, Any]) -> Dict[str, Any]:
     prop = d.setdefault("property", {})
     pricing = d.setdefault("pricing_financing", {})
@@ -1047,6 +1024,122 @@ def _is_critically_incomplete(d: Dict[str, Any]) -> bool:
     missing_fin   = not pnl.get("gross_potential_rent") or not pnl.get("operating_expenses") or not pnl.get("noi")
     return bool(missing_basic or missing_fin)
 
+def _completeness_score(d: Dict[str, Any]) -> int:
+    s = 0
+    s += sum(1 for k in ["address", "units"] if d.get("property", {}).get(k))
+    s += sum(1 for k in ["price"] if d.get("pricing_financing", {}).get(k))
+    s += sum(1 for k in ["gross_potential_rent", "operating_expenses", "noi"] if d.get("pnl", {}).get(k))
+    return s
+
+_COMPLETENESS_MAX = 6
+
+# Process-lifetime per-strategy counters for hedged hybrid parsing
+_STRATEGY_STATS: Dict[str, Dict[str, float]] = {}
+
+def _record_strategy_run(name: str, latency_s: Optional[float], won: bool, failed: bool) -> None:
+    st = _STRATEGY_STATS.setdefault(name, {"runs": 0, "wins": 0, "failures": 0, "completed": 0, "latency_total_s": 0.0})
+    st["runs"] += 1
+    st["wins"] += int(won)
+    st["failures"] += int(failed)
+    if latency_s is not None:
+        st["completed"] += 1
+        st["latency_total_s"] += latency_s
+
+def _strategy_stats_snapshot() -> Dict[str, Dict[str, Any]]:
+    return {
+        name: {
+            "runs": int(st["runs"]),
+            "wins": int(st["wins"]),
+            "failures": int(st["failures"]),
+            "win_rate": round(st["wins"] / st["runs"], 3) if st["runs"] else None,
+            "avg_latency_s": round(st["latency_total_s"] / st["completed"], 3) if st["completed"] else None,
+        }
+        for name, st in _STRATEGY_STATS.items()
+    }
+
+async def _race_parsers(parsers: List[tuple], md: str, hedge_delay_s: float) -> tuple:
+    """Hedged execution of [(name, parse_fn), ...] on the same markdown.
+
+    The first parser starts immediately; the next one starts once the
+    previous has failed or `hedge_delay_s` has passed without a result. A
+    result with a perfect completeness score wins outright; otherwise every
+    started parser is allowed to finish and the best score wins (ties go to
+    the earlier parser). Parsers still running at that point are cancelled
+    (their worker thread finishes in the background, the result is dropped).
+
+    Returns (raw_parsed, winner_name, race_metadata); re-raises the last
+    failure if every parser failed.
+    """
+    queue = list(parsers)
+    order = [name for name, _ in parsers]
+    tasks: Dict[asyncio.Future, str] = {}
+    started: Dict[str, float] = {}
+    runs: Dict[str, Dict[str, Any]] = {name: {"status": "not_started"} for name in order}
+    results: Dict[str, tuple] = {}
+    last_error: Optional[Exception] = None
+
+    def launch():
+        name, fn = queue.pop(0)
+        started[name] = time.perf_counter()
+        tasks[asyncio.ensure_future(run_blocking("anthropic", fn, md))] = name
+
+    launch()
+    while tasks:
+        done, _ = await asyncio.wait(
+            list(tasks), timeout=hedge_delay_s if queue else None, return_when=asyncio.FIRST_COMPLETED
+        )
+        if not done:
+            launch()  # hedge: the running parser is slow
+            continue
+        for task in done:
+            name = tasks.pop(task)
+            latency = round(time.perf_counter() - started[name], 3)
+            try:
+                raw = task.result()
+                score = _completeness_score(_normalize_parsed(raw))
+                results[name] = (raw, score)
+                runs[name] = {"status": "ok", "latency_s": latency, "score": score}
+            except Exception as e:
+                last_error = e
+                detail = getattr(e, "detail", None) or str(e)
+                runs[name] = {"status": "failed", "latency_s": latency, "error": str(detail)[:200]}
+        if any(score >= _COMPLETENESS_MAX for _, score in results.values()):
+            break
+        if not tasks:
+            if results:
+                break
+            if queue:
+                launch()  # everything started so far failed; don't wait out the hedge delay
+
+    for task, name in tasks.items():
+        task.cancel()
+        runs[name] = {"status": "cancelled", "latency_s": round(time.perf_counter() - started[name], 3)}
+
+    winner = None
+    if results:
+        winner = max(results, key=lambda n: (results[n][1], -order.index(n)))
+        runs[winner]["status"] = "won"
+    for name in order:
+        status = runs[name]["status"]
+        if status != "not_started":
+            _record_strategy_run(
+                name,
+                runs[name].get("latency_s") if status in {"won", "ok", "failed"} else None,
+                won=status == "won",
+                failed=status == "failed",
+            )
+    if winner is None:
+        raise last_error or RuntimeError("No parser produced a result")
+
+    race = {
+        "mode": "hedged",
+        "hedge_delay_s": hedge_delay_s,
+        "winner": winner,
+        "runs": runs,
+        "stats": _strategy_stats_snapshot(),
+    }
+    return results[winner][0], winner, race
+
 def _calculate_deal_metrics(d: Dict[str, Any]) -> Dict[str, Any]:
     """Calculate comprehensive investment metrics programmatically"""
     
@@ -1065,6 +1158,7 @@ def _calculate_deal_metrics(d: Dict[str, Any]) -> Dict[str, Any]:
     expense_ratio = _as_number(d.get("pnl", {}).get("expense_ratio")) or 0
     interest_rate = _as_number(d.get("pricing_financing", {}).get("interest_rate")) or 0
     term_years = _as_number(d.get("pricing_financing", {}).get("term_years")) or 30
+    loan_terms = amortization.loan_terms_from(d.get("pricing_financing", {}).get("loan_terms"))
     
     metrics = {}
     
@@ -1168,23 +1262,15 @@ def _calculate_deal_metrics(d: Dict[str, Any]) -> Dict[str, Any]:
         year_cash_flow = year_noi - debt_service
         if year == 5:  # Add sale proceeds in year 5
             sale_price = price * (1.03 ** 5)  # 3% annual appreciation
-            remaining_loan = loan_amount * 0.85 if loan_amount else 0  # Rough estimate of remaining balance
+            if loan_terms:  # scheduled balance after 60 payments
+                remaining_loan = amortization.outstanding(amortization.schedule(loan_terms), 60)
+            else:
+                remaining_loan = loan_amount * 0.85 if loan_amount else 0  # Rough estimate of remaining balance
             year_cash_flow += (sale_price - remaining_loan)
         irr_cash_flows.append(year_cash_flow)
     
-    # Simple IRR approximation
-    try:
-        # Newton's method for IRR (simplified)
-        rate = 0.1  # Initial guess
-        for _ in range(20):
-            npv = sum(cf / ((1 + rate) ** i) for i, cf in enumerate(irr_cash_flows))
-            dnpv = sum(-i * cf / ((1 + rate) ** (i + 1)) for i, cf in enumerate(irr_cash_flows) if i > 0)
-            if abs(dnpv) < 0.0001:
-                break
-            rate = rate - npv / dnpv
-        metrics["irr_5_year"] = round(rate * 100, 2)
-    except:
-        metrics["irr_5_year"] = 0
+    irr = returns.irr(irr_cash_flows)
+    metrics["irr_5_year"] = round(irr * 100, 2) if math.isfinite(irr) else 0
     
     # 15. Payback Period (years to recover initial investment)
     if annual_cash_flow > 0 and down_payment:
@@ -1214,59 +1300,6 @@ def _calculate_deal_metrics(d: Dict[str, Any]) -> Dict[str, Any]:
     else:
         metrics["cash_flow_per_unit"] = 0
     
-    # Now ask Claude for opinion based on these calculated metrics
-    metrics_summary = f"""
-    Investment Metrics Summary:
-    - Cap Rate: {metrics['cap_rate']}%
-    - Cash-on-Cash Return: {metrics['cash_on_cash_return']}%
-    - DSCR: {metrics['dscr']}
-    - Annual Cash Flow: ${metrics['annual_cash_flow']:,.0f}
-    - Monthly Cash Flow: ${metrics['monthly_cash_flow']:,.0f}
-    - ROI Year 1: {metrics['roi_year_1']}%
-    - IRR (5-year): {metrics['irr_5_year']}%
-    - GRM: {metrics['grm']}
-    - Price per Unit: ${metrics['price_per_unit']:,.0f}
-    - Expense Ratio: {metrics['expense_ratio']}%
-    - Break-even Ratio: {metrics['break_even_ratio']}%
-    - Debt Yield: {metrics['debt_yield']}%
-    - 1% Rule: {metrics['one_percent_rule']}%
-    - Payback Period: {metrics['payback_period_years']} years
-    - Operating Margin: {metrics['operating_margin']}%
-    """
-    
-    prompt = f"""Based on these calculated investment metrics, provide a brief investment opinion.
-    
-    {metrics_summary}
-    
-    Return JSON with:
-    - verdict: 'STRONG BUY', 'BUY', 'HOLD', 'PASS', or 'STRONG PASS'
-    - confidence: 'High', 'Moderate', or 'Low'
-    - pros: array of 3-4 positive factors
-    - cons: array of 3-4 negative factors or risks
-    - summary: 2-3 sentence investment thesis
-    
-    Focus on the actual numbers and standard investment criteria. Be critical and analytical."""
-    
-    try:
-        res = ANTHROPIC.messages.create(
-            model=ANTHROPIC_MODEL,
-            max_tokens=600,
-            temperature=0,
-            messages=[{"role": "user", "content": prompt}],
-        )
-        txt = res.content[0].text.strip().replace("```json", "").replace("```", "")
-        m = re.search(r"\{.*\}\s*$", txt, re.DOTALL)
-        opinion = json.loads(m.group(0) if m else txt)
-    except:
-        # Fallback opinion based on metrics
-        opinion = {
-            "verdict": "HOLD",
-            "confidence": "Moderate",
-            "pros": ["Metrics calculated successfully"],
-            "cons": ["Unable to generate detailed analysis"],
-            "summary": "Review the metrics carefully before making an investment decision."
-        }
-    
     # Calculate a simple score based on key metrics
     score = 50  # Base score
     if metrics['cap_rate'] >= 7: score += 10
@@ -1281,18 +1314,92 @@ def _calculate_deal_metrics(d: Dict[str, Any]) -> Dict[str, Any]:
     elif metrics['irr_5_year'] >= 10: score += 5
     
     score = min(100, max(0, score))
+
+    # The opinion is generated in the background (see _request_deal_opinion);
+    # it's built from rounded metrics so equal fingerprints mean equal prompts.
+    rounded = deal_opinions.rounded_metrics(metrics)
     
     return {
         "metrics": metrics,
         "score": score,
+        "verdict": None,
+        "confidence": None,
+        "pros": [],
+        "cons": [],
+        "summary": "",
+        "metrics_summary": _metrics_summary(rounded),
+        "opinion_id": deal_opinions.fingerprint(rounded, ANTHROPIC_MODEL),
+    }
+
+def _metrics_summary(m: Dict[str, Any]) -> str:
+    return f"""
+    Investment Metrics Summary:
+    - Cap Rate: {m['cap_rate']}%
+    - Cash-on-Cash Return: {m['cash_on_cash_return']}%
+    - DSCR: {m['dscr']}
+    - Annual Cash Flow: ${m['annual_cash_flow']:,.0f}
+    - Monthly Cash Flow: ${m['monthly_cash_flow']:,.0f}
+    - ROI Year 1: {m['roi_year_1']}%
+    - IRR (5-year): {m['irr_5_year']}%
+    - GRM: {m['grm']}
+    - Price per Unit: ${m['price_per_unit']:,.0f}
+    - Expense Ratio: {m['expense_ratio']}%
+    - Break-even Ratio: {m['break_even_ratio']}%
+    - Debt Yield: {m['debt_yield']}%
+    - 1% Rule: {m['one_percent_rule']}%
+    - Payback Period: {m['payback_period_years']} years
+    - Operating Margin: {m['operating_margin']}%
+    """
+
+def _generate_deal_opinion(metrics_summary: str) -> Dict[str, Any]:
+    """Ask Claude for a verdict on calculated metrics. Raises on failure."""
+    prompt = f"""Based on these calculated investment metrics, provide a brief investment opinion.
+    
+    {metrics_summary}
+    
+    Return JSON with:
+    - verdict: 'STRONG BUY', 'BUY', 'HOLD', 'PASS', or 'STRONG PASS'
+    - confidence: 'High', 'Moderate', or 'Low'
+    - pros: array of 3-4 positive factors
+    - cons: array of 3-4 negative factors or risks
+    - summary: 2-3 sentence investment thesis
+    
+    Focus on the actual numbers and standard investment criteria. Be critical and analytical."""
+    
+    res = ANTHROPIC.messages.create(
+        model=ANTHROPIC_MODEL,
+        max_tokens=600,
+        temperature=0,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    txt = res.content[0].text.strip().replace("```json", "").replace("```", "")
+    m = re.search(r"\{.*\}\s*$", txt, re.DOTALL)
+    opinion = json.loads(m.group(0) if m else txt)
+    return {
         "verdict": opinion.get("verdict", "HOLD"),
         "confidence": opinion.get("confidence", "Moderate"),
         "pros": opinion.get("pros", []),
         "cons": opinion.get("cons", []),
         "summary": opinion.get("summary", ""),
-        "metrics_summary": metrics_summary
     }
 
+def _apply_deal_opinion(analysis: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill a deal_analysis dict from an opinion status record."""
+    analysis["opinion_status"] = state["status"]
+    if state.get("opinion"):
+        analysis.update(state["opinion"])
+    return analysis
+
+def _request_deal_opinion(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Attach a cached opinion, or start generating one in the background."""
+    fp = analysis["opinion_id"]
+    analysis["opinion_url"] = f"/deal-opinions/{fp}"
+    if ANTHROPIC is None:
+        return _apply_deal_opinion(analysis, {"status": deal_opinions.FAILED, "opinion": dict(deal_opinions.FALLBACK_OPINION)})
+    summary = analysis["metrics_summary"]
+    state = deal_opinions.OPINIONS.request(fp, lambda: _generate_deal_opinion(summary))
+    return _apply_deal_opinion(analysis, state)
+
 # ---------------- Property Analysis (UNCHANGED) ----------------
 def analyze_property_with_market(
    property_data: Dict[str, Any],
@@ -1519,13 +1626,19 @@ def health():
         "version": "9.0.0",
         "parser_default": "parser_v4",
         "clients": {
-            "mistral": MISTRAL is not None,
+            "mistral": bool(MISTRAL_API_KEY),
             "anthropic": ANTHROPIC is not None,
         }
     }
 
+@app.get("/admission/stats")
+def admission_stats():
+    """Running / queued requests and recent waits per heavy endpoint class."""
+    return {"ok": True, "classes": ADMISSION.stats()}
+
 @app.post("/ocr/underwrite")
 async def ocr_and_underwrite(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     pages: Optional[str] = Form(default=""),
 
@@ -1557,6 +1670,12 @@ async def ocr_and_underwrite(
     st_interest_rate: Optional[float] = Form(default=None),
     st_remaining_term_years: Optional[int] = Form(default=None),
     st_amort_years: Optional[int] = Form(default=None),
+
+    # job mode: return a job id immediately and run the pipeline in the background
+    async_job: Optional[bool] = Form(default=False),
+
+    # response projection, e.g. ?fields=deal_id,parsed.pricing_financing
+    fields: Optional[str] = Query(default=None),
 ):
     print(f"\n{'='*80}")
     print(f"[OCR/UNDERWRITE] REQUEST RECEIVED")
@@ -1568,11 +1687,93 @@ async def ocr_and_underwrite(
     if mime not in ALLOWED_UPLOAD_MIMES:
         raise HTTPException(status_code=415, detail=f"Unsupported content type: {mime}")
 
-    data = await file.read()
-    if not data:
+    # Spooled to a mapped temp file (upload_spool): the upload never sits on the heap
+    upload = await spool_upload(file, MAX_BYTES)
+    if not upload.size:
         raise HTTPException(status_code=400, detail="Empty upload")
-    if len(data) > MAX_BYTES:
-        raise HTTPException(status_code=413, detail=f"File too large (> {MAX_BYTES // (1024*1024)} MB)")
+
+    params = {
+        "pages": pages,
+        "parser_strategy": parser_strategy,
+        "loan_amount": loan_amount,
+        "down_payment_pct": down_payment_pct,
+        "interest_rate": interest_rate,
+        "term_years": term_years,
+        "loan_type": loan_type,
+        "financing_mode": financing_mode,
+        "amort_years": amort_years,
+        "down_payment_amount": down_payment_amount,
+        "sf_interest_rate": sf_interest_rate,
+        "sf_amort_years": sf_amort_years,
+        "sf_balloon_years": sf_balloon_years,
+        "sf_io_years": sf_io_years,
+        "st_existing_balance": st_existing_balance,
+        "st_interest_rate": st_interest_rate,
+        "st_remaining_term_years": st_remaining_term_years,
+        "st_amort_years": st_amort_years,
+    }
+
+    with upload:
+        if async_job:
+            if mime == "application/pdf" and pages:
+                try:
+                    _parse_pages_string(pages, pdf_page_count(upload.view))
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+            try:
+                job = await OCR_JOBS.submit(upload.view, mime, file.filename, params)
+            except JobQueueFull as e:
+                raise HTTPException(status_code=503, detail=str(e))
+            return JSONResponse(status_code=202, content={
+                "ok": True,
+                "job_id": job["id"],
+                "status": job["status"],
+                "status_url": f"/ocr/jobs/{job['id']}",
+                "result_url": f"/ocr/jobs/{job['id']}/result",
+            })
+
+        result = await _run_metered(
+            upload.view, mime, file.filename, params, None,
+            lambda *a: background_tasks.add_task(deal_images.run_deal_images, *a),
+        )
+    return project(result, fields)
+
+
+async def _underwrite_pipeline(
+    data: Union[bytes, PdfSession],
+    mime: str,
+    file_name: Optional[str],
+    params: Dict[str, Any],
+    progress=None,
+) -> Dict[str, Any]:
+    """OCR -> parse -> enrich -> underwrite -> metrics -> images for one upload.
+
+    PDFs arrive as the upload's PdfSession: page slicing, OCR fingerprints,
+    batching and the recovery pass all read from that one parsed handle.
+
+    Shared by the inline /ocr/underwrite response and the background job
+    workers. `progress(stage, partial=None)` is called as each stage starts
+    and again with interim results (OCR page count, property block, ...) as
+    soon as they exist, for the job event stream.
+    """
+    stage = progress or (lambda _name, _partial=None: None)
+    pages = params.get("pages") or ""
+    parser_strategy = params.get("parser_strategy")
+    loan_amount = params.get("loan_amount")
+    down_payment_pct = params.get("down_payment_pct")
+    interest_rate = params.get("interest_rate")
+    term_years = params.get("term_years")
+    financing_mode = params.get("financing_mode")
+    amort_years = params.get("amort_years")
+    down_payment_amount = params.get("down_payment_amount")
+    sf_interest_rate = params.get("sf_interest_rate")
+    sf_amort_years = params.get("sf_amort_years")
+    sf_balloon_years = params.get("sf_balloon_years")
+    sf_io_years = params.get("sf_io_years") or 0
+    st_existing_balance = params.get("st_existing_balance")
+    st_interest_rate = params.get("st_interest_rate")
+    st_remaining_term_years = params.get("st_remaining_term_years")
+    st_amort_years = params.get("st_amort_years")
 
     orig_data, orig_mime = data, mime
 
@@ -1581,21 +1782,24 @@ async def ocr_and_underwrite(
         strategy = "claude"
 
     if mime == "application/pdf" and pages:
+        stage("slice")
         try:
             data = _slice_pdf(data, pages)
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
+    stage("ocr")
     if mime in ALLOWED_DOC_MIMES:
-        ocr_json = _call_mistral_ocr(data, mime)
+        ocr_json = await run_blocking("mistral", _call_mistral_ocr, data, mime)
         md_parts = [p.get("markdown", "") for p in ocr_json.get("pages", []) if isinstance(p, dict)]
         markdown_text = "\n\n".join([m for m in md_parts if m]).strip()
         if not markdown_text:
             raise HTTPException(status_code=502, detail="No text extracted from OCR")
+        stage("ocr", {"ocr_page_count": len(ocr_json.get("pages", [])), "cache": ocr_json.get("cache")})
     else:
         ocr_json = None
         try:
-            text = data.decode("utf-8", errors="ignore")
+            text = bytes(data).decode("utf-8", errors="ignore")
         except Exception:
             text = base64.b64encode(data).decode("utf-8")
         markdown_text = "SPREADSHEET_CONTENT\n\n" + text[:500000]
@@ -1633,21 +1837,31 @@ async def ocr_and_underwrite(
             raise HTTPException(status_code=502, detail=f"parser_v4 returned error: {err or 'unknown error'}")
         return res.get("data") or {}
 
+    stage("parse")
+    strategy_race = None
     try:
         if strategy == "claude":
-            parsed_raw = _parse_with_claude(markdown_text); used_strategy = "claude"
+            parsed_raw = await run_blocking("anthropic", _parse_with_claude, markdown_text); used_strategy = "claude"
         elif strategy == "om_v4":
-            parsed_raw = _parse_with_om_v4(markdown_text);  used_strategy = "om_v4"
-        else:
+            parsed_raw = await run_blocking("anthropic", _parse_with_om_v4, markdown_text);  used_strategy = "om_v4"
+        elif HYBRID_EXECUTION == "sequential":
             try:
-                parsed_raw = _parse_with_om_v4(markdown_text); used_strategy = "om_v4"
+                parsed_raw = await run_blocking("anthropic", _parse_with_om_v4, markdown_text); used_strategy = "om_v4"
             except Exception:
-                parsed_raw = _parse_with_claude(markdown_text); used_strategy = "claude"
+                parsed_raw = await run_blocking("anthropic", _parse_with_claude, markdown_text); used_strategy = "claude"
+        else:
+            parsed_raw, used_strategy, strategy_race = await _race_parsers(
+                [("om_v4", _parse_with_om_v4), ("claude", _parse_with_claude)],
+                markdown_text,
+                HYBRID_HEDGE_DELAY_S,
+            )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Parsing failed: {e}")
+    stage("parse", {"used_strategy": used_strategy, "strategy_race": strategy_race})
 
+    stage("enrich")
     normalized = _normalize_parsed(parsed_raw)
 
     # Deterministic enrichment from selected pages
@@ -1676,7 +1890,13 @@ async def ocr_and_underwrite(
         if pr.get(k) and not pricing.get(k):
             pricing[k] = pr[k]
 
-    ops = _extract_operating_summary_from_markdown(markdown_text)
+    # One pass over the OCR pages gives the operating summary values and
+    # their page/line sources together.
+    try:
+        ops = scan_ocr_json(ocr_json) if ocr_json is not None else scan_pages([markdown_text])
+    except Exception as e:
+        ops = {"pnl": {}, "expenses": {}, "sources": {}}
+        normalized.setdefault("metadata", {})["sources_error"] = str(e)[:200]
     for k, v in (ops.get("pnl") or {}).items():
         if v is not None and not pnl.get(k):
             pnl[k] = v
@@ -1686,17 +1906,13 @@ async def ocr_and_underwrite(
 
     # Attach lightweight source metadata for key P&L/expense fields so
     # the frontend can show where values came from in the PDF viewer.
-    try:
-        if ocr_json is not None:
-            op_sources = _extract_operating_summary_sources(ocr_json)
-            if op_sources:
-                normalized.setdefault("metadata", {})["sources"] = op_sources
-    except Exception as e:
-        # Never let source-mapping failures break underwriting; just
-        # record a truncated error string for debugging.
-        normalized.setdefault("metadata", {})["sources_error"] = str(e)[:200]
+    if ocr_json is not None and ops.get("sources"):
+        normalized.setdefault("metadata", {})["sources"] = ops["sources"]
+
+    stage("enrich", {"property": prop, "unit_mix_rows": len(normalized.get("unit_mix") or [])})
 
     # ---------- Financing mode compute (overrides/augments Claude) ----------
+    stage("underwrite")
     fm = (financing_mode or "").strip().lower()
     price_val = _as_number(pricing.get("price"))
 
@@ -1705,6 +1921,11 @@ async def ocr_and_underwrite(
             pricing["monthly_payment"] = round(monthly, 2)
             pricing["annual_debt_service"] = round(monthly * 12, 2)
 
+    def set_schedule(terms):
+        # The terms travel with the deal so metrics / cost seg can rebuild the schedule from cache
+        pricing["loan_terms"] = terms._asdict()
+        return amortization.schedule(terms)
+
     if fm == "traditional":
         dp_pct_v   = _as_number(down_payment_pct)
         rate_v     = _as_number(interest_rate)
@@ -1719,8 +1940,8 @@ async def ocr_and_underwrite(
             loan_amt = _as_number(pricing.get("loan_amount"))
 
         n = int((amort_y_v or term_y_v or 30) * 12) if (amort_y_v or term_y_v) else None
-        m = _pmti(loan_amt, rate_v or 0, n or 0)
-        set_ads(m)
+        sched = set_schedule(amortization.loan_terms(loan_amt, rate_v, n))
+        set_ads(amortization.monthly_payment(sched))
         pricing["debt_type"] = "Traditional"
 
     elif fm == "seller_finance":
@@ -1737,28 +1958,14 @@ async def ocr_and_underwrite(
         else:
             loan_amt = _as_number(pricing.get("loan_amount"))
 
+        # IO months first, then amortizing over the full amortization; the balloon
+        # (if any) is whatever is left at that payment - the whole loan if it falls inside IO.
         amort_m = int((amort_y_v or 30) * 12)
-        if io_y_v and io_y_v > 0:
-            io_months = int(io_y_v * 12)
-            io_payment = (rate_v or 0)/100/12 * (loan_amt or 0)
-            if bal_y_v and bal_y_v*12 <= io_months:
-                balloon_amt = loan_amt
-                set_ads(io_payment)
-            else:
-                rem_months = max(0, (bal_y_v or 0)*12 - io_months) if bal_y_v else amort_m - io_months
-                pmt = _pmti(loan_amt, rate_v or 0, amort_m)
-                set_ads(io_payment if io_months else pmt)
-                if bal_y_v:
-                    balloon_amt = _remaining_balance(loan_amt, rate_v or 0, amort_m, rem_months)
-                else:
-                    balloon_amt = 0.0
-        else:
-            pmt = _pmti(loan_amt, rate_v or 0, amort_m)
-            set_ads(pmt)
-            if bal_y_v:
-                balloon_amt = _remaining_balance(loan_amt, rate_v or 0, amort_m, int(bal_y_v*12))
-            else:
-                balloon_amt = 0.0
+        sched = set_schedule(amortization.loan_terms(
+            loan_amt, rate_v, amort_m, io_months=io_y_v * 12, balloon_month=(bal_y_v or 0) * 12,
+        ))
+        set_ads(amortization.monthly_payment(sched))
+        balloon_amt = amortization.balloon_amount(sched)
 
         pricing["balloon_amount"] = round(balloon_amt, 2) if balloon_amt else 0.0
         pricing["debt_type"] = "Seller Finance"
@@ -1772,8 +1979,8 @@ async def ocr_and_underwrite(
         loan_amt = existing_bal_v
         pricing["loan_amount"] = round(loan_amt or 0, 2)
         amort_m = int((amort_y_v or rem_term_y_v or 30) * 12)
-        pmt = _pmti(loan_amt, rate_v or 0, amort_m)
-        set_ads(pmt)
+        sched = set_schedule(amortization.loan_terms(loan_amt, rate_v, amort_m))
+        set_ads(amortization.monthly_payment(sched))
         pricing["debt_type"] = "Subject-To"
         if price_val and existing_bal_v is not None:
             pricing["down_payment"] = round(max(0.0, price_val - existing_bal_v), 2)
@@ -1782,16 +1989,24 @@ async def ocr_and_underwrite(
     normalized = _validate_and_enrich(normalized)
     normalized = _compute_underwriting(normalized)
     normalized.setdefault("metadata", {})["used_strategy"] = used_strategy
+    if strategy_race:
+        normalized["metadata"]["strategy_race"] = strategy_race
     normalized["visualizations"] = _generate_visualization_data(normalized)
+    stage("underwrite", {
+        "pricing_financing": normalized.get("pricing_financing"),
+        "pnl": normalized.get("pnl"),
+        "underwriting": normalized.get("underwriting"),
+    })
 
     # Recovery pass if still incomplete and user sliced pages
     if (mime == "application/pdf") and pages and _is_critically_incomplete(normalized):
+        stage("recovery")
         try:
-            full_ocr = _call_mistral_ocr(orig_data, orig_mime)
+            full_ocr = await run_blocking("mistral", _call_mistral_ocr, orig_data, orig_mime)
             rec_idxs = _pages_with_keywords(full_ocr, RECOVERY_KEYWORDS)
             rec_md = "\n\n".join([(full_ocr["pages"][i].get("markdown") or "") for i in rec_idxs])
             combined_md = markdown_text + "\n\n--- RECOVERY PAGES ---\n\n" + rec_md
-            parsed2 = _call_claude_parse_from_markdown(combined_md, financing_params)
+            parsed2 = await run_blocking("anthropic", _call_claude_parse_from_markdown, combined_md, financing_params)
             n2 = _normalize_parsed(parsed2)
 
             prop2 = n2.setdefault("property", {})
@@ -1826,76 +2041,235 @@ async def ocr_and_underwrite(
             n2 = _validate_and_enrich(n2)
             n2 = _compute_underwriting(n2)
             n2.setdefault("metadata", {})["used_strategy"] = used_strategy + "+recovery"
+            if strategy_race:
+                n2["metadata"]["strategy_race"] = strategy_race
             n2["visualizations"] = _generate_visualization_data(n2)
             n2["metadata"]["recovery_pages_used"] = [i+1 for i in rec_idxs]
 
-            def _score(d: Dict[str, Any]) -> int:
-                s = 0
-                s += sum(1 for k in ["address", "units"] if d.get("property", {}).get(k))
-                s += sum(1 for k in ["price"] if d.get("pricing_financing", {}).get(k))
-                s += sum(1 for k in ["gross_potential_rent", "operating_expenses", "noi"] if d.get("pnl", {}).get(k))
-                return s
-
-            if _score(n2) > _score(normalized):
+            if _completeness_score(n2) > _completeness_score(normalized):
                 normalized = n2
+            stage("recovery", {"recovery_pages_used": n2["metadata"]["recovery_pages_used"], "adopted": normalized is n2})
 
         except Exception as e:
             normalized.setdefault("metadata", {})["recovery_error"] = str(e)[:200]
 
     # Calculate comprehensive deal metrics instead of simple opinion
-    normalized["deal_analysis"] = _calculate_deal_metrics(normalized)
+    stage("metrics")
+    normalized["deal_analysis"] = _request_deal_opinion(_calculate_deal_metrics(normalized))
+    stage("metrics", {"deal_analysis": normalized["deal_analysis"]})
 
-    # NEW: Extract images from PDF if applicable
-    extracted_images = []
-    image_count = 0
+    # Images are extracted and uploaded after the response is sent (see
+    # _schedule_deal_images); the client picks them up from images_url.
     generated_deal_id = str(uuid.uuid4())
-    
-    if mime == "application/pdf" and HAS_PARSER_V4:
-        try:
-            from image_storage import upload_images_to_supabase
-            
-            # Save PDF temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
-                tmp_pdf.write(orig_data)
-                tmp_pdf_path = tmp_pdf.name
-            
-            # Create temp directory for extracted images
-            temp_img_dir = f"temp_images_{generated_deal_id}"
-            os.makedirs(temp_img_dir, exist_ok=True)
-            
-            # Extract images using parser
-            extracted = _RE_PARSER.extract_images_from_pdf(tmp_pdf_path, temp_img_dir)
-            
-            # Upload to Supabase Storage
-            if extracted:
-                uploaded = upload_images_to_supabase(generated_deal_id, extracted)
-                extracted_images = uploaded
-                image_count = len(uploaded)
-            
-            # Cleanup
-            os.remove(tmp_pdf_path)
-            shutil.rmtree(temp_img_dir, ignore_errors=True)
-            
-            print(f"✅ Extracted and uploaded {image_count} images for deal {generated_deal_id}")
-            
-        except Exception as e:
-            print(f"⚠️ Image extraction failed: {str(e)}")
-            # Don't fail the whole request if image extraction fails
+    images_status = None
+    images_url = None
+    if mime == "application/pdf":
+        deal_images.mark_pending(generated_deal_id)
+        images_status = deal_images.PENDING
+        images_url = f"/ocr/deals/{generated_deal_id}/images"
+
+    # Raw OCR markdown can run to megabytes; keep it server-side for the
+    # PDF viewer instead of sending it with every response. The store is an
+    # LRU, so the URL can go 404 after eviction.
+    raw_markdown_url = None
+    if markdown_text:
+        await asyncio.get_running_loop().run_in_executor(None, save_markdown, generated_deal_id, markdown_text)
+        raw_markdown_url = f"/ocr/deals/{generated_deal_id}/markdown"
 
     return {
         "ok": True,
         "parsed": normalized,
-        "raw_markdown": markdown_text,
+        "raw_markdown_url": raw_markdown_url,
+        "raw_markdown_chars": len(markdown_text or ""),
         "ocr_page_count": len(ocr_json.get("pages", [])) if ocr_json else None,
         "selected_pages": pages or "all",
-        "file_name": file.filename,
-        "file_size_mb": round(len(data) / (1024 * 1024), 2),
+        "file_name": file_name,
+        "file_size_mb": round(_document_size(data, orig_data) / (1024 * 1024), 2),
         "user_financing": financing_params,
-        "images": extracted_images,  # NEW: Return extracted image URLs
-        "image_count": image_count,   # NEW: Return count
+        "images": [],  # filled in by GET images_url once images_status is "done"
+        "image_count": 0,
+        "images_status": images_status,
+        "images_url": images_url,
         "deal_id": generated_deal_id,  # NEW: Return deal ID for tracking images
     }
 
+
+def _schedule_deal_images(result: Dict[str, Any], doc, schedule) -> None:
+    """Hand a finished pipeline result's image work to `schedule(pdf, deal_id)`.
+
+    A PdfSession is retained for the background work, which closes it.
+    """
+    if isinstance(result, dict) and result.get("images_status") == deal_images.PENDING:
+        schedule(doc.retain() if isinstance(doc, PdfSession) else doc, result["deal_id"])
+
+
+async def _run_metered(data, mime, file_name, params, progress, schedule_images, budget_wait=UPLOAD_MEMORY_WAIT_S):
+    """Run the pipeline on one upload within the upload memory budget, recording what it cost."""
+    async with UPLOAD_BUDGET.reserve(len(data), timeout=budget_wait):
+        meter = UploadMeter(len(data))
+        with open_upload(data, mime) as doc:
+            result = await _underwrite_pipeline(doc, mime, file_name, params, meter.wrap(progress))
+            _schedule_deal_images(result, doc, schedule_images)
+        result["upload_memory"] = meter.report()
+        log.info("[upload] %s: %s", file_name, result["upload_memory"])
+    return result
+
+
+async def _run_underwrite_job(data, mime, file_name, params, progress=None):
+    # Queued jobs wait for budget rather than failing.
+    return await _run_metered(data, mime, file_name, params, progress, deal_images.start_background, budget_wait=None)
+
+@app.get("/ocr/jobs/{job_id}")
+async def ocr_job_status(job_id: str):
+    job = OCR_JOBS.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"ok": True, "job": job}
+
+@app.get("/ocr/jobs/{job_id}/result")
+async def ocr_job_result(job_id: str, fields: Optional[str] = None):
+    job = OCR_JOBS.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=job.get("error_status") or 500, detail=job.get("error") or "Job failed")
+    if job["status"] != "succeeded":
+        return JSONResponse(status_code=202, content={"ok": False, "job": job})
+    result = OCR_JOBS.result(job_id)
+    if result is None:
+        raise HTTPException(status_code=410, detail="Job result no longer available")
+    return project(_with_deal_opinion(_with_deal_images(result)), fields)
+
+def _with_deal_images(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge background image extraction status into a stored pipeline result."""
+    deal_id = result.get("deal_id")
+    if not deal_id or not result.get("images_status"):
+        return result
+    record = deal_images.get_status(deal_id)
+    if record:
+        result["images_status"] = record["status"]
+        result["images"] = record.get("images") or []
+        result["image_count"] = record.get("image_count") or 0
+    return result
+
+def _with_deal_opinion(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill a stored pipeline result's deal_analysis once its opinion is ready."""
+    analysis = (result.get("parsed") or {}).get("deal_analysis") or {}
+    if analysis.get("opinion_status") == deal_opinions.PENDING:
+        state = deal_opinions.OPINIONS.status(analysis["opinion_id"])
+        if state is not None:
+            _apply_deal_opinion(analysis, state)
+    return result
+
+@app.get("/deal-opinions/{opinion_id}")
+async def get_deal_opinion(opinion_id: str):
+    """Poll for a deal opinion started by underwriting; status is pending until ready."""
+    state = deal_opinions.OPINIONS.status(opinion_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown opinion")
+    return {"ok": True, "opinion_id": opinion_id, **state}
+
+METRICS_BATCH_MAX_ROWS = int(os.getenv("METRICS_BATCH_MAX_ROWS", "200000"))
+
+def _batch_metrics(body: Dict[str, Any]) -> Dict[str, Any]:
+    if "deals" in body:
+        cols = deal_metrics.columns_from_deals(body.get("deals") or [])
+    else:
+        cols = deal_metrics.as_columns(body.get("columns") or {})
+    result = deal_metrics.compute_metrics(deal_metrics.fill_underwriting(cols))
+    return {"count": len(result["score"]), **deal_metrics.to_response(result, body.get("orient") or "columns")}
+
+@app.post("/metrics/batch")
+async def metrics_batch(request: Request):
+    """Deal metrics + score for many deals in one vectorized pass.
+
+    Body: {"columns": {"price": [...], "noi": [...], ...}} (see
+    deal_metrics.INPUT_FIELDS) or {"deals": [parsed_deal, ...]}, plus an
+    optional "orient": "columns" (default) | "records". Figures match
+    `_calculate_deal_metrics` for the same deal exactly.
+    """
+    try:
+        body = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Body must be JSON")
+    if not isinstance(body, dict) or not ("deals" in body or "columns" in body):
+        raise HTTPException(status_code=400, detail="Provide 'columns' or 'deals'")
+    if body.get("orient", "columns") not in ("columns", "records"):
+        raise HTTPException(status_code=400, detail="orient must be 'columns' or 'records'")
+    rows = len(body.get("deals") or []) if "deals" in body else max(
+        (len(v) for v in (body.get("columns") or {}).values() if isinstance(v, list)), default=0)
+    if rows > METRICS_BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {METRICS_BATCH_MAX_ROWS} deals per batch")
+    try:
+        result = await run_blocking("metrics", _batch_metrics, body)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ok": True, **result}
+
+@app.get("/ocr/deals/{deal_id}/images")
+async def ocr_deal_images(deal_id: str):
+    """Images extracted from an underwritten OM; status is pending until the upload finishes."""
+    record = deal_images.get_status(deal_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="No images recorded for this deal")
+    return {"ok": True, **record}
+
+@app.get("/ocr/deals/{deal_id}/markdown")
+async def ocr_deal_markdown(deal_id: str, request: Request):
+    """Raw OCR markdown of an underwritten OM, for the PDF viewer.
+
+    A deal's markdown never changes, so responses are cacheable forever and
+    revalidate with ETag/If-None-Match. Stored gzip bytes go out as-is to
+    clients that accept gzip. The store is size-capped (OCR_MARKDOWN_MAX_MB),
+    so this answers 404 once a deal's markdown has been evicted.
+    """
+    stored = await asyncio.get_running_loop().run_in_executor(None, load_markdown, deal_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="No markdown stored for this deal")
+    body, etag = stored
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(body)
+    return Response(content=body, media_type="text/markdown; charset=utf-8", headers=headers)
+
+@app.get("/ocr/jobs/{job_id}/events")
+async def ocr_job_events(job_id: str, request: Request):
+    """Server-Sent Events stream of a job's stage starts/ends, timings and partial results.
+
+    Past events are replayed first, so the stream can be opened at any point;
+    EventSource reconnects resume after the Last-Event-ID header.
+    """
+    if not OCR_JOBS.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        after = int(request.headers.get("last-event-id", "-1"))
+    except ValueError:
+        after = -1
+
+    async def _stream():
+        yield "retry: 3000\n\n"
+        async for ev in OCR_JOBS.events(job_id, after=after):
+            if await request.is_disconnected():
+                break
+            if ev is None:
+                yield ": keep-alive\n\n"
+                continue
+            payload = json.dumps({"at": ev["at"], **ev["data"]}, default=str)
+            yield f"id: {ev['id']}\nevent: {ev['event']}\ndata: {payload}\n\n"
+
+    return StreamingResponse(_stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
 @app.post("/ocr/file")
 async def ocr_file_legacy(
     file: UploadFile = File(...),
@@ -1906,19 +2280,18 @@ async def ocr_file_legacy(
     if mime not in ALLOWED_DOC_MIMES:
         raise HTTPException(status_code=415, detail=f"Unsupported content type: {mime}")
 
-    data = await file.read()
-    if not data:
+    upload = await spool_upload(file, MAX_BYTES)
+    if not upload.size:
         raise HTTPException(status_code=400, detail="Empty upload")
-    if len(data) > MAX_BYTES:
-        raise HTTPException(status_code=413, detail=f"File too large")
 
-    if mime == "application/pdf" and pages:
-        try:
-            data = _slice_pdf(data, pages)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
+    with upload, open_upload(upload.view, mime) as doc:
+        if mime == "application/pdf" and pages:
+            try:
+                doc = _slice_pdf(doc, pages)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
 
-    ocr_json = _call_mistral_ocr(data, mime)
+        ocr_json = await run_blocking("mistral", _call_mistral_ocr, doc, mime)
     return {"ok": True, "parser": "none (ocr only)", "ocr_data": ocr_json}
 
 
@@ -1938,20 +2311,19 @@ async def ocr_sources(
     if mime not in ALLOWED_DOC_MIMES:
         raise HTTPException(status_code=415, detail=f"Unsupported content type: {mime}")
 
-    data = await file.read()
-    if not data:
+    upload = await spool_upload(file, MAX_BYTES)
+    if not upload.size:
         raise HTTPException(status_code=400, detail="Empty upload")
-    if len(data) > MAX_BYTES:
-        raise HTTPException(status_code=413, detail="File too large")
 
-    # Optional page slicing for PDFs
-    if mime == "application/pdf" and pages:
-        try:
-            data = _slice_pdf(data, pages)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
+    with upload, open_upload(upload.view, mime) as doc:
+        # Optional page slicing for PDFs
+        if mime == "application/pdf" and pages:
+            try:
+                doc = _slice_pdf(doc, pages)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
 
-    ocr_json = _call_mistral_ocr(data, mime)
+        ocr_json = await run_blocking("mistral", _call_mistral_ocr, doc, mime)
     sources = {}
     error = None
     try:
@@ -2003,24 +2375,24 @@ async def health_check_verify(
    if len(data) > MAX_BYTES:
        raise HTTPException(status_code=413, detail="File too large")
    
-   # Handle PDF page selection
-   if mime == "application/pdf" and pages:
-       try:
-           data = _slice_pdf(data, pages)
-       except ValueError as e:
-           raise HTTPException(status_code=400, detail=str(e))
-   
    # OCR the document
    markdown_text = ""
    if mime in {"application/pdf", "image/png", "image/jpeg", "image/jpg", "image/webp"}:
-       try:
-           ocr_json = _call_mistral_ocr(data, mime)
-           for page in ocr_json.get("pages", []):
-               if isinstance(page, dict) and "markdown" in page:
-                   markdown_text += page["markdown"] + "\n\n"
-       except Exception as e:
-           print(f"OCR error: {e}")
-           raise HTTPException(status_code=502, detail=f"OCR failed: {str(e)}")
+       with open_upload(data, mime) as doc:
+           # Handle PDF page selection
+           if mime == "application/pdf" and pages:
+               try:
+                   doc = _slice_pdf(doc, pages)
+               except ValueError as e:
+                   raise HTTPException(status_code=400, detail=str(e))
+           try:
+               ocr_json = await run_blocking("mistral", _call_mistral_ocr, doc, mime)
+               for page in ocr_json.get("pages", []):
+                   if isinstance(page, dict) and "markdown" in page:
+                       markdown_text += page["markdown"] + "\n\n"
+           except Exception as e:
+               print(f"OCR error: {e}")
+               raise HTTPException(status_code=502, detail=f"OCR failed: {str(e)}")
    else:
        try:
            markdown_text = data.decode("utf-8", errors="ignore")
@@ -2032,7 +2404,7 @@ async def health_check_verify(
    
    # Parse with health check parser
    try:
-       extracted_data = health_parse(markdown_text)
+       extracted_data = await run_blocking("anthropic", health_parse, markdown_text)
        extracted_data = normalize_and_compute(extracted_data)
        
        # Apply user corrections if any
@@ -2074,7 +2446,7 @@ async def health_check_analyze(request: Request):
        except ImportError:
            raise HTTPException(status_code=501, detail="Health check analysis not available")
        
-       health_check_result = generate_health_check_analysis(verified_payload)
+       health_check_result = await run_blocking("anthropic", generate_health_check_analysis, verified_payload)
        return {
            "ok": True,
            "health_check": health_check_result
@@ -2242,35 +2614,36 @@ Format your responses clearly with sections and bullet points for easy reading."
         messages.append({"role": "user", "content": message})
         
         # Call OpenAI API
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {openai_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4o",
-                    "messages": messages,
-                    "temperature": 0.7,
-                    "max_tokens": 2000
-                }
+        client = get_async_http_client("openai")
+        response = await client.post(
+            "https://api.openai.com/v1/chat/completions",
+            timeout=60.0,
+            headers={
+                "Authorization": f"Bearer {openai_key}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": "gpt-4o",
+                "messages": messages,
+                "temperature": 0.7,
+                "max_tokens": 2000
+            }
+        )
+        
+        if response.status_code != 200:
+            return JSONResponse(
+                status_code=response.status_code,
+                content={"success": False, "error": f"OpenAI API error: {response.text}"}
             )
-            
-            if response.status_code != 200:
-                return JSONResponse(
-                    status_code=response.status_code,
-                    content={"success": False, "error": f"OpenAI API error: {response.text}"}
-                )
-            
-            result = response.json()
-            assistant_message = result["choices"][0]["message"]["content"]
-            
-            return JSONResponse(content={
-                "success": True,
-                "response": assistant_message
-            })
-            
+        
+        result = response.json()
+        assistant_message = result["choices"][0]["message"]["content"]
+        
+        return JSONResponse(content={
+            "success": True,
+            "response": assistant_message
+        })
+        
     except Exception as e:
         print(f"DD Chat error: {str(e)}")
         return JSONResponse(
@@ -2605,65 +2978,66 @@ Use REAL DATA. If missing, use null. DO NOT SKIP THE JSON."""
             "response_format": {"type": "text"}  # Ensure we get text not pure JSON
         }
         
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                "https://api.perplexity.ai/chat/completions",
-                headers=headers,
-                json=payload
+        client = get_async_http_client("perplexity")
+        response = await client.post(
+            "https://api.perplexity.ai/chat/completions",
+            timeout=120.0,
+            headers=headers,
+            json=payload
+        )
+        
+        if response.status_code != 200:
+            error_text = response.text
+            print(f"Perplexity API error: {response.status_code} - {error_text}")
+            return JSONResponse(
+                status_code=500,
+                content={"success": False, "error": f"Perplexity API error: {response.status_code}"}
             )
-            
-            if response.status_code != 200:
-                error_text = response.text
-                print(f"Perplexity API error: {response.status_code} - {error_text}")
-                return JSONResponse(
-                    status_code=500,
-                    content={"success": False, "error": f"Perplexity API error: {response.status_code}"}
-                )
-            
-            result = response.json()
-            content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-            citations = result.get("citations", [])
-            
-            print(f"[MarketResearch] Raw response length: {len(content)} chars")
-            print(f"[MarketResearch] Response preview: {content[:500]}...")
-            
-            # Extract JSON data from response if present
-            market_data = None
+        
+        result = response.json()
+        content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+        citations = result.get("citations", [])
+        
+        print(f"[MarketResearch] Raw response length: {len(content)} chars")
+        print(f"[MarketResearch] Response preview: {content[:500]}...")
+        
+        # Extract JSON data from response if present
+        market_data = None
+        try:
+            # Look for JSON code block
+            import re
+            json_match = re.search(r'```json\s*(\{.*?\})\s*```', content, re.DOTALL)
+            if json_match:
+                market_data = json.loads(json_match.group(1))
+                print(f"[MarketResearch] ✅ Extracted market data: {len(market_data.get('markets', []))} markets")
+                print(f"[MarketResearch] Market data: {market_data}")
+            else:
+                print(f"[MarketResearch] ❌ No JSON block found in response")
+                # Try alternative: look for just the markets array
+                markets_match = re.search(r'"markets"\s*:\s*\[(.*?)\]', content, re.DOTALL)
+                if markets_match:
+                    print(f"[MarketResearch] Found markets array without code block, attempting to parse...")
+                    market_data = json.loads('{' + markets_match.group(0) + '}')
+                    print(f"[MarketResearch] ✅ Extracted {len(market_data.get('markets', []))} markets from inline JSON")
+        except Exception as e:
+            print(f"[MarketResearch] ❌ Failed to extract JSON: {e}")
+            import traceback
+            traceback.print_exc()
+        
+        # No token deduction for chat endpoint
+        if profile_id:
             try:
-                # Look for JSON code block
-                import re
-                json_match = re.search(r'```json\s*(\{.*?\})\s*```', content, re.DOTALL)
-                if json_match:
-                    market_data = json.loads(json_match.group(1))
-                    print(f"[MarketResearch] ✅ Extracted market data: {len(market_data.get('markets', []))} markets")
-                    print(f"[MarketResearch] Market data: {market_data}")
-                else:
-                    print(f"[MarketResearch] ❌ No JSON block found in response")
-                    # Try alternative: look for just the markets array
-                    markets_match = re.search(r'"markets"\s*:\s*\[(.*?)\]', content, re.DOTALL)
-                    if markets_match:
-                        print(f"[MarketResearch] Found markets array without code block, attempting to parse...")
-                        market_data = json.loads('{' + markets_match.group(0) + '}')
-                        print(f"[MarketResearch] ✅ Extracted {len(market_data.get('markets', []))} markets from inline JSON")
-            except Exception as e:
-                print(f"[MarketResearch] ❌ Failed to extract JSON: {e}")
-                import traceback
-                traceback.print_exc()
-            
-            # No token deduction for chat endpoint
-            if profile_id:
-                try:
-                    print(f"[MarketResearch] Chat completed for profile {profile_id} — no tokens deducted.")
-                except Exception:
-                    pass
-            
-            return {
-                "success": True,
-                "response": content,
-                "citations": citations,
-                "marketData": market_data  # Add structured data
-            }
-            
+                print(f"[MarketResearch] Chat completed for profile {profile_id} — no tokens deducted.")
+            except Exception:
+                pass
+        
+        return {
+            "success": True,
+            "response": content,
+            "citations": citations,
+            "marketData": market_data  # Add structured data
+        }
+        
     except Exception as e:
         print(f"Market research chat error: {e}")
         import traceback
@@ -2976,62 +3350,63 @@ This location research is CRITICAL for evaluating tenant demand - include specif
             "max_tokens": 4000
         }
         
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                "https://api.perplexity.ai/chat/completions",
-                headers=headers,
-                json=payload
+        client = get_async_http_client("perplexity")
+        response = await client.post(
+            "https://api.perplexity.ai/chat/completions",
+            timeout=120.0,
+            headers=headers,
+            json=payload
+        )
+        
+        if response.status_code != 200:
+            error_text = response.text
+            print(f"Perplexity API error: {response.status_code} - {error_text}")
+            return JSONResponse(
+                status_code=500,
+                content={"success": False, "error": f"Perplexity API error: {response.status_code}"}
             )
-            
-            if response.status_code != 200:
-                error_text = response.text
-                print(f"Perplexity API error: {response.status_code} - {error_text}")
-                return JSONResponse(
-                    status_code=500,
-                    content={"success": False, "error": f"Perplexity API error: {response.status_code}"}
-                )
-            
-            result = response.json()
-            content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
-            # Deduct token after successful generation (only if authenticated)
-            if profile_id and profile:
-                try:
-                    token_supabase = get_token_supabase()
-                    new_balance = profile["token_balance"] - tokens_required
-                    
-                    token_supabase.table("profiles").update({
-                        "token_balance": new_balance
-                    }).eq("id", profile_id).execute()
-                    
-                    # Log usage
-                    token_supabase.table("token_usage").insert({
-                        "profile_id": profile_id,
-                        "operation_type": "market_research_results",
-                        "tokens_used": tokens_required,
-                        "deal_id": None,
-                        "deal_name": property_name,
-                        "location": f"{location.get('city', '')}, {location.get('state', '')} {location.get('zip', '')}"
-                    }).execute()
-                    
-                    log.info(f"Deducted {tokens_required} token(s) for market research. New balance: {new_balance}")
-                except Exception as token_error:
-                    log.error(f"Failed to deduct token: {token_error}")
-                    # Don't fail the request if token deduction fails
-            
-            # Build response safely even when unauthenticated
-            return {
-                "success": True,
-                "summary": content,
-                "tokens_deducted": tokens_required if profile_id else 0,
-                "new_balance": new_balance,
-                "message": (
-                    f"✓ {tokens_required} token deducted. Remaining balance: {new_balance}"
-                    if (profile_id and new_balance is not None)
-                    else "AI summary generated."
-                )
-            }
-            
+        
+        result = response.json()
+        content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+        
+        # Deduct token after successful generation (only if authenticated)
+        if profile_id and profile:
+            try:
+                token_supabase = get_token_supabase()
+                new_balance = profile["token_balance"] - tokens_required
+                
+                token_supabase.table("profiles").update({
+                    "token_balance": new_balance
+                }).eq("id", profile_id).execute()
+                
+                # Log usage
+                token_supabase.table("token_usage").insert({
+                    "profile_id": profile_id,
+                    "operation_type": "market_research_results",
+                    "tokens_used": tokens_required,
+                    "deal_id": None,
+                    "deal_name": property_name,
+                    "location": f"{location.get('city', '')}, {location.get('state', '')} {location.get('zip', '')}"
+                }).execute()
+                
+                log.info(f"Deducted {tokens_required} token(s) for market research. New balance: {new_balance}")
+            except Exception as token_error:
+                log.error(f"Failed to deduct token: {token_error}")
+                # Don't fail the request if token deduction fails
+        
+        # Build response safely even when unauthenticated
+        return {
+            "success": True,
+            "summary": content,
+            "tokens_deducted": tokens_required if profile_id else 0,
+            "new_balance": new_balance,
+            "message": (
+                f"✓ {tokens_required} token deducted. Remaining balance: {new_balance}"
+                if (profile_id and new_balance is not None)
+                else "AI summary generated."
+            )
+        }
+        
     except Exception as e:
         print(f"Market data summary error: {e}")
         import traceback
@@ -3307,7 +3682,9 @@ Subject To is the clear winner with **12.4% Cash-on-Cash** and **1.31x DSCR** -
                 }
             }
         
-        response = ANTHROPIC.messages.create(
+        response = await run_blocking(
+            "anthropic",
+            ANTHROPIC.messages.create,
             model="claude-3-haiku-20240307",
             max_tokens=4000,
             system=DEAL_STRUCTURE_SYSTEM_PROMPT,
@@ -3411,7 +3788,9 @@ async def spreadsheet_command(request: Request):
             raise HTTPException(status_code=400, detail="Message is required")
         
         # Process command through AI
-        result = process_spreadsheet_command(
+        result = await run_blocking(
+            "anthropic",
+            process_spreadsheet_command,
             user_message=user_message,
             property_data=property_data,
             current_sheet_state=current_sheet_state
@@ -3430,7 +3809,7 @@ async def spreadsheet_command(request: Request):
 
 
 @app.get("/api/spreadsheet/get-template")
-async def get_spreadsheet_template():
+async def get_spreadsheet_template(fields: Optional[str] = None):
     """
     Return the multifamily underwriting model template from Excel file
     """
@@ -3441,10 +3820,10 @@ async def get_spreadsheet_template():
         template_data = load_excel_template()
         print(f"[GET TEMPLATE] Loaded {len(template_data['rows'])} rows")
         
-        return JSONResponse(content={
+        return JSONResponse(content=project({
             "success": True,
             "data": template_data
-        })
+        }, fields))
     except Exception as e:
         print(f"[GET TEMPLATE] Error: {e}")
         import traceback
@@ -3531,7 +3910,9 @@ async def max_partner_chat(request: Request):
                 "message": {"role": "assistant", "content": assistant_text}
             })
 
-        res = ANTHROPIC.messages.create(
+        res = await run_blocking(
+            "anthropic",
+            ANTHROPIC.messages.create,
             model="claude-3-haiku-20240307",
             max_tokens=4000,
             system=MAX_PARTNER_SYSTEM_PROMPT,
@@ -3571,7 +3952,7 @@ async def max_partner_chat(request: Request):
 
 
 @app.post("/api/spreadsheet/build-model")
-async def spreadsheet_build_model_direct(request: Request):
+async def spreadsheet_build_model_direct(request: Request, fields: Optional[str] = None):
     """
     Build full underwriting model directly without Claude API
     """
@@ -3617,10 +3998,10 @@ async def spreadsheet_build_model_direct(request: Request):
         print(f"[BUILD MODEL DIRECT] Generated {len(operations)} operations")
         print(f"[BUILD MODEL DIRECT] First 3 operations: {operations[:3]}")
         
-        return JSONResponse(content={
+        return JSONResponse(content=project({
             "success": True,
             "operations": operations
-        })
+        }, fields))
         
     except Exception as e:
         print(f"[BUILD MODEL DIRECT] ERROR: {e}")
@@ -0,0 +1,365 @@
+"""
+Admission Module - Concurrency limits and bounded queues for heavy endpoints
+
+OCR underwriting, deal parsing and Rapid Fire each fan out into PDF
+renders and provider calls. Without a cap, a burst of them runs all at
+once and every request slows down together. AdmissionMiddleware sorts
+requests into endpoint classes and admits each one only when both
+
+- its class has fewer than ADMISSION_LIMIT requests running, and
+- its profile (X-Profile-ID header or profile_id cookie, else the client
+  address) has fewer than ADMISSION_PROFILE_LIMIT of them running.
+
+Behind the hosting proxy the peer address is the proxy's, so requests from
+ADMISSION_TRUSTED_PROXIES are keyed on the X-Forwarded-For hop before the
+proxies. Callers with no profile and no usable address only count against
+the class limits, so they can't be lumped into one shared profile.
+
+Anything else waits in the class's FIFO queue (one profile can't hold
+more than ADMISSION_PROFILE_QUEUE of its places). When the queue is full,
+or a request has waited ADMISSION_QUEUE_TIMEOUT_S, the answer is 429 with
+a Retry-After estimated from recent service times. Requests are checked
+before their body is read, so a rejected upload costs nothing. A slot is
+freed once the last response chunk is sent, so BackgroundTasks that run
+after it don't hold a place or count towards the service times.
+
+`ADMISSION.stats()` (GET /admission/stats) reports per class running and
+queued counts, admissions, rejections and recent wait percentiles.
+
+Config (every value can be overridden per class, e.g. ADMISSION_LIMIT_OCR):
+    ADMISSION_LIMIT              requests running at once per class (default 4)
+    ADMISSION_PROFILE_LIMIT      running requests per profile per class (default 2)
+    ADMISSION_QUEUE              queued requests per class (default 32)
+    ADMISSION_PROFILE_QUEUE      queued requests per profile per class (default 8)
+    ADMISSION_QUEUE_TIMEOUT_S    longest wait in the queue (default 60)
+    ADMISSION_RETRY_AFTER_S      Retry-After when there is no timing history yet (default 5)
+    ADMISSION_TRUSTED_PROXIES    comma-separated proxy networks whose X-Forwarded-For is used
+                                 (default loopback and private ranges)
+"""
+import os
+import json
+import math
+import time
+import asyncio
+import logging
+import ipaddress
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+log = logging.getLogger("admission")
+
+# class -> (method, path) routes it covers
+ENDPOINT_CLASSES: Dict[str, List[Tuple[str, str]]] = {
+    "ocr": [("POST", "/ocr/underwrite")],
+    "parse": [("POST", "/v2/deals/parse")],
+    "rapid_fire": [("POST", "/v2/rapid-fire/underwrite")],
+}
+
+DEFAULTS = {
+    "LIMIT": 4,
+    "PROFILE_LIMIT": 2,
+    "QUEUE": 32,
+    "PROFILE_QUEUE": 8,
+    "QUEUE_TIMEOUT_S": 60.0,
+    "RETRY_AFTER_S": 5.0,
+}
+
+_SAMPLES = 256  # recent wait / service times kept per class
+
+# Peers whose X-Forwarded-For is believed (the hosting platform's proxies)
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(n.strip(), strict=False)
+    for n in os.getenv(
+        "ADMISSION_TRUSTED_PROXIES", "127.0.0.0/8,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,::1/128,fc00::/7"
+    ).split(",")
+    if n.strip()
+]
+
+
+def setting(name: str, endpoint_class: str) -> float:
+    """ADMISSION_<NAME>_<CLASS>, else ADMISSION_<NAME>, else the default."""
+    default = DEFAULTS[name]
+    for key in (f"ADMISSION_{name}_{endpoint_class.upper()}", f"ADMISSION_{name}"):
+        raw = os.getenv(key)
+        if raw:
+            try:
+                return type(default)(raw)
+            except ValueError:
+                log.warning("Ignoring invalid %s=%r", key, raw)
+    return default
+
+
+class Rejected(Exception):
+    """The request can't be admitted; `retry_after` is in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Gate:
+    """Running slots plus a bounded FIFO queue for one endpoint class."""
+
+    def __init__(self, name: str, limit: int, profile_limit: int, queue_limit: int,
+                 profile_queue_limit: int, timeout: float, retry_after: float):
+        self.name = name
+        self.limit = max(1, limit)
+        self.profile_limit = max(1, profile_limit)
+        self.queue_limit = max(0, queue_limit)
+        self.profile_queue_limit = max(0, profile_queue_limit)
+        self.timeout = timeout
+        self.default_retry_after = retry_after
+        self.active = 0
+        self.running: Dict[str, int] = {}
+        self.queued: Dict[str, int] = {}
+        self.waiting: Deque[Tuple[Optional[str], asyncio.Future]] = deque()
+        self.counters = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+        self.max_queue_depth = 0
+        self.waits: Deque[float] = deque(maxlen=_SAMPLES)
+        self.services: Deque[float] = deque(maxlen=_SAMPLES)
+
+    @classmethod
+    def from_env(cls, name: str) -> "Gate":
+        return cls(
+            name,
+            limit=int(setting("LIMIT", name)),
+            profile_limit=int(setting("PROFILE_LIMIT", name)),
+            queue_limit=int(setting("QUEUE", name)),
+            profile_queue_limit=int(setting("PROFILE_QUEUE", name)),
+            timeout=setting("QUEUE_TIMEOUT_S", name),
+            retry_after=setting("RETRY_AFTER_S", name),
+        )
+
+    # profile None is an unidentified caller: only the class-wide limits apply.
+    def _can_run(self, profile: Optional[str]) -> bool:
+        return self.active < self.limit and (profile is None or self.running.get(profile, 0) < self.profile_limit)
+
+    def _start(self, profile: Optional[str]) -> None:
+        self.active += 1
+        if profile is not None:
+            self.running[profile] = self.running.get(profile, 0) + 1
+        self.counters["admitted"] += 1
+
+    def _dequeue(self, profile: Optional[str], fut: asyncio.Future) -> None:
+        self.waiting.remove((profile, fut))
+        if profile is not None:
+            self.queued[profile] -= 1
+            if not self.queued[profile]:
+                del self.queued[profile]
+
+    def _dispatch(self) -> None:
+        # Hand freed slots to the oldest waiters whose profile is under its limit.
+        for profile, fut in list(self.waiting):
+            if self.active >= self.limit:
+                break
+            if fut.done() or not self._can_run(profile):
+                continue
+            self._dequeue(profile, fut)
+            self._start(profile)
+            fut.set_result(None)
+
+    def retry_after(self) -> int:
+        """Seconds until a queue place is likely to free up."""
+        if not self.services:
+            return max(1, int(math.ceil(self.default_retry_after)))
+        mean = sum(self.services) / len(self.services)
+        return max(1, min(300, int(math.ceil(mean * (len(self.waiting) + 1) / self.limit))))
+
+    async def acquire(self, profile: Optional[str]) -> float:
+        """Take a running slot for `profile`, queueing if needed; returns seconds waited."""
+        # Every release dispatches, so no queued request could run right now:
+        # a request that can run may go straight in.
+        if self._can_run(profile):
+            self._start(profile)
+            return 0.0
+        if len(self.waiting) >= self.queue_limit or (
+            profile is not None and self.queued.get(profile, 0) >= self.profile_queue_limit
+        ):
+            self.counters["rejected_queue_full"] += 1
+            raise Rejected(f"{self.name} queue is full", self.retry_after())
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiting.append((profile, fut))
+        if profile is not None:
+            self.queued[profile] = self.queued.get(profile, 0) + 1
+        self.counters["queued"] += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self.waiting))
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.timeout)
+        except asyncio.TimeoutError:
+            if fut.done():  # granted as the timeout fired
+                self.release(profile)
+            else:
+                self._dequeue(profile, fut)
+                fut.cancel()
+            self.counters["rejected_timeout"] += 1
+            raise Rejected(f"{self.name} queue wait exceeded {self.timeout:g}s", self.retry_after())
+        except asyncio.CancelledError:
+            if fut.done():
+                self.release(profile)
+            else:
+                self._dequeue(profile, fut)
+                fut.cancel()
+            raise
+        waited = time.perf_counter() - t0
+        self.waits.append(waited)
+        return waited
+
+    def release(self, profile: Optional[str], service_s: Optional[float] = None) -> None:
+        self.active -= 1
+        if profile is not None:
+            self.running[profile] -= 1
+            if not self.running[profile]:
+                del self.running[profile]
+        if service_s is not None:
+            self.services.append(service_s)
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = list(self.waits)
+        services = list(self.services)
+        ms = lambda v: None if v is None else round(v * 1000, 1)  # noqa: E731
+        return {
+            "limit": self.limit,
+            "profile_limit": self.profile_limit,
+            "queue_limit": self.queue_limit,
+            "running": self.active,
+            "queue_depth": len(self.waiting),
+            "max_queue_depth": self.max_queue_depth,
+            "profiles_running": len(self.running),
+            "profiles_queued": len(self.queued),
+            **self.counters,
+            "wait_ms_p50": ms(_percentile(waits, 0.50)),
+            "wait_ms_p95": ms(_percentile(waits, 0.95)),
+            "service_ms_p50": ms(_percentile(services, 0.50)),
+            "service_ms_p95": ms(_percentile(services, 0.95)),
+        }
+
+
+class Admission:
+    """The gates for every endpoint class, keyed by route."""
+
+    def __init__(self, classes: Dict[str, List[Tuple[str, str]]]):
+        self.classes = classes
+        self._routes = {route: name for name, routes in classes.items() for route in routes}
+        self._gates: Dict[str, Gate] = {}
+
+    def gate(self, name: str) -> Gate:
+        gate = self._gates.get(name)
+        if gate is None:
+            gate = self._gates[name] = Gate.from_env(name)
+        return gate
+
+    def classify(self, method: str, path: str) -> Optional[str]:
+        return self._routes.get((method.upper(), path.rstrip("/") or "/"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: self.gate(name).stats() for name in self.classes}
+
+
+ADMISSION = Admission(ENDPOINT_CLASSES)
+
+
+def _trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address.strip())
+    except ValueError:
+        return False
+    return any(ip in net for net in TRUSTED_PROXIES)
+
+
+def _client_address(scope, headers: Dict[bytes, bytes]) -> Optional[str]:
+    """The caller's address: the peer, or behind trusted proxies the last X-Forwarded-For hop they didn't add."""
+    client = scope.get("client")
+    peer = client[0] if client else None
+    if not peer or not _trusted(peer):
+        return peer
+    hops = [h.strip() for h in headers.get(b"x-forwarded-for", b"").decode("latin-1").split(",") if h.strip()]
+    for hop in reversed(hops):
+        if not _trusted(hop):
+            return hop
+    return None  # only proxies in the chain: no way to tell callers apart
+
+
+def _profile_of(scope, headers: Dict[bytes, bytes]) -> Optional[str]:
+    """Per-profile limit key, or None for a caller that can't be identified."""
+    profile = headers.get(b"x-profile-id", b"").decode("latin-1").strip()
+    if not profile:
+        for part in headers.get(b"cookie", b"").decode("latin-1").split(";"):
+            key, _, value = part.strip().partition("=")
+            if key == "profile_id" and value:
+                profile = value
+                break
+    if profile:
+        return f"profile:{profile}"
+    address = _client_address(scope, headers)
+    return f"client:{address}" if address else None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware holding a Gate slot until each classified request's response is sent."""
+
+    def __init__(self, app, admission: Admission = ADMISSION):
+        self.app = app
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        name = self.admission.classify(scope.get("method", ""), scope.get("path", "")) \
+            if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        gate = self.admission.gate(name)
+        headers = dict((k.lower(), v) for k, v in scope.get("headers") or [])
+        profile = _profile_of(scope, headers)
+        try:
+            waited = await gate.acquire(profile)
+        except Rejected as e:
+            log.warning("Admission %s rejected %s: %s (queue %d)", name, profile or "anonymous", e.reason, len(gate.waiting))
+            body = json.dumps({
+                "detail": f"Too many requests: {e.reason}; retry after {e.retry_after}s",
+                "endpoint_class": name,
+                "queue_depth": len(gate.waiting),
+            }).encode("utf-8")
+            await send({"type": "http.response.start", "status": 429, "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(e.retry_after).encode("latin-1")),
+            ]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        t0 = time.perf_counter()
+        held = True
+
+        def _release(service_s: Optional[float]) -> None:
+            nonlocal held
+            if held:
+                held = False
+                gate.release(profile, service_s)
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers") or []) + [
+                    (b"x-admission-wait-ms", str(int(waited * 1000)).encode("latin-1")),
+                ]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # The response is complete. Starlette runs BackgroundTasks after
+                # this inside the same app call; they must not hold the slot.
+                _release(time.perf_counter() - t0)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _release(time.perf_counter() - t0)
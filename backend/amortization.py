@@ -0,0 +1,222 @@
+"""
+Amortization Module - Vectorized loan payment, balance and schedule math
+
+- `pmti` / `remaining_balance` are the closed-form payment and balance
+  over arrays (no principal or no term -> 0 payment, 0% rate -> straight
+  line). Powers go through `np.float_power` (libm pow, like Python's `**`)
+  so each element matches the scalar formulas exactly;
+  benchmarks/bench_amortization.py keeps the scalar versions as reference.
+- `schedules(loans)` builds month-by-month schedules (payment, interest,
+  principal, balance, balloon) for many loans in one pass. Every financing
+  mode is a LoanTerms tuple: traditional and subject-to loans are plain
+  amortizing loans, seller financing adds interest-only months and/or a
+  balloon. Schedules are cached by their LoanTerms, so the deal metrics,
+  cost seg and spreadsheet model all read the same arrays.
+
+Rates are annual percentages (6.5 = 6.5%), terms are months.
+
+Config:
+    AMORTIZATION_CACHE_SIZE   schedules kept in memory (default 4096)
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+ArrayLike = Union[float, np.ndarray]
+
+AMORTIZATION_CACHE_SIZE = int(os.getenv("AMORTIZATION_CACHE_SIZE", "4096"))
+
+SCHEDULE_FIELDS = ("payment", "interest", "principal", "balance", "balloon")
+
+
+def pmti(principal: ArrayLike, annual_rate_pct: ArrayLike, n_months: ArrayLike) -> np.ndarray:
+    """Monthly principal + interest payment."""
+    principal, rate_pct, n = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64),
+        np.asarray(annual_rate_pct, dtype=np.float64),
+        np.asarray(n_months, dtype=np.float64),
+    )
+    r = (rate_pct / 100.0) / 12.0
+    with np.errstate(all="ignore"):
+        amortizing = principal * (r / (1 - np.float_power(1 + r, -n)))
+        out = np.where(r == 0, principal / n, amortizing)
+    valid = (principal > 0) & (n > 0) & ~np.isnan(rate_pct)
+    return np.where(valid, out, 0.0)
+
+
+def remaining_balance(principal: ArrayLike, annual_rate_pct: ArrayLike, amort_months: ArrayLike,
+                      payments_made: ArrayLike) -> np.ndarray:
+    """Balance left after `payments_made` level payments on an `amort_months` schedule."""
+    principal, rate_pct, n, k = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64),
+        np.asarray(annual_rate_pct, dtype=np.float64),
+        np.asarray(amort_months, dtype=np.float64),
+        np.asarray(payments_made, dtype=np.float64),
+    )
+    r = (rate_pct / 100.0) / 12.0
+    with np.errstate(all="ignore"):
+        grown_n = np.float_power(1 + r, n)
+        amortizing = principal * ((grown_n - np.float_power(1 + r, k)) / (grown_n - 1))
+        straight = np.maximum(0.0, principal - principal * k / n)
+        out = np.where(r == 0, straight, amortizing)
+    return np.where(principal > 0, out, 0.0)
+
+
+class LoanTerms(NamedTuple):
+    """One loan. `io_months` of interest-only payments come first, then
+    level payments amortizing over `amort_months`; a non-zero
+    `balloon_month` pays off the remaining balance at that payment."""
+    principal: float
+    annual_rate_pct: float
+    amort_months: int
+    io_months: int = 0
+    balloon_month: int = 0
+
+
+def loan_terms(principal, annual_rate_pct, amort_months, io_months=0, balloon_month=0) -> LoanTerms:
+    """LoanTerms from loosely typed inputs (None -> 0, months truncated to whole payments)."""
+    return LoanTerms(
+        float(principal or 0.0),
+        float(annual_rate_pct or 0.0),
+        max(0, int(amort_months or 0)),
+        max(0, int(io_months or 0)),
+        max(0, int(balloon_month or 0)),
+    )
+
+
+def loan_terms_from(d: Any) -> Optional[LoanTerms]:
+    """LoanTerms from a stored `pricing_financing.loan_terms` dict, or None if absent/invalid."""
+    if not isinstance(d, dict):
+        return None
+    try:
+        return loan_terms(*(d.get(f) for f in LoanTerms._fields))
+    except (TypeError, ValueError):
+        return None
+
+
+def amortize(loans: Sequence[LoanTerms], months: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Schedules for `loans` as (n_loans, months) arrays, month 1 in column 0.
+
+    `months` defaults to the longest schedule; months after a loan is paid
+    off (or ballooned) are zero. `balance` is after that month's payment
+    and any balloon, so it is 0 from the balloon month on.
+    """
+    terms = np.array([tuple(t) for t in loans], dtype=np.float64).reshape(-1, 5)
+    principal, rate_pct, amort, io, balloon_month = (terms[:, i:i + 1] for i in range(5))
+    principal = np.where(principal > 0, principal, 0.0)
+    end = np.where(balloon_month > 0, np.minimum(balloon_month, io + amort), io + amort)
+    end = np.where((principal > 0) & (amort > 0), end, 0.0)
+    if months is None:
+        months = int(end.max()) if end.size else 0
+    m = np.arange(1, months + 1, dtype=np.float64)[None, :]
+
+    r = (rate_pct / 100.0) / 12.0
+    paid = np.clip(m - io, 0.0, amort)
+    balance = remaining_balance(principal, rate_pct, amort, paid)
+    prev = np.concatenate([principal, balance[:, :-1]], axis=1) if months else balance
+    in_io = m <= io
+    payment = np.where(in_io, principal * r, pmti(principal, rate_pct, amort))
+    principal_paid = prev - balance
+    interest = np.where(in_io, payment, payment - principal_paid)
+
+    at_balloon = (m == balloon_month) & (balloon_month > 0)
+    balloon = np.where(at_balloon, balance, 0.0)
+    active = m <= end
+    out = {
+        "payment": payment,
+        "interest": interest,
+        "principal": principal_paid,
+        "balance": np.where(at_balloon, 0.0, balance),
+        "balloon": balloon,
+    }
+    return {k: np.where(active, v, 0.0) for k, v in out.items()}
+
+
+_CACHE: "OrderedDict[LoanTerms, Dict[str, np.ndarray]]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def schedules(loans: Sequence[LoanTerms]) -> List[Dict[str, np.ndarray]]:
+    """Cached per-loan schedules (read-only 1-D arrays); misses are built in one vectorized call."""
+    loans = [t if isinstance(t, LoanTerms) else loan_terms(*t) for t in loans]
+    out: List[Optional[Dict[str, np.ndarray]]] = [None] * len(loans)
+    missing: "OrderedDict[LoanTerms, List[int]]" = OrderedDict()
+    with _CACHE_LOCK:
+        for i, t in enumerate(loans):
+            hit = _CACHE.get(t)
+            if hit is not None:
+                _CACHE.move_to_end(t)
+                out[i] = hit
+            else:
+                missing.setdefault(t, []).append(i)
+    if missing:
+        built = amortize(list(missing))
+        with _CACHE_LOCK:
+            for row, (t, idxs) in enumerate(missing.items()):
+                n = t.io_months + t.amort_months
+                if t.balloon_month:
+                    n = min(n, t.balloon_month)
+                if t.principal <= 0 or t.amort_months <= 0:
+                    n = 0
+                sched = {}
+                for k in SCHEDULE_FIELDS:
+                    a = built[k][row, :n].copy()
+                    a.setflags(write=False)
+                    sched[k] = a
+                _CACHE[t] = sched
+                for i in idxs:
+                    out[i] = sched
+            while len(_CACHE) > AMORTIZATION_CACHE_SIZE:
+                _CACHE.popitem(last=False)
+    return out
+
+
+def schedule(terms: LoanTerms) -> Dict[str, np.ndarray]:
+    """Cached schedule of one loan."""
+    return schedules([terms])[0]
+
+
+def monthly_payment(sched: Dict[str, np.ndarray]) -> float:
+    """The first scheduled payment (the IO payment for seller-finance IO periods)."""
+    return float(sched["payment"][0]) if len(sched["payment"]) else 0.0
+
+
+def balloon_amount(sched: Dict[str, np.ndarray]) -> float:
+    return float(sched["balloon"].sum())
+
+
+def outstanding(sched: Dict[str, np.ndarray], month: int) -> float:
+    """Debt owed after `month` payments; a balloon paid earlier counts as refinanced, not repaid."""
+    month = min(month, len(sched["balance"]))
+    if month <= 0:
+        return 0.0
+    return float(sched["balance"][month - 1] + sched["balloon"][:month].sum())
+
+
+def outstanding_at(loans: Sequence[LoanTerms], month: int) -> np.ndarray:
+    """`outstanding` for many loans in one vectorized pass (no caching)."""
+    if not loans:
+        return np.zeros(0)
+    built = amortize(loans, months=max(1, month))
+    return built["balance"][:, -1] + built["balloon"].sum(axis=1)
+
+
+def annual(sched: Dict[str, np.ndarray], years: int) -> Dict[str, np.ndarray]:
+    """Per-year totals for years 1..years: debt_service, interest, principal, balloon, and year-end balance."""
+    n = years * 12
+    padded = {k: np.zeros(n) for k in SCHEDULE_FIELDS}
+    for k in SCHEDULE_FIELDS:
+        a = sched[k][:n]
+        padded[k][:a.size] = a
+    by_year = {k: padded[k].reshape(years, 12) for k in SCHEDULE_FIELDS}
+    return {
+        "debt_service": by_year["payment"].sum(axis=1),
+        "interest": by_year["interest"].sum(axis=1),
+        "principal": by_year["principal"].sum(axis=1),
+        "balloon": by_year["balloon"].sum(axis=1),
+        "balance": by_year["balance"][:, -1],
+    }
@@ -0,0 +1,99 @@
+"""
+Benchmark: a burst of heavy requests with and without admission control.
+
+Simulates an endpoint whose work slows down with the number of requests
+in flight (processor sharing: each of N concurrent requests progresses at
+1/N speed, like PDF renders sharing the CPU and provider calls sharing a
+rate limit). Fires --burst requests from --profiles profiles at once
+through AdmissionMiddleware on an in-process ASGI app and reports, for
+requests that were served, p50 / p95 / max latency, plus how many got 429
+and what the queue peaked at.
+
+    cd backend && python benchmarks/bench_admission.py [--burst 60] [--work-ms 200]
+"""
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx  # noqa: E402
+
+from admission import Admission, AdmissionMiddleware, Gate  # noqa: E402
+
+logging.getLogger("admission").setLevel(logging.ERROR)
+
+ROUTE = ("POST", "/v2/deals/parse")
+
+
+class SharedWork:
+    """Each in-flight request gets 1/N of the capacity."""
+
+    def __init__(self, work_s: float):
+        self.work_s = work_s
+        self.active = 0
+
+    async def run(self) -> None:
+        self.active += 1
+        left = self.work_s
+        try:
+            while left > 0:
+                step = 0.005
+                await asyncio.sleep(step)
+                left -= step / self.active
+        finally:
+            self.active -= 1
+
+
+def make_app(work: SharedWork):
+    async def app(scope, receive, send):
+        await work.run()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"2")]})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+async def burst(app, n: int, profiles: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i):
+            t0 = time.perf_counter()
+            r = await client.post(ROUTE[1], headers={"X-Profile-ID": f"p{i % profiles}"})
+            return r.status_code, time.perf_counter() - t0
+        return await asyncio.gather(*(one(i) for i in range(n)))
+
+
+def summarize(label: str, results, gate=None) -> None:
+    served = sorted(t for status, t in results if status == 200)
+    rejected = sum(1 for status, _ in results if status == 429)
+    pct = lambda q: served[min(len(served) - 1, int(q * len(served)))] * 1000  # noqa: E731
+    extra = f"  peak queue {gate.max_queue_depth}" if gate else ""
+    print(f"{label:10}: served {len(served):3d}  429 {rejected:3d}  "
+          f"p50 {pct(0.5):7.0f} ms  p95 {pct(0.95):7.0f} ms  max {served[-1] * 1000:7.0f} ms{extra}")
+
+
+def main(n: int, profiles: int, work_ms: float, limit: int, queue: int) -> None:
+    work = SharedWork(work_ms / 1000)
+    print(f"burst of {n} requests from {profiles} profiles, {work_ms:g} ms of work each")
+    summarize("no limits", asyncio.run(burst(make_app(work), n, profiles)))
+
+    admission = Admission({"parse": [ROUTE]})
+    gate = admission._gates["parse"] = Gate("parse", limit=limit, profile_limit=max(1, limit // 2),
+                                            queue_limit=queue, profile_queue_limit=queue,
+                                            timeout=60, retry_after=5)
+    app = AdmissionMiddleware(make_app(work), admission)
+    summarize("admission", asyncio.run(burst(app, n, profiles)), gate)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--burst", type=int, default=60)
+    ap.add_argument("--profiles", type=int, default=6)
+    ap.add_argument("--work-ms", type=float, default=200)
+    ap.add_argument("--limit", type=int, default=4)
+    ap.add_argument("--queue", type=int, default=32)
+    args = ap.parse_args()
+    main(args.burst, args.profiles, args.work_ms, args.limit, args.queue)
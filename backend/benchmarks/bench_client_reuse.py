@@ -0,0 +1,125 @@
+"""
+Benchmark: a new httpx client per request vs the shared provider_clients pool.
+
+Starts a local HTTPS server (self-signed certificate made with the openssl
+CLI, RSA 2048 like most providers' edge) that answers a small JSON body,
+then sends --requests POSTs sequentially and --concurrency at a time:
+
+    per-request  `async with httpx.AsyncClient() as client` around every
+                 call (what the chat / Perplexity / RentCast handlers did),
+                 so every call does TCP + TLS setup
+    shared       provider_clients.get_async_http_client, keep-alive reuse
+
+Reports mean and p95 latency and total time. Two real costs are left out,
+so the per-request numbers here are a lower bound:
+- Over the internet, each saved handshake is also one to two round trips.
+- A default `httpx.AsyncClient()` loads the CA bundle into a new SSL
+  context (about 25 ms here). The benchmark's per-request clients use
+  verify=False because of the self-signed certificate.
+
+    cd backend && python benchmarks/bench_client_reuse.py [--requests 200] [--concurrency 10]
+"""
+import ssl
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.server
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx  # noqa: E402
+
+import provider_clients  # noqa: E402
+from provider_clients import close_clients, get_async_http_client  # noqa: E402
+
+BODY = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024  # headers and body leave in one write
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(tmp: Path):
+    key, cert = tmp / "key.pem", tmp / "cert.pem"
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", str(key),
+                    "-out", str(cert), "-days", "1", "-subj", "/CN=localhost"],
+                   check=True, capture_output=True)
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert, key)
+    srv.socket = ctx.wrap_socket(srv.socket, server_side=True)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"https://localhost:{srv.server_port}/v1/chat/completions"
+
+
+async def per_request(url: str) -> float:
+    t0 = time.perf_counter()
+    async with httpx.AsyncClient(timeout=30.0, verify=False) as client:
+        r = await client.post(url, json={"q": 1})
+        r.raise_for_status()
+    return time.perf_counter() - t0
+
+
+async def shared(url: str) -> float:
+    t0 = time.perf_counter()
+    r = await get_async_http_client("bench").post(url, json={"q": 1}, timeout=30.0)
+    r.raise_for_status()
+    return time.perf_counter() - t0
+
+
+async def run(fn, url: str, n: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            return await fn(url)
+
+    t0 = time.perf_counter()
+    times = sorted(await asyncio.gather(*(one() for _ in range(n))))
+    total = time.perf_counter() - t0
+    return total, sum(times) / n, times[int(0.95 * (n - 1))]
+
+
+async def main(n: int, concurrency: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        srv, url = start_server(Path(tmp))
+        # The local certificate is self-signed; the shared client otherwise uses provider_clients' settings.
+        provider_clients._ASYNC["bench"] = (asyncio.get_running_loop(), httpx.AsyncClient(
+            timeout=30.0, limits=provider_clients.limits(), http2=provider_clients.HTTP2, verify=False))
+        try:
+            print(f"{n} POSTs over local HTTPS (TLS 1.3, RSA 2048)")
+            for label, c in (("sequential", 1), (f"{concurrency} at a time", concurrency)):
+                for name, fn in (("per-request", per_request), ("shared", shared)):
+                    total, mean, p95 = await run(fn, url, n, c)
+                    print(f"{label:14} {name:12}: total {total * 1000:7.0f} ms  "
+                          f"mean {mean * 1000:6.2f} ms  p95 {p95 * 1000:6.2f} ms")
+        finally:
+            await close_clients()
+            srv.shutdown()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=10)
+    args = ap.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,142 @@
+"""
+Benchmark + equivalence check: vectorized deal_metrics vs _calculate_deal_metrics.
+
+Builds randomized parsed deals (missing fields, zeros, negative cash flow,
+expense line items only, extreme leverage with no meaningful IRR, ...),
+runs each through the scalar path (_compute_underwriting -> _calculate_deal_metrics) and the whole set
+through deal_metrics in one pass, asserts every metric and score is
+identical, then times both.
+
+    cd backend && python benchmarks/bench_deal_metrics.py [--deals 20000]
+"""
+import os
+import sys
+import copy
+import math
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+
+import App  # noqa: E402
+import deal_metrics  # noqa: E402
+
+
+def _maybe(rng: random.Random, value, p_missing=0.1):
+    r = rng.random()
+    if r < p_missing:
+        return None
+    if r < p_missing + 0.03:
+        return 0
+    return value
+
+
+def make_deal(rng: random.Random) -> dict:
+    units = rng.choice([rng.randint(2, 400), rng.randint(2, 40)])
+    price = round(units * rng.uniform(30_000, 250_000), rng.choice([0, 2]))
+    gpr = units * rng.uniform(500, 2500) * 12
+    vac = gpr * rng.uniform(0, 0.15) * rng.choice([1, -1])
+    other = gpr * rng.uniform(0, 0.05)
+    egi = gpr - abs(vac) + other
+    opex = egi * rng.uniform(0.25, 0.7)
+    noi = egi - opex
+    ltv = rng.choice([0, rng.uniform(0.5, 0.8), rng.uniform(0.9, 1.2)])
+    loan = price * ltv
+    rate = rng.uniform(0.03, 0.09)
+    debt = loan * rate * rng.uniform(1.0, 1.4)
+    d = {
+        "property": {"units": _maybe(rng, units), "rba_sqft": _maybe(rng, units * rng.uniform(500, 1100), 0.4)},
+        "pricing_financing": {
+            "price": _maybe(rng, price, 0.05),
+            "annual_debt_service": _maybe(rng, round(debt, 2)),
+            "down_payment": _maybe(rng, round(price - loan, 2)),
+            "loan_amount": _maybe(rng, round(loan, 2)),
+        },
+        "pnl": {
+            "gross_potential_rent": _maybe(rng, round(gpr, 2)),
+            "vacancy_amount": _maybe(rng, round(vac, 2), 0.3),
+            "other_income": _maybe(rng, round(other, 2), 0.3),
+            "effective_gross_income": _maybe(rng, round(egi, 2), 0.3),
+            "operating_expenses": _maybe(rng, round(opex, 2), 0.2),
+            "noi": _maybe(rng, round(noi, 2), 0.3),
+            "cap_rate": _maybe(rng, round(noi / price, 4) if price else None, 0.6),
+            "expense_ratio": _maybe(rng, round(opex / egi, 4), 0.6),
+        },
+        "expenses": {},
+    }
+    if d["pnl"]["operating_expenses"] is None and rng.random() < 0.7:
+        d["expenses"] = {
+            "taxes": round(opex * 0.3, 2), "insurance": round(opex * 0.1, 2),
+            "repairs": str(round(opex * 0.2, 2)), "payroll": round(opex * 0.4, 2),
+            "total": round(opex, 2), "management": None,
+        }
+    if loan and rng.random() < 0.4:
+        io = rng.choice([0, 0, 12, 24])
+        d["pricing_financing"]["loan_terms"] = {
+            "principal": round(loan, 2), "annual_rate_pct": round(rate * 100, 3),
+            "amort_months": rng.choice([240, 300, 360]), "io_months": io,
+            "balloon_month": rng.choice([0, 0, 36, 60, 84]),
+        }
+    if rng.random() < 0.02:
+        d["pricing_financing"]["down_payment"] = rng.choice([1e-3, 1.0, -5000.0])  # IRR edge cases
+    if rng.random() < 0.01:
+        d["pricing_financing"]["price"] = "call for offers"
+    return d
+
+
+def scalar(deals):
+    return [App._calculate_deal_metrics(App._compute_underwriting(copy.deepcopy(d))) for d in deals]
+
+
+def batch(deals):
+    cols = deal_metrics.columns_from_deals(deals)
+    return deal_metrics.compute_metrics(deal_metrics.fill_underwriting(cols))
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, float) and math.isnan(a):
+        return isinstance(b, float) and math.isnan(b)
+    return a == b
+
+
+def main(n: int, seed: int):
+    rng = random.Random(seed)
+    deals = [make_deal(rng) for _ in range(n)]
+
+    t0 = time.perf_counter()
+    expected = scalar(deals)
+    t_scalar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    got = batch(deals)
+    t_batch = time.perf_counter() - t0
+
+    mismatches = 0
+    for i, exp in enumerate(expected):
+        for name in deal_metrics.METRIC_NAMES:
+            a, b = exp["metrics"][name], float(got["metrics"][name][i])
+            if not _same(float(a), b):
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"deal {i} {name}: scalar={a!r} batch={b!r}")
+        if exp["score"] != int(got["score"][i]):
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"deal {i} score: scalar={exp['score']} batch={got['score'][i]}")
+    assert mismatches == 0, f"{mismatches} mismatching values"
+
+    print(f"{n} deals, {len(deal_metrics.METRIC_NAMES)} metrics + score: identical")
+    print(f"scalar : {t_scalar * 1000:9.1f} ms  ({t_scalar / n * 1e6:.1f} us/deal)")
+    print(f"batch  : {t_batch * 1000:9.1f} ms  ({t_batch / n * 1e6:.2f} us/deal)  {t_scalar / t_batch:.0f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--deals", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    main(args.deals, args.seed)
@@ -0,0 +1,233 @@
+"""
+Micro-benchmark: single-pass markdown scan vs. the three legacy scans.
+
+Builds a deterministic 200-page OM-style fixture (narrative pages, rent
+roll tables, an operating summary that spills across a page break, noisy
+numeric lines) and times
+
+    legacy   _extract_operating_summary_from_markdown(joined markdown)
+             + _extract_operating_summary_sources(ocr_json)
+             + _pages_with_keywords(ocr_json, RECOVERY_KEYWORDS)
+    scan     markdown_scan.scan_ocr_json(ocr_json)
+
+after checking that both produce identical values, sources and keyword
+pages. The legacy implementations are copied below verbatim.
+
+    cd backend && python benchmarks/bench_markdown_scan.py [--pages 200] [--repeat 20]
+"""
+import re
+import sys
+import random
+import argparse
+import timeit
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from markdown_scan import LABEL_MAP, RECOVERY_KEYWORDS, scan_ocr_json  # noqa: E402
+
+
+# ---------------- legacy implementations (pre single-pass) ----------------
+def _num(v) -> Optional[float]:
+    if v is None:
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    s = str(v).strip()
+    if not s:
+        return None
+    neg = s.startswith("(") and s.endswith(")")
+    s = s.replace("$", "").replace(",", "").replace("%", "").replace("(", "").replace(")", "")
+    try:
+        x = float(s)
+        return -x if neg else x
+    except:
+        return None
+
+
+_LEGACY_OP_SUM_RE = re.compile(r"\b(OPERATING SUMMARY|INCOME STATEMENT)\b(?:.|\n){0,3500}", re.IGNORECASE)
+def _extract_operating_summary_from_markdown(md: str) -> Dict[str, Any]:
+    """Extract high-level P&L and expense lines from markdown.
+
+    This is the legacy helper that operates on a single markdown blob.
+    It is kept as-is for backward compatibility. A new helper
+    `_extract_operating_summary_sources` (defined below) performs a
+    similar extraction but also tracks page/line sources using the full
+    `ocr_json` structure.
+    """
+    out_pnl: Dict[str, Any] = {}
+    out_exp: Dict[str, Any] = {}
+    block_m = _LEGACY_OP_SUM_RE.search(md or "")
+    text = block_m.group(0) if block_m else (md or "")
+    if not text:
+        return {"pnl": {}, "expenses": {}}
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        mnum = re.search(r"\$?\(?-?[\d,]+(?:\.\d+)?\)?", line)
+        if not mnum:
+            continue
+        actual = _num(mnum.group(0))
+        label = re.sub(r"\$?\(?-?[\d,]+(?:\.\d+)?\)?.*$", "", line).strip().upper()
+        key = None
+        for k, v in LABEL_MAP.items():
+            if k in label:
+                key = v; break
+        if key is None:
+            continue
+        if key in {"taxes","insurance","admin","repairs_maintenance","utilities","marketing","management","other"}:
+            out_exp[key] = actual
+        else:
+            out_pnl[key] = actual
+    if out_exp and "operating_expenses" not in out_pnl:
+        out_pnl["operating_expenses"] = sum(v for v in out_exp.values() if isinstance(v, (int, float)))
+    if out_pnl.get("gross_potential_rent") is not None and out_pnl.get("vacancy_amount") is not None:
+        gpr = out_pnl["gross_potential_rent"]; vac = abs(out_pnl["vacancy_amount"])
+        if gpr:
+            out_pnl["vacancy_rate"] = round(vac / gpr, 4)
+    return {"pnl": out_pnl, "expenses": out_exp}
+
+def _extract_operating_summary_sources(ocr_json: dict) -> Dict[str, Any]:
+    """Best-effort mapping of key fields to their OCR page/line.
+
+    Returns a flat dict mapping field paths (e.g. "pnl.noi",
+    "expenses.taxes") to simple source metadata:
+
+        {"pnl.noi": {"page": 5, "line_index": 12, "text": "..."}, ...}
+
+    This does not currently rely on bounding boxes; if the upstream OCR
+    payload is later extended with coordinates, this helper can be
+    enhanced to include a "bbox" entry while keeping the same shape.
+    """
+    if not isinstance(ocr_json, dict):
+        return {}
+
+    pages = ocr_json.get("pages", []) or []
+    if not pages:
+        return {}
+
+    sources: Dict[str, Any] = {}
+
+    for page_idx, page in enumerate(pages):
+        md = (page.get("markdown") or "")
+        if not md:
+            continue
+
+        block_m = _LEGACY_OP_SUM_RE.search(md)
+        text = block_m.group(0) if block_m else md
+        if not text:
+            continue
+
+        for line_idx, raw in enumerate(text.splitlines()):
+            line = raw.strip()
+            if not line:
+                continue
+
+            mnum = re.search(r"\$?\(?-?[\d,]+(?:\.\d+)?\)?", line)
+            if not mnum:
+                continue
+
+            label = re.sub(r"\$?\(?-?[\d,]+(?:\.\d+)?\)?.*$", "", line).strip().upper()
+            key = None
+            for k, v in LABEL_MAP.items():
+                if k in label:
+                    key = v
+                    break
+            if key is None:
+                continue
+
+            # Only record the first occurrence for each field to keep
+            # the mapping simple and deterministic.
+            if key in {"taxes","insurance","admin","repairs_maintenance","utilities","marketing","management","other"}:
+                path = f"expenses.{key}"
+            else:
+                path = f"pnl.{key}"
+
+            if path in sources:
+                continue
+
+            sources[path] = {
+                "page": page_idx + 1,  # 1-based page index for UI
+                "line_index": line_idx,
+                "text": line,
+            }
+
+    return sources
+
+def _pages_with_keywords(ocr_json: dict, keywords: List[str]) -> List[int]:
+    hits = []
+    for i, p in enumerate(ocr_json.get("pages", []) or []):
+        md = (p.get("markdown") or "").lower()
+        if any(k.lower() in md for k in keywords):
+            hits.append(i)
+    return sorted(set(hits)) or list(range(min(3, len(ocr_json.get("pages", [])))))
+
+
+# ---------------- fixture ----------------
+_WORDS = ("the property is located in a growing submarket with strong demand drivers "
+          "including employment growth new retail amenities and limited new supply").split()
+_SUMMARY = [
+    ("GROSS POTENTIAL RENT", 1_245_600), ("Total Economic Losses", -62_280), ("Other Income", 48_000),
+    ("EFFECTIVE GROSS INCOME", 1_231_320), ("Real Estate Taxes", 142_000), ("Insurance", 38_500),
+    ("General & Administrative", 21_000), ("Repairs & Maintenance", 54_300), ("Utilities", 96_200),
+    ("Turnover & Marketing", 12_400), ("Management & Leasing", 49_250), ("Reserves", 25_000),
+    ("TOTAL OPERATING EXPENSES", 438_650), ("NET OPERATING INCOME", 792_670),
+]
+
+
+def build_fixture(n_pages: int, seed: int = 7) -> dict:
+    rnd = random.Random(seed)
+    pages = []
+    summary_page = n_pages // 3
+    for i in range(n_pages):
+        lines = [f"# Section {i + 1}"]
+        if i == summary_page:
+            lines.append("## OPERATING SUMMARY")
+            lines += [f"| {label} | ${value:,.0f} | ${value * 1.03:,.0f} |" for label, value in _SUMMARY[:8]]
+        elif i == summary_page + 1:
+            lines += [f"| {label} | ${value:,.0f} | ${value * 1.03:,.0f} |" for label, value in _SUMMARY[8:]]
+        elif i % 9 == 4:
+            lines.append("## RENT ROLL")
+            lines += [f"| {100 + u} | 2BR/2BA | 950 SF | ${rnd.randint(1100, 1900):,} | ${rnd.randint(1200, 2000):,} |"
+                      for u in range(40)]
+        elif i % 17 == 8:
+            lines.append("## Utilities and Insurance comparison 2019-2023")
+            lines += [f"Year {2019 + k}: {rnd.randint(10, 99)}% occupancy, {rnd.randint(100, 999)} units surveyed"
+                      for k in range(5)]
+        for _ in range(rnd.randint(6, 14)):
+            lines.append(" ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(12, 30))).capitalize() + ".")
+        if i % 25 == 0:
+            lines.append(f"Asking price ${rnd.randint(10, 40)},{rnd.randint(100, 999)},000 | {rnd.randint(50, 300)} units")
+        pages.append({"index": i, "markdown": "\n".join(lines)})
+    return {"pages": pages}
+
+
+def legacy(ocr_json: dict):
+    md = "\n\n".join([p.get("markdown", "") for p in ocr_json["pages"] if p.get("markdown")]).strip()
+    ops = _extract_operating_summary_from_markdown(md)
+    return ops, _extract_operating_summary_sources(ocr_json), _pages_with_keywords(ocr_json, RECOVERY_KEYWORDS)
+
+
+def single_pass(ocr_json: dict):
+    scan = scan_ocr_json(ocr_json)
+    hits = scan["keyword_pages"] or list(range(min(3, scan["page_count"])))
+    return {"pnl": scan["pnl"], "expenses": scan["expenses"]}, scan["sources"], hits
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="single-pass markdown scan benchmark")
+    ap.add_argument("--pages", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    fixture = build_fixture(args.pages)
+    chars = sum(len(p["markdown"]) for p in fixture["pages"])
+    assert legacy(fixture) == single_pass(fixture), "single-pass scan disagrees with legacy output"
+
+    t_old = min(timeit.repeat(lambda: legacy(fixture), number=1, repeat=args.repeat))
+    t_new = min(timeit.repeat(lambda: single_pass(fixture), number=1, repeat=args.repeat))
+    print(f"fixture: {args.pages} pages, {chars / 1024:.0f} KiB of markdown (outputs identical)")
+    print(f"legacy (3 scans):   {t_old * 1000:8.2f} ms")
+    print(f"single pass:        {t_new * 1000:8.2f} ms   ({t_old / t_new:.1f}x faster)")
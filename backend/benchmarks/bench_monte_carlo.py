@@ -0,0 +1,62 @@
+"""
+Benchmark: seeded Monte Carlo deal simulation, in-process vs process pool.
+
+Runs the same seeded simulation in-process and on the "montecarlo" process
+pool, asserts the summaries are identical, then times both at a few path
+counts.
+
+    cd backend && python benchmarks/bench_monte_carlo.py [--paths 100000 1000000] [--deal-id ...]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from provider_pool import shutdown_pools  # noqa: E402
+from v2_underwriter import storage  # noqa: E402
+from v2_underwriter.monte_carlo import run_monte_carlo  # noqa: E402
+
+SAMPLE_DEAL = {
+    "pricing_financing": {"price": 6000000, "loan_amount": 4500000},
+    "pnl": {"gross_potential_rent": 1070246, "other_income": 33044, "vacancy_rate": 0.05,
+            "effective_gross_income": 1139252, "operating_expenses": 533676, "noi": 605576},
+    "financing": {"ltv": 75, "interest_rate": 6.5, "amortization_years": 30, "loan_term_years": 5, "loan_fees_percent": 1.5},
+    "underwriting": {"holding_period": 10, "exit_cap_rate": 7.0, "selling_costs_percent": 2},
+    "deal_setup": {"buy_box": {"minDscr": 1.25}},
+}
+
+SUMMARY_KEYS = ("irr", "cash_on_cash", "dscr_min", "prob_dscr_breach", "prob_irr_negative")
+
+
+def main(path_counts, deal_id):
+    deal_json = SAMPLE_DEAL
+    if deal_id:
+        deal = storage.get_deal(deal_id)
+        deal_json = deal.scenario_json or deal.parsed_json
+
+    check = 200000
+    local = run_monte_carlo(deal_json, {"paths": check, "seed": 11, "parallel": False})
+    pooled = run_monte_carlo(deal_json, {"paths": check, "seed": 11, "parallel": True})
+    for key in SUMMARY_KEYS:
+        assert local[key] == pooled[key], key
+    print(f"{check} paths, seed 11: in-process and pool summaries identical")
+    print(f"  IRR p5/p50/p95: {local['irr']['percentiles']['5.0']} / {local['irr']['percentiles']['50.0']} / "
+          f"{local['irr']['percentiles']['95.0']}  P(DSCR < {local['min_dscr']}): {local['prob_dscr_breach']}")
+
+    for paths in path_counts:
+        for parallel in (False, True):
+            t0 = time.perf_counter()
+            run_monte_carlo(deal_json, {"paths": paths, "seed": 1, "parallel": parallel})
+            elapsed = time.perf_counter() - t0
+            print(f"{paths:>9} paths  {'pool' if parallel else 'local'}: {elapsed * 1000:8.1f} ms")
+    shutdown_pools()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--paths", type=int, nargs="+", default=[100000, 1000000])
+    ap.add_argument("--deal-id", default=None)
+    args = ap.parse_args()
+    main(args.paths, args.deal_id)
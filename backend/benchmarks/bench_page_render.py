@@ -0,0 +1,100 @@
+"""
+Benchmark: rendering the pages filter_pdf_pages_smart keeps vs all pages.
+
+Builds (once, cached under /tmp) the synthetic OM from bench_pdf_session
+at about --mb megabytes (~120 pages by default), picks --keep pages the
+way the scorer would (spread across the document) and, in a fresh
+subprocess per mode, rasterizes at 100 DPI:
+
+    all       every page, then keep the selected ones (convert_from_bytes
+              before; PyMuPDF stands in for poppler when it isn't installed)
+    selected  only the selected pages, serially from the session
+    pool      PdfSession.render_many on the "render" process pool
+
+Reports wall time and peak RSS growth; the selected images are asserted
+pixel-identical across modes. Set PROCESS_POOL_SIZE_RENDER to choose the
+pool size (defaults to the CPU count; with one CPU it falls back to serial).
+
+    cd backend && python benchmarks/bench_page_render.py [--mb 66] [--keep 15]
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import resource
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_pdf_session import build_fixture, legacy_render_all  # noqa: E402
+from pdf_session import PdfSession  # noqa: E402
+from provider_pool import process_pool_size, shutdown_pools  # noqa: E402
+
+
+def selection(total: int, keep: int):
+    return sorted({round(i * (total - 1) / max(1, keep - 1)) for i in range(keep)})
+
+
+def digest(images) -> str:
+    h = hashlib.sha256()
+    for im in images:
+        h.update(f"{im.size}".encode())
+        h.update(im.tobytes())
+    return h.hexdigest()
+
+
+def child(mode: str, path: str, keep: int) -> None:
+    data = Path(path).read_bytes()
+    with PdfSession(data) as pdf:
+        total = pdf.page_count
+        idxs = selection(total, keep)
+        if mode == "pool":
+            pdf.render_many(idxs[:1] * 2, dpi=100)  # start the workers outside the timing
+        base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        t0 = time.perf_counter()
+        if mode == "all":
+            rendered = legacy_render_all(data)
+            images = [rendered[i] for i in idxs]
+            del rendered
+        elif mode == "selected":
+            images = [pdf.render(i, dpi=100) for i in idxs]
+        else:
+            images = pdf.render_many(idxs, dpi=100)
+        elapsed = time.perf_counter() - t0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    shutdown_pools()
+    print(json.dumps({"seconds": elapsed, "peak_mb": (peak - base) / 1024, "digest": digest(images),
+                      "pages": total, "kept": len(images)}))
+
+
+def main(mb: float, keep: int) -> None:
+    path = Path(f"/tmp/bench_om_{int(mb)}mb.pdf")
+    if not path.exists():
+        build_fixture(path, mb)
+    results = {}
+    for mode in ("all", "selected", "pool"):
+        proc = subprocess.run([sys.executable, __file__, "--child", mode, "--file", str(path), "--keep", str(keep)],
+                              capture_output=True, text=True, check=True, env=os.environ)
+        results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert len({r["digest"] for r in results.values()}) == 1, "rendered pages differ"
+    r = results["all"]
+    print(f"{path.name}: {r['pages']} pages, {r['kept']} kept, render workers {process_pool_size('render')}; "
+          "images identical")
+    for mode, r in results.items():
+        print(f"{mode:8}: {r['seconds'] * 1000:8.0f} ms   peak RSS +{r['peak_mb']:7.1f} MB")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--mb", type=float, default=66)
+    ap.add_argument("--keep", type=int, default=15)
+    ap.add_argument("--child", choices=["all", "selected", "pool"], help=argparse.SUPPRESS)
+    ap.add_argument("--file", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        child(args.child, args.file, args.keep)
+    else:
+        main(args.mb, args.keep)
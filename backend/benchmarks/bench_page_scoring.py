@@ -0,0 +1,147 @@
+"""
+Benchmark: page triage scoring, legacy checks vs the compiled scorer.
+
+Generates --pages pages of OM-like text (rent roll and operating statement
+lines, marketing copy, tables, near-empty image pages, mixed case and
+non-ASCII) and scores them with
+
+    legacy    score_page_for_financial_data as it was (copied below):
+              ~55 substring checks, a findall and a search per page
+    compiled  page_scoring.score_page (precompiled table, capped counts)
+    cached    page_scoring.score_pages on pages it has already seen
+    pool      score_pages on the "scoring" process pool
+
+Scores are asserted identical for every page, plus a set of edge-case
+strings (keywords inside words, overlapping keywords, prefixes).
+
+    cd backend && python benchmarks/bench_page_scoring.py [--pages 300] [--repeat 5]
+"""
+import re
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from provider_pool import get_process_pool, process_pool_size, shutdown_pools  # noqa: E402
+from v2_underwriter import page_scoring  # noqa: E402
+from v2_underwriter.page_scoring import score_page, score_pages  # noqa: E402
+
+
+def legacy_score(text: str) -> int:
+    score = 0
+    text_lower = text.lower()
+    financial_keywords = [
+        'rent roll', 'unit mix', 'income', 'expense', 'noi', 'cap rate',
+        'operating', 'vacancy', 'gross', 'net', 'annual', 'monthly',
+        'taxes', 'insurance', 'utilities', 'maintenance', 'management',
+        'financing', 'loan', 'mortgage', 'interest rate', 'ltv', 'debt service',
+        'purchase price', 'price per unit', 'price per sf', 'asking price',
+        'proforma', 'pro forma', 'actual', 'budget', 'projected',
+        'cash flow', 'return', 'irr', 'coc', 'cash on cash',
+        'bedroom', 'br', 'bath', 'ba', 'sqft', 'sf', 'square feet',
+        'tenant', 'lease', 'occupancy', 'occupied', 'vacant'
+    ]
+    for keyword in financial_keywords:
+        if keyword in text_lower:
+            score += 10
+    dollar_count = text.count('$')
+    score += min(dollar_count * 3, 30)
+    pct_count = text.count('%')
+    score += min(pct_count * 2, 20)
+    number_pattern = r'\b\d{1,3}(?:,\d{3})*(?:\.\d{2})?\b'
+    numbers = re.findall(number_pattern, text)
+    score += min(len(numbers) * 2, 40)
+    if re.search(r'\d+\s+\d+\s+\d+', text):
+        score += 15
+    if len(text.strip()) < 100:
+        score -= 50
+    marketing_words = ['amenities', 'lifestyle', 'community', 'neighborhood', 'location highlights', 'area overview']
+    for word in marketing_words:
+        if word in text_lower:
+            score -= 5
+    return score
+
+
+FINANCIAL = [
+    "Gross Potential Rent ${:,}", "Vacancy Loss ({:,})", "Net Operating Income ${:,}", "Cap Rate {}.25%",
+    "Unit {}  2BR/1BA  850 SqFt  $1,150  Occupied", "Real Estate Taxes {:,}", "Debt Service {:,}",
+    "Price Per Unit ${:,}", "PRO FORMA {} ACTUAL", "Cash-on-Cash {}%", "Tenant lease expires {}",
+]
+MARKETING = [
+    "Resort-style AMENITIES and a vibrant lifestyle {}", "Walkable neighborhood near downtown {}",
+    "Location Highlights: {} minutes to the airport", "Area Overview - Ñandú Café, Straße {}",
+    "A thriving community with internet and cable {}", "Beautiful landscaping and abundant parking {}",
+]
+EDGE_CASES = [
+    "", "ba", "bath", "BATH", "bathroom", "abatement", "brbath", "cashonflow", "cash on cash", "cash flow",
+    "proforma pro forma", "internet", "pro  forma", "price per sfprice per unit", "İSTANBUL income",
+    "amenitiesamenities", "1 2 3", "12,345.67 $ % 1,234,567", "ß" * 120 + " noi", "x" * 99,
+]
+
+
+def make_pages(n: int, seed: int = 11):
+    rng = random.Random(seed)
+    pages = []
+    for i in range(n):
+        kind = rng.random()
+        if kind < 0.15:
+            pages.append(rng.choice(["", "Photo", "  \n EXCLUSIVELY LISTED BY \n"]))
+            continue
+        pool = FINANCIAL if kind < 0.65 else MARKETING if kind < 0.9 else FINANCIAL + MARKETING
+        lines = [rng.choice(pool).format(rng.randint(1, 999999)) for _ in range(rng.randint(20, 80))]
+        if rng.random() < 0.3:
+            lines += [" ".join(str(rng.randint(1, 9999)) for _ in range(6)) for _ in range(10)]
+        pages.append("\n".join(lines))
+    return pages
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(n: int, repeat: int) -> None:
+    for s in EDGE_CASES:
+        assert score_page(s) == legacy_score(s), f"score differs for {s!r}"
+    pages = make_pages(n)
+    expected = [legacy_score(p) for p in pages]
+
+    t_legacy, out = timed(lambda: [legacy_score(p) for p in pages], repeat)
+    assert out == expected
+    t_compiled, out = timed(lambda: [score_page(p) for p in pages], repeat)
+    assert out == expected, "compiled scores differ"
+    score_pages(pages)
+    t_cached, out = timed(lambda: score_pages(pages), repeat)
+    assert out == expected, "cached scores differ"
+
+    get_process_pool("scoring").submit(len, []).result()  # start the workers outside the timing
+
+    def pooled():
+        page_scoring._CACHE.clear()
+        return score_pages(pages, parallel=True)
+
+    t_pool, out = timed(pooled, repeat)
+    assert out == expected, "pool scores differ"
+    shutdown_pools()
+
+    chars = sum(len(p) for p in pages) / 1e6
+    print(f"{n} pages, {chars:.1f} M chars, {len(EDGE_CASES)} edge cases; scores identical "
+          f"(scoring workers: {process_pool_size('scoring')})")
+    for label, t in (("legacy", t_legacy), ("compiled", t_compiled), ("cached", t_cached), ("pool", t_pool)):
+        print(f"{label:9}: {t * 1000:8.1f} ms  ({t_legacy / t:5.1f}x)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--pages", type=int, default=300)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    main(args.pages, args.repeat)
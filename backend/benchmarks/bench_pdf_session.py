@@ -0,0 +1,198 @@
+"""
+Benchmark: one PdfSession per upload vs re-parsing the PDF in every stage.
+
+Builds (once, cached under /tmp) a synthetic OM of about --mb megabytes:
+pages of rent roll / operating statement text, each with a large photo.
+Then runs the stages an upload goes through
+
+    slice the requested pages         (pypdf reader + writer before)
+    OCR cache fingerprints + batches  (PyMuPDF open of the slice, twice)
+    page text for scoring             (PyMuPDF open of the upload)
+    render the selected pages         (pdf2image of every page before)
+    image extraction                  (PyMuPDF open of the upload)
+
+once with the legacy per-stage code (copied below) and once through a
+single PdfSession, each in a fresh subprocess, and reports wall time and
+peak RSS growth. Fingerprints, text and extracted images are asserted
+identical. Without poppler installed the legacy render step falls back to
+PyMuPDF rendering every page, which is what convert_from_bytes did.
+
+    cd backend && python benchmarks/bench_pdf_session.py [--mb 50] [--pages 1-40]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import resource
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fitz  # noqa: E402
+
+from pdf_session import PdfSession  # noqa: E402
+from ocr_cache import page_keys  # noqa: E402
+from ocr_batches import split_pdf  # noqa: E402
+from deal_images import extract_images  # noqa: E402
+
+MODEL = "mistral-ocr-latest"
+SELECT_FOR_RENDER = 15
+
+LINES = [
+    "Gross Potential Rent {:,}", "Vacancy Loss ({:,})", "Effective Gross Income {:,}",
+    "Real Estate Taxes {:,}", "Insurance {:,}", "Repairs & Maintenance {:,}",
+    "Net Operating Income {:,}", "Unit 1{:03d}  2BR/1BA  850 SF  $1,150  Occupied",
+    "Price per Unit ${:,}", "Amenities and lifestyle near downtown {}",
+]
+
+
+def build_fixture(path: Path, target_mb: float, seed: int = 7) -> None:
+    from PIL import Image
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    n = 0
+    while True:
+        page = doc.new_page()
+        text = "\n".join(rng.choice(LINES).format(rng.randint(100, 999999)) for _ in range(40))
+        page.insert_text((40, 60), text, fontsize=9)
+        w, h = 900, 650
+        img = Image.frombytes("RGB", (w, h), rng.randbytes(w * h * 3))
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=92)
+        page.insert_image(fitz.Rect(40, 430, 560, 800), stream=buf.getvalue())
+        n += 1
+        if n % 10 == 0 and len(doc.tobytes()) >= target_mb * 1024 * 1024:
+            break
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+# ---------------- legacy per-stage implementations ----------------
+def legacy_slice(pdf_bytes: bytes, idxs):
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    writer = PdfWriter()
+    for i in idxs:
+        writer.add_page(reader.pages[i])
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def legacy_page_keys(doc_bytes: bytes):
+    # The slice was fingerprinted from its own bytes (a second PyMuPDF open)
+    return page_keys(bytes(doc_bytes), "application/pdf", MODEL)
+
+
+def legacy_split(pdf_bytes: bytes, batch_pages: int = 8):
+    src = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        out = []
+        for start in range(0, src.page_count, batch_pages):
+            part = fitz.open()
+            part.insert_pdf(src, from_page=start, to_page=min(src.page_count, start + batch_pages) - 1)
+            out.append((start, part.tobytes(garbage=3, deflate=True)))
+            part.close()
+        return out
+    finally:
+        src.close()
+
+
+def legacy_texts(pdf_bytes: bytes):
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        return [doc[i].get_text() for i in range(len(doc))]
+    finally:
+        doc.close()
+
+
+def legacy_render_all(pdf_bytes: bytes):
+    try:
+        from pdf2image import convert_from_bytes
+        return convert_from_bytes(pdf_bytes, dpi=100)
+    except Exception:
+        from PIL import Image
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        try:
+            out = []
+            for page in doc:
+                pix = page.get_pixmap(dpi=100, alpha=False)
+                out.append(Image.frombytes("RGB", (pix.width, pix.height), pix.samples))
+            return out
+        finally:
+            doc.close()
+
+
+def run_legacy(data: bytes, idxs):
+    sliced = legacy_slice(data, idxs)
+    keys = legacy_page_keys(sliced)
+    batches = legacy_split(sliced)
+    texts = legacy_texts(data)
+    selected = sorted(range(len(texts)), key=lambda i: -len(texts[i]))[:SELECT_FOR_RENDER]
+    all_images = legacy_render_all(data)
+    renders = [all_images[i] for i in sorted(selected)]
+    images = extract_images(data)  # already one PyMuPDF open per call
+    return keys, len(batches), texts, len(renders), [im["sha256"] for im in images]
+
+
+def run_session(data: bytes, idxs):
+    with PdfSession(data) as pdf:
+        sliced = pdf.select(idxs)
+        keys = page_keys(sliced, "application/pdf", MODEL)
+        batches = split_pdf(sliced)
+        texts = [pdf.text(i) for i in range(pdf.page_count)]
+        selected = sorted(range(len(texts)), key=lambda i: -len(texts[i]))[:SELECT_FOR_RENDER]
+        renders = [pdf.render(i, dpi=100) for i in sorted(selected)]
+        images = extract_images(pdf)
+        return keys, len(batches), texts, len(renders), [im["sha256"] for im in images]
+
+
+def child(mode: str, path: str, pages: str) -> None:
+    data = Path(path).read_bytes()
+    a, b = (int(x) for x in pages.split("-"))
+    idxs = list(range(a - 1, b))
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    out = (run_legacy if mode == "legacy" else run_session)(data, idxs)
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    digest = hashlib.sha256(json.dumps(out, default=str).encode()).hexdigest()
+    print(json.dumps({"seconds": elapsed, "peak_mb": (peak - base) / 1024, "digest": digest,
+                      "pages": len(out[2]), "images": len(out[4])}))
+
+
+def main(mb: float, pages: str) -> None:
+    path = Path(f"/tmp/bench_om_{int(mb)}mb.pdf")
+    if not path.exists():
+        build_fixture(path, mb)
+    size = path.stat().st_size / (1024 * 1024)
+    results = {}
+    for mode in ("legacy", "session"):
+        proc = subprocess.run([sys.executable, __file__, "--child", mode, "--file", str(path), "--pages", pages],
+                              capture_output=True, text=True, check=True)
+        results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert results["legacy"]["digest"] == results["session"]["digest"], "stage outputs differ"
+    r = results["legacy"]
+    print(f"{path.name}: {size:.1f} MB, {r['pages']} pages, {r['images']} images, slice {pages}; outputs identical")
+    for mode, r in results.items():
+        print(f"{mode:8}: {r['seconds'] * 1000:8.0f} ms   peak RSS +{r['peak_mb']:7.1f} MB")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--mb", type=float, default=50)
+    ap.add_argument("--pages", default="1-40")
+    ap.add_argument("--child", choices=["legacy", "session"], help=argparse.SUPPRESS)
+    ap.add_argument("--file", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        child(args.child, args.file, args.pages)
+    else:
+        main(args.mb, args.pages)
@@ -0,0 +1,203 @@
+"""
+Benchmark: Rapid Fire napkin underwriting, per-row loop vs the columnar engine.
+
+Generates --rows CREXI-style rows (blank, "N/A", "$1,234,567" and "6.25%"
+cells, zero units, prices only as Price/Unit) and underwrites them with
+the default buy box:
+
+    legacy    the old per-row loop (copied below) over row dicts, then
+              FastAPI's jsonable_encoder walk over the returned deals
+    columnar  rapid_fire.float_column / fallback_noi / napkin_metrics /
+              build_deals, returned as a JSONResponse
+
+Deals are asserted identical. Also times the whole POST /v2/rapid-fire/underwrite
+(multipart upload, CSV parse, column detection, engine, JSON body) on an
+in-process app.
+
+    cd backend && python benchmarks/bench_rapid_fire.py [--rows 100000]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from v2_underwriter import routes  # noqa: E402
+from v2_underwriter.rapid_fire import (  # noqa: E402
+    as_float, build_deals, derive_total_price, fallback_noi, float_column, napkin_metrics,
+)
+
+logging.disable(logging.WARNING)
+
+A = {
+    "vacancy_rate": 5.0, "expense_ratio": 50.0, "closing_costs_pct": 2.0, "acquisition_fee_pct": 1.0,
+    "ltv_pct": 75.0, "interest_rate_pct": 6.5, "amort_years": 30.0, "min_dscr": 1.25, "min_coc": 8.0, "min_cap": 7.0,
+}
+HEADERS = ["Property Name", "Units", "Asking Price", "Price/Unit", "Cap Rate", "NOI", "Gross Income"]
+
+
+def make_rows(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    junk = ["", "N/A", "--", None]
+    rows = []
+    for i in range(n):
+        units = rng.choice([rng.randint(4, 300)] * 8 + [0, None])
+        ppu = rng.randint(60_000, 260_000)
+        price = units * ppu if units else rng.randint(400_000, 30_000_000)
+        cap = rng.uniform(4.0, 10.5)
+        rows.append([
+            f"{i} Main St, Phoenix, AZ 850{i % 100:02d}",
+            str(units) if units is not None else None,
+            rng.choice([f"${price:,}", str(price), str(price), rng.choice(junk)]),
+            f"${ppu:,}",
+            rng.choice([f"{cap:.2f}%", f"{cap:.2f}", rng.choice(junk)]),
+            rng.choice([str(round(price * cap / 100 * rng.uniform(0.8, 1.2)))] + junk),
+            rng.choice([str(round(price * 0.14))] + junk * 2),
+        ])
+    return rows
+
+
+def legacy(rows):
+    """The napkin math of the old per-row route loop (CREXI path)."""
+    def annual_debt_service(purchase_price):
+        loan_amount = purchase_price * (A["ltv_pct"] / 100.0)
+        r = (A["interest_rate_pct"] / 100.0) / 12.0
+        n = int(A["amort_years"] * 12)
+        if r <= 0 or n <= 0:
+            return None
+        payment = loan_amount * (r * (1 + r) ** n) / ((1 + r) ** n - 1)
+        return payment * 12.0
+
+    deals = []
+    for idx, r in enumerate(rows):
+        row = dict(zip(HEADERS, r))
+        name = row.get("Property Name") or ""
+        units = as_float(row.get("Units"))
+        total_price = as_float(row.get("Asking Price"))
+        raw_ppu = as_float(row.get("Price/Unit"))
+        broker_cap = as_float(row.get("Cap Rate"))
+        noi = as_float(row.get("NOI"))
+        gross_income = as_float(row.get("Gross Income"))
+        if (total_price is None or total_price <= 0) and raw_ppu is not None and units is not None and units > 0:
+            total_price = raw_ppu * units
+        if total_price is None or total_price <= 0:
+            continue
+        if noi is None:
+            if gross_income is not None and gross_income > 0:
+                effective_income = gross_income * (1.0 - A["vacancy_rate"] / 100.0)
+                noi = effective_income - effective_income * (A["expense_ratio"] / 100.0)
+            elif broker_cap is not None and broker_cap > 0:
+                noi = total_price * (broker_cap / 100.0)
+        cap_rate = (noi / total_price) * 100.0 if noi is not None else None
+        ads = annual_debt_service(total_price)
+        dscr = noi / ads if noi is not None and ads not in (None, 0) else None
+        equity = total_price * (1.0 - A["ltv_pct"] / 100.0)
+        equity += total_price * (A["closing_costs_pct"] / 100.0)
+        equity += total_price * (A["acquisition_fee_pct"] / 100.0)
+        coc = monthly = None
+        if noi is not None and ads is not None and equity > 0:
+            coc = ((noi - ads) / equity) * 100.0
+            monthly = (noi - ads) / 12.0
+        reasons = []
+        if noi is None or noi <= 0 or units is None or units <= 0:
+            verdict = "TRASH"
+            if noi is None or noi <= 0:
+                reasons.append("Missing or invalid NOI")
+            if units is None or units <= 0:
+                reasons.append("Missing or invalid units")
+        elif dscr is not None and dscr < A["min_dscr"]:
+            verdict = "TRASH"
+            reasons.append(f"DSCR {dscr:.2f} below minimum {A['min_dscr']:.2f}")
+        elif coc is not None and coc < A["min_coc"]:
+            verdict = "TRASH"
+            reasons.append(f"Cash-on-cash {coc:.1f}% below minimum {A['min_coc']:.1f}%")
+        elif cap_rate is not None and cap_rate < A["min_cap"]:
+            verdict = "MAYBE"
+            reasons.append(f"Cap rate {cap_rate:.1f}% below minimum {A['min_cap']:.1f}%")
+        else:
+            verdict = "DEAL"
+            reasons.append("Meets all minimum underwriting thresholds")
+        ppu = total_price / units if units is not None and units > 0 else None
+        deals.append({
+            "id": f"rf-{idx+1}", "name": str(name) if name else "Unnamed Property", "city": "", "state": "",
+            "units": int(units) if units is not None else None, "totalPrice": float(total_price),
+            "pricePerUnit": float(ppu) if ppu is not None and ppu > 0 else None,
+            "brokerCapRate": float(broker_cap) if broker_cap is not None else None,
+            "noi": float(noi) if noi is not None else None,
+            "calculatedCapRate": float(cap_rate) if cap_rate is not None else None,
+            "dscr": float(dscr) if dscr is not None else None,
+            "cashOnCash": float(coc) if coc is not None else None,
+            "monthlyCashFlow": float(monthly) if monthly is not None else None,
+            "listingUrl": None, "ownerName": None, "verdict": verdict, "verdictReasons": reasons, "aiAnalysis": None,
+        })
+    return deals
+
+
+def columnar(rows):
+    cols = list(zip(*rows))
+    units = float_column(cols[1])
+    total_price = derive_total_price(float_column(cols[2]), float_column(cols[3]), units)
+    kept = np.flatnonzero(total_price > 0)
+    units, total_price = units[kept], total_price[kept]
+    broker_cap = float_column(cols[4])[kept]
+    noi = fallback_noi(float_column(cols[5])[kept], total_price, float_column(cols[6])[kept], broker_cap, A)
+    none = [None] * len(kept)
+    text = {"name": [cols[0][i] for i in kept.tolist()], "city": none, "state": none,
+            "listing_url": none, "owner_name": none}
+    return build_deals(kept.tolist(), text, units, total_price, broker_cap, noi,
+                       napkin_metrics(total_price, units, noi, A), A)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+
+async def post_csv(body: bytes):
+    app = FastAPI()
+    app.include_router(routes.router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        t0 = time.perf_counter()
+        r = await client.post("/v2/rapid-fire/underwrite", files={"file": ("crexi.csv", body, "text/csv")},
+                              data={"settings": "{}", "sourceType": "crexi"})
+        r.raise_for_status()
+        return time.perf_counter() - t0, len(r.content), r.json()["debug"]["returned_deals"]
+
+
+def main(n: int) -> None:
+    rows = make_rows(n)
+    t_loop, old = timed(lambda: legacy(rows))
+    t_enc, _ = timed(lambda: JSONResponse(content=jsonable_encoder({"deals": old})))
+    t_engine, new = timed(lambda: columnar(rows))
+    t_body, _ = timed(lambda: JSONResponse(content={"deals": new}))
+    assert new == old, "columnar deals differ from the per-row loop"
+
+    csv_lines = [",".join(HEADERS)] + [",".join(f'"{c}"' if c else "" for c in r) for r in rows]
+    t_post, size, returned = asyncio.run(post_csv(("\n".join(csv_lines) + "\n").encode()))
+
+    print(f"{n} rows -> {len(new)} deals; deals identical")
+    print(f"legacy  : loop {t_loop * 1000:7.0f} ms + encode {t_enc * 1000:7.0f} ms = {(t_loop + t_enc) * 1000:7.0f} ms")
+    print(f"columnar: engine {t_engine * 1000:5.0f} ms + body {t_body * 1000:7.0f} ms = "
+          f"{(t_engine + t_body) * 1000:7.0f} ms  ({(t_loop + t_enc) / (t_engine + t_body):4.1f}x)")
+    print(f"endpoint: {t_post * 1000:7.0f} ms end to end ({returned} deals, {size / 2 ** 20:.1f} MB body)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--rows", type=int, default=100000)
+    args = ap.parse_args()
+    main(args.rows)
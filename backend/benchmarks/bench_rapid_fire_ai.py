@@ -0,0 +1,135 @@
+"""
+Benchmark: Rapid Fire AI enrichment, one Claude call at a time vs concurrent.
+
+Builds a Reonomy-style CSV of --rows properties, --ai-share of them without
+an NOI (so they need analyze_property_with_ai), and posts it to
+/v2/rapid-fire/underwrite on an in-process app. The Claude call is replaced
+by a stand-in that sleeps --latency-ms and returns a deterministic analysis,
+so only the orchestration is measured:
+
+    serial      RAPID_FIRE_AI_CONCURRENCY=1 (same as the old inline loop)
+    concurrent  the default RAPID_FIRE_AI_CONCURRENCY
+
+The deals must be identical. A third run injects failures (every 7th AI
+row raises, every 11th overruns RAPID_FIRE_AI_TIMEOUT_S) and checks that
+those rows fall back to the FMR estimate and that all deals keep row order.
+
+    cd backend && python benchmarks/bench_rapid_fire_ai.py [--rows 120] [--ai-share 0.5] [--latency-ms 150]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from v2_underwriter import rapid_fire_ai, routes  # noqa: E402
+
+logging.disable(logging.ERROR)
+
+ZIPS = ["85004", "85251", "85281", "85201", "85032"]
+FMR = {z: {"zip": z, "fmr_2br": str(1300 + 90 * i), "state_name": "Arizona", "county_name": "Maricopa"}
+       for i, z in enumerate(ZIPS)}
+TAXES = {("arizona", "maricopa"): 0.0055}
+
+
+def make_csv(n: int, ai_share: float) -> bytes:
+    # Column detection samples the first 20 rows, so those all carry an NOI
+    lines = ["Address,Units,Sale Price,NOI"]
+    for i in range(n):
+        units = 25 + (i * 7) % 60
+        price = units * (140_000 + (i * 3_517) % 90_000)
+        needs_ai = i >= 20 and (i * 0.618) % 1 < ai_share
+        noi = "" if needs_ai else str(round(price * (0.055 + (i % 5) * 0.006)))
+        lines.append(f'"{100 + i} W Camelback Rd, Phoenix, AZ {ZIPS[i % len(ZIPS)]}",{units},{price},{noi}')
+    return ("\n".join(lines) + "\n").encode()
+
+
+def fake_analysis(latency_s: float, inject_failures: bool):
+    calls = {"n": 0}
+
+    def analyze(address, units, sale_price, sqft, mortgage_amount, zip_code, fmr_data, settings, tax_by_county=None):
+        row = int(address.split()[0]) - 100
+        if inject_failures and row % 7 == 0:
+            raise RuntimeError("simulated provider error")
+        time.sleep(latency_s * (20 if inject_failures and row % 11 == 0 else 1))
+        calls["n"] += 1
+        return {
+            "estimatedNOI": round(sale_price * (0.05 + (row % 4) * 0.01)),
+            "verdict": ("deal", "maybe", "trash")[row % 3],
+            "confidence": "medium",
+            "reasoning": f"stand-in analysis for row {row}",
+        }
+
+    return analyze, calls
+
+
+async def underwrite(app, body: bytes):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        t0 = time.perf_counter()
+        r = await client.post(
+            "/v2/rapid-fire/underwrite",
+            files={"file": ("reonomy.csv", body, "text/csv")},
+            data={"settings": "{}", "sourceType": "reonomy"},
+        )
+        r.raise_for_status()
+        return time.perf_counter() - t0, r.json()
+
+
+def run(app, body: bytes, latency_s: float, concurrency: int, inject_failures: bool = False):
+    routes.analyze_property_with_ai, calls = fake_analysis(latency_s, inject_failures)
+    rapid_fire_ai.RAPID_FIRE_AI_CONCURRENCY = concurrency
+    elapsed, out = asyncio.run(underwrite(app, body))
+    return elapsed, out, calls["n"]
+
+
+def main(n: int, ai_share: float, latency_ms: float) -> None:
+    routes._FMR_BY_ZIP = FMR
+    routes._PROPERTY_TAX_BY_COUNTY = TAXES
+    app = FastAPI()
+    app.include_router(routes.router)
+    body = make_csv(n, ai_share)
+    latency_s = latency_ms / 1000
+    default_concurrency = rapid_fire_ai.RAPID_FIRE_AI_CONCURRENCY
+
+    t_serial, serial, _ = run(app, body, latency_s, 1)
+    t_conc, conc, _ = run(app, body, latency_s, default_concurrency)
+    assert conc["deals"] == serial["deals"], "concurrent deals differ from serial"
+    ai_rows = serial["debug"]["ai_enrichment"]["requested"]
+
+    rapid_fire_ai.RAPID_FIRE_AI_TIMEOUT_S = latency_s * 5
+    t_fail, failed, _ = run(app, body, latency_s, default_concurrency, inject_failures=True)
+    stats = failed["debug"]["ai_enrichment"]
+    ids = [int(d["id"].split("-")[1]) for d in failed["deals"]]
+    assert ids == sorted(ids) and len(ids) == len(serial["deals"]), "deals out of row order"
+    fallbacks = 0
+    for d, s in zip(failed["deals"], serial["deals"]):
+        if s["aiAnalysis"] and not d["aiAnalysis"]:
+            fallbacks += 1
+            assert d["noi"] and d["noi"] > 0, "FMR fallback gave no NOI"
+    assert fallbacks == stats["failed"] + stats["timed_out"] + stats["skipped"]
+
+    print(f"{len(serial['deals'])} deals, {ai_rows} needing AI, stand-in latency {latency_ms:.0f} ms; deals identical")
+    print(f"serial     (1 at a time): {t_serial * 1000:7.0f} ms")
+    print(f"concurrent ({default_concurrency} at a time): {t_conc * 1000:7.0f} ms  ({t_serial / t_conc:4.1f}x)")
+    print(f"with failures: {t_fail * 1000:7.0f} ms  analyzed {stats['analyzed']}, failed {stats['failed']}, "
+          f"timed out {stats['timed_out']}, skipped {stats['skipped']}; {fallbacks} rows fell back to FMR, "
+          f"row order kept")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--rows", type=int, default=120)
+    ap.add_argument("--ai-share", type=float, default=0.5)
+    ap.add_argument("--latency-ms", type=float, default=150)
+    args = ap.parse_args()
+    main(args.rows, args.ai_share, args.latency_ms)
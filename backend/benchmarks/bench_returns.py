@@ -0,0 +1,83 @@
+"""
+Benchmark + accuracy check: returns.irr / npv vs numpy_financial.
+
+Builds randomized cash-flow series (conventional hold-and-sell deals,
+deals with capital calls mid-hold, losers with no positive IRR, all-negative
+series with no IRR at all), solves them with numpy_financial one series at
+a time and with returns in one vectorized call, checks the two agree, then
+times both.
+
+    cd backend && python benchmarks/bench_returns.py [--series 100000] [--years 10]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import numpy_financial as npf
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import returns  # noqa: E402
+
+
+def make_series(n: int, years: int, rng: np.random.Generator) -> np.ndarray:
+    equity = rng.uniform(1e5, 5e6, n)
+    yield_on_cost = rng.uniform(-0.04, 0.14, (n, 1))
+    growth = rng.uniform(-0.02, 0.05, (n, 1))
+    cf = np.empty((n, years + 1))
+    cf[:, 0] = -equity
+    cf[:, 1:] = equity[:, None] * yield_on_cost * (1 + growth) ** np.arange(years)
+    cf[:, -1] += equity * rng.uniform(0.2, 2.5, n)  # sale proceeds
+
+    kind = rng.random(n)
+    calls = kind < 0.10  # capital call mid-hold
+    cf[calls, rng.integers(1, years, calls.sum())] -= equity[calls] * rng.uniform(0.1, 0.6, calls.sum())
+    wipeout = (kind >= 0.10) & (kind < 0.12)  # nothing ever comes back
+    cf[wipeout, 1:] = -np.abs(cf[wipeout, 1:])
+    return cf
+
+
+def main(n: int, years: int, seed: int):
+    cf = make_series(n, years, np.random.default_rng(seed))
+
+    t0 = time.perf_counter()
+    expected = np.array([npf.irr(row) for row in cf])
+    t_npf = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    got = returns.irr(cf)
+    t_vec = time.perf_counter() - t0
+
+    nan_mismatch = int((np.isnan(expected) != np.isnan(got)).sum())
+    both = np.isfinite(expected) & np.isfinite(got)
+    max_err = float(np.abs(expected[both] - got[both]).max()) if both.any() else 0.0
+    assert nan_mismatch == 0, f"{nan_mismatch} series solvable by only one side"
+    assert max_err < 1e-9, f"max abs IRR difference {max_err:.3e}"
+
+    rate = 0.08
+    t0 = time.perf_counter()
+    npv_expected = np.array([npf.npv(rate, row) for row in cf])
+    t_npf_npv = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    npv_got = returns.npv(rate, cf)
+    t_vec_npv = time.perf_counter() - t0
+    npv_err = float((np.abs(npv_expected - npv_got) / np.maximum(np.abs(cf).sum(axis=1), 1)).max())
+    assert npv_err < 1e-12, f"max relative NPV difference {npv_err:.3e}"
+
+    print(f"{n} series x {years + 1} flows: {int(both.sum())} IRRs agree within {max_err:.1e}, "
+          f"{int(np.isnan(got).sum())} without IRR on both sides")
+    print(f"irr  numpy_financial: {t_npf * 1000:9.1f} ms")
+    print(f"irr  returns        : {t_vec * 1000:9.1f} ms  {t_npf / t_vec:.0f}x")
+    print(f"npv  numpy_financial: {t_npf_npv * 1000:9.1f} ms")
+    print(f"npv  returns        : {t_vec_npv * 1000:9.1f} ms  {t_npf_npv / t_vec_npv:.0f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--series", type=int, default=100000)
+    ap.add_argument("--years", type=int, default=10)
+    ap.add_argument("--seed", type=int, default=3)
+    args = ap.parse_args()
+    main(args.series, args.years, args.seed)
@@ -0,0 +1,137 @@
+"""
+Benchmark: peak memory of one OM upload, read-into-memory vs spooled + streamed.
+
+Uses the synthetic OM from bench_pdf_session (about --mb megabytes, built
+once under /tmp) and, in a fresh subprocess per mode, takes it from an
+on-disk form file to a finished OCR request body:
+
+    legacy   await file.read() -> pypdf slice -> base64 data URL string
+             -> JSON request body (what the Mistral SDK sent)
+    spooled  spool_upload -> mmap -> PdfSession slice view -> streamed
+             base64 JSON body (upload_spool.data_url_json_body)
+
+The body is consumed as it would be by the HTTP client. Reports wall time,
+peak anonymous RSS (heap; sampled every few ms) and peak total RSS, which
+also counts the reclaimable file-backed pages of the mapping. The streamed
+body is checked byte-for-byte against the legacy one first.
+
+    cd backend && python benchmarks/bench_upload_memory.py [--mb 50] [--pages 1-40]
+"""
+import io
+import sys
+import json
+import time
+import base64
+import argparse
+import resource
+import threading
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_pdf_session import build_fixture, legacy_slice  # noqa: E402
+from pdf_session import PdfSession  # noqa: E402
+from upload_spool import _spool, data_url_json_body, rss_anon_bytes  # noqa: E402
+
+MODEL = "mistral-ocr-latest"
+PAYLOAD = {"model": MODEL, "document": {"type": "document_url"}, "include_image_base64": False}
+
+
+def legacy_body(src, idxs) -> bytes:
+    data = src.read()
+    if idxs:
+        data = legacy_slice(data, idxs)
+    url = f"data:application/pdf;base64,{base64.b64encode(data).decode('utf-8')}"
+    payload = json.loads(json.dumps(PAYLOAD))
+    payload["document"]["document_url"] = url
+    return json.dumps(payload).encode("utf-8")
+
+
+def spooled_body(src, idxs):
+    upload = _spool(src, 10 ** 12)
+    pdf = PdfSession(upload.view)
+    doc = pdf.select(idxs) if idxs else pdf
+    body, length = data_url_json_body(PAYLOAD, ("document", "document_url"), doc.pdf_bytes(), "application/pdf")
+    return body, length, (pdf, upload)
+
+
+def child(mode: str, path: str, pages: str) -> None:
+    idxs = []
+    if pages:
+        a, b = (int(x) for x in pages.split("-"))
+        idxs = list(range(a - 1, b))
+    peak_anon = [rss_anon_bytes()]
+    base_anon = peak_anon[0]
+    done = threading.Event()
+
+    def sampler():
+        while not done.is_set():
+            peak_anon[0] = max(peak_anon[0], rss_anon_bytes())
+            time.sleep(0.002)
+
+    threading.Thread(target=sampler, daemon=True).start()
+    base_total = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    sent = 0
+    with open(path, "rb") as src:
+        if mode == "legacy":
+            body = legacy_body(src, idxs)
+            sent = len(body)
+            del body
+        else:
+            body, length, keep = spooled_body(src, idxs)
+            for chunk in body:
+                sent += len(chunk)
+            assert sent == length
+            keep[0].close()
+            keep[1].close()
+    elapsed = time.perf_counter() - t0
+    peak_anon[0] = max(peak_anon[0], rss_anon_bytes())
+    done.set()
+    peak_total = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"seconds": elapsed, "sent": sent, "anon_mb": (peak_anon[0] - base_anon) / 2 ** 20,
+                      "total_mb": (peak_total - base_total) / 1024}))
+
+
+def check_equal(path: Path) -> None:
+    """On a small slice, the streamed body is the legacy body, byte for byte."""
+    with open(path, "rb") as src:
+        data = src.read()
+    doc = PdfSession(data)
+    sliced = doc.select([0, 1, 2]).pdf_bytes()
+    body, length = data_url_json_body(PAYLOAD, ("document", "document_url"), sliced, "application/pdf")
+    streamed = b"".join(body)
+    assert len(streamed) == length
+    assert streamed == legacy_body(io.BytesIO(sliced), []), "streamed body differs"
+    doc.close()
+
+
+def main(mb: float, pages: str) -> None:
+    path = Path(f"/tmp/bench_om_{int(mb)}mb.pdf")
+    if not path.exists():
+        build_fixture(path, mb)
+    check_equal(path)
+    size = path.stat().st_size / 2 ** 20
+    print(f"{path.name}: {size:.1f} MB; streamed body identical to the legacy JSON body")
+    for label, spec in (("whole document", ""), (f"pages {pages}", pages)):
+        print(f"-- {label}")
+        for mode in ("legacy", "spooled"):
+            proc = subprocess.run([sys.executable, __file__, "--child", mode, "--file", str(path), "--pages", spec],
+                                  capture_output=True, text=True, check=True)
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{mode:8}: {r['seconds'] * 1000:7.0f} ms  body {r['sent'] / 2 ** 20:6.1f} MB  "
+                  f"peak anon +{r['anon_mb']:6.1f} MB ({r['anon_mb'] / size:4.2f}x)  peak RSS +{r['total_mb']:6.1f} MB")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--mb", type=float, default=50)
+    ap.add_argument("--pages", default="1-40")
+    ap.add_argument("--child", choices=["legacy", "spooled"], help=argparse.SUPPRESS)
+    ap.add_argument("--file", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        child(args.child, args.file, args.pages)
+    else:
+        main(args.mb, args.pages)
@@ -0,0 +1,108 @@
+"""
+Benchmark: page image encoding for the Claude vision parse, serial q75 vs budgeted.
+
+Takes --text pages rendered at 100 DPI from the synthetic OM of
+bench_pdf_session (tables and text with an inset photo) plus --photos
+full-page photo pages, and encodes them
+
+    legacy    serially, full size, JPEG quality 75 (parse_deal_v2 before)
+    budgeted  vision_images.encode_pages with the default token / payload
+              budgets, on the "image-encode" thread pool
+
+Reports wall time, base64 payload, estimated image tokens (one per 750
+pixels), and for text pages the smallest size kept and the mean absolute
+pixel error against the original render, as a legibility check.
+
+    cd backend && python benchmarks/bench_vision_encoding.py [--text 12] [--photos 3]
+"""
+import io
+import sys
+import time
+import math
+import base64
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from PIL import Image, ImageChops, ImageFilter, ImageStat  # noqa: E402
+
+from bench_pdf_session import build_fixture  # noqa: E402
+from pdf_session import PdfSession  # noqa: E402
+from v2_underwriter.vision_images import encode_pages, tokens  # noqa: E402
+
+
+def legacy_encode(images):
+    out = []
+    for img in images:
+        buf = io.BytesIO()
+        if img.mode == 'RGBA':
+            img = img.convert('RGB')
+        img.save(buf, format='JPEG', quality=75, optimize=True)
+        out.append(base64.b64encode(buf.getvalue()).decode('utf-8'))
+    return out
+
+
+def photo_page(rng: random.Random, size=(850, 1100)):
+    base = Image.linear_gradient("L").resize(size).convert("RGB")
+    tint = Image.new("RGB", size, (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    noise = Image.frombytes("RGB", (size[0] // 4, size[1] // 4), rng.randbytes(size[0] * size[1] * 3 // 16))
+    noise = noise.resize(size, Image.BICUBIC).filter(ImageFilter.GaussianBlur(2))
+    return Image.blend(Image.blend(base, tint, 0.5), noise, 0.4)
+
+
+def mean_error(original, data_b64: str) -> float:
+    decoded = Image.open(io.BytesIO(base64.b64decode(data_b64))).convert("RGB")
+    if decoded.size != original.size:
+        decoded = decoded.resize(original.size, Image.LANCZOS)
+    return sum(ImageStat.Stat(ImageChops.difference(original.convert("RGB"), decoded)).mean) / 3
+
+
+def main(n_text: int, n_photos: int) -> None:
+    path = Path("/tmp/bench_om_66mb.pdf")
+    if not path.exists():
+        build_fixture(path, 66)
+    with PdfSession(path.read_bytes()) as pdf:
+        step = max(1, pdf.page_count // max(1, n_text))
+        images = [pdf.render(i, dpi=100) for i in range(0, step * n_text, step)]
+    rng = random.Random(5)
+    images += [photo_page(rng) for _ in range(n_photos)]
+
+    t0 = time.perf_counter()
+    legacy = legacy_encode(images)
+    t_legacy = time.perf_counter() - t0
+    encode_pages(images[:1])  # start the pool outside the timing
+    t0 = time.perf_counter()
+    items, stats = encode_pages(images)
+    t_new = time.perf_counter() - t0
+
+    # No kinds when the pages fit the token budget unclassified (all encoded as text)
+    text_idx = [i for i, k in enumerate(stats["kinds"] or ["text"] * len(images)) if k == "text"]
+    legacy_tokens = sum(tokens(im.size) for im in images)
+    legacy_bytes = sum(len(b) for b in legacy)
+    print(f"{len(images)} pages: {len(text_idx)} classified text, {len(images) - len(text_idx)} photo "
+          f"(expected {n_text} / {n_photos})")
+    print(f"legacy  : {t_legacy * 1000:7.0f} ms  payload {legacy_bytes / 2 ** 20:5.2f} MB  ~{legacy_tokens} tokens")
+    print(f"budgeted: {t_new * 1000:7.0f} ms  payload {stats['payload_bytes'] / 2 ** 20:5.2f} MB  "
+          f"~{stats['est_tokens']} tokens")
+    if text_idx:
+        smallest = min(stats["sizes"][i] for i in text_idx)
+        err_legacy = sum(mean_error(images[i], legacy[i]) for i in text_idx) / len(text_idx)
+        err_new = sum(mean_error(images[i], items[i]["source"]["data"]) for i in text_idx) / len(text_idx)
+        print(f"text pages: smallest {smallest[0]}x{smallest[1]} (from {images[text_idx[0]].size[0]}x"
+              f"{images[text_idx[0]].size[1]}), quality {min(stats['qualities'][i] for i in text_idx)}; "
+              f"mean abs error {err_legacy:.2f} legacy vs {err_new:.2f} budgeted (0-255)")
+    photo_sizes = [stats["sizes"][i] for i in range(len(images)) if i not in text_idx]
+    if photo_sizes:
+        print(f"photo pages: {photo_sizes[0][0]}x{photo_sizes[0][1]}, "
+              f"quality {min(stats['qualities'][i] for i in range(len(images)) if i not in text_idx)}")
+    assert math.isfinite(t_new)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--text", type=int, default=12)
+    ap.add_argument("--photos", type=int, default=3)
+    args = ap.parse_args()
+    main(args.text, args.photos)
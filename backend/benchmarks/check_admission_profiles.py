@@ -0,0 +1,65 @@
+"""
+Check: admission profiles tell anonymous callers apart behind the proxy.
+
+Asserts that
+
+    - an X-Profile-ID header or profile_id cookie wins over any address
+    - requests from a trusted proxy are keyed on the X-Forwarded-For hop
+      before the proxies, and X-Forwarded-For from other peers is ignored
+    - a caller with no profile and no usable address gets no profile
+    - unidentified callers only count against the class limits: with a
+      per-profile limit of 1, three of them still run at once
+
+    cd backend && python benchmarks/check_admission_profiles.py
+"""
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from admission import Gate, _profile_of  # noqa: E402
+
+
+def profile(peer, forwarded=None, **headers):
+    h = {k.replace("_", "-").encode(): v.encode() for k, v in headers.items()}
+    if forwarded is not None:
+        h[b"x-forwarded-for"] = forwarded.encode()
+    return _profile_of({"client": (peer, 443) if peer else None}, h)
+
+
+async def check_gate() -> None:
+    gate = Gate("ocr", limit=3, profile_limit=1, queue_limit=4, profile_queue_limit=1, timeout=5, retry_after=5)
+    for _ in range(3):
+        assert await gate.acquire(None) == 0.0, "unidentified caller queued behind the others"
+    assert gate.active == 3 and not gate.running
+    waiter = asyncio.ensure_future(gate.acquire("client:203.0.113.9"))
+    await asyncio.sleep(0)
+    assert len(gate.waiting) == 1
+    gate.release(None, 0.1)
+    await waiter
+    assert gate.running == {"client:203.0.113.9": 1}
+    for p in (None, None, "client:203.0.113.9"):
+        gate.release(p)
+    assert gate.active == 0 and not gate.running and not gate.queued
+
+
+def main() -> None:
+    assert profile("10.0.0.5", "203.0.113.9", x_profile_id="u1") == "profile:u1"
+    assert profile("10.0.0.5", "203.0.113.9", cookie="a=b; profile_id=u2") == "profile:u2"
+
+    assert profile("10.0.0.5", "203.0.113.9") == "client:203.0.113.9"
+    assert profile("10.0.0.5", "203.0.113.10") == "client:203.0.113.10", "callers behind the proxy share a profile"
+    assert profile("10.0.0.5", "198.51.100.7, 203.0.113.9, 10.1.2.3") == "client:203.0.113.9", "took a spoofable hop"
+    assert profile("198.51.100.7", "203.0.113.9") == "client:198.51.100.7", "trusted XFF from an untrusted peer"
+
+    assert profile("10.0.0.5") is None
+    assert profile("10.0.0.5", "10.9.9.9") is None
+    assert profile(None) is None
+
+    asyncio.run(check_gate())
+    print("Admission profiles: keyed on the forwarded client; unidentified callers skip per-profile limits")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Check: AdmissionMiddleware frees the slot when the response is sent, not
+when the app call returns.
+
+Starlette runs BackgroundTasks inside the app call after the last body
+chunk, so a slot released only on return would be held (and its time
+counted towards Retry-After) for the whole background job. Asserts that
+
+    - a FastAPI route's background task runs with the slot already free,
+      and the recorded service time excludes it
+    - a streamed response keeps the slot until its final chunk
+    - an app that fails before responding releases the slot exactly once
+
+    cd backend && python benchmarks/check_admission_release.py
+"""
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi import BackgroundTasks, FastAPI  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+
+from admission import Admission, AdmissionMiddleware, Gate  # noqa: E402
+
+BACKGROUND_S = 0.3
+
+
+def make_gate():
+    admission = Admission({"ocr": [("POST", "/ocr/underwrite"), ("POST", "/stream"), ("POST", "/boom")]})
+    gate = admission._gates["ocr"] = Gate("ocr", limit=1, profile_limit=1, queue_limit=4,
+                                          profile_queue_limit=4, timeout=10, retry_after=5)
+    return admission, gate
+
+
+async def call(app, path: str):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": [], "client": ("127.0.0.1", 1),
+             "query_string": b"", "root_path": "", "scheme": "http", "server": ("bench", 80), "http_version": "1.1",
+             "asgi": {"version": "3.0", "spec_version": "2.4"}}
+    await app(scope, receive, send)
+    return sent
+
+
+async def main() -> None:
+    admission, gate = make_gate()
+    seen = {}
+    api = FastAPI()
+
+    async def images():
+        seen["active_in_background"] = gate.active
+        await asyncio.sleep(BACKGROUND_S)
+
+    @api.post("/ocr/underwrite")
+    async def underwrite(background_tasks: BackgroundTasks):
+        background_tasks.add_task(images)
+        return {"ok": True}
+
+    @api.post("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                seen.setdefault("active_while_streaming", []).append(gate.active)
+                yield b"x"
+        return StreamingResponse(chunks())
+
+    app = AdmissionMiddleware(api, admission)
+    sent = await call(app, "/ocr/underwrite")
+    assert sent[0]["status"] == 200
+    assert seen["active_in_background"] == 0, "slot still held while the background task ran"
+    assert gate.active == 0 and not gate.running
+    assert len(gate.services) == 1 and gate.services[0] < BACKGROUND_S, "service time includes the background task"
+
+    await call(app, "/stream")
+    assert seen["active_while_streaming"] == [1, 1, 1], "slot freed before the stream finished"
+    assert gate.active == 0 and len(gate.services) == 2
+
+    async def boom(scope, receive, send):
+        raise RuntimeError("failed before responding")
+
+    admission, gate = make_gate()
+    try:
+        await call(AdmissionMiddleware(boom, admission), "/boom")
+    except RuntimeError:
+        pass
+    assert gate.active == 0 and not gate.running and len(gate.services) == 1, "failed request not released once"
+    print("Admission: slot freed at the final body chunk; background tasks don't hold it")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+"""
+Check: deal image status records expire with the OCR job TTL.
+
+Writes status records into a temp DEAL_IMAGES_DIR, ages some of them past
+OCR_JOB_TTL_HOURS and asserts that
+
+    - prune_statuses() deletes exactly the expired records, after which
+      get_status returns None (GET /ocr/deals/{id}/images answers 404)
+    - processing a deal sweeps expired records on its own once
+      the prune interval has passed, and records the new deal
+
+    cd backend && python benchmarks/check_deal_image_status.py
+"""
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import deal_images  # noqa: E402
+from ocr_jobs import OCR_JOB_TTL_HOURS  # noqa: E402
+
+
+def age(deal_id: str) -> None:
+    old = time.time() - OCR_JOB_TTL_HOURS * 3600 - 60
+    os.utime(deal_images._status_path(deal_id), (old, old))
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        deal_images.DEAL_IMAGES_DIR = Path(tmp)
+        for i in range(6):
+            deal_images.mark_pending(f"deal-{i}")
+        for i in (0, 2, 4):
+            age(f"deal-{i}")
+        assert deal_images.prune_statuses() == 3
+        assert [deal_images.get_status(f"deal-{i}") is not None for i in range(6)] == [False, True] * 3
+
+        for i in (1, 3):
+            age(f"deal-{i}")
+        deal_images._pruned_at = time.time() - deal_images._PRUNE_SECONDS
+        deal_images.extract_images = lambda pdf: []
+        deal_images.process_deal_images(b"%PDF", "deal-new")
+        assert deal_images.get_status("deal-new")["status"] == deal_images.DONE
+        assert sorted(p.stem for p in Path(tmp).glob("*.json")) == ["deal-5", "deal-new"], "expired records left"
+    print("Deal image status: expired records pruned on demand and while processing deals")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Check: the underwriting response's file size never writes a PDF slice.
+
+A page-sliced PdfSession whose pages all came from the OCR cache never
+builds its sub-PDF. Asserts that _document_size then reports the upload
+without calling pdf_bytes(), reports the slice once OCR has built it, and
+handles plain bytes (spreadsheets, images).
+
+    cd backend && python benchmarks/check_document_size.py
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("OPENAI_API_KEY", "check")
+os.environ.setdefault("ANTHROPIC_API_KEY", "check")
+
+import fitz  # noqa: E402
+
+import App  # noqa: E402
+from pdf_session import PdfSession  # noqa: E402
+
+
+def main() -> None:
+    doc = fitz.open()
+    for i in range(12):
+        doc.new_page().insert_text((72, 72), f"Rent roll page {i} " * 20)
+    data = doc.tobytes()
+
+    writes = []
+    build = PdfSession.pdf_bytes
+    PdfSession.pdf_bytes = lambda self, *a: (writes.append(1), build(self, *a))[1]
+    with PdfSession(data) as upload:
+        sliced = App._slice_pdf(upload, "1-3")
+        assert App._document_size(sliced, upload) == len(data)
+        assert not writes, "measuring the size wrote the slice"
+        part = build(sliced)
+        assert App._document_size(sliced, upload) == len(part) < len(data)
+        assert App._document_size(upload, upload) == len(data)
+    assert App._document_size(b"a,b\n1,2\n", b"a,b\n1,2\n") == 8
+    print("Document size: reported from the upload or the built slice, no PDF written to measure it")
+
+
+if __name__ == "__main__":
+    main()
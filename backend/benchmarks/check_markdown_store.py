@@ -0,0 +1,68 @@
+"""
+Check: the raw OCR markdown store is a size-capped LRU.
+
+Saves --deals deals' markdown into a store capped at a few deals' worth
+and asserts that
+
+    - the store never grows past OCR_MARKDOWN_MAX_MB (here, the test cap)
+    - the least recently read deals are the ones evicted, and load_markdown
+      then returns None (GET /ocr/deals/{id}/markdown answers 404)
+    - surviving deals round-trip and keep their ETag
+    - a fresh store over the same directory picks up the survivors
+
+    cd backend && python benchmarks/check_markdown_store.py [--deals 20]
+"""
+import sys
+import gzip
+import uuid
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import response_slimming  # noqa: E402
+from ocr_cache import PageCache  # noqa: E402
+from response_slimming import load_markdown, save_markdown  # noqa: E402
+
+
+def om_markdown(rng: random.Random) -> str:
+    rows = [f"| Unit {i} | {rng.randint(700, 1900)} | ${rng.randint(900, 2400):,} |" for i in range(400)]
+    return "# Offering Memorandum\n\n| Unit | SF | Rent |\n|---|---|---|\n" + "\n".join(rows)
+
+
+def main(deals: int) -> None:
+    rng = random.Random(3)
+    texts = {str(uuid.uuid4()): om_markdown(rng) for _ in range(deals)}
+    sizes = [len(gzip.compress(t.encode("utf-8"), mtime=0)) for t in texts.values()]
+    cap = max(sizes) * 4
+    with tempfile.TemporaryDirectory() as tmp:
+        store = response_slimming.MARKDOWN_STORE = PageCache(Path(tmp), cap, suffix=".md.gz")
+        ids = list(texts)
+        keep = ids[0]
+        for deal_id in ids:
+            save_markdown(deal_id, texts[deal_id])
+            assert load_markdown(keep) is not None, "recently read deal was evicted"
+            assert store.stats()["bytes"] <= cap, "store grew past its cap"
+        on_disk = sum(p.stat().st_size for p in Path(tmp).glob("*/*.md.gz"))
+        assert on_disk == store.stats()["bytes"] <= cap, "files left behind after eviction"
+
+        alive = [d for d in ids if load_markdown(d) is not None]
+        assert keep in alive and ids[-1] in alive and len(alive) < deals
+        assert all(load_markdown(d) is None for d in ids[1:deals - len(alive) + 1]), "evicted out of LRU order"
+        body, etag = load_markdown(keep)
+        assert gzip.decompress(body).decode("utf-8") == texts[keep]
+        assert load_markdown(keep)[1] == etag
+
+        response_slimming.MARKDOWN_STORE = PageCache(Path(tmp), cap, suffix=".md.gz")
+        assert [d for d in ids if load_markdown(d) is not None] == alive, "store lost entries on reload"
+    print(f"Markdown store: {deals} deals into a {cap / 1024:.0f} KB cap -> {len(alive)} kept, "
+          f"{deals - len(alive)} evicted oldest-read first")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--deals", type=int, default=20)
+    args = ap.parse_args()
+    main(args.deals)
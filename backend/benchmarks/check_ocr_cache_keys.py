@@ -0,0 +1,81 @@
+"""
+Check: OCR cache keys tell apart pages whose content lives in form XObjects.
+
+show_pdf_page (and most stamping tools) leave every page with the same
+content stream, `q /fzFrm0 Do Q`, and put the real drawing in a form
+XObject. Builds such pages and asserts that
+
+    - pages drawing different text get different keys (the old
+      content-stream + image key gave them the same one)
+    - the same page gets the same key in a one-page slice, in a slice
+      written by pypdf (different object numbers and key order), and in
+      another document that embeds the same source page
+    - pages differing only in a font file get different keys
+
+    cd backend && python benchmarks/check_ocr_cache_keys.py
+"""
+import io
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fitz  # noqa: E402
+
+from ocr_cache import page_keys  # noqa: E402
+
+MODEL = "mistral-ocr-latest"
+PDF = "application/pdf"
+
+
+def source_pages(texts, fontname="helv"):
+    src = fitz.open()
+    for t in texts:
+        src.new_page().insert_text((50, 72), t, fontname=fontname, fontsize=11)
+    return src
+
+
+def wrapped(src, order):
+    """A PDF whose pages only draw a form XObject made from `src` pages."""
+    doc = fitz.open()
+    for i in order:
+        page = doc.new_page()
+        page.show_pdf_page(page.rect, src, i)
+    return doc.tobytes(garbage=3, deflate=True)
+
+
+def pypdf_slice(data: bytes, idxs) -> bytes:
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(io.BytesIO(data))
+    writer = PdfWriter()
+    for i in idxs:
+        writer.add_page(reader.pages[i])
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def main() -> None:
+    src = source_pages(["Net Operating Income 412,000", "Net Operating Income 981,500", "Net Operating Income 412,000"])
+    data = wrapped(src, [0, 1, 2])
+    with fitz.open("pdf", data) as doc:
+        assert len({doc[i].read_contents() for i in range(3)}) == 1, "fixture pages should share one content stream"
+    keys = page_keys(data, PDF, MODEL)
+    assert keys[0] != keys[1], "different XObject text, same key"
+    assert keys[0] == keys[2], "same XObject text, different key"
+
+    with fitz.open("pdf", data) as doc:
+        part = fitz.open()
+        part.insert_pdf(doc, from_page=1, to_page=1)
+        assert page_keys(part.tobytes(), PDF, MODEL) == [keys[1]], "key changed in a PyMuPDF slice"
+    assert page_keys(pypdf_slice(data, [1, 0]), PDF, MODEL) == [keys[1], keys[0]], "key changed in a pypdf slice"
+    assert page_keys(wrapped(src, [1]), PDF, MODEL) == [keys[1]], "key changed in another document"
+
+    other_font = wrapped(source_pages(["Net Operating Income 412,000"], fontname="cour"), [0])
+    assert page_keys(other_font, PDF, MODEL) != [keys[0]], "font change, same key"
+    print("OCR cache keys: XObject pages distinguished, stable across slices and documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Check: the OCR job store prunes finished jobs while running and writes
+state only on status and stage changes.
+
+Runs a JobManager on a temp directory with a stand-in pipeline runner and
+asserts that
+
+    - prune() deletes finished jobs older than OCR_JOB_TTL_HOURS (state,
+      result and upload files) and keeps newer ones
+    - a running manager prunes on its own every OCR_JOB_PRUNE_SECONDS,
+      with no submit or restart
+    - a job reporting --partials partial results over five stages writes
+      its state file a handful of times, not once per progress call, while
+      an SSE subscriber still sees every event live
+    - the state on disk ends up complete and survives a restart
+    - a result that can't be written (here, a circular dict) fails the job
+      and ends its event stream instead of leaving it 'running'
+
+    cd backend && python benchmarks/check_ocr_jobs.py [--partials 500]
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import ocr_jobs  # noqa: E402
+from ocr_jobs import JobManager  # noqa: E402
+
+STAGES = ["ocr", "parse", "enrich", "underwrite", "metrics"]
+
+
+def make_runner(partials: int):
+    async def runner(data, mime, file_name, params, progress):
+        for i in range(partials):
+            progress(STAGES[i * len(STAGES) // partials], {"n": i, "blob": "x" * 200})
+            await asyncio.sleep(0)
+        return {"deal_id": params["deal"]}
+    return runner
+
+
+async def finish(jobs: JobManager, job_id: str) -> dict:
+    while (jobs.get(job_id) or {}).get("status") not in ocr_jobs.FINISHED:
+        await asyncio.sleep(0.01)
+    while jobs._writes:
+        await asyncio.sleep(0.01)
+    return jobs.get(job_id)
+
+
+def age(jobs: JobManager, job_id: str) -> None:
+    jobs._jobs[job_id]["finished_at"] = time.time() - ocr_jobs.OCR_JOB_TTL_HOURS * 3600 - 60
+
+
+async def check_prune(root: Path) -> None:
+    jobs = JobManager(root, workers=1)
+    jobs.set_runner(make_runner(5))
+    await jobs.start()
+    old = (await jobs.submit(b"pdf", "application/pdf", "old.pdf", {"deal": "a"}))["id"]
+    new = (await jobs.submit(b"pdf", "application/pdf", "new.pdf", {"deal": "b"}))["id"]
+    await finish(jobs, old)
+    await finish(jobs, new)
+    age(jobs, old)
+    assert await jobs.prune() == 1
+    assert jobs.get(old) is None and jobs.result(old) is None, "expired job still readable"
+    assert not list(root.glob(f"{old}*")), "expired job files left on disk"
+    assert jobs.get(new)["status"] == "succeeded" and jobs.result(new) == {"deal_id": "b"}
+
+    await jobs.stop()
+
+    # A running manager prunes without a submit or a restart
+    ocr_jobs.OCR_JOB_PRUNE_SECONDS, saved = 0.05, ocr_jobs.OCR_JOB_PRUNE_SECONDS
+    try:
+        jobs = JobManager(root / "idle", workers=1)
+        jobs.set_runner(make_runner(5))
+        await jobs.start()
+        job_id = (await jobs.submit(b"pdf", "application/pdf", "idle.pdf", {"deal": "d"}))["id"]
+        await finish(jobs, job_id)
+        age(jobs, job_id)
+        await asyncio.sleep(0.3)
+        assert jobs.get(job_id) is None and not list((root / "idle").glob(f"{job_id}*")), "expired job not pruned while running"
+        await jobs.stop()
+    finally:
+        ocr_jobs.OCR_JOB_PRUNE_SECONDS = saved
+    print("OCR jobs: expired jobs pruned on demand and periodically")
+
+
+async def check_writes(root: Path, partials: int) -> None:
+    jobs = JobManager(root, workers=1)
+    jobs.set_runner(make_runner(partials))
+    writes = []
+    write_text = jobs._write_text
+    jobs._write_text = lambda path, text: (writes.append(path.name), write_text(path, text))
+    await jobs.start()
+    job_id = (await jobs.submit(b"pdf", "application/pdf", "om.pdf", {"deal": "c"}))["id"]
+
+    seen = []
+
+    async def follow():
+        async for ev in jobs.events(job_id):
+            if ev is not None:
+                seen.append(ev["event"])
+
+    t0 = time.perf_counter()
+    await asyncio.gather(follow(), finish(jobs, job_id))
+    elapsed = time.perf_counter() - t0
+    await jobs.stop()
+    state_writes = writes.count(f"{job_id}.json")
+    assert seen.count("partial") == partials and seen[-1] == "succeeded", "subscriber missed events"
+    assert state_writes <= 2 * len(STAGES) + 3, f"{state_writes} state writes for {partials} progress calls"
+
+    with open(root / f"{job_id}.json", encoding="utf-8") as f:
+        on_disk = json.load(f)
+    assert on_disk["status"] == "succeeded" and len(on_disk["events"]) == len(seen), "final state incomplete"
+
+    restarted = JobManager(root, workers=1)
+    await restarted.start()
+    replay = [ev["event"] async for ev in restarted.events(job_id) if ev is not None]
+    await restarted.stop()
+    assert replay == seen, "events lost across a restart"
+    print(f"OCR jobs: {partials} partials over {len(STAGES)} stages -> {state_writes} state writes "
+          f"({elapsed * 1000:.0f} ms), every event streamed and kept")
+
+
+async def check_result_write(root: Path) -> None:
+    async def runner(data, mime, file_name, params, progress):
+        progress("ocr")
+        result = {"deal_id": "e"}
+        result["self"] = result
+        return result
+
+    jobs = JobManager(root, workers=1)
+    jobs.set_runner(runner)
+    await jobs.start()
+    job_id = (await jobs.submit(b"pdf", "application/pdf", "om.pdf", {}))["id"]
+    seen = []
+
+    async def follow():
+        async for ev in jobs.events(job_id):
+            if ev is not None:
+                seen.append(ev["event"])
+
+    await asyncio.wait_for(asyncio.gather(follow(), finish(jobs, job_id)), timeout=10)
+    await jobs.stop()
+    job = jobs.get(job_id)
+    assert job["status"] == "failed" and "Could not store the result" in job["error"], job
+    assert seen[-1] == "failed", "event stream did not end"
+    assert jobs.result(job_id) is None and not list(root.glob("*.tmp")), "partial result left on disk"
+    print("OCR jobs: a result that can't be stored fails the job and ends its stream")
+
+
+async def main(partials: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        await check_prune(Path(tmp) / "prune")
+        await check_writes(Path(tmp) / "writes", partials)
+        await check_result_write(Path(tmp) / "result")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--partials", type=int, default=500)
+    args = ap.parse_args()
+    asyncio.run(main(args.partials))
@@ -0,0 +1,93 @@
+"""
+Check: sensitivity inputs keep a deal's own assumptions and fall back to
+the client's pro forma defaults.
+
+Asserts that extract_sensitivity_inputs
+
+    - keeps explicit zeros (0% income / expense growth, all-cash LTV,
+      no selling costs) instead of swapping in defaults
+    - reads growth and selling-cost fields as percentages (0.5 is 0.5%),
+      while LTVs and note rates still accept 0.75 / 0.065
+    - defaults income growth to 0%, expense growth to 3% and the exit cap
+      to 7.25% (also for an exit cap <= 0 or > 20), like
+      client/src/utils/realEstateCalculations.js
+    - puts the deal's own IRR (computed the client's way, in plain
+      Python) in the grid's base cell
+
+    cd backend && python benchmarks/check_sensitivity_inputs.py
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import numpy_financial as npf
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_amortization import scalar_pmti, scalar_remaining_balance  # noqa: E402
+from v2_underwriter.sensitivity import compute_sensitivity_grid, extract_sensitivity_inputs  # noqa: E402
+
+BASE = {
+    "pricing_financing": {"price": 4000000},
+    "pnl": {"effective_gross_income": 700000, "operating_expenses": 300000, "noi": 400000},
+    "financing": {"ltv": 70, "interest_rate": 6.0, "amortization_years": 30},
+    "underwriting": {"holding_period": 5},
+}
+
+
+def deal(**uw):
+    d = {k: dict(v) for k, v in BASE.items()}
+    d["underwriting"].update(uw)
+    return d
+
+
+def client_irr(inputs):
+    """Levered IRR the client's way: EGI and expenses grown separately, sale on next year's NOI."""
+    price, hold = inputs["price"], inputs["hold_years"]
+    loan = price * inputs["ltv"] / 100
+    egi, opex = inputs["egi"], inputs["opex"]
+    debt = scalar_pmti(loan, inputs["interest_rate"], 360) * 12 if loan else 0.0
+    flows = [-(price - loan)]
+    for year in range(1, hold + 2):
+        if year > 1:
+            egi *= 1 + inputs["income_growth"] / 100
+            opex *= 1 + inputs["expense_growth"] / 100
+        if year <= hold:
+            flows.append(egi - opex - debt)
+    balance = scalar_remaining_balance(loan, inputs["interest_rate"], 360, hold * 12) if loan else 0.0
+    flows[-1] += (egi - opex) / (inputs["exit_cap_rate"] / 100) * (1 - inputs["selling_costs_percent"] / 100) - balance
+    return npf.irr(flows) * 100
+
+
+def main() -> None:
+    defaults = extract_sensitivity_inputs(deal())
+    assert (defaults["income_growth"], defaults["expense_growth"], defaults["exit_cap_rate"]) == (0.0, 3.0, 7.25)
+
+    zeros = extract_sensitivity_inputs(deal(income_growth_rate=0, expense_growth_rate=0, selling_costs_percent=0))
+    assert (zeros["income_growth"], zeros["expense_growth"], zeros["selling_costs_percent"]) == (0.0, 0.0, 0.0)
+    cash = deal()
+    cash["financing"]["ltv"] = 0
+    assert extract_sensitivity_inputs(cash)["ltv"] == 0.0, "all-cash deal modelled with debt"
+
+    small = extract_sensitivity_inputs(deal(income_growth_rate=0.5, expense_growth_rate=0.25,
+                                            selling_costs_percent=0.75, exit_cap_rate=6.5))
+    assert (small["income_growth"], small["expense_growth"], small["selling_costs_percent"]) == (0.5, 0.25, 0.75)
+    assert small["exit_cap_rate"] == 6.5
+    fractions = deal()
+    fractions["financing"].update(ltv=0.75, interest_rate=0.065)
+    f = extract_sensitivity_inputs(fractions)
+    assert (f["ltv"], round(f["interest_rate"], 9)) == (75.0, 6.5)
+    for bad in (0, -1, 35):
+        assert extract_sensitivity_inputs(deal(exit_cap_rate=bad))["exit_cap_rate"] == 7.25
+
+    for case in (deal(), deal(income_growth_rate=2, expense_growth_rate=0, selling_costs_percent=0.5), cash):
+        inputs = extract_sensitivity_inputs(case)
+        grid = compute_sensitivity_grid(inputs, np.array([inputs["price"]]), np.array([inputs["interest_rate"]]),
+                                        np.array([inputs["exit_cap_rate"]]))
+        base, expected = grid["irr"][0, 0, 0], client_irr(inputs)
+        assert abs(base - expected) < 1e-8, f"base cell IRR {base:.4f}% vs deal IRR {expected:.4f}%"
+    print("Sensitivity inputs: explicit zeros kept, percents read as percents, base cell = deal IRR")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Load test: concurrent /ocr/file throughput with a slow (simulated) Mistral.
+
+The shared "mistral" HTTP client is swapped for one on an httpx
+MockTransport whose handler sleeps for a fixed latency before answering,
+the way the real OCR endpoint blocks the calling thread. Requests are sent
+in-process through httpx's ASGI transport at increasing concurrency; with
+provider calls on their own thread pool, throughput should grow with
+concurrency (up to PROVIDER_POOL_SIZE_MISTRAL) instead of staying flat at
+one request per latency period, and /health should answer immediately
+while OCR calls are in flight.
+
+    cd backend && python benchmarks/loadtest_provider_pool.py [--latency 0.5]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("OPENAI_API_KEY", "loadtest")
+os.environ.setdefault("ANTHROPIC_API_KEY", "loadtest")
+os.environ["OCR_CACHE_DIR"] = tempfile.mkdtemp(prefix="ocr_cache_loadtest_")
+
+import fitz  # noqa: E402
+import httpx  # noqa: E402
+
+import App  # noqa: E402
+import provider_clients  # noqa: E402
+
+
+def _slow_mistral(latency: float) -> httpx.Client:
+    """A "mistral" client whose OCR endpoint answers after `latency` seconds."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        request.read()  # drain the streamed data-URL body like the real server
+        time.sleep(latency)  # blocking, like the real network round trip
+        return httpx.Response(200, json={"model": App.OCR_MODEL, "pages": [{"index": 0, "markdown": "stub"}]})
+
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
+
+def _make_pdf(tag: str) -> bytes:
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), f"Load test document {tag}")
+    return doc.tobytes()
+
+
+async def _run_level(client: httpx.AsyncClient, concurrency: int, rounds: int, counter: list) -> float:
+    async def one():
+        counter[0] += 1
+        pdf = _make_pdf(str(counter[0]))  # unique page -> always an OCR cache miss
+        r = await client.post("/ocr/file", files={"file": ("om.pdf", pdf, "application/pdf")})
+        r.raise_for_status()
+
+    total = concurrency * rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed
+
+
+async def main(latency: float, rounds: int, levels: list):
+    App.MISTRAL_API_KEY = App.MISTRAL_API_KEY or "loadtest"
+    provider_clients._SYNC["mistral"] = _slow_mistral(latency)
+    transport = httpx.ASGITransport(app=App.app)
+    counter = [0]
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        print(f"Simulated OCR latency: {latency:.2f}s  (serial ceiling: {1 / latency:.1f} req/s)")
+        print(f"{'concurrency':>11}  {'req/s':>8}  {'speedup':>8}")
+        base = None
+        for c in levels:
+            rps = await _run_level(client, c, rounds, counter)
+            base = base or rps
+            print(f"{c:>11}  {rps:>8.2f}  {rps / base:>7.2f}x")
+
+        # /health must stay responsive while OCR calls are running.
+        async def busy():
+            counter[0] += 1
+            await client.post("/ocr/file", files={"file": ("om.pdf", _make_pdf(str(counter[0])), "application/pdf")})
+
+        tasks = [asyncio.create_task(busy()) for _ in range(levels[-1])]
+        await asyncio.sleep(latency / 4)
+        t0 = time.perf_counter()
+        await client.get("/health")
+        health_ms = (time.perf_counter() - t0) * 1000
+        await asyncio.gather(*tasks)
+        print(f"/health latency under load: {health_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--latency", type=float, default=0.5, help="simulated OCR latency in seconds")
+    ap.add_argument("--rounds", type=int, default=2, help="batches per concurrency level")
+    ap.add_argument("--levels", type=str, default="1,2,4,8", help="comma-separated concurrency levels")
+    args = ap.parse_args()
+    asyncio.run(main(args.latency, args.rounds, [int(x) for x in args.levels.split(",")]))
@@ -0,0 +1,360 @@
+"""
+Deal Images Module - Background, in-memory image extraction and upload for OMs
+
+Images are pulled straight out of the upload's PdfSession, the PyMuPDF
+handle the OCR stages already parsed (no temp PDF, no per-image temp files). Each image xref is checked against its declared
+width/height before it is decoded, so logos and icons are skipped without
+extracting them, and images repeated on several pages are taken once.
+
+Storage is content-addressed: each distinct image is stored once under its
+full SHA-256 (objects/ab/<sha256>.<ext>) with WebP thumbnails beside it
+(thumbs/ab/<sha256>_<size>.webp), so a broker logo or stock photo shared by
+hundreds of OMs is uploaded and stored once. A deal only keeps references
+(hash, page, urls), recorded locally and as deals/<deal_id>/images.json in
+the bucket. Thumbnails are encoded on the "thumbnails" process pool;
+uploads run concurrently, capped by PROVIDER_CONCURRENCY_SUPABASE.
+
+All of this happens after the underwriting response is sent: the response
+carries `images_status: "pending"` and the finished list is recorded under
+data/deal_images/<deal_id>.json, served by GET /ocr/deals/{deal_id}/images.
+Status records live as long as OCR jobs do (OCR_JOB_TTL_HOURS): older ones
+are pruned as new deals finish, after which that endpoint answers 404 (the
+bucket manifest stays).
+
+Config:
+    IMAGE_MIN_WIDTH / IMAGE_MIN_HEIGHT   skip smaller xrefs before decoding (default 150)
+    IMAGE_MIN_BYTES                      skip smaller encoded images (default 10000)
+    IMAGE_THUMB_SIZES                    thumbnail bounding boxes in px (default "160,480,960")
+    IMAGE_THUMB_QUALITY                  WebP quality (default 80)
+"""
+import io
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from ocr_jobs import OCR_JOB_TTL_HOURS
+from pdf_session import PdfSession, PdfSource, as_session
+from provider_pool import concurrency_limit, get_pool, get_process_pool, run_blocking
+
+log = logging.getLogger("deal_images")
+
+DEAL_IMAGES_DIR = Path(os.getenv("DEAL_IMAGES_DIR") or Path(__file__).resolve().parent / "data" / "deal_images")
+IMAGE_MIN_WIDTH = int(os.getenv("IMAGE_MIN_WIDTH", "150"))
+IMAGE_MIN_HEIGHT = int(os.getenv("IMAGE_MIN_HEIGHT", "150"))
+IMAGE_MIN_BYTES = int(os.getenv("IMAGE_MIN_BYTES", "10000"))
+IMAGE_THUMB_SIZES = sorted({int(x) for x in os.getenv("IMAGE_THUMB_SIZES", "160,480,960").split(",") if x.strip()})
+IMAGE_THUMB_QUALITY = int(os.getenv("IMAGE_THUMB_QUALITY", "80"))
+
+PENDING, DONE, FAILED = "pending", "done", "failed"
+
+# Status records older than the OCR job TTL are swept at most this often.
+_PRUNE_SECONDS = 600.0
+_prune_lock = threading.Lock()
+_pruned_at = 0.0
+
+# Keep references to running background tasks so they aren't garbage collected.
+_TASKS: Set[asyncio.Task] = set()
+
+# Hashes known to be in the store already, so repeats skip the existence check.
+_KNOWN_MAX = 20000
+_KNOWN: "OrderedDict[str, bool]" = OrderedDict()
+
+
+def extract_images(pdf: PdfSource) -> List[Dict[str, Any]]:
+    """Extract candidate property images from PDF bytes or a PdfSession, in page order.
+
+    Returns dicts with the encoded image in "bytes" plus filename,
+    page_number, image_index, format, size_bytes, hash (md5 prefix),
+    sha256, width, height.
+    """
+    images: List[Dict[str, Any]] = []
+    seen: Set[int] = set()
+    with as_session(pdf) as session, session.document() as doc:
+        for page_num in range(session.page_count):
+            for img_index, img in enumerate(doc.get_page_images(session.doc_index(page_num), full=True)):
+                xref, width, height = img[0], img[2], img[3]
+                if xref in seen:
+                    continue
+                seen.add(xref)
+                # Declared dimensions come from the xref dictionary: no decode needed.
+                if width < IMAGE_MIN_WIDTH or height < IMAGE_MIN_HEIGHT:
+                    continue
+                try:
+                    base_image = doc.extract_image(xref)
+                except Exception as e:
+                    log.warning("Could not extract image xref %s on page %s: %s", xref, page_num + 1, e)
+                    continue
+                if not base_image:
+                    continue
+                image_bytes = base_image["image"]
+                if len(image_bytes) < IMAGE_MIN_BYTES:
+                    continue
+                image_ext = base_image["ext"]
+                image_hash = hashlib.md5(image_bytes).hexdigest()[:8]
+                images.append({
+                    "filename": f"page_{page_num + 1}_img_{img_index + 1}_{image_hash}.{image_ext}",
+                    "page_number": page_num + 1,
+                    "image_index": img_index + 1,
+                    "format": image_ext,
+                    "size_bytes": len(image_bytes),
+                    "hash": image_hash,
+                    "sha256": hashlib.sha256(image_bytes).hexdigest(),
+                    "width": width,
+                    "height": height,
+                    "bytes": image_bytes,
+                })
+    return images
+
+
+def thumb_sizes_for(width: int, height: int, sizes: List[int] = IMAGE_THUMB_SIZES) -> List[int]:
+    """Configured sizes smaller than the image, always keeping the smallest."""
+    longest = max(width, height)
+    return [size for n, size in enumerate(sorted(sizes)) if n == 0 or size < longest]
+
+
+def make_thumbnails(image_bytes: bytes, sizes: List[int], quality: int = IMAGE_THUMB_QUALITY) -> Dict[int, bytes]:
+    """WebP thumbnails fitting each size x size box (never upscaled); runs in a worker process."""
+    from PIL import Image
+
+    out: Dict[int, bytes] = {}
+    with Image.open(io.BytesIO(image_bytes)) as im:
+        im.load()
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "transparency" in im.info or im.mode in ("LA", "PA") else "RGB")
+        for size in thumb_sizes_for(im.size[0], im.size[1], sizes):
+            thumb = im.copy()
+            thumb.thumbnail((size, size), Image.LANCZOS)
+            buf = io.BytesIO()
+            thumb.save(buf, "WEBP", quality=quality, method=4)
+            out[size] = buf.getvalue()
+    return out
+
+
+def _remember(content_hash: str) -> None:
+    _KNOWN[content_hash] = True
+    _KNOWN.move_to_end(content_hash)
+    while len(_KNOWN) > _KNOWN_MAX:
+        _KNOWN.popitem(last=False)
+
+
+def _store_image(supabase, img: Dict[str, Any], sem, thumbs_future) -> Dict[str, Any]:
+    """Ensure one image and its thumbnails are in the store; return its thumbnail sizes."""
+    from image_storage import object_exists, object_path, thumb_path, upload_object
+
+    content_hash = img["sha256"]
+    original = object_path(content_hash, img["format"])
+    if content_hash not in _KNOWN:
+        with sem:
+            exists = object_exists(supabase, original)
+        if not exists:
+            try:
+                if thumbs_future is not None:
+                    thumbs = thumbs_future.result()
+                else:
+                    thumbs = make_thumbnails(img["bytes"], IMAGE_THUMB_SIZES)
+            except Exception as e:
+                # Formats Pillow can't decode (JPX, JBIG2, ...) are stored without thumbnails.
+                log.warning("No thumbnails for %s: %s", img["filename"], e)
+                thumbs = {}
+            # Thumbnails first: an original in the store implies its thumbnails are too.
+            for size, data in thumbs.items():
+                with sem:
+                    upload_object(supabase, thumb_path(content_hash, size), data, "image/webp")
+            with sem:
+                upload_object(supabase, original, img["bytes"], f"image/{img['format']}")
+            _remember(content_hash)
+            return {"sizes": sorted(thumbs), "deduped": False}
+        _remember(content_hash)
+    if thumbs_future is not None:
+        thumbs_future.cancel()
+    return {"sizes": None, "deduped": True}
+
+
+def upload_images(deal_id: str, images: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Store images by content hash and return this deal's references, in page order.
+
+    Thumbnail encoding starts for every image up front on the process pool
+    (cancelled for images the store already has). Failed images are logged
+    and skipped.
+    """
+    if not images:
+        return []
+    from image_storage import get_supabase_client, object_path, public_url, thumb_path
+
+    supabase = get_supabase_client()
+    sem = concurrency_limit("supabase")
+    pool = get_pool("supabase-uploads")
+    procs = get_process_pool("thumbnails")
+
+    unique: Dict[str, Dict[str, Any]] = {}
+    for img in images:
+        unique.setdefault(img["sha256"], img)
+    thumb_futures = {
+        h: procs.submit(make_thumbnails, img["bytes"], IMAGE_THUMB_SIZES)
+        for h, img in unique.items() if h not in _KNOWN
+    }
+    futures = {
+        pool.submit(_store_image, supabase, img, sem, thumb_futures.get(h)): h
+        for h, img in unique.items()
+    }
+    stored: Dict[str, Dict[str, Any]] = {}
+    for fut in as_completed(futures):
+        h = futures[fut]
+        try:
+            stored[h] = fut.result()
+        except Exception as e:
+            log.warning("Error storing image %s: %s", unique[h]["filename"], e)
+
+    refs: List[Dict[str, Any]] = []
+    for img in images:
+        entry = stored.get(img["sha256"])
+        if entry is None:
+            continue
+        h = img["sha256"]
+        # Images already in the store were given the same configured sizes.
+        sizes = entry["sizes"] if entry["sizes"] is not None else thumb_sizes_for(img["width"], img["height"])
+        thumbnails = {str(size): public_url(supabase, thumb_path(h, size)) for size in sizes}
+        storage_path = object_path(h, img["format"])
+        url = public_url(supabase, storage_path)
+        refs.append({
+            "filename": img["filename"],
+            "url": url,
+            "thumbnails": thumbnails,
+            "thumb_url": thumbnails[str(_default_thumb_size(sizes))] if sizes else url,
+            "page_number": img["page_number"],
+            "storage_path": storage_path,
+            "content_hash": h,
+            "size_bytes": img["size_bytes"],
+            "format": img["format"],
+            "width": img["width"],
+            "height": img["height"],
+            "deduped": entry["deduped"],
+        })
+    return refs
+
+
+def _default_thumb_size(sizes: List[int]) -> int:
+    """Gallery default: the middle configured size available for this image."""
+    return sorted(sizes)[min(1, len(sizes) - 1)]
+
+
+def _save_manifest(deal_id: str, refs: List[Dict[str, Any]]) -> None:
+    """Persist the deal's image references alongside the store (best effort)."""
+    try:
+        from image_storage import get_supabase_client, IMAGE_BUCKET
+
+        supabase = get_supabase_client()
+        supabase.storage.from_(IMAGE_BUCKET).upload(
+            path=f"deals/{deal_id}/images.json",
+            file=json.dumps({"deal_id": deal_id, "images": refs}).encode("utf-8"),
+            file_options={"content-type": "application/json", "upsert": "true"}
+        )
+    except Exception as e:
+        log.warning("Could not save image manifest for deal %s: %s", deal_id, e)
+
+
+# ---------- status records ----------
+def _status_path(deal_id: str) -> Path:
+    return DEAL_IMAGES_DIR / f"{deal_id}.json"
+
+
+def _write_status(deal_id: str, record: Dict[str, Any]) -> None:
+    DEAL_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+    record["updated_at"] = time.time()
+    path = _status_path(deal_id)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def prune_statuses(now: Optional[float] = None) -> int:
+    """Delete status records not updated for OCR_JOB_TTL_HOURS; returns how many went."""
+    global _pruned_at
+    now = time.time() if now is None else now
+    with _prune_lock:
+        _pruned_at = now
+        cutoff = now - OCR_JOB_TTL_HOURS * 3600
+        removed = 0
+        for path in DEAL_IMAGES_DIR.glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+    if removed:
+        log.info("Pruned %d expired image status record(s)", removed)
+    return removed
+
+
+def _maybe_prune() -> None:
+    if time.time() - _pruned_at >= _PRUNE_SECONDS:
+        prune_statuses()
+
+
+def get_status(deal_id: str) -> Optional[Dict[str, Any]]:
+    """{"deal_id", "status", "images", "image_count", "error", "updated_at"} or None."""
+    path = _status_path(deal_id)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        log.warning("Unreadable image status for %s: %s", deal_id, e)
+        return None
+
+
+def mark_pending(deal_id: str) -> None:
+    _write_status(deal_id, {"deal_id": deal_id, "status": PENDING, "images": [], "image_count": 0, "error": None})
+
+
+def process_deal_images(pdf: PdfSource, deal_id: str) -> List[Dict[str, Any]]:
+    """Extract + upload, recording the outcome. Never raises; closes `pdf` if it is a session."""
+    started = time.perf_counter()
+    _maybe_prune()
+    try:
+        try:
+            extracted = extract_images(pdf)
+        finally:
+            if isinstance(pdf, PdfSession):
+                pdf.close()
+        uploaded = upload_images(deal_id, extracted)
+        if uploaded:
+            _save_manifest(deal_id, uploaded)
+    except Exception as e:
+        log.warning("Image extraction/upload failed for deal %s: %s", deal_id, e)
+        _write_status(deal_id, {"deal_id": deal_id, "status": FAILED, "images": [], "image_count": 0, "error": str(e)[:300]})
+        return []
+    _write_status(deal_id, {
+        "deal_id": deal_id,
+        "status": DONE,
+        "images": uploaded,
+        "image_count": len(uploaded),
+        "extracted_count": len(extracted),
+        "deduped_count": sum(1 for ref in uploaded if ref.get("deduped")),
+        "seconds": round(time.perf_counter() - started, 3),
+        "error": None,
+    })
+    log.info("Extracted %d and stored %d images for deal %s", len(extracted), len(uploaded), deal_id)
+    return uploaded
+
+
+async def run_deal_images(pdf: PdfSource, deal_id: str) -> List[Dict[str, Any]]:
+    return await run_blocking("supabase", process_deal_images, pdf, deal_id)
+
+
+def start_background(pdf: PdfSource, deal_id: str) -> None:
+    """Fire-and-forget image processing on the running event loop (takes ownership of a session)."""
+    task = asyncio.get_running_loop().create_task(run_deal_images(pdf, deal_id))
+    _TASKS.add(task)
+    task.add_done_callback(_TASKS.discard)
@@ -0,0 +1,272 @@
+"""
+Deal Metrics Module - Vectorized batch version of the deal metrics
+
+`compute_metrics(columns)` produces, for thousands of deals in one NumPy
+pass, exactly the numbers `_calculate_deal_metrics` computes for a single
+deal (cap rate, cash-on-cash, DSCR, GRM, break-even, debt yield, 5-year
+IRR, ... and the 0-100 score). The scalar path's branch rules, operation
+order and Python `round()` semantics are reproduced element-wise (and both
+paths solve the 5-year IRR with `returns.irr`, row by row), so a deal
+screened in a batch gets bit-for-bit the figures it gets from
+/ocr/underwrite. benchmarks/bench_deal_metrics.py checks this against the
+scalar function on randomized deals.
+
+Inputs are float columns (NaN = missing). `columns_from_deals` builds them
+from parsed deal dicts, and `fill_underwriting` applies the derivations
+`_compute_underwriting` makes before metrics are calculated (EGI from
+GPR/vacancy/other income, NOI from EGI - opex, expense ratio, cap rate).
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+import amortization
+import returns
+
+# column -> (section, key) in a parsed deal
+INPUT_FIELDS = {
+    "price": ("pricing_financing", "price"),
+    "units": ("property", "units"),
+    "rba_sqft": ("property", "rba_sqft"),
+    "noi": ("pnl", "noi"),
+    "egi": ("pnl", "effective_gross_income"),
+    "gpr": ("pnl", "gross_potential_rent"),
+    "vacancy_amount": ("pnl", "vacancy_amount"),
+    "other_income": ("pnl", "other_income"),
+    "opex": ("pnl", "operating_expenses"),
+    "cap_rate": ("pnl", "cap_rate"),
+    "expense_ratio": ("pnl", "expense_ratio"),
+    "debt_service": ("pricing_financing", "annual_debt_service"),
+    "down_payment": ("pricing_financing", "down_payment"),
+    "loan_amount": ("pricing_financing", "loan_amount"),
+}
+
+# Optional loan-term columns (pricing_financing.loan_terms, see amortization.LoanTerms);
+# with them the year-5 sale repays the scheduled balance instead of 85% of the loan.
+LOAN_TERM_FIELDS = {
+    "loan_principal": "principal",
+    "loan_rate_pct": "annual_rate_pct",
+    "amort_months": "amort_months",
+    "io_months": "io_months",
+    "balloon_month": "balloon_month",
+}
+
+METRIC_NAMES = (
+    "annual_cash_flow", "monthly_cash_flow", "cash_on_cash_return", "roi_year_1",
+    "cap_rate", "dscr", "grm", "price_per_unit", "price_per_sf", "expense_ratio",
+    "break_even_ratio", "ltv", "debt_yield", "one_percent_rule", "irr_5_year",
+    "payback_period_years", "rent_to_price_ratio", "operating_margin", "cash_flow_per_unit",
+)
+
+
+def _num(v: Any) -> float:
+    try:
+        return float(v) if v is not None else np.nan
+    except Exception:
+        return np.nan
+
+
+def columns_from_deals(deals: Iterable[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Float columns (NaN for missing) from parsed deal dicts.
+
+    Operating expenses fall back to the line-item subtotal of `expenses`
+    the same way `_compute_underwriting` does.
+    """
+    rows: Dict[str, List[float]] = {k: [] for k in (*INPUT_FIELDS, *LOAN_TERM_FIELDS)}
+    for d in deals:
+        d = d or {}
+        for col, (section, key) in INPUT_FIELDS.items():
+            rows[col].append(_num((d.get(section) or {}).get(key)))
+        terms = amortization.loan_terms_from((d.get("pricing_financing") or {}).get("loan_terms"))
+        for col, field in LOAN_TERM_FIELDS.items():
+            rows[col].append(float(getattr(terms, field)) if terms else np.nan)
+        exps = d.get("expenses") or {}
+        if np.isnan(rows["opex"][-1]) and exps:
+            subtotal = 0.0
+            for k, v in exps.items():
+                if k in {"total", "total_current"}:
+                    continue
+                val = _num(v)
+                if val and not np.isnan(val):
+                    subtotal += val
+            if subtotal > 0:
+                rows["opex"][-1] = round(subtotal, 2)
+    return {k: np.asarray(v, dtype=np.float64) for k, v in rows.items()}
+
+
+def as_columns(columns: Dict[str, Iterable[Any]]) -> Dict[str, np.ndarray]:
+    """Validate user-supplied columns: known names, equal lengths; missing columns are all-NaN."""
+    unknown = set(columns) - set(INPUT_FIELDS) - set(LOAN_TERM_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+    arrays = {k: np.array([_num(v) for v in vals], dtype=np.float64) for k, vals in columns.items()}
+    lengths = {len(a) for a in arrays.values()}
+    if len(lengths) > 1:
+        raise ValueError("All columns must have the same length")
+    n = lengths.pop() if lengths else 0
+    return {k: arrays.get(k, np.full(n, np.nan)) for k in (*INPUT_FIELDS, *LOAN_TERM_FIELDS)}
+
+
+def py_round(x: np.ndarray, ndigits: int) -> np.ndarray:
+    """Element-wise Python `round(x, ndigits)`.
+
+    np.round scales by 10**ndigits before rounding, which can land on the
+    other side of a .5 tie from Python's exact decimal rounding; those
+    near-tie elements (and ones whose scaling overflows) are redone with
+    Python's round.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    with np.errstate(all="ignore"):
+        scale = 10.0 ** ndigits
+        y = x * scale
+        out = np.rint(y) / scale
+        frac = np.abs(y - np.floor(y) - 0.5)
+        suspect = (frac <= np.maximum(1e-9, np.abs(y) * 1e-15)) | (np.isfinite(x) & ~np.isfinite(y))
+    if suspect.any():
+        idx = np.flatnonzero(suspect)
+        out[idx] = [round(v, ndigits) for v in x[idx].tolist()]
+    return out
+
+
+def _or0(x: np.ndarray) -> np.ndarray:
+    """`value or 0` for columns: missing (NaN) becomes 0."""
+    return np.where(np.isnan(x), 0.0, x)
+
+
+def fill_underwriting(cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Column-wise equivalent of the derived fields `_compute_underwriting` fills in."""
+    c = dict(cols)
+    with np.errstate(all="ignore"):
+        gpr, egi = c["gpr"], c["egi"]
+        vac = np.where(np.isnan(c["vacancy_amount"]), 0.0, np.abs(c["vacancy_amount"]))
+        other = np.where(np.isnan(c["other_income"]), 0.0, c["other_income"])
+        need = np.isnan(egi) & ~np.isnan(gpr)
+        egi = np.where(need, py_round(gpr - vac + other, 2), egi)
+
+        opex, noi, price = c["opex"], c["noi"], c["price"]
+        need = np.isnan(noi) & ~np.isnan(egi) & ~np.isnan(opex)
+        noi = np.where(need, py_round(egi - opex, 2), noi)
+
+        need = np.isnan(c["expense_ratio"]) & ~np.isnan(egi) & ~np.isnan(opex) & (egi != 0)
+        c["expense_ratio"] = np.where(need, py_round(opex / egi, 4), c["expense_ratio"])
+
+        need = np.isnan(c["cap_rate"]) & ~np.isnan(noi) & ~np.isnan(price) & (price != 0)
+        c["cap_rate"] = np.where(need, py_round(noi / price, 4), c["cap_rate"])
+    c["egi"], c["noi"] = egi, noi
+    return c
+
+
+def _scheduled_balance(cols: Dict[str, np.ndarray], fallback: np.ndarray, month: int) -> np.ndarray:
+    """Outstanding loan balance after `month` payments where loan terms are known, else `fallback`."""
+    principal = cols.get("loan_principal")
+    if principal is None:
+        return fallback
+    has = np.flatnonzero(~np.isnan(principal))
+    if has.size == 0:
+        return fallback
+    terms = [
+        amortization.loan_terms(*(cols[c][i] for c in LOAN_TERM_FIELDS))
+        for i in has
+    ]
+    out = fallback.copy()
+    out[has] = amortization.outstanding_at(terms, month)
+    return out
+
+
+def compute_metrics(cols: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """All `_calculate_deal_metrics` figures and the score, as arrays.
+
+    Returns {"metrics": {name: ndarray}, "score": ndarray}; values are
+    rounded exactly as the scalar function rounds them.
+    """
+    price = _or0(cols["price"])
+    units = _or0(cols["units"])
+    noi = _or0(cols["noi"])
+    egi = _or0(cols["egi"])
+    gpr = _or0(cols["gpr"])
+    opex = _or0(cols["opex"])
+    debt_service = _or0(cols["debt_service"])
+    down_payment = _or0(cols["down_payment"])
+    loan_amount = _or0(cols["loan_amount"])
+    cap_rate = _or0(cols["cap_rate"])
+    expense_ratio = _or0(cols["expense_ratio"])
+    rba_sqft = _or0(cols["rba_sqft"])
+
+    m: Dict[str, np.ndarray] = {}
+    zero = np.zeros_like(price)
+    with np.errstate(all="ignore"):
+        annual_cash_flow = noi - debt_service
+        m["annual_cash_flow"] = py_round(annual_cash_flow, 2)
+        m["monthly_cash_flow"] = py_round(annual_cash_flow / 12, 2)
+        m["cash_on_cash_return"] = np.where(down_payment > 0, py_round((annual_cash_flow / down_payment) * 100, 2), zero)
+        m["roi_year_1"] = np.where(price > 0, py_round((annual_cash_flow / price) * 100, 2), zero)
+        m["cap_rate"] = np.where(
+            (price > 0) & (noi != 0),
+            py_round((noi / price) * 100, 2),
+            np.where(cap_rate != 0, py_round(cap_rate * 100, 2), zero),
+        )
+        m["dscr"] = np.where(debt_service > 0, py_round(noi / debt_service, 2), zero)
+        m["grm"] = np.where((price != 0) & (gpr > 0), py_round(price / gpr, 2), zero)
+        m["price_per_unit"] = np.where((price != 0) & (units > 0), py_round(price / units, 0), zero)
+        m["price_per_sf"] = np.where((price != 0) & (rba_sqft > 0), py_round(price / rba_sqft, 2), zero)
+        m["expense_ratio"] = np.where(
+            (egi > 0) & (opex != 0),
+            py_round((opex / egi) * 100, 2),
+            np.where(expense_ratio != 0, py_round(expense_ratio * 100, 2), zero),
+        )
+        m["break_even_ratio"] = np.where(egi > 0, py_round(((opex + debt_service) / egi) * 100, 2), zero)
+        m["ltv"] = np.where((loan_amount != 0) & (price > 0), py_round((loan_amount / price) * 100, 2), zero)
+        m["debt_yield"] = np.where((loan_amount > 0) & (noi != 0), py_round((noi / loan_amount) * 100, 2), zero)
+        m["one_percent_rule"] = np.where((gpr != 0) & (price > 0), py_round(((gpr / 12) / price) * 100, 2), zero)
+
+        # 5-year cash flows: 3% rent growth, 2%/yr expense creep, 3% appreciation;
+        # the sale repays the scheduled balance, or 85% of the loan without
+        # loan terms (same assumptions as the scalar path).
+        flows = [-np.where(down_payment != 0, down_payment, price)]
+        for year in range(1, 6):
+            year_cash_flow = (noi * (1.03 ** year) - (opex * (0.02 * year))) - debt_service
+            if year == 5:
+                sale_price = price * (1.03 ** 5)
+                remaining_loan = np.where(loan_amount != 0, loan_amount * 0.85, 0.0)
+                remaining_loan = _scheduled_balance(cols, remaining_loan, 60)
+                year_cash_flow = year_cash_flow + (sale_price - remaining_loan)
+            flows.append(year_cash_flow)
+        irr = returns.irr(np.column_stack(flows))
+        m["irr_5_year"] = np.where(np.isfinite(irr), py_round(irr * 100, 2), 0.0)
+
+        m["payback_period_years"] = np.where(
+            (annual_cash_flow > 0) & (down_payment != 0), py_round(down_payment / annual_cash_flow, 1), zero
+        )
+        m["rent_to_price_ratio"] = np.where((gpr != 0) & (price > 0), py_round((gpr / price) * 100, 2), zero)
+        m["operating_margin"] = np.where(egi > 0, py_round((noi / egi) * 100, 2), zero)
+        m["cash_flow_per_unit"] = np.where(units > 0, py_round(annual_cash_flow / units, 2), zero)
+
+    score = np.full(price.shape, 50)
+    score += np.select([m["cap_rate"] >= 7, m["cap_rate"] >= 5], [10, 5], 0)
+    score += np.select([m["cash_on_cash_return"] >= 10, m["cash_on_cash_return"] >= 7], [10, 5], 0)
+    score += np.select([m["dscr"] >= 1.5, m["dscr"] >= 1.25], [10, 5], 0)
+    score += np.select([m["expense_ratio"] <= 40, m["expense_ratio"] <= 50], [10, 5], 0)
+    score += np.select([m["irr_5_year"] >= 15, m["irr_5_year"] >= 10], [10, 5], 0)
+    score = np.clip(score, 0, 100)
+
+    return {"metrics": {k: m[k] for k in METRIC_NAMES}, "score": score}
+
+
+def _jsonable(a: np.ndarray) -> List[Optional[float]]:
+    """Array -> list with NaN/inf as None (JSON has no non-finite numbers)."""
+    vals = a.tolist()
+    if np.isfinite(a).all():
+        return vals
+    return [v if v == v and v not in (float("inf"), float("-inf")) else None for v in vals]
+
+
+def to_response(result: Dict[str, Any], orient: str = "columns") -> Dict[str, Any]:
+    """JSON-ready output: columnar lists, or one record per deal for orient="records"."""
+    metrics = {k: _jsonable(v) for k, v in result["metrics"].items()}
+    score = [int(s) for s in result["score"].tolist()]
+    if orient == "records":
+        return {"deals": [
+            {"metrics": {k: metrics[k][i] for k in METRIC_NAMES}, "score": score[i]}
+            for i in range(len(score))
+        ]}
+    return {"metrics": metrics, "score": score}
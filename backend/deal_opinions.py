@@ -0,0 +1,122 @@
+"""
+Deal Opinions Module - Background investment opinions, cached by metric fingerprint
+
+The deterministic deal metrics are ready in microseconds; the LLM verdict
+(verdict / confidence / pros / cons / summary) takes seconds. Underwriting
+responses therefore return the metrics immediately with
+`opinion_status: "pending"` and an `opinion_url`; the opinion is generated
+on the "anthropic" pool in the background and picked up by polling
+GET /deal-opinions/{fingerprint}.
+
+Opinions are keyed by a fingerprint of the rounded metrics the prompt is
+built from (plus the model name), so two deals whose numbers round the same
+share one opinion and never pay for it twice. Finished opinions live in a
+disk-backed LRU under data/deal_opinions.
+
+Config:
+    DEAL_OPINIONS_DIR      cache location
+    DEAL_OPINIONS_MAX_MB   cache size cap (default 32)
+"""
+import os
+import json
+import math
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from ocr_cache import PageCache
+from provider_pool import run_blocking
+
+log = logging.getLogger("deal_opinions")
+
+DEAL_OPINIONS_DIR = Path(os.getenv("DEAL_OPINIONS_DIR") or Path(__file__).resolve().parent / "data" / "deal_opinions")
+DEAL_OPINIONS_MAX_BYTES = int(float(os.getenv("DEAL_OPINIONS_MAX_MB", "32")) * 1024 * 1024)
+
+PENDING, READY, FAILED = "pending", "ready", "failed"
+
+# Metrics the opinion prompt sees, and how coarsely each is rounded for the fingerprint.
+_DOLLAR_FIELDS = ("annual_cash_flow", "monthly_cash_flow", "price_per_unit")
+_RATIO_FIELDS = {
+    "cap_rate": 1, "cash_on_cash_return": 1, "dscr": 2, "roi_year_1": 1, "irr_5_year": 1,
+    "grm": 1, "expense_ratio": 1, "break_even_ratio": 1, "debt_yield": 1,
+    "one_percent_rule": 2, "payback_period_years": 1, "operating_margin": 1,
+}
+
+FALLBACK_OPINION = {
+    "verdict": "HOLD",
+    "confidence": "Moderate",
+    "pros": ["Metrics calculated successfully"],
+    "cons": ["Unable to generate detailed analysis"],
+    "summary": "Review the metrics carefully before making an investment decision.",
+}
+
+
+def _sig(x: float, digits: int = 3) -> float:
+    """Round to `digits` significant figures."""
+    if not x:
+        return 0
+    return round(x, digits - 1 - int(math.floor(math.log10(abs(x)))))
+
+
+def rounded_metrics(metrics: Dict[str, Any]) -> Dict[str, float]:
+    """The opinion-relevant metrics, rounded so near-identical deals coincide."""
+    out: Dict[str, float] = {}
+    for k in _DOLLAR_FIELDS:
+        out[k] = _sig(float(metrics.get(k) or 0))
+    for k, places in _RATIO_FIELDS.items():
+        out[k] = round(float(metrics.get(k) or 0), places)
+    return out
+
+
+def fingerprint(rounded: Dict[str, float], model: str = "") -> str:
+    payload = json.dumps({"model": model, "metrics": rounded}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class OpinionStore:
+    """Cached opinions plus the generations currently in flight."""
+
+    def __init__(self, cache: PageCache):
+        self.cache = cache
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._failed: Dict[str, str] = {}
+
+    def status(self, fp: str) -> Optional[Dict[str, Any]]:
+        """{"status", "opinion", "error"} for a fingerprint, or None if unknown."""
+        opinion = self.cache.get(fp)
+        if opinion is not None:
+            return {"status": READY, "opinion": opinion, "error": None}
+        if fp in self._inflight:
+            return {"status": PENDING, "opinion": None, "error": None}
+        if fp in self._failed:
+            return {"status": FAILED, "opinion": dict(FALLBACK_OPINION), "error": self._failed[fp]}
+        return None
+
+    def request(self, fp: str, generate: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the current status, starting `generate` on the anthropic pool on a miss.
+
+        Must be called from the event loop. Concurrent requests for the same
+        fingerprint share one generation.
+        """
+        current = self.status(fp)
+        if current is not None and current["status"] != FAILED:
+            return current
+        self._failed.pop(fp, None)
+        task = asyncio.get_running_loop().create_task(self._generate(fp, generate))
+        self._inflight[fp] = task
+        return {"status": PENDING, "opinion": None, "error": None}
+
+    async def _generate(self, fp: str, generate: Callable[[], Dict[str, Any]]) -> None:
+        try:
+            opinion = await run_blocking("anthropic", generate)
+            self.cache.put(fp, opinion)
+        except Exception as e:
+            log.warning("Deal opinion %s failed: %s", fp, e)
+            self._failed[fp] = str(e)[:300]
+        finally:
+            self._inflight.pop(fp, None)
+
+
+OPINIONS = OpinionStore(PageCache(DEAL_OPINIONS_DIR, DEAL_OPINIONS_MAX_BYTES))
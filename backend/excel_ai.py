@@ -11,6 +11,8 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from openai import OpenAI
 
+from provider_pool import run_blocking
+
 log = logging.getLogger("excel_ai")
 
 router = APIRouter(prefix="/api/excel-ai", tags=["Excel AI"])
@@ -211,7 +213,9 @@ You are the institutional standard for real estate underwriting AI."""
         # Call GPT-4
         log.info(f"[Excel AI] Calling GPT-4o-mini...")
         
-        response = client.chat.completions.create(
+        response = await run_blocking(
+            "openai",
+            client.chat.completions.create,
             model="gpt-4o-mini",
             messages=messages,
             temperature=0.7,
@@ -68,3 +68,46 @@ def upload_images_to_supabase(deal_id: str, images: List[Dict[str, Any]]) -> Lis
             continue
     
     return uploaded_images
+
+# ---------- content-addressed store ----------
+# Originals live once per content hash under objects/, with WebP thumbnails
+# next to them under thumbs/; deals only hold references (see deal_images).
+IMAGE_BUCKET = "deal-images"
+
+
+def object_path(content_hash: str, ext: str) -> str:
+    return f"objects/{content_hash[:2]}/{content_hash}.{ext}"
+
+
+def thumb_path(content_hash: str, size: int) -> str:
+    return f"thumbs/{content_hash[:2]}/{content_hash}_{size}.webp"
+
+
+def public_url(supabase: Client, storage_path: str, bucket_name: str = IMAGE_BUCKET) -> str:
+    return supabase.storage.from_(bucket_name).get_public_url(storage_path)
+
+
+def object_exists(supabase: Client, storage_path: str, bucket_name: str = IMAGE_BUCKET) -> bool:
+    """True if a stored object already sits at storage_path."""
+    folder, _, name = storage_path.rpartition("/")
+    found = supabase.storage.from_(bucket_name).list(folder, {"search": name, "limit": 1})
+    return any(item.get("name") == name for item in (found or []))
+
+
+def upload_object(supabase: Client, storage_path: str, data: bytes, content_type: str,
+                  bucket_name: str = IMAGE_BUCKET) -> None:
+    """
+    Write an immutable content-addressed object. An object that is already
+    there (uploaded by another deal or worker) counts as success.
+    """
+    try:
+        supabase.storage.from_(bucket_name).upload(
+            path=storage_path,
+            file=data,
+            file_options={"content-type": content_type, "upsert": "false", "cache-control": "31536000"}
+        )
+    except Exception as e:
+        msg = str(e).lower()
+        if "duplicate" in msg or "already exists" in msg or "409" in msg:
+            return
+        raise
@@ -0,0 +1,338 @@
+"""
+Markdown Scan Module - Single-pass extraction of operating-summary lines from OCR pages
+
+One walk over the OCR'd pages produces everything the underwriting pipeline
+used to get from three separate scans:
+
+    pnl / expenses   operating summary values (legacy
+                     `_extract_operating_summary_from_markdown` semantics:
+                     first OPERATING SUMMARY / INCOME STATEMENT block in the
+                     whole document, else every line; later lines win)
+    sources          first page/line for each field (legacy
+                     `_extract_operating_summary_sources` semantics: block
+                     per page, else the whole page)
+    keyword_pages    pages mentioning any recovery keyword (legacy
+                     `_pages_with_keywords` semantics, case-insensitive)
+
+Keywords, labels and section headings are found by one trie-factored
+pattern run once per page; only lines that contain a label are then
+classified (number + label lookup), instead of per-line re.search/re.sub
+calls and linear loops over the label table for every line.
+"""
+import re
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+LABEL_MAP = {
+    "GROSS POTENTIAL RE": "gross_potential_rent",
+    "GROSS POTENTIAL RENT": "gross_potential_rent",
+    "TOTAL ECONOMIC LOSSES": "vacancy_amount",
+    "VACANCY": "vacancy_amount",
+    "OTHER INCOME": "other_income",
+    "EFFECTIVE GROSS INCOME": "effective_gross_income",
+    "REAL ESTATE TAXES": "taxes",
+    "INSURANCE": "insurance",
+    "GENERAL & ADMINISTRATIVE": "admin",
+    "GENERAL AND ADMINISTRATIVE": "admin",
+    "REPAIRS, MAINTENANCE, & CONTRACT SERVICES": "repairs_maintenance",
+    "REPAIRS, MAINTENANCE. & CONTRACT SERVICES": "repairs_maintenance",
+    "REPAIRS & MAINTENANCE": "repairs_maintenance",
+    "REPAIRS": "repairs_maintenance",
+    "UTILITIES": "utilities",
+    "TURNOVER & MARKETING": "marketing",
+    "MARKETING": "marketing",
+    "MANAGEMENT & LEASING": "management",
+    "MANAGEMENT": "management",
+    "RESERVES": "other",
+    "TOTAL OPERATING EXPENSES": "operating_expenses",
+    "NET OPERATING INCOME": "noi",
+}
+
+EXPENSE_KEYS = {"taxes", "insurance", "admin", "repairs_maintenance", "utilities", "marketing", "management", "other"}
+
+RECOVERY_KEYWORDS = [
+    "PRICING DETAIL","LIST PRICE","ASKING PRICE","OFFERING PRICE","PURCHASE PRICE",
+    "PRICE PER UNIT","PRICE PER SQUARE FOOT","NUMBER OF UNITS","RENTABLE SQUARE FOOT","RBA","LOT SIZE",
+    "OPERATING SUMMARY","INCOME STATEMENT","GROSS POTENTIAL RENT","EFFECTIVE GROSS INCOME",
+    "OTHER INCOME","VACANCY","OPERATING EXPENSES","NET OPERATING INCOME","NOI",
+    "UNIT MIX","RENT ROLL","MARKET RENT","CURRENT RENT","ADDRESS","PROPERTY OVERVIEW"
+]
+
+# Block = section heading plus the next 3500 characters.
+BLOCK_HEADINGS = ("OPERATING SUMMARY", "INCOME STATEMENT")
+BLOCK_HEAD_RE = re.compile(r"\b(OPERATING SUMMARY|INCOME STATEMENT)\b", re.IGNORECASE)
+BLOCK_SPAN = 3500
+
+NUM_RE = re.compile(r"\$?\(?-?[\d,]+(?:\.\d+)?\)?")
+
+# Same boundaries as str.splitlines()
+_LINE_BREAK_RE = re.compile("\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+# Zero-width lookahead at every position, alternatives in LABEL_MAP order:
+# at each offset the highest-priority label starting there is captured, so
+# the lowest priority index over all matches is the first LABEL_MAP key
+# contained anywhere in the label.
+_LABELS = list(LABEL_MAP)
+_LABEL_PRIORITY = {k: i for i, k in enumerate(_LABELS)}
+_LABEL_RE = re.compile("(?=(" + "|".join(re.escape(k) for k in _LABELS) + "))")
+
+
+def _trie_pattern(words) -> str:
+    """Regex for a word set with shared prefixes factored out.
+
+    Python's re tries every branch of a flat alternation at each offset;
+    factoring the words into a trie means one character test per distinct
+    next letter instead, which is what makes the page scan fast.
+    """
+    trie: Dict[str, dict] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch != ""]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return emit(trie)
+
+
+class _Automaton:
+    """One compiled pattern over keywords, labels and block headings.
+
+    Matching runs on the upper-cased page with a lookahead, so every offset
+    reports its longest word. Any shorter word that is a prefix of that
+    match occurs at the same offset, which is what `flags` precomputes:
+    word -> (is/contains a keyword, is/contains a label, headings).
+    """
+
+    def __init__(self, keywords: Sequence[str]):
+        kws = {k.upper() for k in keywords}
+        labels = set(LABEL_MAP)
+        words = kws | labels | set(BLOCK_HEADINGS)
+        self.keywords = [k.lower() for k in keywords]
+        self.regex = re.compile("(?=(" + _trie_pattern(words) + "))")
+        self.flags: Dict[str, Tuple[bool, bool, Tuple[str, ...]]] = {}
+        for w in words:
+            prefixes = {v for v in words if w.startswith(v)}
+            heads = tuple(h for h in BLOCK_HEADINGS if h in prefixes)
+            self.flags[w] = (bool(prefixes & kws), bool(prefixes & labels), heads)
+
+
+_AUTOMATA: Dict[Tuple[str, ...], _Automaton] = {}
+
+
+def automaton(keywords: Sequence[str] = RECOVERY_KEYWORDS) -> _Automaton:
+    key = tuple(keywords)
+    auto = _AUTOMATA.get(key)
+    if auto is None:
+        auto = _AUTOMATA[key] = _Automaton(keywords)
+    return auto
+
+
+def _amount(s: str) -> Optional[float]:
+    s = s.strip()
+    if not s:
+        return None
+    neg = s.startswith("(") and s.endswith(")")
+    s = s.replace("$", "").replace(",", "").replace("%", "").replace("(", "").replace(")", "")
+    try:
+        x = float(s)
+        return -x if neg else x
+    except ValueError:
+        return None
+
+
+def _label_key(label: str) -> Optional[str]:
+    best = None
+    for m in _LABEL_RE.finditer(label):
+        p = _LABEL_PRIORITY[m.group(1)]
+        if best is None or p < best:
+            best = p
+            if p == 0:
+                break
+    return LABEL_MAP[_LABELS[best]] if best is not None else None
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+class _Classifier:
+    """Per-scan memo of stripped line -> (field path, amount) or None."""
+
+    def __init__(self):
+        self._memo: Dict[str, Optional[Tuple[str, Optional[float]]]] = {}
+
+    def __call__(self, line: str) -> Optional[Tuple[str, Optional[float]]]:
+        try:
+            return self._memo[line]
+        except KeyError:
+            pass
+        hit = None
+        m = NUM_RE.search(line)
+        if m:
+            key = _label_key(line[:m.start()].strip().upper())
+            if key is not None:
+                path = f"expenses.{key}" if key in EXPENSE_KEYS else f"pnl.{key}"
+                hit = (path, _amount(m.group(0)))
+        self._memo[line] = hit
+        return hit
+
+
+def _set_value(path: str, value: Optional[float], pnl: Dict[str, Any], exps: Dict[str, Any]) -> None:
+    if path.startswith("expenses."):
+        exps[path[9:]] = value
+    else:
+        pnl[path[4:]] = value
+
+
+def _fold(classify: _Classifier, text: str, pnl: Dict[str, Any], exps: Dict[str, Any]) -> None:
+    for raw in text.splitlines():
+        line = raw.strip()
+        if line:
+            hit = classify(line)
+            if hit is not None:
+                _set_value(hit[0], hit[1], pnl, exps)
+
+
+def _scan_page(auto: _Automaton, md: str) -> Tuple[bool, Optional[Tuple[int, int]], int, List[Tuple[int, str]]]:
+    """-> (keyword hit, heading span, text start, [(line_index, stripped line)])
+
+    Only lines that contain a label can classify, so only those are
+    returned; line indices are relative to the block (or page) text, as
+    splitlines() would number them.
+    """
+    up = md.upper()
+    if len(up) != len(md):
+        # Case mapping changed the length (e.g. "ß" -> "SS"), so offsets
+        # can't be mapped back; take every line of the block/page instead.
+        low = md.lower()
+        kw_hit = any(k in low for k in auto.keywords)
+        head = BLOCK_HEAD_RE.search(md)
+        span = (head.start(), head.end()) if head else None
+        start = span[0] if span else 0
+        text = md[start:span[1] + BLOCK_SPAN] if span else md
+        return kw_hit, span, start, [(i, raw.strip()) for i, raw in enumerate(text.splitlines()) if raw.strip()]
+
+    kw_hit = False
+    span: Optional[Tuple[int, int]] = None
+    label_pos: List[int] = []
+    for m in auto.regex.finditer(up):
+        is_kw, is_label, heads = auto.flags[m.group(1)]
+        kw_hit = kw_hit or is_kw
+        if is_label:
+            label_pos.append(m.start())
+        if heads and span is None:
+            p = m.start()
+            for h in heads:
+                e = p + len(h)
+                if (p == 0 or not _is_word_char(md[p - 1])) and (e == len(md) or not _is_word_char(md[e])):
+                    span = (p, e)
+                    break
+
+    start, end = (span[0], min(len(md), span[1] + BLOCK_SPAN)) if span else (0, len(md))
+    cand = [p - start for p in label_pos if start <= p < end]
+    if not cand:
+        return kw_hit, span, start, []
+
+    text = md[start:end]
+    starts, ends = [0], []
+    for br in _LINE_BREAK_RE.finditer(text):
+        ends.append(br.start())
+        starts.append(br.end())
+    ends.append(len(text))
+    lines = []
+    for i in sorted({bisect_right(starts, q) - 1 for q in cand}):
+        line = text[starts[i]:ends[i]].strip()
+        if line:
+            lines.append((i, line))
+    return kw_hit, span, start, lines
+
+
+def scan_pages(pages_md: Sequence[str], keywords: Sequence[str] = RECOVERY_KEYWORDS) -> Dict[str, Any]:
+    """Single pass over page markdown strings.
+
+    The document text for `pnl`/`expenses` is the non-empty pages joined
+    with blank lines, exactly as `/ocr/underwrite` builds `markdown_text`.
+    """
+    auto = automaton(keywords)
+    classify = _Classifier()
+    sources: Dict[str, Any] = {}
+    keyword_pages: List[int] = []
+    doc_pnl: Dict[str, Any] = {}
+    doc_exp: Dict[str, Any] = {}
+    doc_block: Optional[Tuple[int, int, int]] = None  # (page, heading start, heading end)
+
+    for page_idx, md in enumerate(pages_md):
+        if not md:
+            continue
+        kw_hit, span, _, lines = _scan_page(auto, md)
+        if kw_hit:
+            keyword_pages.append(page_idx)
+        if span and doc_block is None:
+            doc_block = (page_idx, span[0], span[1])
+
+        for line_idx, line in lines:
+            hit = classify(line)
+            if hit is None:
+                continue
+            path = hit[0]
+            if path not in sources:
+                sources[path] = {
+                    "page": page_idx + 1,  # 1-based page index for UI
+                    "line_index": line_idx,
+                    "text": line,
+                }
+            if doc_block is None:
+                # No block anywhere yet: document values come from every line.
+                _set_value(path, hit[1], doc_pnl, doc_exp)
+
+    if doc_block is not None:
+        # The document block may run past its page into the following ones.
+        page_idx, start, head_end = doc_block
+        limit = head_end - start + BLOCK_SPAN
+        parts, size = [], 0
+        for md in pages_md[page_idx:]:
+            if not md:
+                continue
+            chunk = md[start:] if not parts else md
+            start = 0
+            if parts:
+                parts.append("\n\n")
+                size += 2
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= limit:
+                break
+        doc_pnl, doc_exp = {}, {}
+        _fold(classify, "".join(parts)[:limit], doc_pnl, doc_exp)
+
+    if doc_exp and "operating_expenses" not in doc_pnl:
+        doc_pnl["operating_expenses"] = sum(v for v in doc_exp.values() if isinstance(v, (int, float)))
+    if doc_pnl.get("gross_potential_rent") is not None and doc_pnl.get("vacancy_amount") is not None:
+        gpr = doc_pnl["gross_potential_rent"]; vac = abs(doc_pnl["vacancy_amount"])
+        if gpr:
+            doc_pnl["vacancy_rate"] = round(vac / gpr, 4)
+
+    return {
+        "pnl": doc_pnl,
+        "expenses": doc_exp,
+        "sources": sources,
+        "keyword_pages": keyword_pages,
+        "page_count": len(pages_md),
+    }
+
+
+def ocr_pages_markdown(ocr_json: Optional[dict]) -> List[str]:
+    if not isinstance(ocr_json, dict):
+        return []
+    return [(p.get("markdown") or "") if isinstance(p, dict) else "" for p in (ocr_json.get("pages") or [])]
+
+
+def scan_ocr_json(ocr_json: Optional[dict], keywords: Sequence[str] = RECOVERY_KEYWORDS) -> Dict[str, Any]:
+    return scan_pages(ocr_pages_markdown(ocr_json), keywords)
@@ -2,6 +2,8 @@
 Institutional-Grade Multifamily Underwriting Model Generator
 Generates exact CSV template structure with all sections, formatting, and formulas
 """
+import amortization
+
 
 def generate_model_operations(params, property_data=None):
     """
@@ -86,12 +88,8 @@ def generate_model_operations(params, property_data=None):
     price_per_sf = purchase_price / total_sf
     
     # Calculate monthly payment for DSCR loan
-    monthly_rate = interest_rate / 12
-    num_payments = loan_term_months
-    if monthly_rate > 0:
-        monthly_payment = loan_amount * (monthly_rate * (1 + monthly_rate)**num_payments) / ((1 + monthly_rate)**num_payments - 1)
-    else:
-        monthly_payment = loan_amount / num_payments
+    loan_schedule = amortization.schedule(amortization.loan_terms(loan_amount, interest_rate * 100, loan_term_months))
+    monthly_payment = amortization.monthly_payment(loan_schedule)
     annual_debt_service = monthly_payment * 12
     
     # Year 1 NOI (will calculate dynamically)
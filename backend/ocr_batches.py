@@ -0,0 +1,111 @@
+"""
+OCR Batches Module - Split large PDFs into page batches and OCR them concurrently
+
+A 150-page OM sent as one data URL is one long serial OCR request. Above
+OCR_BATCH_MIN_PAGES the PDF is cut into OCR_BATCH_PAGES-page sub-PDFs and
+the batches are sent in parallel, at most PROVIDER_CONCURRENCY_<NAME>
+requests in flight per provider across the whole process. Results are
+stitched back into the provider's `{pages: [{index, markdown, ...}]}`
+shape with each page carrying its index in the original document, so
+wall-clock time approaches the slowest batch rather than the sum.
+
+Config:
+    OCR_BATCH_PAGES          pages per batch (default 8)
+    OCR_BATCH_MIN_PAGES      documents shorter than this go in one request (default 16)
+    PROVIDER_CONCURRENCY_MISTRAL  in-flight batch cap (see provider_pool)
+"""
+import os
+import logging
+from concurrent.futures import FIRST_EXCEPTION, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pdf_session import PdfSource, as_session
+from provider_pool import concurrency_limit, get_pool
+
+log = logging.getLogger("ocr_batches")
+
+OCR_BATCH_PAGES = int(os.getenv("OCR_BATCH_PAGES", "8"))
+OCR_BATCH_MIN_PAGES = int(os.getenv("OCR_BATCH_MIN_PAGES", "16"))
+
+
+class BatchPageMismatch(Exception):
+    """A batch came back with a different page count than was sent."""
+
+
+def pdf_page_count(pdf: PdfSource) -> int:
+    with as_session(pdf) as session:
+        return session.page_count
+
+
+def split_pdf(pdf: PdfSource, batch_pages: int = OCR_BATCH_PAGES) -> List[Tuple[int, bytes]]:
+    """Return [(first_page_index, sub_pdf_bytes), ...] covering the document in order."""
+    with as_session(pdf) as session:
+        step = max(1, batch_pages)
+        return [
+            (start, session.pdf_bytes(range(start, min(session.page_count, start + step))))
+            for start in range(0, session.page_count, step)
+        ]
+
+
+def should_batch(pdf: PdfSource, page_count: Optional[int] = None) -> bool:
+    if page_count is None:
+        try:
+            page_count = pdf_page_count(pdf)
+        except Exception:
+            return False
+    return page_count >= max(OCR_BATCH_MIN_PAGES, OCR_BATCH_PAGES + 1)
+
+
+def ocr_in_batches(
+    pdf: PdfSource,
+    request_fn: Callable[[bytes], Dict[str, Any]],
+    provider: str = "mistral",
+    batch_pages: int = OCR_BATCH_PAGES,
+) -> Dict[str, Any]:
+    """OCR a PDF as concurrent page batches and merge the results.
+
+    `request_fn(sub_pdf_bytes)` performs one OCR request and returns the
+    provider's JSON dict. The first failing batch's exception is re-raised
+    (after cancelling batches that have not started); a batch whose page
+    count doesn't match what was sent raises BatchPageMismatch so callers
+    can fall back to a single request.
+    """
+    with as_session(pdf) as session:
+        batches = split_pdf(session, batch_pages)
+        total = session.page_count
+    sem = concurrency_limit(provider)
+    pool = get_pool(f"{provider}-batches")
+
+    def _run(sub: bytes) -> Dict[str, Any]:
+        with sem:
+            return request_fn(sub)
+
+    futures = [pool.submit(_run, sub) for _, sub in batches]
+    done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+    for f in pending:
+        f.cancel()
+    for f in futures:
+        if f.done() and not f.cancelled() and f.exception() is not None:
+            raise f.exception()
+
+    merged: Dict[str, Any] = {}
+    pages: List[Dict[str, Any]] = []
+    pages_processed = 0
+    ends = [start for start, _ in batches[1:]] + [total]
+    for (start, sub), end, fut in zip(batches, ends, futures):
+        resp = fut.result()
+        got = [p for p in (resp.get("pages") or []) if isinstance(p, dict)]
+        expected = end - start
+        if len(got) != expected:
+            raise BatchPageMismatch(f"batch at page {start + 1}: sent {expected} pages, got {len(got)}")
+        for offset, page in enumerate(got):
+            pages.append(dict(page, index=start + offset))
+        if not merged:
+            merged = {k: v for k, v in resp.items() if k not in ("pages", "usage_info")}
+        pages_processed += int(((resp.get("usage_info") or {}).get("pages_processed")) or len(got))
+
+    merged["pages"] = pages
+    merged["usage_info"] = {"pages_processed": pages_processed}
+    merged["batches"] = len(batches)
+    log.info("[OCR batches] %d pages in %d batches of <=%d", len(pages), len(batches), batch_pages)
+    return merged
@@ -0,0 +1,260 @@
+"""
+OCR Cache Module - Page-granular, content-addressed cache for Mistral OCR results
+
+Every OCR'd page is stored on disk under the SHA-256 of the page's content
+bytes (content stream + everything its resources reach: form XObjects,
+images, fonts), so the same page is only
+ever sent to Mistral once no matter which upload, page slice or recovery
+pass it shows up in. Entries are evicted least-recently-used once the cache
+grows past its size cap.
+"""
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pdf_session import PdfSource, as_session
+
+OCR_CACHE_DIR = Path(os.getenv("OCR_CACHE_DIR") or Path(__file__).resolve().parent / "data" / "ocr_cache")
+OCR_CACHE_MAX_BYTES = int(float(os.getenv("OCR_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+
+class PageCache:
+    """Disk-backed LRU of OCR page dicts keyed by content hash.
+
+    get/put store JSON dicts; get_bytes/put_bytes store opaque payloads
+    (files named <key><suffix>).
+    """
+
+    def __init__(self, root: Path, max_bytes: int, suffix: str = ".json"):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._index: Optional["OrderedDict[str, int]"] = None  # key -> size, oldest first
+        self._total = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}{self.suffix}"
+
+    def _load_index(self) -> None:
+        # Rebuild recency order from file mtimes (touched on every hit).
+        entries = []
+        if self.root.exists():
+            for p in self.root.glob(f"*/*{self.suffix}"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, p.name[:-len(self.suffix)], st.st_size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total = sum(self._index.values())
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        payload = self.get_bytes(key)
+        if payload is None:
+            return None
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    def put(self, key: str, page: Dict[str, Any]) -> None:
+        self.put_bytes(key, json.dumps(page, ensure_ascii=False).encode("utf-8"))
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if self._index is None:
+                self._load_index()
+            if key not in self._index:
+                return None
+            path = self._path(key)
+            try:
+                payload = path.read_bytes()
+                os.utime(path, None)
+            except Exception:
+                self._total -= self._index.pop(key, 0)
+                return None
+            self._index.move_to_end(key)
+            return payload
+
+    def put_bytes(self, key: str, payload: bytes) -> None:
+        with self._lock:
+            if self._index is None:
+                self._load_index()
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, path)
+            self._total -= self._index.pop(key, 0)
+            self._index[key] = len(payload)
+            self._total += len(payload)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._index is None:
+                self._load_index()
+            return {"entries": len(self._index), "bytes": self._total, "max_bytes": self.max_bytes}
+
+
+OCR_CACHE = PageCache(OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES)
+
+
+# PDF object tokens as PyMuPDF prints them: delimiters, names, hex strings,
+# literal strings (scanned separately for nesting), and bare words/numbers
+_TOKEN = re.compile(rb"\s*(<<|>>|\[|\]|\(|/[^\s/\[\]<>(){}%]*|<[0-9A-Fa-f\s]*>|[^\s/\[\]<>(){}%]+)")
+# Back-references up the page tree would pull the whole document into every page's key
+_SKIP_KEYS = {b"/Parent", b"/P"}
+
+
+def _literal_end(src: bytes, i: int) -> int:
+    """Index just past the literal string whose "(" is at src[i]."""
+    depth = 0
+    while i < len(src):
+        c = src[i:i + 1]
+        if c == b"\\":
+            i += 2
+            continue
+        if c == b"(":
+            depth += 1
+        elif c == b")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _tokens(src: bytes) -> List[bytes]:
+    out, i = [], 0
+    while i < len(src):
+        m = _TOKEN.match(src, i)
+        if not m:
+            break
+        if m.group(1) == b"(":
+            start = m.start(1)
+            i = _literal_end(src, start)
+            out.append(src[start:i])
+        else:
+            out.append(m.group(1))
+            i = m.end()
+    return out
+
+
+def _canonical(tokens: List[bytes], pos: int, fdoc, memo: Dict[int, bytes], active: set):
+    """Serialize the value at tokens[pos] with sorted dict keys and each
+    "N 0 R" replaced by the referenced object's digest; returns (bytes, next pos)."""
+    tok = tokens[pos]
+    if tok == b"<<":
+        entries, pos = [], pos + 1
+        while pos < len(tokens) and tokens[pos] != b">>":
+            key = tokens[pos]
+            value, pos = _canonical(tokens, pos + 1, fdoc, memo, active)
+            if key not in _SKIP_KEYS:
+                entries.append(key + b" " + value)
+        return b"<<" + b" ".join(sorted(entries)) + b">>", pos + 1
+    if tok == b"[":
+        items, pos = [], pos + 1
+        while pos < len(tokens) and tokens[pos] != b"]":
+            value, pos = _canonical(tokens, pos, fdoc, memo, active)
+            items.append(value)
+        return b"[" + b" ".join(items) + b"]", pos + 1
+    if pos + 2 < len(tokens) and tokens[pos + 2] == b"R" and tok.isdigit() and tokens[pos + 1].isdigit():
+        return b"<" + _object_digest(fdoc, int(tok), memo, active).hex().encode() + b">", pos + 3
+    return tok, pos + 1
+
+
+def _resolve(fdoc, src: bytes, memo: Dict[int, bytes], active: set) -> bytes:
+    tokens = _tokens(src)
+    out, pos = [], 0
+    while pos < len(tokens):
+        value, pos = _canonical(tokens, pos, fdoc, memo, active)
+        out.append(value)
+    return b" ".join(out)
+
+
+def _object_digest(fdoc, xref: int, memo: Dict[int, bytes], active: set) -> bytes:
+    """Merkle digest of an object: its canonical source (sorted keys, each
+    reference replaced by the referenced object's digest) plus its raw
+    stream. Independent of xref numbering and writer key order, so a page's
+    objects hash the same after being copied into another PDF."""
+    if xref in memo:
+        return memo[xref]
+    if xref in active:
+        return b"cycle"
+    active.add(xref)
+    try:
+        src = fdoc.xref_object(xref, compressed=True).encode("utf-8", "surrogateescape")
+    except Exception:
+        src = b""
+    h = hashlib.sha256(_resolve(fdoc, src, memo, active))
+    if fdoc.xref_is_stream(xref):
+        h.update(fdoc.xref_stream_raw(xref) or b"")
+    active.discard(xref)
+    memo[xref] = h.digest()
+    return memo[xref]
+
+
+def _page_resources(fdoc, xref: int) -> bytes:
+    """The page's /Resources entry (inherited from the page tree if the page has none)."""
+    for _ in range(64):
+        kind, value = fdoc.xref_get_key(xref, "Resources")
+        if kind != "null":
+            return value.encode("utf-8", "surrogateescape")
+        kind, parent = fdoc.xref_get_key(xref, "Parent")
+        if kind != "xref":
+            break
+        xref = int(parent.split()[0])
+    return b""
+
+
+def page_keys(doc: PdfSource, mime: str, model: str) -> List[str]:
+    """Return one cache key per page of the document.
+
+    PDF pages (bytes or a PdfSession) are fingerprinted by their
+    decompressed content stream plus a Merkle digest of everything their
+    resources reach (form XObjects and their own resources, images, fonts
+    and font files, graphics states), so pages that only differ inside a
+    form XObject (`q /fzFrm0 Do Q`) get different keys, and a page hashes
+    the same whether it comes from the original upload or a re-written
+    slice. Single images are one page keyed by their file bytes.
+    """
+    if mime != "application/pdf":
+        h = hashlib.sha256(model.encode("utf-8"))
+        h.update(doc)
+        return [h.hexdigest()]
+
+    keys = []
+    with as_session(doc) as pdf, pdf.document() as fdoc:
+        memo: Dict[int, bytes] = {}  # shared fonts and forms are hashed once per document
+        for i in range(pdf.page_count):
+            page = fdoc[pdf.doc_index(i)]
+            h = hashlib.sha256(model.encode("utf-8"))
+            h.update(f"{tuple(page.rect)}|{page.rotation}".encode("utf-8"))
+            h.update(page.read_contents())
+            h.update(_resolve(fdoc, _page_resources(fdoc, page.xref), memo, set()))
+            keys.append(h.hexdigest())
+    return keys
+
+
+def extract_pages(pdf: PdfSource, page_indices: List[int]) -> bytes:
+    """Build a new PDF holding only the given 0-based pages, in order."""
+    with as_session(pdf) as session:
+        return session.pdf_bytes(page_indices)
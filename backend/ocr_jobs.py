@@ -0,0 +1,439 @@
+"""
+OCR Jobs Module - Background job queue for the /ocr/underwrite pipeline
+
+Submitting an upload in job mode stores the file and a small JSON state
+record under data/ocr_jobs (next to data/deals_v2) and returns a job id
+straight away. A fixed number of asyncio workers pull jobs off the queue
+and run the underwriting pipeline; clients poll the job's state and fetch
+the finished result when it is done.
+
+Because state and uploads live on disk, jobs that were queued or running
+when the process stopped are picked up again on the next startup (up to
+OCR_JOB_MAX_ATTEMPTS times). Finished jobs are pruned after
+OCR_JOB_TTL_HOURS, at startup and then every OCR_JOB_PRUNE_SECONDS.
+
+State is written on status and stage changes only, off the event loop;
+saves requested while one is being written collapse into one more write.
+
+Each job also keeps an ordered event log (stage_start / stage_end with
+timings, partial results as soon as a stage produces them, and a final
+succeeded / failed event) that `events()` replays and then follows live,
+for the Server-Sent Events progress stream. Live subscribers read the
+in-memory log; partial results reach disk with the next stage change.
+
+Config:
+    OCR_JOB_WORKERS        concurrent pipeline runs (default 2)
+    OCR_JOB_MAX_QUEUE      queued jobs accepted before submit is refused (default 100)
+    OCR_JOB_MAX_ATTEMPTS   runs per job across restarts (default 3)
+    OCR_JOB_TTL_HOURS      how long finished jobs are kept (default 24)
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from upload_spool import SpooledUpload
+
+log = logging.getLogger("ocr_jobs")
+
+OCR_JOBS_DIR = Path(os.getenv("OCR_JOBS_DIR") or Path(__file__).resolve().parent / "data" / "ocr_jobs")
+OCR_JOB_WORKERS = int(os.getenv("OCR_JOB_WORKERS", "2"))
+OCR_JOB_MAX_QUEUE = int(os.getenv("OCR_JOB_MAX_QUEUE", "100"))
+OCR_JOB_MAX_ATTEMPTS = int(os.getenv("OCR_JOB_MAX_ATTEMPTS", "3"))
+OCR_JOB_TTL_HOURS = float(os.getenv("OCR_JOB_TTL_HOURS", "24"))
+OCR_JOB_HEARTBEAT_SECONDS = 15.0
+OCR_JOB_PRUNE_SECONDS = 600.0
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = {SUCCEEDED, FAILED}
+
+# progress(stage, partial=None): entering a new stage closes the previous
+# one; `partial` attaches an interim result to the current stage.
+Progress = Callable[..., None]
+
+# runner(data, mime, file_name, params, progress) -> result dict; data is the
+# upload as a read-only buffer (memory-mapped), not bytes
+JobRunner = Callable[[memoryview, str, Optional[str], Dict[str, Any], Progress], Awaitable[Dict[str, Any]]]
+
+
+class JobQueueFull(Exception):
+    """Raised by submit() when the queue already holds OCR_JOB_MAX_QUEUE jobs."""
+
+
+def _now() -> float:
+    return round(time.time(), 3)
+
+
+class JobManager:
+    """Disk-persisted job records plus a bounded pool of asyncio workers."""
+
+    def __init__(self, root: Path, workers: int = OCR_JOB_WORKERS, max_queue: int = OCR_JOB_MAX_QUEUE):
+        self.root = Path(root)
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self._runner: Optional[JobRunner] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._writes: Dict[str, asyncio.Task] = {}
+        self._dirty: Set[str] = set()
+        self._pruned_at = 0.0
+
+    # ---------- storage ----------
+    def _state_path(self, job_id: str) -> Path:
+        return self.root / f"{job_id}.json"
+
+    def _upload_path(self, job_id: str) -> Path:
+        return self.root / f"{job_id}.upload"
+
+    def _result_path(self, job_id: str) -> Path:
+        return self.root / f"{job_id}.result.json"
+
+    def _write_text(self, path: Path, text: str) -> None:
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def _write_json(self, path: Path, payload: Dict[str, Any]) -> None:
+        self._write_text(path, json.dumps(payload, ensure_ascii=False, default=str))
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        job["updated_at"] = _now()
+        self._write_json(self._state_path(job["id"]), job)
+
+    def _save_soon(self, job: Dict[str, Any]) -> None:
+        """Persist `job` from a background write; a save asked for mid-write becomes one more write."""
+        job["updated_at"] = _now()
+        if job["id"] in self._writes:
+            self._dirty.add(job["id"])
+            return
+        self._writes[job["id"]] = asyncio.get_running_loop().create_task(self._flush(job))
+
+    async def _flush(self, job: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                # Serialized here, on the loop, so the worker thread never sees the dict change
+                text = json.dumps(job, ensure_ascii=False, default=str)
+                await loop.run_in_executor(None, self._write_text, self._state_path(job["id"]), text)
+                if job["id"] not in self._dirty:
+                    break
+                self._dirty.discard(job["id"])
+        except Exception as e:
+            log.warning("Could not save OCR job %s: %s", job["id"], e)
+        finally:
+            self._writes.pop(job["id"], None)
+            self._dirty.discard(job["id"])
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        path = self._state_path(job_id)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            log.warning("Unreadable job state %s: %s", path.name, e)
+            return None
+
+    def _delete(self, job_id: str) -> None:
+        for path in (self._state_path(job_id), self._upload_path(job_id), self._result_path(job_id)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        self._jobs.pop(job_id, None)
+
+    def _expired(self) -> List[str]:
+        cutoff = time.time() - OCR_JOB_TTL_HOURS * 3600
+        return [
+            job_id for job_id, job in self._jobs.items()
+            if job.get("status") in FINISHED and (job.get("finished_at") or 0) < cutoff
+            and job_id not in self._writes
+        ]
+
+    async def prune(self) -> int:
+        """Delete finished jobs older than OCR_JOB_TTL_HOURS; returns how many went."""
+        self._pruned_at = time.time()
+        expired = self._expired()
+        if expired:
+            for job_id in expired:
+                self._jobs.pop(job_id, None)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, lambda: [self._delete(job_id) for job_id in expired])
+            log.info("Pruned %d finished OCR job(s)", len(expired))
+        return len(expired)
+
+    # ---------- lifecycle ----------
+    def set_runner(self, runner: JobRunner) -> None:
+        self._runner = runner
+
+    async def start(self) -> None:
+        """Create the queue, re-enqueue unfinished jobs from disk and start workers and the pruner."""
+        if self._tasks:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._queue = asyncio.Queue()
+        self._recover()
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(i), name=f"ocr-job-worker-{i}"))
+        self._tasks.append(asyncio.create_task(self._janitor(), name="ocr-job-janitor"))
+        log.info("OCR job workers started: %d (queue depth %d)", self.workers, self._queue.qsize())
+
+    async def stop(self) -> None:
+        """Cancel workers. Jobs that were running stay 'running' on disk and resume on next start."""
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.gather(*self._writes.values(), return_exceptions=True)
+
+    def _recover(self) -> None:
+        cutoff = time.time() - OCR_JOB_TTL_HOURS * 3600
+        pending = []
+        for path in self.root.glob("*.json"):
+            if path.name.endswith(".result.json"):
+                continue
+            job = self._load(path.stem)
+            if not job:
+                continue
+            if job.get("status") in FINISHED:
+                if (job.get("finished_at") or 0) < cutoff:
+                    self._delete(job["id"])
+                else:
+                    self._jobs[job["id"]] = job
+                continue
+            if not self._upload_path(job["id"]).exists():
+                self._fail(job, "Upload missing after restart", 500)
+                continue
+            if job.get("attempts", 0) >= OCR_JOB_MAX_ATTEMPTS:
+                self._fail(job, f"Gave up after {job['attempts']} attempts", 500)
+                continue
+            job["status"] = QUEUED
+            job["stage"] = "queued"
+            self._jobs[job["id"]] = job
+            self._save(job)
+            pending.append(job)
+        for job in sorted(pending, key=lambda j: j.get("created_at") or 0):
+            self._queue.put_nowait(job["id"])
+        self._pruned_at = time.time()
+        if pending:
+            log.info("Recovered %d unfinished OCR job(s)", len(pending))
+
+    # ---------- public API ----------
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, data, mime: str, file_name: Optional[str], params: Dict[str, Any]) -> Dict[str, Any]:
+        if self._queue is None:
+            await self.start()
+        if self._queue.qsize() >= self.max_queue:
+            raise JobQueueFull(f"OCR job queue is full ({self.max_queue} jobs)")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": QUEUED,
+            "stage": "queued",
+            "stages": [],
+            "events": [],
+            "file_name": file_name,
+            "mime": mime,
+            "size_bytes": len(data),
+            "params": params,
+            "attempts": 0,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "error_status": None,
+        }
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._upload_path(job_id).write_bytes, data)
+        self._emit(job, "queued", {"queue_depth": self._queue.qsize() + 1})
+        await loop.run_in_executor(None, self._save, job)  # not shared with anything yet
+        self._jobs[job_id] = job
+        self._queue.put_nowait(job_id)
+        return self.public_view(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id) or self._load(job_id)
+        return self.public_view(job) if job else None
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        path = self._result_path(job_id)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def public_view(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        view = {k: v for k, v in job.items() if k not in ("params", "events")}
+        if job.get("status") == QUEUED and self._queue is not None:
+            view["queue_depth"] = self._queue.qsize()
+        return view
+
+    async def events(self, job_id: str, after: int = -1) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Replay a job's events with id > `after`, then follow new ones live.
+
+        Yields None as a heartbeat when nothing has happened for a while and
+        stops after the job's succeeded / failed event.
+        """
+        job = self._jobs.get(job_id) or self._load(job_id)
+        if not job:
+            return
+        q: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(q)
+        try:
+            for ev in list(job.get("events") or []):
+                if ev["id"] > after:
+                    after = ev["id"]
+                    yield ev
+            if job.get("status") in FINISHED:
+                return
+            while True:
+                try:
+                    ev = await asyncio.wait_for(q.get(), timeout=OCR_JOB_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if ev["id"] <= after:
+                    continue
+                after = ev["id"]
+                yield ev
+                if ev["event"] in FINISHED:
+                    return
+        finally:
+            subs = self._subscribers.get(job_id) or []
+            if q in subs:
+                subs.remove(q)
+            if not subs:
+                self._subscribers.pop(job_id, None)
+
+    # ---------- worker ----------
+    def _emit(self, job: Dict[str, Any], event: str, data: Dict[str, Any]) -> None:
+        events = job.setdefault("events", [])
+        # Snapshot now: partials are live pipeline dicts that keep changing.
+        data = json.loads(json.dumps(data, default=str))
+        ev = {"id": len(events), "event": event, "at": _now(), "data": data}
+        events.append(ev)
+        for q in self._subscribers.get(job["id"]) or []:
+            q.put_nowait(ev)
+
+    def _fail(self, job: Dict[str, Any], message: str, status_code: int) -> None:
+        job["status"] = FAILED
+        job["stage"] = "failed"
+        job["error"] = message
+        job["error_status"] = status_code
+        job["finished_at"] = _now()
+        self._jobs[job["id"]] = job
+        self._emit(job, FAILED, {"error": message, "status": status_code})
+        self._save_soon(job)
+        try:
+            self._upload_path(job["id"]).unlink()
+        except FileNotFoundError:
+            pass
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("OCR job worker %d crashed on %s", n, job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _janitor(self) -> None:
+        while True:
+            await asyncio.sleep(max(0.0, self._pruned_at + OCR_JOB_PRUNE_SECONDS - time.time()))
+            try:
+                await self.prune()
+            except Exception:
+                log.exception("OCR job prune failed")
+                self._pruned_at = time.time()
+
+    async def _run(self, job_id: str) -> None:
+        job = self._jobs.get(job_id) or self._load(job_id)
+        if not job or job.get("status") in FINISHED:
+            return
+        if self._runner is None:
+            self._fail(job, "No pipeline runner configured", 500)
+            return
+
+        loop = asyncio.get_running_loop()
+        # Memory-mapped, not read: a queued 50 MB OM stays out of the heap
+        upload = await loop.run_in_executor(None, SpooledUpload.open, str(self._upload_path(job_id)))
+
+        job["status"] = RUNNING
+        job["attempts"] = job.get("attempts", 0) + 1
+        job["started_at"] = _now()
+        job["stages"] = []
+        self._emit(job, "started", {"attempt": job["attempts"]})
+        self._save_soon(job)
+
+        def end_stage(now: float) -> None:
+            if job["stages"] and "seconds" not in job["stages"][-1]:
+                last = job["stages"][-1]
+                last["seconds"] = round(now - last["at"], 3)
+                self._emit(job, "stage_end", {"stage": last["stage"], "seconds": last["seconds"]})
+
+        def progress(stage: str, partial: Optional[Dict[str, Any]] = None) -> None:
+            if stage != job.get("stage") or not job["stages"]:
+                now = _now()
+                end_stage(now)
+                job["stages"].append({"stage": stage, "at": now})
+                job["stage"] = stage
+                self._emit(job, "stage_start", {"stage": stage})
+                self._save_soon(job)
+            if partial:
+                self._emit(job, "partial", {"stage": stage, **partial})
+
+        try:
+            result = await self._runner(upload.view, job["mime"], job.get("file_name"), job.get("params") or {}, progress)
+        except asyncio.CancelledError:
+            # Shutdown mid-run: leave the job 'running' so startup recovery re-queues it.
+            raise
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            self._fail(job, str(detail)[:1000], getattr(e, "status_code", 500))
+            log.warning("OCR job %s failed: %s", job_id, detail)
+            return
+        finally:
+            upload.close()
+
+        try:
+            await loop.run_in_executor(None, self._write_json, self._result_path(job_id), result)
+        except Exception as e:
+            # Disk full or an unserializable result: fail the job rather than leave it 'running'
+            self._fail(job, f"Could not store the result: {e}"[:1000], 500)
+            log.warning("OCR job %s result not stored: %s", job_id, e)
+            return
+        end_stage(_now())
+        job["status"] = SUCCEEDED
+        job["stage"] = "done"
+        job["finished_at"] = _now()
+        self._emit(job, SUCCEEDED, {
+            "seconds": round(job["finished_at"] - job["started_at"], 3),
+            "deal_id": result.get("deal_id") if isinstance(result, dict) else None,
+        })
+        self._save_soon(job)
+        try:
+            self._upload_path(job_id).unlink()
+        except FileNotFoundError:
+            pass
+
+
+OCR_JOBS = JobManager(OCR_JOBS_DIR)
@@ -9,6 +9,8 @@ from anthropic import Anthropic
 from dotenv import load_dotenv
 import fitz  # PyMuPDF
 
+from ocr_batches import ocr_in_batches, should_batch, BatchPageMismatch
+
 load_dotenv()
 
 # API Configuration
@@ -50,24 +52,40 @@ class RealEstateParser:
         b64 = base64.b64encode(file_bytes).decode('utf-8')
         return f"data:{mime_type};base64,{b64}"
     
+    def _ocr_data_url(self, data_url: str) -> Dict[str, Any]:
+        """Single Mistral OCR request for a data URL"""
+        response = self.mistral.ocr.process(
+            model="mistral-ocr-latest",
+            document={
+                "type": "document_url",
+                "document_url": data_url
+            },
+            include_image_base64=False
+        )
+        return json.loads(response.model_dump_json())
+
     def extract_text_with_ocr(self, file_path: str) -> Dict[str, Any]:
         """Extract text from document using Mistral OCR"""
         try:
-            # Convert file to data URL
-            data_url = self.file_to_base64_url(file_path)
-            
-            # Call Mistral OCR
-            response = self.mistral.ocr.process(
-                model="mistral-ocr-latest",
-                document={
-                    "type": "document_url",
-                    "document_url": data_url
-                },
-                include_image_base64=False
-            )
-            
-            # Convert response to dict
-            ocr_result = json.loads(response.model_dump_json())
+            # Large PDFs are OCR'd as concurrent page batches
+            ocr_result = None
+            if Path(file_path).suffix.lower() == '.pdf':
+                with open(file_path, "rb") as f:
+                    pdf_bytes = f.read()
+                if should_batch(pdf_bytes):
+                    try:
+                        ocr_result = ocr_in_batches(
+                            pdf_bytes,
+                            lambda sub: self._ocr_data_url(
+                                f"data:application/pdf;base64,{base64.b64encode(sub).decode('utf-8')}"
+                            ),
+                            provider="mistral",
+                        )
+                    except BatchPageMismatch as e:
+                        print(f"OCR batch page mismatch ({e}); retrying as a single request")
+
+            if ocr_result is None:
+                ocr_result = self._ocr_data_url(self.file_to_base64_url(file_path))
             
             # Extract markdown text from pages
             markdown_text = ""
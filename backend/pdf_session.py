@@ -0,0 +1,250 @@
+"""
+PDF Session Module - One parsed PyMuPDF handle per uploaded PDF
+
+An upload used to be parsed again by every stage that touched it: pypdf
+to slice pages, PyMuPDF for OCR cache fingerprints and batch splitting,
+PyMuPDF again for page scoring, poppler (pdf2image) for rendering and
+once more for image extraction. A PdfSession parses the bytes once and
+serves all of those from the one document handle:
+
+- The document is opened straight over the upload buffer (no copy) on
+  first use, so a PDF that is only forwarded is never parsed.
+- `select(indices)` narrows the session to a page subset without writing
+  anything; `pdf_bytes()` writes the subset out only when a provider
+  actually needs a file.
+- `text(i)` is cached per page, `render(i, dpi)` returns a PIL image,
+  `document()` exposes the handle for fingerprinting and image extraction.
+  Page numbers are always relative to the session's own pages.
+
+`render_many(indices, dpi)` renders several pages at once: past
+PDF_RENDER_PARALLEL_PAGES pages (and with more than one "render" worker)
+the pages are split into one contiguous group per worker, each group is
+written out as a small PDF and rasterized on the "render" process pool
+(provider_pool), since pixmap rendering holds the GIL.
+
+PyMuPDF documents are not thread-safe, so all access to a handle is
+serialized by its lock. Handles are reference counted: a session owns one
+reference (closed on `close()` / leaving a `with`), `retain()` hands
+another to background work, and views from `select()` borrow the
+reference of the session they came from. Functions that accept either PDF
+bytes or a session use `as_session` to wrap bytes in a temporary one.
+
+Config:
+    PDF_RENDER_PARALLEL_PAGES   fewest pages rendered on the process pool (default 6)
+    PROCESS_POOL_SIZE_RENDER    render workers (default: provider_pool's PROCESS_POOL_SIZE)
+"""
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import fitz  # PyMuPDF
+
+from provider_pool import get_process_pool, process_pool_size
+
+log = logging.getLogger("pdf_session")
+
+PDF_RENDER_PARALLEL_PAGES = int(os.getenv("PDF_RENDER_PARALLEL_PAGES", "6"))
+
+PdfSource = Union[bytes, memoryview, "PdfSession"]
+
+
+def _render_pages(pdf: bytes, dpi: int) -> List[Tuple[int, int, bytes]]:
+    """Process-pool worker: (width, height, RGB samples) for every page of `pdf`."""
+    doc = fitz.open(stream=pdf, filetype="pdf")
+    try:
+        out = []
+        for page in doc:
+            pix = page.get_pixmap(dpi=dpi, alpha=False)
+            out.append((pix.width, pix.height, pix.samples))
+        return out
+    finally:
+        doc.close()
+
+
+class _Handle:
+    """The shared fitz.Document behind one upload and its views."""
+
+    def __init__(self, data: Union[bytes, memoryview]):
+        self.data = data
+        self.lock = threading.RLock()
+        self.refs = 1
+        self.texts: Dict[int, str] = {}
+        self._doc: Optional[fitz.Document] = None
+
+    def open(self) -> fitz.Document:
+        # Caller holds the lock.
+        if self.refs <= 0:
+            raise ValueError("PDF session is closed")
+        if self._doc is None:
+            self._doc = fitz.open(stream=self.data, filetype="pdf")
+        return self._doc
+
+    def release(self) -> None:
+        with self.lock:
+            self.refs -= 1
+            if self.refs <= 0 and self._doc is not None:
+                self._doc.close()
+                self._doc = None
+                self.texts.clear()
+
+
+class PdfSession:
+    """A parsed PDF, or a page subset of one."""
+
+    def __init__(self, data: Union[bytes, memoryview], *, _handle: Optional[_Handle] = None,
+                 _pages: Optional[List[int]] = None, _owner: bool = True):
+        self._h = _handle or _Handle(data)
+        self._pages = _pages  # document page indices; None = every page
+        self._owner = _owner
+        self._closed = False
+        self._bytes = self._h.data if _pages is None else None
+
+    def __enter__(self) -> "PdfSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release this session's reference; the document closes with the last one."""
+        if self._owner and not self._closed:
+            self._closed = True
+            self._h.release()
+
+    def retain(self) -> "PdfSession":
+        """Another owning reference to the same pages, for work that outlives this one."""
+        with self._h.lock:
+            if self._h.refs <= 0:
+                raise ValueError("PDF session is closed")
+            self._h.refs += 1
+        other = PdfSession(self._h.data, _handle=self._h, _pages=self._pages)
+        other._bytes = self._bytes
+        return other
+
+    @property
+    def page_count(self) -> int:
+        if self._pages is not None:
+            return len(self._pages)
+        with self._h.lock:
+            return self._h.open().page_count
+
+    @property
+    def built_size(self) -> Optional[int]:
+        """len(pdf_bytes()) if those bytes already exist (always for a whole document), else None."""
+        return None if self._bytes is None else len(self._bytes)
+
+    def doc_index(self, i: int) -> int:
+        """Document page index of this session's page `i`."""
+        return self._pages[i] if self._pages is not None else i
+
+    def select(self, indices: Iterable[int]) -> "PdfSession":
+        """A view of pages `indices` (in the given order); valid while this session is open."""
+        pages = [self.doc_index(i) for i in indices]
+        with self._h.lock:
+            total = self._h.open().page_count
+        for p in pages:
+            if not 0 <= p < total:
+                raise IndexError(f"page index {p} out of range (doc has {total} pages)")
+        if pages == list(range(total)):
+            pages = None
+        return PdfSession(self._h.data, _handle=self._h, _pages=pages, _owner=False)
+
+    @contextmanager
+    def document(self) -> Iterator[fitz.Document]:
+        """The underlying fitz.Document, held under the handle lock; map pages with `doc_index`."""
+        with self._h.lock:
+            yield self._h.open()
+
+    def pdf_bytes(self, indices: Optional[Iterable[int]] = None) -> Union[bytes, memoryview]:
+        """This session's pages (or pages `indices` of it) as a standalone PDF.
+
+        The whole document comes back as the buffer it was opened from (a
+        memory-mapped upload stays a mapping), so treat it as bytes-like.
+        """
+        if indices is not None:
+            return self.select(indices).pdf_bytes()
+        if self._bytes is None:
+            with self._h.lock:
+                src = self._h.open()
+                out = fitz.open()
+                try:
+                    # Contiguous runs go in one insert_pdf call each.
+                    run_start = prev = None
+                    for p in self._pages + [None]:
+                        if run_start is not None and p == prev + 1:
+                            prev = p
+                            continue
+                        if run_start is not None:
+                            out.insert_pdf(src, from_page=run_start, to_page=prev)
+                        run_start = prev = p
+                    self._bytes = out.tobytes(garbage=3, deflate=True)
+                finally:
+                    out.close()
+        return self._bytes
+
+    def text(self, i: int) -> str:
+        """Plain text of page `i` (cached on the handle)."""
+        p = self.doc_index(i)
+        with self._h.lock:
+            cached = self._h.texts.get(p)
+            if cached is None:
+                cached = self._h.open()[p].get_text()
+                self._h.texts[p] = cached
+            return cached
+
+    def render(self, i: int, dpi: int = 100):
+        """Page `i` rasterized at `dpi` as an RGB PIL image."""
+        from PIL import Image
+
+        with self._h.lock:
+            pix = self._h.open()[self.doc_index(i)].get_pixmap(dpi=dpi, alpha=False)
+            return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+    def render_many(self, indices: Iterable[int], dpi: int = 100) -> list:
+        """Pages `indices` rasterized at `dpi`, in order; large batches go to the render pool."""
+        from PIL import Image
+
+        indices = list(indices)
+        workers = min(process_pool_size("render"), len(indices))
+        if len(indices) < PDF_RENDER_PARALLEL_PAGES or workers < 2:
+            return [self.render(i, dpi) for i in indices]
+        step = -(-len(indices) // workers)
+        groups = [indices[i:i + step] for i in range(0, len(indices), step)]
+        try:
+            pool = get_process_pool("render")
+            futures = [pool.submit(_render_pages, bytes(self.pdf_bytes(g)), dpi) for g in groups]
+            pages = [page for fut in futures for page in fut.result()]
+        except Exception as e:
+            log.warning("Parallel render failed, rendering serially: %s", e)
+            return [self.render(i, dpi) for i in indices]
+        return [Image.frombytes("RGB", (w, h), samples) for w, h, samples in pages]
+
+
+@contextmanager
+def as_session(pdf: PdfSource) -> Iterator[PdfSession]:
+    """`pdf` itself if it is a session, else a temporary session over the bytes."""
+    if isinstance(pdf, PdfSession):
+        yield pdf
+        return
+    session = PdfSession(pdf)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@contextmanager
+def open_upload(data: Union[bytes, memoryview], mime: str) -> Iterator[Union[bytes, memoryview, PdfSession]]:
+    """A PdfSession for PDF uploads (closed on exit); other uploads pass through as they are."""
+    if mime != "application/pdf":
+        yield data
+        return
+    with PdfSession(data) as session:
+        yield session
+
+
+def source_bytes(doc: PdfSource) -> Union[bytes, memoryview]:
+    """The bytes to send to a provider for `doc`."""
+    return doc.pdf_bytes() if isinstance(doc, PdfSession) else doc
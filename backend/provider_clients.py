@@ -0,0 +1,149 @@
+"""
+Provider Clients Module - Process-wide pooled LLM SDK and HTTP clients
+
+Handlers used to build a fresh `Anthropic(...)` or `httpx.AsyncClient()`
+per request, so every provider call paid for DNS, TCP and a TLS handshake
+before sending a byte. This registry hands out long-lived clients instead:
+
+- `get_http_client(name)` / `get_async_http_client(name)`: one httpx client
+  per provider name ("perplexity", "rentcast", "mistral", ...) with keep-alive
+  connection pools and HTTP/2 when the `h2` package is installed. Pass
+  per-call timeouts to `.get/.post(timeout=...)`; the client default is
+  HTTP_TIMEOUT_S. Async clients are bound to the event loop that created
+  them and rebuilt if a different loop asks.
+- `get_anthropic_client()` / `get_openai_client()`: SDK clients cached per
+  API key (read from the environment when not given), on the SDKs' own
+  httpx client classes with the same pool limits.
+
+`close_clients()` (called from the app's shutdown hook) closes everything.
+
+Config:
+    HTTP_MAX_CONNECTIONS       connections per client (default 100)
+    HTTP_MAX_KEEPALIVE         idle keep-alive connections per client (default 20)
+    HTTP_KEEPALIVE_EXPIRY_S    idle connection lifetime (default 30)
+    HTTP_TIMEOUT_S             default request timeout (default 60)
+    HTTP2_ENABLED              use HTTP/2 where available (default 1)
+"""
+import os
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+log = logging.getLogger("provider_clients")
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY_S = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", "30"))
+HTTP_TIMEOUT_S = float(os.getenv("HTTP_TIMEOUT_S", "60"))
+
+try:
+    import h2  # noqa: F401
+    _H2_AVAILABLE = True
+except ImportError:
+    _H2_AVAILABLE = False
+HTTP2 = _H2_AVAILABLE and os.getenv("HTTP2_ENABLED", "1").lower() not in ("0", "false", "no")
+
+_LOCK = threading.Lock()
+_SYNC: Dict[str, httpx.Client] = {}
+_ASYNC: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+_SDK: Dict[Tuple[str, str], Any] = {}
+
+
+def limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+    )
+
+
+def get_http_client(name: str = "default") -> httpx.Client:
+    """Shared synchronous client for `name` (thread-safe)."""
+    client = _SYNC.get(name)
+    if client is None or client.is_closed:
+        with _LOCK:
+            client = _SYNC.get(name)
+            if client is None or client.is_closed:
+                client = httpx.Client(timeout=HTTP_TIMEOUT_S, limits=limits(), http2=HTTP2)
+                _SYNC[name] = client
+    return client
+
+
+def get_async_http_client(name: str = "default") -> httpx.AsyncClient:
+    """Shared async client for `name` on the running event loop."""
+    loop = asyncio.get_running_loop()
+    entry = _ASYNC.get(name)
+    if entry is None or entry[0] is not loop or entry[1].is_closed:
+        with _LOCK:
+            entry = _ASYNC.get(name)
+            if entry is None or entry[0] is not loop or entry[1].is_closed:
+                # A client from another (finished) loop can't be reused or awaited here.
+                entry = (loop, httpx.AsyncClient(timeout=HTTP_TIMEOUT_S, limits=limits(), http2=HTTP2))
+                _ASYNC[name] = entry
+    return entry[1]
+
+
+def _env_key(*names: str) -> Optional[str]:
+    for n in names:
+        if os.getenv(n):
+            return os.getenv(n)
+    return None
+
+
+def _sdk(provider: str, api_key: str, build):
+    key = (provider, api_key)
+    client = _SDK.get(key)
+    if client is None:
+        with _LOCK:
+            client = _SDK.get(key)
+            if client is None:
+                client = build()
+                _SDK[key] = client
+    return client
+
+
+def get_anthropic_client(api_key: Optional[str] = None):
+    """Shared Anthropic client (ANTHROPIC_API_KEY / CLAUDE_API_KEY by default)."""
+    import anthropic
+
+    api_key = api_key or _env_key("ANTHROPIC_API_KEY", "CLAUDE_API_KEY")
+    if not api_key:
+        raise RuntimeError("Missing Anthropic API key. Set ANTHROPIC_API_KEY (or CLAUDE_API_KEY).")
+    return _sdk("anthropic", api_key, lambda: anthropic.Anthropic(
+        api_key=api_key, http_client=anthropic.DefaultHttpxClient(limits=limits(), http2=HTTP2),
+    ))
+
+
+def get_openai_client(api_key: Optional[str] = None):
+    """Shared OpenAI client (OPENAI_API_KEY by default)."""
+    import openai
+
+    api_key = api_key or _env_key("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("Missing OpenAI API key. Set OPENAI_API_KEY.")
+    return _sdk("openai", api_key, lambda: openai.OpenAI(
+        api_key=api_key, http_client=openai.DefaultHttpxClient(limits=limits(), http2=HTTP2),
+    ))
+
+
+async def close_clients() -> None:
+    """Close every pooled client; later calls build fresh ones."""
+    with _LOCK:
+        sync = list(_SYNC.values())
+        async_entries = list(_ASYNC.values())
+        sdks = list(_SDK.values())
+        _SYNC.clear()
+        _ASYNC.clear()
+        _SDK.clear()
+    loop = asyncio.get_running_loop()
+    for owner, client in async_entries:
+        if owner is loop:
+            await client.aclose()
+    for client in sync + sdks:
+        try:
+            client.close()
+        except Exception as e:
+            log.warning("Error closing %s: %s", type(client).__name__, e)
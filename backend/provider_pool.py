@@ -0,0 +1,124 @@
+"""
+Provider Pool Module - Bounded thread pools for blocking LLM/OCR SDK calls
+
+The Mistral, Anthropic and OpenAI SDK clients used across the backend are
+synchronous. Calling them directly from an `async def` handler blocks the
+event loop for the whole round trip, so every provider call goes through
+`run_blocking(provider, fn, ...)`, which runs it on that provider's own
+thread pool and awaits the result.
+
+Pool sizes are configurable per provider:
+    PROVIDER_POOL_SIZE            default size for every pool (16)
+    PROVIDER_POOL_SIZE_MISTRAL    override for the "mistral" pool
+    PROVIDER_POOL_SIZE_ANTHROPIC  override for the "anthropic" pool
+    ...
+
+Fan-out work (OCR page batches, image uploads) additionally holds a
+per-provider semaphore from `concurrency_limit(provider)` so one request
+can't flood a provider:
+    PROVIDER_CONCURRENCY          default in-flight cap (4)
+    PROVIDER_CONCURRENCY_<NAME>   override, e.g. PROVIDER_CONCURRENCY_MISTRAL
+
+CPU-bound work (thumbnail encoding, page rendering) runs on named process
+pools from `get_process_pool(name)`, started with the "spawn" method so
+workers never inherit the server's threads or locks:
+    PROCESS_POOL_SIZE             default worker count (CPU count)
+    PROCESS_POOL_SIZE_<NAME>      override, e.g. PROCESS_POOL_SIZE_THUMBNAILS
+"""
+import os
+import asyncio
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+DEFAULT_POOL_SIZE = int(os.getenv("PROVIDER_POOL_SIZE", "16"))
+DEFAULT_CONCURRENCY = int(os.getenv("PROVIDER_CONCURRENCY", "4"))
+DEFAULT_PROCESS_POOL_SIZE = int(os.getenv("PROCESS_POOL_SIZE", "0")) or (os.cpu_count() or 2)
+
+_POOLS: Dict[str, ThreadPoolExecutor] = {}
+_POOLS_LOCK = threading.Lock()
+_LIMITS: Dict[str, threading.BoundedSemaphore] = {}
+_PROCESS_POOLS: Dict[str, ProcessPoolExecutor] = {}
+
+
+def pool_size(provider: str) -> int:
+    """Configured worker count for a provider's pool."""
+    raw = os.getenv(f"PROVIDER_POOL_SIZE_{provider.upper()}")
+    try:
+        return max(1, int(raw)) if raw else max(1, DEFAULT_POOL_SIZE)
+    except ValueError:
+        return max(1, DEFAULT_POOL_SIZE)
+
+
+def get_pool(provider: str) -> ThreadPoolExecutor:
+    """Return (creating on first use) the executor for a provider."""
+    pool = _POOLS.get(provider)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.get(provider)
+            if pool is None:
+                pool = ThreadPoolExecutor(
+                    max_workers=pool_size(provider),
+                    thread_name_prefix=f"{provider}-call",
+                )
+                _POOLS[provider] = pool
+    return pool
+
+
+def concurrency_limit(provider: str) -> threading.BoundedSemaphore:
+    """Process-wide semaphore capping in-flight fan-out requests to a provider."""
+    sem = _LIMITS.get(provider)
+    if sem is None:
+        with _POOLS_LOCK:
+            sem = _LIMITS.get(provider)
+            if sem is None:
+                raw = os.getenv(f"PROVIDER_CONCURRENCY_{provider.upper()}")
+                try:
+                    n = int(raw) if raw else DEFAULT_CONCURRENCY
+                except ValueError:
+                    n = DEFAULT_CONCURRENCY
+                sem = threading.BoundedSemaphore(max(1, n))
+                _LIMITS[provider] = sem
+    return sem
+
+
+def process_pool_size(name: str) -> int:
+    """Configured worker count for a named process pool."""
+    raw = os.getenv(f"PROCESS_POOL_SIZE_{name.upper()}")
+    try:
+        return max(1, int(raw)) if raw else max(1, DEFAULT_PROCESS_POOL_SIZE)
+    except ValueError:
+        return max(1, DEFAULT_PROCESS_POOL_SIZE)
+
+
+def get_process_pool(name: str) -> ProcessPoolExecutor:
+    """Return (creating on first use) a named process pool for CPU-bound work."""
+    pool = _PROCESS_POOLS.get(name)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _PROCESS_POOLS.get(name)
+            if pool is None:
+                pool = ProcessPoolExecutor(
+                    max_workers=process_pool_size(name),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                _PROCESS_POOLS[name] = pool
+    return pool
+
+
+async def run_blocking(provider: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking provider call on its pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(provider), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_pools() -> None:
+    """Stop all pools; queued calls are cancelled, running ones finish."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values()) + list(_PROCESS_POOLS.values())
+        _POOLS.clear()
+        _PROCESS_POOLS.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,238 @@
+"""
+Response Slimming Module - Compression negotiation, field projection and
+server-side raw OCR markdown
+
+- CompressionMiddleware compresses JSON/text responses above
+  RESPONSE_COMPRESS_MIN_BYTES with brotli (when the `brotli` package is
+  installed and the client accepts it) or gzip. Server-Sent Event streams
+  and responses that already carry a Content-Encoding pass through untouched.
+- project(payload, fields) trims a response to the dotted paths listed in
+  a `fields=` parameter, e.g. `fields=deal_id,parsed.pricing_financing`.
+- The raw OCR markdown of an underwritten OM is kept on disk, gzip-encoded,
+  under data/ocr_markdown and served on request by
+  GET /ocr/deals/{deal_id}/markdown instead of inline in every response.
+  The store is a size-capped LRU (ocr_cache.PageCache), so a deal's
+  raw_markdown_url answers 404 once its markdown has been evicted.
+
+Config:
+    RESPONSE_COMPRESS_MIN_BYTES   smallest body worth compressing (default 1024)
+    RESPONSE_GZIP_LEVEL           gzip level (default 6)
+    RESPONSE_BROTLI_QUALITY       brotli quality (default 5)
+    OCR_MARKDOWN_DIR              where raw markdown is stored
+    OCR_MARKDOWN_MAX_MB           raw markdown store size cap (default 256)
+"""
+import os
+import gzip
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ocr_cache import PageCache
+
+try:
+    import brotli  # type: ignore
+    HAS_BROTLI = True
+except ImportError:
+    brotli = None
+    HAS_BROTLI = False
+
+log = logging.getLogger("response_slimming")
+
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+OCR_MARKDOWN_DIR = Path(os.getenv("OCR_MARKDOWN_DIR") or Path(__file__).resolve().parent / "data" / "ocr_markdown")
+OCR_MARKDOWN_MAX_BYTES = int(float(os.getenv("OCR_MARKDOWN_MAX_MB", "256")) * 1024 * 1024)
+
+_COMPRESSIBLE = ("application/json", "text/", "application/javascript", "image/svg+xml")
+_NEVER_COMPRESS = ("text/event-stream",)
+
+# Top-level status flags survive any projection so clients can still branch on them.
+_ALWAYS_KEEP = ("ok", "success")
+
+
+# ---------- compression ----------
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}."""
+    out: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for p in params.split(";"):
+            name, _, value = p.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        out[token] = q
+    return out
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported coding the client accepts: br, then gzip."""
+    accepted = accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    for coding in (("br", "gzip") if HAS_BROTLI else ("gzip",)):
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    accepted = accepted_encodings(accept_encoding)
+    return accepted.get("gzip", accepted.get("*", 0.0)) > 0
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for k, v in headers:
+        if k.lower() == name:
+            return v
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware negotiating brotli/gzip for buffered JSON/text responses."""
+
+    def __init__(self, app, minimum_size: int = RESPONSE_COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = dict((k.lower(), v) for k, v in scope.get("headers") or [])
+        coding = choose_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Dict[str, Any]] = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def _send(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers") or [])
+                ctype = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+                if (
+                    _header(headers, b"content-encoding") is not None
+                    or not ctype.startswith(_COMPRESSIBLE)
+                    or ctype.startswith(_NEVER_COMPRESS)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._finish(start, b"".join(chunks), coding, send)
+
+        await self.app(scope, receive, _send)
+
+    async def _finish(self, start: Dict[str, Any], body: bytes, coding: str, send) -> None:
+        headers = [(k, v) for k, v in start.get("headers") or [] if k.lower() != b"content-length"]
+        vary = _header(headers, b"vary")
+        if len(body) >= self.minimum_size:
+            body = compress(body, coding)
+            headers.append((b"content-encoding", coding.encode("latin-1")))
+            etag = _header(headers, b"etag")
+            if etag is not None and not etag.startswith(b"W/"):
+                # The bytes differ from the identity representation.
+                headers = [(k, v) for k, v in headers if k.lower() != b"etag"]
+                headers.append((b"etag", b"W/" + etag))
+        if vary is None:
+            headers.append((b"vary", b"Accept-Encoding"))
+        elif b"accept-encoding" not in vary.lower():
+            headers = [(k, v) for k, v in headers if k.lower() != b"vary"]
+            headers.append((b"vary", vary + b", Accept-Encoding"))
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+# ---------- field projection ----------
+def parse_fields(fields: Optional[str]) -> List[List[str]]:
+    """'a,b.c' -> [['a'], ['b', 'c']]; empty/None -> []."""
+    return [
+        [p for p in f.strip().split(".") if p]
+        for f in (fields or "").split(",")
+        if f.strip().strip(".")
+    ]
+
+
+def _pick(src: Any, path: List[str], dst: Dict[str, Any]) -> None:
+    key, rest = path[0], path[1:]
+    if not isinstance(src, dict) or key not in src:
+        return
+    if not rest:
+        dst[key] = src[key]
+        return
+    if isinstance(dst.get(key), dict) or key not in dst:
+        child = dst.setdefault(key, {})
+        if isinstance(src[key], dict):
+            _pick(src[key], rest, child)
+        if not child:
+            dst.pop(key, None)
+
+
+def project(payload: Any, fields: Optional[str]) -> Any:
+    """Keep only the requested dotted paths of a dict response.
+
+    Unknown paths are ignored; `ok`/`success` are always kept. Without
+    `fields` (or for non-dict payloads) the payload is returned as-is.
+    """
+    paths = parse_fields(fields)
+    if not paths or not isinstance(payload, dict):
+        return payload
+    out: Dict[str, Any] = {k: payload[k] for k in _ALWAYS_KEEP if k in payload}
+    for path in paths:
+        _pick(payload, path, out)
+    return out
+
+
+# ---------- raw OCR markdown ----------
+MARKDOWN_STORE = PageCache(OCR_MARKDOWN_DIR, OCR_MARKDOWN_MAX_BYTES, suffix=".md.gz")
+
+
+def save_markdown(deal_id: str, markdown: str) -> None:
+    """Store a deal's raw OCR markdown gzip-encoded (served as-is to gzip clients).
+
+    Least recently read deals are evicted once the store passes
+    OCR_MARKDOWN_MAX_MB.
+    """
+    MARKDOWN_STORE.put_bytes(
+        deal_id, gzip.compress((markdown or "").encode("utf-8"), compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+    )
+
+
+def load_markdown(deal_id: str) -> Optional[Tuple[bytes, str]]:
+    """(gzip_bytes, etag) for a stored deal, or None (never stored, or evicted)."""
+    data = MARKDOWN_STORE.get_bytes(deal_id)
+    if data is None:
+        return None
+    return data, '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags: Iterable[str] = (t.strip() for t in if_none_match.split(","))
+    return any(t == "*" or t.removeprefix("W/") == etag for t in tags)
@@ -0,0 +1,236 @@
+"""
+Returns Module - Vectorized NPV / IRR / XIRR / equity multiple
+
+One implementation of the return math shared by the deal metrics (scalar
+and batch), cost segregation and the sensitivity / simulation engines.
+Every function takes a single cash-flow series or a 2-D array of series
+(one per row) and solves all rows at once.
+
+IRR:
+- Rows with exactly one sign change (conventional: money in, then money
+  out) have a single rate > -100%, found by safeguarded Newton steps from
+  `guess`.
+- Rows where Newton doesn't converge, and non-conventional rows (several
+  sign changes, so possibly several rates), fall back to bracketed
+  bisection. A grid of rates is scanned for sign changes of NPV, the
+  brackets nearest 0% on either side are bisected and the root closer to
+  0% wins, which is the root numpy_financial.irr picks.
+- Rows with no rate (all flows one sign, no sign change found) are NaN,
+  also as in numpy_financial.
+
+Each row's result depends only on that row, so a deal gets the same IRR
+whether it is solved alone or inside a batch.
+
+benchmarks/bench_returns.py compares against numpy_financial on 100k series.
+"""
+from datetime import date, datetime
+from typing import Any, Optional, Sequence, Union
+
+import numpy as np
+
+ArrayLike = Union[Sequence[float], np.ndarray]
+
+# Rates scanned for sign changes when Newton can't be trusted, dense where
+# real-estate returns live so that two nearby roots rarely share a bracket.
+_BRACKET_GRID = np.concatenate([
+    [-0.999, -0.99, -0.975, -0.95],
+    np.round(np.arange(-0.9, 1.0, 0.025), 3),
+    [1.0, 1.25, 1.5, 2.0, 3.0, 5.0, 10.0, 25.0, 100.0],
+])
+
+
+def _as_2d(cash_flows: ArrayLike):
+    cf = np.asarray(cash_flows, dtype=np.float64)
+    single = cf.ndim == 1
+    return (cf[None, :] if single else cf), single
+
+
+def _ret(values: np.ndarray, single: bool):
+    return float(values[0]) if single else values
+
+
+# ---------- periodic ----------
+def _npv_and_slope(rate: np.ndarray, cf: np.ndarray):
+    """NPV of each row at its rate and dNPV/drate, via Horner in v = 1/(1+r).
+
+    `rate` is (rows,) or (rows, k) for k rates per row.
+    """
+    with np.errstate(all="ignore"):
+        v = 1.0 / (1.0 + rate)
+        cols = cf.reshape(cf.shape + (1,) * (rate.ndim - 1))
+        p = np.broadcast_to(cols[:, -1], v.shape)
+        dp = np.zeros_like(v)
+        for t in range(cf.shape[1] - 2, -1, -1):
+            dp = dp * v + p
+            p = p * v + cols[:, t]
+        return p, -dp * v * v
+
+
+def npv(rate: Union[float, ArrayLike], cash_flows: ArrayLike):
+    """NPV with the first flow at t=0 (numpy_financial convention).
+
+    `rate` is a scalar or one rate per row.
+    """
+    cf, single = _as_2d(cash_flows)
+    rate = np.broadcast_to(np.asarray(rate, dtype=np.float64), (cf.shape[0],))
+    return _ret(_npv_and_slope(rate, cf)[0], single)
+
+
+def sign_changes(cash_flows: ArrayLike) -> np.ndarray:
+    """Number of sign changes per row, ignoring zero flows."""
+    cf, _ = _as_2d(cash_flows)
+    last = np.zeros(cf.shape[0])
+    changes = np.zeros(cf.shape[0], dtype=np.int64)
+    for t in range(cf.shape[1]):
+        s = np.sign(cf[:, t])
+        changes += (s != 0) & (last != 0) & (s != last)
+        last = np.where(s != 0, s, last)
+    return changes
+
+
+def _solve(f, n: int, newton_rows: np.ndarray, guess: float, tol: float, maxiter: int) -> np.ndarray:
+    """Newton on `newton_rows`, then grid bracketing + bisection for the rest.
+
+    `f(rate, rows)` returns (value, slope) for the given row indices.
+    """
+    out = np.full(n, np.nan)
+    with np.errstate(all="ignore"):
+        rows = np.flatnonzero(newton_rows)
+        rate = np.full(rows.size, float(guess))
+        for _ in range(maxiter):
+            if rows.size == 0:
+                break
+            val, slope = f(rate, rows)
+            step = val / slope
+            new = rate - step
+            # Stay inside the domain: never step to or past -100%.
+            new = np.where(new <= -1.0, (rate - 1.0) / 2.0, new)
+            ok = np.isfinite(new)
+            done = ok & (np.abs(new - rate) <= tol * (1.0 + np.abs(new)))
+            out[rows[done]] = new[done]
+            keep = ok & ~done
+            rows, rate = rows[keep], new[keep]
+
+        pending = np.flatnonzero(np.isnan(out))
+        if pending.size:
+            grid = _BRACKET_GRID
+            vals = f(np.broadcast_to(grid, (pending.size, grid.size)), pending)[0]
+            flips = np.sign(vals[:, :-1]) * np.sign(vals[:, 1:]) <= 0
+            flips &= np.isfinite(vals[:, :-1]) & np.isfinite(vals[:, 1:])
+            # Candidate brackets: the sign change nearest 0% on each side of it.
+            mid = (grid[:-1] + grid[1:]) / 2.0
+            cand_rows, cand_k = [], []
+            for side in (mid < 0, mid >= 0):
+                dist = np.where(flips & side, np.abs(mid), np.inf)
+                k = np.argmin(dist, axis=1)
+                has = np.isfinite(dist[np.arange(pending.size), k])
+                cand_rows.append(np.flatnonzero(has))
+                cand_k.append(k[has])
+            idx, k = np.concatenate(cand_rows), np.concatenate(cand_k)
+            rows = pending[idx]
+            lo, hi = grid[k], grid[k + 1]
+            f_lo = vals[idx, k]
+            active = np.ones(rows.size, dtype=bool)
+            for _ in range(200):
+                # Converged rows are frozen so no row depends on its neighbours.
+                active &= hi - lo > tol * (1.0 + np.abs(lo))
+                if not active.any():
+                    break
+                m = (lo + hi) / 2.0
+                f_m = f(m, rows)[0]
+                left = active & (np.sign(f_m) == np.sign(f_lo))
+                right = active & ~left
+                lo = np.where(left, m, lo)
+                f_lo = np.where(left, f_m, f_lo)
+                hi = np.where(right, m, hi)
+            root = (lo + hi) / 2.0
+            # Where both sides have a root keep the one closer to 0%, like numpy_financial.
+            order = np.lexsort((np.abs(root), rows))
+            first = np.ones(order.size, dtype=bool)
+            first[1:] = rows[order][1:] != rows[order][:-1]
+            out[rows[order][first]] = root[order][first]
+    return out
+
+
+def irr(cash_flows: ArrayLike, guess: float = 0.1, tol: float = 1e-12, maxiter: int = 50):
+    """IRR of each row (as a fraction); NaN where no rate exists."""
+    cf, single = _as_2d(cash_flows)
+    changes = sign_changes(cf)
+
+    def f(rate, rows):
+        return _npv_and_slope(rate, cf[rows])
+
+    out = _solve(f, cf.shape[0], changes == 1, guess, tol, maxiter)
+    out[changes == 0] = np.nan
+    return _ret(out, single)
+
+
+# ---------- dated ----------
+def _year_fractions(dates: Any, n: int, t: int) -> np.ndarray:
+    d = np.asarray(dates)
+    if d.dtype.kind in "OUS":
+        d = np.array([
+            np.datetime64(x.date() if isinstance(x, datetime) else x, "D") if isinstance(x, (date, datetime))
+            else np.datetime64(x, "D")
+            for x in d.ravel()
+        ]).reshape(d.shape)
+    d = d.astype("datetime64[D]").astype(np.int64).astype(np.float64)
+    d = np.broadcast_to(d if d.ndim == 2 else d[None, :], (n, t))
+    return (d - d[:, :1]) / 365.0
+
+
+def _xnpv_and_slope(rate: np.ndarray, cf: np.ndarray, years: np.ndarray):
+    """XNPV and its slope; `rate` is (rows,) or (rows, k) like `_npv_and_slope`."""
+    with np.errstate(all="ignore"):
+        if rate.ndim > 1:
+            cf, years = cf[:, None, :], years[:, None, :]
+        log1p = np.log1p(rate)[..., None]
+        disc = np.exp(-years * log1p)
+        val = (cf * disc).sum(axis=-1)
+        slope = (-years * cf * disc).sum(axis=-1) / (1.0 + rate)
+        return val, slope
+
+
+def xnpv(rate: Union[float, ArrayLike], cash_flows: ArrayLike, dates: Any):
+    """NPV of irregularly dated flows, discounted to the first date (Actual/365)."""
+    cf, single = _as_2d(cash_flows)
+    years = _year_fractions(dates, *cf.shape)
+    rate = np.broadcast_to(np.asarray(rate, dtype=np.float64), (cf.shape[0],))
+    return _ret(_xnpv_and_slope(rate, cf, years)[0], single)
+
+
+def xirr(cash_flows: ArrayLike, dates: Any, guess: float = 0.1, tol: float = 1e-12, maxiter: int = 50):
+    """Annualized IRR of irregularly dated flows (Excel XIRR convention).
+
+    `dates` is one date sequence shared by every row, or one per row.
+    """
+    cf, single = _as_2d(cash_flows)
+    years = _year_fractions(dates, *cf.shape)
+    changes = sign_changes(cf)
+
+    def f(rate, rows):
+        return _xnpv_and_slope(rate, cf[rows], years[rows])
+
+    out = _solve(f, cf.shape[0], changes == 1, guess, tol, maxiter)
+    out[changes == 0] = np.nan
+    return _ret(out, single)
+
+
+# ---------- multiples ----------
+def equity_multiple(cash_flows: ArrayLike, invested: Optional[ArrayLike] = None):
+    """Total distributions / equity invested, per row.
+
+    By default negative flows are the investment and positive flows the
+    distributions; pass `invested` to divide every flow after t=0 by a
+    known equity figure instead. NaN where nothing was invested.
+    """
+    cf, single = _as_2d(cash_flows)
+    with np.errstate(all="ignore"):
+        if invested is None:
+            paid_in = -np.where(cf < 0, cf, 0.0).sum(axis=1)
+            out = np.where(cf > 0, cf, 0.0).sum(axis=1) / paid_in
+        else:
+            paid_in = np.broadcast_to(np.asarray(invested, dtype=np.float64), (cf.shape[0],))
+            out = cf[:, 1:].sum(axis=1) / paid_in
+        out = np.where(paid_in > 0, out, np.nan)
+    return _ret(out, single)
@@ -9,6 +9,9 @@ import math
 
 from dotenv import load_dotenv
 
+import amortization
+from provider_clients import get_anthropic_client
+
 # Ensure env vars are loaded even when this module is imported directly by uvicorn.
 load_dotenv(os.path.join(os.path.dirname(__file__), ".env"), override=True)
 
@@ -24,7 +27,7 @@ def _get_anthropic_client() -> Anthropic:
         raise RuntimeError(
             "Missing Anthropic API key. Set ANTHROPIC_API_KEY (or CLAUDE_API_KEY) in backend/.env."
         )
-    return Anthropic(api_key=api_key)
+    return get_anthropic_client(api_key)
 
 from max_prompts import MAX_SPREADSHEET_SYSTEM_PROMPT
 
@@ -191,9 +194,8 @@ def build_full_underwriting_model(model_spec, property_data):
     total_uses = purchase_price + closing_costs + due_diligence + capex_budget_yr1 + financing_costs + operating_reserves
     
     # Debt service
-    monthly_rate = interest_rate / 12
-    num_payments = loan_term_months
-    monthly_payment = loan_amount * (monthly_rate * (1 + monthly_rate)**num_payments) / ((1 + monthly_rate)**num_payments - 1) if monthly_rate > 0 else loan_amount / num_payments
+    loan_schedule = amortization.schedule(amortization.loan_terms(loan_amount, interest_rate * 100, loan_term_months))
+    monthly_payment = amortization.monthly_payment(loan_schedule)
     annual_debt_service = monthly_payment * 12
     
     # Year 1 NOI (estimated)
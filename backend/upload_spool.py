@@ -0,0 +1,274 @@
+"""
+Upload Spool Module - Disk-spooled, memory-mapped uploads with a memory budget
+
+`await file.read()` on a 50 MB OM, a sliced copy and a base64 data URL
+(plus the JSON body built around it) used to put 4-5x the upload on the
+heap per request, and a few concurrent OMs could get the instance
+OOM-killed. Instead:
+
+- UploadLimitMiddleware rejects multipart bodies over the limit with 413
+  from the Content-Length header before any of the body is read, and cuts
+  off bodies without one (chunked) once they pass the limit.
+- `spool_upload` copies the parsed form file to a temp file in chunks and
+  memory-maps it read-only, so the document is file-backed page cache
+  rather than heap. PdfSession (pdf_session) opens the mapping directly.
+- `data_url_json_body` streams a provider JSON payload whose data URL is
+  base64-encoded chunk by chunk as the request is sent, with an exact
+  Content-Length, instead of building the string in memory.
+- UPLOAD_BUDGET caps the uploads being processed at once by their
+  expected memory (size x UPLOAD_MEMORY_FACTOR); requests over budget wait,
+  then get 503 with Retry-After. UploadMeter samples anonymous RSS at each
+  pipeline stage so every result reports what it actually cost.
+
+Config:
+    UPLOAD_SPOOL_DIR           where uploads are spooled (default: system temp dir)
+    UPLOAD_CHUNK_BYTES         copy / base64 chunk size (default 1 MB)
+    UPLOAD_FORM_SLACK_BYTES    multipart overhead allowed over the file limit (default 1 MB)
+    UPLOAD_MEMORY_BUDGET_MB    expected upload memory in flight (default 512)
+    UPLOAD_MEMORY_FACTOR       expected memory per upload byte (default 1.5)
+    UPLOAD_MEMORY_WAIT_S       how long an upload waits for budget (default 30)
+"""
+import os
+import json
+import math
+import mmap
+import base64
+import asyncio
+import logging
+import resource
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, Optional, Tuple, Union
+
+from fastapi import HTTPException, UploadFile
+
+log = logging.getLogger("upload_spool")
+
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_FORM_SLACK_BYTES = int(os.getenv("UPLOAD_FORM_SLACK_BYTES", str(1024 * 1024)))
+UPLOAD_MEMORY_BUDGET_MB = float(os.getenv("UPLOAD_MEMORY_BUDGET_MB", "512"))
+UPLOAD_MEMORY_FACTOR = float(os.getenv("UPLOAD_MEMORY_FACTOR", "1.5"))
+UPLOAD_MEMORY_WAIT_S = float(os.getenv("UPLOAD_MEMORY_WAIT_S", "30"))
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+# ---------- early rejection ----------
+class UploadLimitMiddleware:
+    """ASGI middleware capping multipart request bodies at `max_bytes`."""
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict((k.lower(), v) for k, v in scope.get("headers") or [])
+        if not headers.get(b"content-type", b"").lower().startswith(b"multipart/"):
+            await self.app(scope, receive, send)
+            return
+        detail = f"File too large (> {(self.max_bytes - UPLOAD_FORM_SLACK_BYTES) // (1024 * 1024)} MB)"
+        try:
+            declared = int(headers.get(b"content-length", b"-1"))
+        except ValueError:
+            declared = -1
+        if declared > self.max_bytes:
+            # Answer before reading any of the body.
+            body = json.dumps({"detail": detail}).encode("utf-8")
+            await send({"type": "http.response.start", "status": 413, "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"connection", b"close"),
+            ]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def _receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body") or b"")
+                if received > self.max_bytes:
+                    # Raised inside form parsing; FastAPI passes HTTPExceptions through.
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, _receive, send)
+
+
+# ---------- spooling ----------
+class SpooledUpload:
+    """An upload copied to a temp file and memory-mapped read-only.
+
+    Spooled uploads are anonymous temp files, so nothing is left on disk
+    whichever way the request ends. `close()` unmaps the file unless views
+    are still alive (a PdfSession handed to background work, say); the
+    mapping then goes away with the last view.
+    """
+
+    def __init__(self, fileobj: BinaryIO, size: int):
+        self.size = size
+        self._mm: Optional[mmap.mmap] = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view: Optional[memoryview] = memoryview(self._mm) if self._mm is not None else None
+
+    @classmethod
+    def open(cls, path: str) -> "SpooledUpload":
+        """Map an existing file (e.g. a queued job's upload) without copying it."""
+        with open(path, "rb") as f:
+            return cls(f, os.fstat(f.fileno()).st_size)
+
+    @property
+    def view(self) -> Buffer:
+        if self.size and self._view is None:
+            raise ValueError("Upload is closed")
+        return self._view if self._view is not None else b""
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._view = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # still exported; unmapped when the last view is dropped
+            self._mm = None
+
+
+def _spool(src: BinaryIO, max_bytes: int) -> SpooledUpload:
+    src.seek(0)
+    with tempfile.TemporaryFile(prefix="upload-", dir=UPLOAD_SPOOL_DIR) as tmp:
+        size = 0
+        while True:
+            chunk = src.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"File too large (> {max_bytes // (1024 * 1024)} MB)")
+            tmp.write(chunk)
+        tmp.flush()
+        return SpooledUpload(tmp, size)
+
+
+async def spool_upload(file: UploadFile, max_bytes: int) -> SpooledUpload:
+    """Copy a form upload to a mapped temp file in chunks (off the event loop)."""
+    return await asyncio.get_running_loop().run_in_executor(None, _spool, file.file, max_bytes)
+
+
+# ---------- streaming base64 ----------
+def b64_chunks(data: Buffer, chunk_bytes: int = UPLOAD_CHUNK_BYTES) -> Iterator[bytes]:
+    """Base64 of `data` in pieces; chunks are a multiple of 3 bytes so they concatenate cleanly."""
+    view = memoryview(data)
+    step = max(3, chunk_bytes - chunk_bytes % 3)
+    for start in range(0, len(view), step):
+        yield base64.b64encode(view[start:start + step])
+
+
+def data_url_json_body(payload: Dict[str, Any], path: Tuple[str, ...], data: Buffer,
+                       mime: str) -> Tuple[Iterator[bytes], int]:
+    """
+    Stream `payload` as JSON with a data URL of `data` at key `path`
+    (e.g. ("document", "document_url")). Returns (chunks, content_length).
+    """
+    marker = "\x00DATA_URL\x00"
+    obj = json.loads(json.dumps(payload))
+    target = obj
+    for key in path[:-1]:
+        target = target.setdefault(key, {})
+    target[path[-1]] = marker
+    head, tail = json.dumps(obj).split(json.dumps(marker))
+    head = (head + f'"data:{mime};base64,').encode("utf-8")
+    tail = ('"' + tail).encode("utf-8")
+    length = len(head) + 4 * math.ceil(len(data) / 3) + len(tail)
+
+    def chunks() -> Iterator[bytes]:
+        yield head
+        yield from b64_chunks(data)
+        yield tail
+
+    return chunks(), length
+
+
+# ---------- memory budget ----------
+def rss_anon_bytes() -> int:
+    """Resident anonymous memory of this process (heap, not mapped files)."""
+    try:
+        with open("/proc/self/statm") as f:
+            _, resident, shared = (int(x) for x in f.read().split()[:3])
+        return (resident - shared) * mmap.PAGESIZE
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class UploadMeter:
+    """Samples anonymous RSS at each pipeline stage of one upload."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.start = self.peak = rss_anon_bytes()
+
+    def sample(self) -> None:
+        self.peak = max(self.peak, rss_anon_bytes())
+
+    def wrap(self, progress=None):
+        """A pipeline `progress` callback that samples before delegating."""
+        def _progress(stage, partial=None):
+            self.sample()
+            if progress is not None:
+                progress(stage, partial)
+        return _progress
+
+    def report(self) -> Dict[str, float]:
+        self.sample()
+        mb = 1024 * 1024
+        return {
+            "upload_mb": round(self.size / mb, 2),
+            "rss_start_mb": round(self.start / mb, 1),
+            "rss_peak_mb": round(self.peak / mb, 1),
+            "rss_growth_mb": round((self.peak - self.start) / mb, 1),
+        }
+
+
+class MemoryBudget:
+    """Weighted async semaphore over the expected memory of in-flight uploads."""
+
+    def __init__(self, capacity_bytes: int):
+        self.capacity = max(1, int(capacity_bytes))
+        self.in_use = 0
+        self._cond: Optional[asyncio.Condition] = None
+
+    def cost(self, size: int) -> int:
+        return min(self.capacity, max(1, int(size * UPLOAD_MEMORY_FACTOR)))
+
+    @asynccontextmanager
+    async def reserve(self, size: int, timeout: Optional[float] = UPLOAD_MEMORY_WAIT_S) -> AsyncIterator[None]:
+        """Hold `size` bytes of upload budget; 503 if it isn't free within `timeout` (None waits)."""
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        need = self.cost(size)
+        async with self._cond:
+            try:
+                await asyncio.wait_for(self._cond.wait_for(lambda: self.in_use + need <= self.capacity), timeout)
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=503, detail="Server is busy with other uploads; retry shortly",
+                                    headers={"Retry-After": str(max(1, int(UPLOAD_MEMORY_WAIT_S)))})
+            self.in_use += need
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.in_use -= need
+                self._cond.notify_all()
+
+
+UPLOAD_BUDGET = MemoryBudget(UPLOAD_MEMORY_BUDGET_MB * 1024 * 1024)
@@ -3,7 +3,8 @@
 
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
-import numpy_financial as npf
+from amortization import annual, loan_terms_from, schedule
+from returns import irr
 import math
 
 # =============================================================================
@@ -449,11 +450,8 @@ def calculate_cost_seg_analysis(inputs: CostSegInputs) -> CostSegResult:
         cash_flows.append(cf)
     
     # Calculate IRR
-    try:
-        after_tax_irr = npf.irr(cash_flows) * 100  # Convert to percentage
-        if math.isnan(after_tax_irr):
-            after_tax_irr = 0.0
-    except:
+    after_tax_irr = irr(cash_flows) * 100  # Convert to percentage
+    if math.isnan(after_tax_irr):
         after_tax_irr = 0.0
     
     # Calculate equity multiple
@@ -564,12 +562,21 @@ def extract_cost_seg_inputs_from_deal(
                  proj.get("leveredCashFlow", 0)
             pre_tax_cash_flows.append(cf)
     
-    # If no projections, estimate from NOI
+    # If no projections, estimate from NOI; debt service comes from the loan's
+    # amortization schedule when the deal carries loan terms (IO, balloon)
     if not pre_tax_cash_flows:
         noi = pnl.get("noi", 0)
-        debt_service = pricing.get("annual_debt_service", 0)
-        annual_cf = noi - debt_service
-        pre_tax_cash_flows = [annual_cf * (1.03 ** i) for i in range(hold_period)]
+        terms = loan_terms_from(pricing.get("loan_terms"))
+        if terms:
+            by_year = annual(schedule(terms), int(hold_period))
+            pre_tax_cash_flows = [
+                (noi or 0) * (1.03 ** i) - float(by_year["debt_service"][i])
+                for i in range(int(hold_period))
+            ]
+        else:
+            debt_service = pricing.get("annual_debt_service", 0)
+            annual_cf = noi - debt_service
+            pre_tax_cash_flows = [annual_cf * (1.03 ** i) for i in range(hold_period)]
     
     # Initial equity
     down_payment_pct = pricing.get("down_payment_pct", 25) or 25
@@ -5,7 +5,6 @@
 import os
 import json
 import logging
-import httpx
 import hashlib
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
@@ -14,6 +13,8 @@ from pydantic import BaseModel
 from enum import Enum
 from dotenv import load_dotenv
 
+from provider_clients import get_async_http_client
+
 # Load environment variables
 load_dotenv(override=True)
 
@@ -594,37 +595,38 @@ async def call_perplexity(prompt: str, model: str = "sonar") -> Dict[str, Any]:
     # Deep research can take up to 5 minutes
     timeout = 300.0 if "deep" in model.lower() else 120.0
     
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.post(
-            PERPLEXITY_BASE_URL,
-            headers=headers,
-            json=payload
-        )
-        
-        log.info(f"[MarketResearch] Perplexity response status: {response.status_code}")
-        
-        if response.status_code != 200:
-            error_text = response.text
-            log.error(f"[MarketResearch] Perplexity API error: {response.status_code} - {error_text}")
-            raise Exception(f"Perplexity API error: {response.status_code} - {error_text}")
-        
-        result = response.json()
-        log.info(f"[MarketResearch] Got response with {len(result.get('choices', []))} choices")
-        
-        # Extract token usage for cost estimation
-        usage = result.get("usage", {})
-        prompt_tokens = usage.get("prompt_tokens", len(prompt) // 4)
-        completion_tokens = usage.get("completion_tokens", 1000)
-        
-        content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-        log.info(f"[MarketResearch] Response content length: {len(content)}")
-        
-        return {
-            "content": content,
-            "prompt_tokens": prompt_tokens,
-            "completion_tokens": completion_tokens,
-            "model": model
-        }
+    client = get_async_http_client("perplexity")
+    response = await client.post(
+        PERPLEXITY_BASE_URL,
+        timeout=timeout,
+        headers=headers,
+        json=payload
+    )
+    
+    log.info(f"[MarketResearch] Perplexity response status: {response.status_code}")
+    
+    if response.status_code != 200:
+        error_text = response.text
+        log.error(f"[MarketResearch] Perplexity API error: {response.status_code} - {error_text}")
+        raise Exception(f"Perplexity API error: {response.status_code} - {error_text}")
+    
+    result = response.json()
+    log.info(f"[MarketResearch] Got response with {len(result.get('choices', []))} choices")
+    
+    # Extract token usage for cost estimation
+    usage = result.get("usage", {})
+    prompt_tokens = usage.get("prompt_tokens", len(prompt) // 4)
+    completion_tokens = usage.get("completion_tokens", 1000)
+    
+    content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+    log.info(f"[MarketResearch] Response content length: {len(content)}")
+    
+    return {
+        "content": content,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "model": model
+    }
 
 
 def _parse_json_response(content: str) -> Dict[str, Any]:
@@ -0,0 +1,240 @@
+# Monte Carlo Simulation Module
+# Seeded, vectorized return simulations for a stored deal
+
+from typing import Dict, Any, List, Optional
+import os
+import time
+
+import numpy as np
+
+from amortization import pmti, remaining_balance
+from returns import irr
+from provider_pool import get_process_pool
+from .sensitivity import extract_sensitivity_inputs, _num, _pct
+
+MONTE_CARLO_MAX_PATHS = int(os.getenv("MONTE_CARLO_MAX_PATHS", "2000000"))
+# Runs at least this large go to the "montecarlo" process pool unless the request says otherwise
+MONTE_CARLO_PARALLEL_PATHS = int(os.getenv("MONTE_CARLO_PARALLEL_PATHS", "500000"))
+# Paths are simulated in fixed chunks, each with its own child seed, so a
+# seeded run gives the same answer in-process and on the pool.
+CHUNK_PATHS = 50000
+
+DEFAULT_PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+
+# Sampled variables (all percentages). Growth and vacancy are drawn per path
+# per year; exit cap and the rate reset once per path.
+VARIABLES = ("rent_growth", "expense_growth", "vacancy", "exit_cap", "rate_reset")
+PER_YEAR = {"rent_growth", "expense_growth", "vacancy"}
+
+
+def extract_simulation_inputs(deal_json: Dict[str, Any], overrides: Dict[str, Any] = None) -> Dict[str, float]:
+    """Sensitivity-grid inputs plus the gross income and vacancy the simulation varies."""
+    inputs = extract_sensitivity_inputs(deal_json, overrides)
+    pnl = deal_json.get("pnl") or {}
+    gpr = _num(pnl.get("gross_potential_rent"), 0.0) + _num(pnl.get("other_income"), 0.0)
+    vacancy = _pct(pnl.get("vacancy_rate"))
+    # Parsers fill vacancy_rate with 0 when the OM only states a dollar vacancy
+    if not vacancy and gpr and _num(pnl.get("vacancy_amount")):
+        vacancy = abs(_num(pnl.get("vacancy_amount"))) / gpr * 100
+    vacancy = vacancy if vacancy is not None else 5.0
+    egi = inputs["egi"] or (inputs["noi"] + inputs["opex"])
+    inputs["vacancy"] = vacancy
+    # Gross income before vacancy, backed out of EGI when the rent roll isn't there
+    inputs["gross_income"] = gpr or egi / (1 - vacancy / 100)
+    if overrides:
+        for key in ("vacancy", "gross_income"):
+            if overrides.get(key) is not None:
+                inputs[key] = float(overrides[key])
+    return inputs
+
+
+def default_distributions(inputs: Dict[str, float]) -> Dict[str, Dict[str, float]]:
+    return {
+        "rent_growth": {"dist": "normal", "mean": inputs["income_growth"], "sd": 1.5},
+        "expense_growth": {"dist": "normal", "mean": inputs["expense_growth"], "sd": 1.0},
+        "vacancy": {"dist": "normal", "mean": inputs["vacancy"], "sd": 2.0, "min": 0, "max": 100},
+        "exit_cap": {"dist": "normal", "mean": inputs["exit_cap_rate"], "sd": 0.5, "min": 1},
+        "rate_reset": {"dist": "normal", "mean": 0.0, "sd": 0.75},
+    }
+
+
+def _check_spec(name: str, spec: Any) -> Dict[str, float]:
+    """Validate one distribution spec: a number, or {"dist": normal|uniform|triangular|fixed, ...}."""
+    if isinstance(spec, (int, float)):
+        return {"dist": "fixed", "value": float(spec)}
+    if not isinstance(spec, dict):
+        raise ValueError(f"{name}: distribution must be a number or an object")
+    dist = spec.get("dist", "normal")
+    need = {
+        "normal": ("mean", "sd"),
+        "uniform": ("min", "max"),
+        "triangular": ("min", "mode", "max"),
+        "fixed": ("value",),
+    }.get(dist)
+    if need is None:
+        raise ValueError(f"{name}: unknown distribution '{dist}'")
+    out = {"dist": dist}
+    for key in need + tuple(k for k in ("min", "max") if k in spec and k not in need):
+        if spec.get(key) is None:
+            raise ValueError(f"{name}: '{dist}' needs '{key}'")
+        out[key] = float(spec[key])
+    if dist == "normal" and out["sd"] < 0:
+        raise ValueError(f"{name}: sd must be >= 0")
+    if dist in ("uniform", "triangular") and out["min"] > out["max"]:
+        raise ValueError(f"{name}: min must be <= max")
+    if dist == "triangular" and not out["min"] <= out["mode"] <= out["max"]:
+        raise ValueError(f"{name}: mode must lie between min and max")
+    return out
+
+
+def _sample(rng: np.random.Generator, spec: Dict[str, float], shape) -> np.ndarray:
+    dist = spec["dist"]
+    if dist == "normal":
+        x = rng.normal(spec["mean"], spec["sd"], shape)
+    elif dist == "uniform":
+        x = rng.uniform(spec["min"], spec["max"], shape)
+    elif dist == "triangular":
+        if spec["min"] == spec["max"]:
+            x = np.full(shape, spec["min"])
+        else:
+            x = rng.triangular(spec["min"], spec["mode"], spec["max"], shape)
+    else:
+        x = np.full(shape, spec["value"])
+    if "min" in spec or "max" in spec:
+        x = np.clip(x, spec.get("min", -np.inf), spec.get("max", np.inf))
+    return x
+
+
+def simulate_paths(inputs: Dict[str, float], dists: Dict[str, Dict[str, float]], n: int,
+                   seed_seq: np.random.SeedSequence, reset_year: int) -> Dict[str, np.ndarray]:
+    """
+    One chunk of paths -> per-path IRR (%), year-1 cash-on-cash (%) and
+    minimum annual DSCR over the hold.
+    """
+    rng = np.random.default_rng(seed_seq)
+    hold = inputs["hold_years"]
+    io_years = min(int(inputs["io_years"]), hold)
+    amort = int(inputs["amortization_years"] * 12)
+    years = hold + 1  # the exit is priced on the buyer's year-1 NOI
+
+    draws = {name: _sample(rng, dists[name], (n, years) if name in PER_YEAR else n) for name in VARIABLES}
+
+    # NOI: growth compounds from year 2; vacancy hits each year's gross income
+    rent_index = np.cumprod(np.concatenate([np.ones((n, 1)), 1 + draws["rent_growth"][:, 1:] / 100], axis=1), axis=1)
+    expense_index = np.cumprod(np.concatenate([np.ones((n, 1)), 1 + draws["expense_growth"][:, 1:] / 100], axis=1), axis=1)
+    noi = inputs["gross_income"] * rent_index * (1 - draws["vacancy"] / 100) - inputs["opex"] * expense_index
+
+    # Debt: the note rate until `reset_year`, then rate + sampled reset, re-amortized on the balance left
+    loan = inputs["price"] * inputs["ltv"] / 100
+    equity = inputs["price"] - loan + loan * inputs["loan_fees_percent"] / 100 + inputs["closing_costs"]
+    r0 = inputs["interest_rate"]
+    r1 = np.maximum(r0 + draws["rate_reset"], 0.0)
+    amortized_before_reset = max(0, reset_year - 1 - io_years) * 12
+    pmt0 = pmti(loan, r0, amort) * 12
+    balance_at_reset = remaining_balance(loan, r0, amort, amortized_before_reset)
+    pmt1 = pmti(balance_at_reset, r1, amort - amortized_before_reset) * 12
+
+    debt = np.empty((n, hold))
+    for y in range(1, hold + 1):
+        reset = y >= reset_year
+        if y <= io_years:
+            debt[:, y - 1] = loan * (r1 if reset else r0) / 100
+        else:
+            debt[:, y - 1] = pmt1 if reset else pmt0
+    if hold >= reset_year:
+        after = (hold - max(reset_year - 1, io_years)) * 12
+        balance = remaining_balance(balance_at_reset, r1, amort - amortized_before_reset, after)
+    else:
+        balance = np.broadcast_to(remaining_balance(loan, r0, amort, max(0, hold - io_years) * 12), (n,))
+
+    sale = noi[:, hold] / (draws["exit_cap"] / 100) * (1 - inputs["selling_costs_percent"] / 100)
+    flows = np.empty((n, hold + 1))
+    flows[:, 0] = -equity
+    flows[:, 1:] = noi[:, :hold] - debt
+    flows[:, -1] += sale - balance
+
+    with np.errstate(all="ignore"):
+        coc = flows[:, 1] / equity * 100 if equity > 0 else np.full(n, np.nan)
+        dscr_min = np.where(debt > 0, noi[:, :hold] / debt, np.inf).min(axis=1)
+    dscr_min[np.isinf(dscr_min)] = np.nan  # no debt service in any year
+    return {"irr": irr(flows) * 100, "coc": coc, "dscr_min": dscr_min}
+
+
+def _simulate_chunk(args) -> Dict[str, np.ndarray]:
+    return simulate_paths(*args)
+
+
+def _summary(values: np.ndarray, percentiles: List[float], places: int) -> Dict[str, Any]:
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return {"mean": None, "percentiles": {str(p): None for p in percentiles}, "valid_paths": 0}
+    return {
+        "mean": round(float(finite.mean()), places),
+        "percentiles": {str(p): round(float(v), places) for p, v in zip(percentiles, np.percentile(finite, percentiles))},
+        "valid_paths": int(finite.size),
+    }
+
+
+def run_monte_carlo(deal_json: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Request body -> response payload for /v2/deals/{deal_id}/monte-carlo.
+    Raises ValueError on bad distributions or path counts.
+    """
+    started = time.perf_counter()
+    inputs = extract_simulation_inputs(deal_json, body.get("overrides"))
+    if not inputs["price"]:
+        raise ValueError("Deal has no purchase price")
+
+    paths = int(body.get("paths") or 100000)
+    if not 1 <= paths <= MONTE_CARLO_MAX_PATHS:
+        raise ValueError(f"paths must be between 1 and {MONTE_CARLO_MAX_PATHS}")
+    seed = int(body["seed"]) if body.get("seed") is not None else int(np.random.SeedSequence().entropy % (2 ** 63))
+    percentiles = [float(p) for p in (body.get("percentiles") or DEFAULT_PERCENTILES)]
+    if any(not 0 <= p <= 100 for p in percentiles):
+        raise ValueError("percentiles must be between 0 and 100")
+    term = (_num(body.get("reset_year")) or _num((deal_json.get("financing") or {}).get("loan_term_years"))
+            or _num((deal_json.get("pricing_financing") or {}).get("term_years")))
+    if term is not None and term < 1:
+        raise ValueError("reset_year must be at least 1")
+    # No loan term anywhere: the note rate holds through the exit
+    reset_year = int(term) if term else inputs["hold_years"] + 1
+
+    dists = default_distributions(inputs)
+    for name, spec in (body.get("distributions") or {}).items():
+        if name not in dists:
+            raise ValueError(f"Unknown variable '{name}'; expected one of {', '.join(VARIABLES)}")
+        dists[name] = spec
+    dists = {name: _check_spec(name, spec) for name, spec in dists.items()}
+
+    buy_box = body.get("buy_box") or (deal_json.get("deal_setup") or {}).get("buy_box") or {}
+    min_dscr = _num(buy_box.get("minDscr"), 1.25)
+
+    sizes = [min(CHUNK_PATHS, paths - i) for i in range(0, paths, CHUNK_PATHS)]
+    jobs = [(inputs, dists, size, child, reset_year)
+            for size, child in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes)))]
+    parallel = body.get("parallel")
+    parallel = (paths >= MONTE_CARLO_PARALLEL_PATHS) if parallel is None else bool(parallel)
+    parallel = parallel and len(jobs) > 1
+    if parallel:
+        chunks = list(get_process_pool("montecarlo").map(_simulate_chunk, jobs))
+    else:
+        chunks = [_simulate_chunk(job) for job in jobs]
+    irr_pct = np.concatenate([c["irr"] for c in chunks])
+    coc = np.concatenate([c["coc"] for c in chunks])
+    dscr_min = np.concatenate([c["dscr_min"] for c in chunks])
+
+    return {
+        "paths": paths,
+        "seed": seed,
+        "parallel": parallel,
+        "inputs": inputs,
+        "distributions": dists,
+        "reset_year": int(term) if term else None,
+        "irr": _summary(irr_pct, percentiles, 2),
+        "cash_on_cash": _summary(coc, percentiles, 2),
+        "dscr_min": _summary(dscr_min, percentiles, 3),
+        "min_dscr": min_dscr,
+        "prob_dscr_breach": round(float(np.mean(dscr_min < min_dscr)), 4),
+        "prob_irr_negative": round(float(np.mean(~(irr_pct >= 0))), 4),
+        "compute_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
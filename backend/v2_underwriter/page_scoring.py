@@ -0,0 +1,123 @@
+# Page Scoring Module
+# Financial-content scoring for PDF page triage
+#
+# A page scores +10 for each financial keyword and -5 for each marketing
+# word its lowercased text contains (substring match, each word counted
+# once), plus capped points for "$", "%", number-like tokens and
+# table-like runs of numbers, minus 50 for near-empty pages.
+#
+# The keyword weights are one precompiled table checked with `in` (a C
+# substring search per keyword; a single-pass regex automaton over the
+# same words measured twice as slow in CPython), the number count stops at
+# its cap, and the table-row pattern is the equivalent form that doesn't
+# backtrack through digit runs. Scores are cached by a hash of the page
+# text, and documents with PAGE_SCORE_PARALLEL_PAGES or more unseen pages
+# are scored in chunks on the "scoring" process pool.
+
+from typing import Dict, List, Optional, Sequence
+from collections import OrderedDict
+import os
+import re
+import hashlib
+from itertools import islice
+import threading
+
+from provider_pool import get_process_pool, process_pool_size
+
+PAGE_SCORE_CACHE_SIZE = int(os.getenv("PAGE_SCORE_CACHE_SIZE", "20000"))
+# Documents with at least this many uncached pages are scored on the process pool
+PAGE_SCORE_PARALLEL_PAGES = int(os.getenv("PAGE_SCORE_PARALLEL_PAGES", "200"))
+
+FINANCIAL_KEYWORDS = [
+    'rent roll', 'unit mix', 'income', 'expense', 'noi', 'cap rate',
+    'operating', 'vacancy', 'gross', 'net', 'annual', 'monthly',
+    'taxes', 'insurance', 'utilities', 'maintenance', 'management',
+    'financing', 'loan', 'mortgage', 'interest rate', 'ltv', 'debt service',
+    'purchase price', 'price per unit', 'price per sf', 'asking price',
+    'proforma', 'pro forma', 'actual', 'budget', 'projected',
+    'cash flow', 'return', 'irr', 'coc', 'cash on cash',
+    'bedroom', 'br', 'bath', 'ba', 'sqft', 'sf', 'square feet',
+    'tenant', 'lease', 'occupancy', 'occupied', 'vacant',
+]
+MARKETING_WORDS = ['amenities', 'lifestyle', 'community', 'neighborhood', 'location highlights', 'area overview']
+
+KEYWORD_WEIGHTS: Dict[str, int] = {**{k: 10 for k in FINANCIAL_KEYWORDS}, **{k: -5 for k in MARKETING_WORDS}}
+
+_KEYWORDS = tuple(KEYWORD_WEIGHTS.items())
+_NUMBER = re.compile(r'\b\d{1,3}(?:,\d{3})*(?:\.\d{2})?\b')
+_NUMBER_CAP = 20  # 2 points each, capped at 40
+# Same pages as r'\d+\s+\d+\s+\d+': any such run has a digit, spaces, digits, spaces, digit
+_TABLE_ROW = re.compile(r'\d\s+\d+\s+\d')
+
+
+def score_page(text: str) -> int:
+    """
+    Score a page based on likelihood of containing useful financial data.
+    Higher score = more likely to have data we need.
+    """
+    text_lower = text.lower()
+    score = sum(weight for keyword, weight in _KEYWORDS if keyword in text_lower)
+
+    score += min(text.count('$') * 3, 30)
+    score += min(text.count('%') * 2, 20)
+    score += 2 * sum(1 for _ in islice(_NUMBER.finditer(text), _NUMBER_CAP))
+    if _TABLE_ROW.search(text):
+        score += 15
+    # Very little text is likely just an image
+    if len(text.strip()) < 100:
+        score -= 50
+    return score
+
+
+def _score_chunk(texts: List[str]) -> List[int]:
+    return [score_page(t) for t in texts]
+
+
+_CACHE: "OrderedDict[bytes, int]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def _key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def score_pages(texts: Sequence[str], parallel: Optional[bool] = None) -> List[int]:
+    """
+    Scores for many pages, in order. Cached by page text; the misses run on
+    the process pool when there are PAGE_SCORE_PARALLEL_PAGES or more of
+    them (or as `parallel` says) and the pool has more than one worker.
+    """
+    keys = [_key(t) for t in texts]
+    scores: List[Optional[int]] = [None] * len(texts)
+    missing: "OrderedDict[bytes, List[int]]" = OrderedDict()
+    with _CACHE_LOCK:
+        for i, k in enumerate(keys):
+            hit = _CACHE.get(k)
+            if hit is not None:
+                _CACHE.move_to_end(k)
+                scores[i] = hit
+            else:
+                missing.setdefault(k, []).append(i)
+    if not missing:
+        return scores
+
+    todo = [texts[idxs[0]] for idxs in missing.values()]
+    workers = process_pool_size("scoring")
+    if parallel is None:
+        parallel = len(todo) >= PAGE_SCORE_PARALLEL_PAGES
+    if parallel and workers > 1 and len(todo) > 1:
+        step = -(-len(todo) // workers)
+        chunks = [todo[i:i + step] for i in range(0, len(todo), step)]
+        computed = [s for part in get_process_pool("scoring").map(_score_chunk, chunks) for s in part]
+    else:
+        computed = _score_chunk(todo)
+
+    with _CACHE_LOCK:
+        for (k, idxs), score in zip(missing.items(), computed):
+            _CACHE[k] = score
+            for i in idxs:
+                scores[i] = score
+        while len(_CACHE) > PAGE_SCORE_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return scores
+
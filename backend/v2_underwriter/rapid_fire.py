@@ -0,0 +1,226 @@
+# Rapid Fire Module
+# Columnar napkin underwriting for Rapid Fire exports
+#
+# The route turns the detected sheet columns into float arrays (NaN for a
+# missing or unparseable cell) and every napkin step runs over whole
+# columns: price derivation, NOI fallbacks, debt service, equity, cash-on-
+# cash, DSCR and the verdict gates. Deal dicts are built only at the end,
+# from plain Python lists. The arithmetic matches the old per-row loop
+# operation for operation, so results agree to the last bit.
+
+from typing import Any, Dict, List, Optional, Sequence
+import math
+
+import numpy as np
+
+# Verdict gate that decided each non-AI row, in evaluation order
+GATE_MISSING, GATE_DSCR, GATE_COC, GATE_CAP, GATE_PASS = range(5)
+GATE_VERDICT = {GATE_MISSING: "TRASH", GATE_DSCR: "TRASH", GATE_COC: "TRASH", GATE_CAP: "MAYBE", GATE_PASS: "DEAL"}
+# Joins a text column into one string for bulk cleaning (ASCII unit separator)
+_SEP = "\x1f"
+
+
+def as_float(v: Any) -> Optional[float]:
+    """Cell value as a float, ignoring `,`, `$` and `%` (None when blank or not numeric)."""
+    if v is None:
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    s = str(v).strip().replace(",", "").replace("$", "").replace("%", "")
+    if not s:
+        return None
+    try:
+        return float(s)
+    except Exception:
+        return None
+
+
+def _float_or_nan(v: Any) -> float:
+    f = as_float(v)
+    return math.nan if f is None else f
+
+
+def _parse_or_nan(s: str) -> float:
+    try:
+        return float(s)
+    except ValueError:
+        return math.nan
+
+
+def float_column(values: Sequence[Any]) -> np.ndarray:
+    """Typed column for `values` (same parsing as as_float), with NaN for missing or non-finite cells."""
+    kinds = set(map(type, values))
+    if kinds <= {str, type(None)}:
+        # CSV columns: strip the separators from the whole column at once, then
+        # parse cell by cell (float() ignores the whitespace as_float strips).
+        joined = _SEP.join(v or "" for v in values)
+        cells = joined.replace(",", "").replace("$", "").replace("%", "").split(_SEP)
+        if len(cells) == len(values):
+            col = np.fromiter(map(_parse_or_nan, cells), dtype=float, count=len(values))
+        else:  # a cell contained the separator itself
+            col = np.fromiter(map(_float_or_nan, values), dtype=float, count=len(values))
+    elif kinds <= {int, float, type(None)}:
+        # Typed spreadsheet cells
+        col = np.array([math.nan if v is None else v for v in values], dtype=float)
+    else:
+        col = np.fromiter(map(_float_or_nan, values), dtype=float, count=len(values))
+    col[~np.isfinite(col)] = np.nan
+    return col
+
+
+def derive_total_price(total_price: np.ndarray, price_per_unit: np.ndarray, units: np.ndarray) -> np.ndarray:
+    """Total price, or Price/Unit x Units where the sheet has no usable total."""
+    derive = ~(total_price > 0) & ~np.isnan(price_per_unit) & (units > 0)
+    return np.where(derive, price_per_unit * units, total_price)
+
+
+def fallback_noi(noi: np.ndarray, total_price: np.ndarray, gross_income: np.ndarray,
+                 broker_cap: np.ndarray, a: Dict[str, float]) -> np.ndarray:
+    """
+    Missing NOI from gross income less vacancy and the expense ratio, else
+    from the broker cap rate. Rows with neither stay NaN.
+    """
+    missing = np.isnan(noi)
+    effective_income = gross_income * (1.0 - a["vacancy_rate"] / 100.0)
+    from_income = effective_income - effective_income * (a["expense_ratio"] / 100.0)
+    from_cap = total_price * (broker_cap / 100.0)
+    out = np.where(missing & (gross_income > 0), from_income, noi)
+    return np.where(missing & ~(gross_income > 0) & (broker_cap > 0), from_cap, out)
+
+
+def annual_debt_service(total_price: np.ndarray, a: Dict[str, float]) -> Optional[np.ndarray]:
+    """Level-payment debt service on LTV x total price, or None when the loan terms can't amortize."""
+    r = (a["interest_rate_pct"] / 100.0) / 12.0
+    n = int(a["amort_years"] * 12)
+    if r <= 0 or n <= 0:
+        return None
+    growth = (1 + r) ** n
+    if growth - 1 == 0:
+        return None
+    loan_amount = total_price * (a["ltv_pct"] / 100.0)
+    return loan_amount * (r * growth) / (growth - 1) * 12.0
+
+
+def napkin_metrics(total_price: np.ndarray, units: np.ndarray, noi: np.ndarray,
+                   a: Dict[str, float]) -> Dict[str, np.ndarray]:
+    """Cap rate, DSCR, cash-on-cash, monthly cash flow and verdict gate per row (NaN where undefined)."""
+    has_noi = ~np.isnan(noi)
+    cap_rate = np.where(has_noi & (total_price > 0), noi / total_price * 100.0, np.nan)
+
+    ads = annual_debt_service(total_price, a)
+    equity = total_price * (1.0 - a["ltv_pct"] / 100.0)
+    equity = equity + total_price * (a["closing_costs_pct"] / 100.0)
+    equity = equity + total_price * (a["acquisition_fee_pct"] / 100.0)
+    if ads is None:
+        dscr = coc = monthly_cf = np.full(len(total_price), np.nan)
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dscr = np.where(has_noi & (ads != 0), noi / ads, np.nan)
+            annual_cf = noi - ads
+            flows = has_noi & (equity > 0)
+            coc = np.where(flows, annual_cf / equity * 100.0, np.nan)
+            monthly_cf = np.where(flows, annual_cf / 12.0, np.nan)
+
+    missing_noi = ~(noi > 0)
+    missing_units = ~(units > 0)
+    gate = np.select(
+        [missing_noi | missing_units, dscr < a["min_dscr"], coc < a["min_coc"], cap_rate < a["min_cap"]],
+        [GATE_MISSING, GATE_DSCR, GATE_COC, GATE_CAP],
+        GATE_PASS,
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price_per_unit = np.where((units > 0) & (total_price > 0), total_price / units, np.nan)
+    return {
+        "cap_rate": cap_rate,
+        "dscr": dscr,
+        "cash_on_cash": coc,
+        "monthly_cf": monthly_cf,
+        "gate": gate,
+        "missing_noi": missing_noi,
+        "missing_units": missing_units,
+        "price_per_unit": price_per_unit,
+    }
+
+
+def _nullable(col: np.ndarray) -> List[Optional[float]]:
+    return [None if x != x else x for x in col.tolist()]
+
+
+def gate_reasons(a: Dict[str, float]):
+    """Verdict-reason builder for non-AI rows, with the buy-box thresholds formatted once."""
+    min_dscr = f"{a['min_dscr']:.2f}"
+    min_coc = f"{a['min_coc']:.1f}"
+    min_cap = f"{a['min_cap']:.1f}"
+
+    def reasons(gate: int, missing_noi: bool, missing_units: bool, dscr: Optional[float],
+                cash_on_cash: Optional[float], cap_rate: Optional[float]) -> List[str]:
+        if gate == GATE_MISSING:
+            out = []
+            if missing_noi:
+                out.append("Missing or invalid NOI")
+            if missing_units:
+                out.append("Missing or invalid units")
+            return out
+        if gate == GATE_DSCR:
+            return [f"DSCR {dscr:.2f} below minimum {min_dscr}"]
+        if gate == GATE_COC:
+            return [f"Cash-on-cash {cash_on_cash:.1f}% below minimum {min_coc}%"]
+        if gate == GATE_CAP:
+            return [f"Cap rate {cap_rate:.1f}% below minimum {min_cap}%"]
+        return ["Meets all minimum underwriting thresholds"]
+
+    return reasons
+
+
+def build_deals(rows: Sequence[int], text: Dict[str, Sequence[Any]], units: np.ndarray, total_price: np.ndarray,
+                broker_cap: np.ndarray, noi: np.ndarray, metrics: Dict[str, np.ndarray], a: Dict[str, float],
+                ai: Optional[Sequence[Optional[Dict[str, Any]]]] = None) -> List[Dict[str, Any]]:
+    """
+    RapidFireDeal dicts for `rows` (original row indices). Arrays are aligned
+    with `rows`; `text` holds the name/city/state/listing_url/owner_name cells.
+    `ai[i]`, when given, is the AI analysis whose verdict row i takes.
+    """
+    cols = zip(
+        rows, text["name"], text["city"], text["state"], text["listing_url"], text["owner_name"],
+        _nullable(units), total_price.tolist(), _nullable(metrics["price_per_unit"]), _nullable(broker_cap),
+        _nullable(noi), _nullable(metrics["cap_rate"]), _nullable(metrics["dscr"]),
+        _nullable(metrics["cash_on_cash"]), _nullable(metrics["monthly_cf"]), metrics["gate"].tolist(),
+        metrics["missing_noi"].tolist(), metrics["missing_units"].tolist(), ai or [None] * len(rows),
+    )
+    reasons_for = gate_reasons(a)
+    deals = []
+    for (idx, name, city, state, listing_url, owner_name, u, price, ppu, cap, n, cap_rate, dscr, coc, monthly,
+         gate, missing_noi, missing_units, analysis) in cols:
+        if analysis is not None:
+            ai_reasoning = analysis.get("reasoning", "AI-powered analysis")
+            verdict = analysis.get("verdict", "MAYBE").upper()
+            reasons = [ai_reasoning or "AI-powered analysis"]
+        else:
+            verdict = GATE_VERDICT[gate]
+            reasons = reasons_for(gate, missing_noi, missing_units, dscr, coc, cap_rate)
+        deals.append({
+            "id": f"rf-{idx+1}",
+            "name": str(name) if name else "Unnamed Property",
+            "city": str(city) if city else "",
+            "state": str(state) if state else "",
+            "units": int(u) if u is not None else None,
+            # DTO fields for frontend
+            "totalPrice": price,
+            "pricePerUnit": ppu if ppu is not None and ppu > 0 else None,
+            "brokerCapRate": cap,
+            "noi": n,
+            "calculatedCapRate": cap_rate,
+            "dscr": dscr,
+            "cashOnCash": coc,
+            "monthlyCashFlow": monthly,
+            "listingUrl": str(listing_url).strip() if listing_url else None,
+            "ownerName": str(owner_name).strip() if owner_name else None,
+            "verdict": verdict,
+            "verdictReasons": reasons,
+            "aiAnalysis": {
+                "used": True,
+                "reasoning": ai_reasoning,
+                "confidence": analysis.get("confidence", "medium"),
+            } if analysis is not None else None,
+        })
+    return deals
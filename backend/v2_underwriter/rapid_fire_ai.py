@@ -0,0 +1,82 @@
+# Rapid Fire AI Module
+# Concurrent Claude enrichment for Rapid Fire rows that lack an NOI
+#
+# Rapid Fire used to call analyze_property_with_ai inline in its row loop,
+# one blocking round trip after another. The route now underwrites the
+# math-only rows first and collects the rows that need AI; this module runs
+# those calls concurrently on the "anthropic" pool, at most
+# RAPID_FIRE_AI_CONCURRENCY at a time. Each call gets RAPID_FIRE_AI_TIMEOUT_S,
+# and the batch as a whole gets RAPID_FIRE_AI_DEADLINE_S: calls still queued
+# at the deadline are not started. Results come back in input order, with
+# None for calls that failed, timed out or were skipped, so the caller can
+# use its FMR fallback for those rows.
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import os
+import time
+import asyncio
+import logging
+
+from provider_pool import run_blocking
+
+log = logging.getLogger("v2_underwriter.rapid_fire_ai")
+
+RAPID_FIRE_AI_CONCURRENCY = int(os.getenv("RAPID_FIRE_AI_CONCURRENCY", "8"))
+RAPID_FIRE_AI_TIMEOUT_S = float(os.getenv("RAPID_FIRE_AI_TIMEOUT_S", "30"))
+RAPID_FIRE_AI_DEADLINE_S = float(os.getenv("RAPID_FIRE_AI_DEADLINE_S", "120"))
+
+
+async def analyze_concurrently(
+    analyze: Callable[..., Dict[str, Any]],
+    calls: Sequence[Dict[str, Any]],
+    concurrency: Optional[int] = None,
+    timeout_s: Optional[float] = None,
+    deadline_s: Optional[float] = None,
+) -> Tuple[List[Optional[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    Run `analyze(**kwargs)` for every kwargs dict in `calls` and return the
+    results in the same order (None where a call failed, timed out or missed
+    the deadline), plus counts for the response's debug block. Limits
+    default to the RAPID_FIRE_AI_* settings.
+    """
+    concurrency = concurrency or RAPID_FIRE_AI_CONCURRENCY
+    timeout_s = timeout_s or RAPID_FIRE_AI_TIMEOUT_S
+    deadline_s = deadline_s or RAPID_FIRE_AI_DEADLINE_S
+    stats = {"requested": len(calls), "analyzed": 0, "failed": 0, "timed_out": 0, "skipped": 0, "elapsed_ms": 0}
+    if not calls:
+        return [], stats
+    sem = asyncio.Semaphore(max(1, concurrency))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + deadline_s
+
+    async def _one(kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        async with sem:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                stats["skipped"] += 1
+                return None
+            try:
+                result = await asyncio.wait_for(
+                    run_blocking("anthropic", analyze, **kwargs), timeout=min(timeout_s, remaining)
+                )
+            except asyncio.TimeoutError:
+                # The worker thread finishes on its own; its result is dropped.
+                stats["timed_out"] += 1
+                log.warning("[AI] Analysis timed out for %s", kwargs.get("address"))
+                return None
+            except Exception as e:
+                stats["failed"] += 1
+                log.error("[AI] Analysis failed for %s: %s", kwargs.get("address"), e)
+                return None
+            stats["analyzed"] += 1
+            return result if isinstance(result, dict) else None
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(_one(kw) for kw in calls))
+    stats["elapsed_ms"] = round((time.perf_counter() - t0) * 1000)
+    log.info(
+        "[AI] Rapid Fire enrichment: %d rows, %d analyzed, %d failed, %d timed out, %d skipped in %d ms",
+        stats["requested"], stats["analyzed"], stats["failed"], stats["timed_out"], stats["skipped"],
+        stats["elapsed_ms"],
+    )
+    return list(results), stats
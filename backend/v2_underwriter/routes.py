@@ -1,10 +1,12 @@
 # V2 Underwriter - API Routes
 import os
 import json
+import asyncio
 import logging
 import re
 from pathlib import Path
 from datetime import datetime
+import numpy as np
 from dotenv import load_dotenv
 from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Form
 from fastapi.responses import JSONResponse
@@ -19,12 +21,21 @@ from .value_add_prompts import build_noi_engineering_prompt, build_deal_structur
 from .prompts_v3 import build_underwriter_system_prompt_v3, build_summary_prompt_v2
 from .prompts_max_ai import build_max_ai_underwriting_prompt
 from . import llm_usage
+from provider_pool import run_blocking
+from provider_clients import get_anthropic_client, get_async_http_client
+from pdf_session import PdfSession, as_session
 from .cost_seg import (
     CostSegInputs, 
     calculate_cost_seg_analysis, 
     calculate_standard_depreciation_comparison,
     extract_cost_seg_inputs_from_deal
 )
+from .sensitivity import sensitivity_for_deal
+from .monte_carlo import run_monte_carlo
+from .page_scoring import score_page, score_pages
+from .vision_images import encode_pages
+from .rapid_fire import as_float, build_deals, derive_total_price, fallback_noi, float_column, napkin_metrics
+from .rapid_fire_ai import analyze_concurrently
 
 # Import Deal Manager parser (add-on, doesn't replace existing parsing)
 try:
@@ -337,109 +348,54 @@ def score_page_for_financial_data(text: str) -> int:
     Score a page based on likelihood of containing useful financial data.
     Higher score = more likely to have data we need.
     """
-    score = 0
-    text_lower = text.lower()
-    
-    # Financial keywords (high value)
-    financial_keywords = [
-        'rent roll', 'unit mix', 'income', 'expense', 'noi', 'cap rate',
-        'operating', 'vacancy', 'gross', 'net', 'annual', 'monthly',
-        'taxes', 'insurance', 'utilities', 'maintenance', 'management',
-        'financing', 'loan', 'mortgage', 'interest rate', 'ltv', 'debt service',
-        'purchase price', 'price per unit', 'price per sf', 'asking price',
-        'proforma', 'pro forma', 'actual', 'budget', 'projected',
-        'cash flow', 'return', 'irr', 'coc', 'cash on cash',
-        'bedroom', 'br', 'bath', 'ba', 'sqft', 'sf', 'square feet',
-        'tenant', 'lease', 'occupancy', 'occupied', 'vacant'
-    ]
-    
-    for keyword in financial_keywords:
-        if keyword in text_lower:
-            score += 10
-    
-    # Count dollar signs and numbers (indicates financial data)
-    dollar_count = text.count('$')
-    score += min(dollar_count * 3, 30)  # Cap at 30 points
-    
-    # Count percentage signs
-    pct_count = text.count('%')
-    score += min(pct_count * 2, 20)  # Cap at 20 points
-    
-    # Look for number patterns (financial figures)
-    number_pattern = r'\b\d{1,3}(?:,\d{3})*(?:\.\d{2})?\b'
-    numbers = re.findall(number_pattern, text)
-    score += min(len(numbers) * 2, 40)  # Cap at 40 points
-    
-    # Table-like patterns (aligned numbers, common in financial docs)
-    if re.search(r'\d+\s+\d+\s+\d+', text):
-        score += 15
-    
-    # Penalize pages with very little text (likely just images)
-    if len(text.strip()) < 100:
-        score -= 50
-    
-    # Penalize marketing fluff
-    marketing_words = ['amenities', 'lifestyle', 'community', 'neighborhood', 'location highlights', 'area overview']
-    for word in marketing_words:
-        if word in text_lower:
-            score -= 5
-    
-    return score
-
-
-def filter_pdf_pages_smart(pdf_bytes: bytes, min_score: int = 20, max_pages: int = 25) -> list:
+    return score_page(text)
+
+
+def filter_pdf_pages_smart(pdf, min_score: int = 20, max_pages: int = 25) -> list:
     """
     Intelligently filter PDF pages to only include those with financial data.
-    Returns a list of PIL images for the selected pages.
+    `pdf` is PDF bytes or the upload's PdfSession; text and renders come from
+    that one parsed handle. Returns a list of PIL images for the selected pages.
     """
-    import fitz  # PyMuPDF
-    from pdf2image import convert_from_bytes
-    
     log.info("[V2] Smart PDF filtering - analyzing pages for financial content...")
-    
-    # Open PDF with PyMuPDF to extract text
-    pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    total_pages = len(pdf_doc)
-    
-    page_scores = []
-    for page_num in range(total_pages):
-        page = pdf_doc[page_num]
-        text = page.get_text()
-        score = score_page_for_financial_data(text)
-        page_scores.append((page_num, score, len(text.strip())))
-        log.debug(f"  Page {page_num + 1}: score={score}, text_len={len(text.strip())}")
-    
-    pdf_doc.close()
-    
-    # Sort by score descending
-    page_scores.sort(key=lambda x: x[1], reverse=True)
-    
-    # Select pages that meet minimum score, up to max_pages
-    selected_pages = []
-    for page_num, score, text_len in page_scores:
-        if score >= min_score and len(selected_pages) < max_pages:
-            selected_pages.append(page_num)
-    
-    # If we didn't get enough pages, add some more by score order
-    if len(selected_pages) < 5:
+
+    with as_session(pdf) as pdf_doc:
+        total_pages = pdf_doc.page_count
+
+        texts = [pdf_doc.text(page_num) for page_num in range(total_pages)]
+        page_scores = []
+        for page_num, (text, score) in enumerate(zip(texts, score_pages(texts))):
+            page_scores.append((page_num, score, len(text.strip())))
+            log.debug(f"  Page {page_num + 1}: score={score}, text_len={len(text.strip())}")
+
+        # Sort by score descending
+        page_scores.sort(key=lambda x: x[1], reverse=True)
+
+        # Select pages that meet minimum score, up to max_pages
+        selected_pages = []
         for page_num, score, text_len in page_scores:
-            if page_num not in selected_pages and len(selected_pages) < max_pages:
+            if score >= min_score and len(selected_pages) < max_pages:
                 selected_pages.append(page_num)
-            if len(selected_pages) >= 10:
-                break
-    
-    # Sort selected pages back to original order for coherent reading
-    selected_pages.sort()
-    
-    log.info(f"[V2] Selected {len(selected_pages)} of {total_pages} pages: {[p+1 for p in selected_pages]}")
-    
-    # Convert only selected pages to images at reduced resolution
-    # Using DPI of 100 instead of default 200 to reduce file size
-    all_images = convert_from_bytes(pdf_bytes, dpi=100)
-    selected_images = [all_images[i] for i in selected_pages if i < len(all_images)]
-    
-    log.info(f"[V2] Converted {len(selected_images)} pages to images for Claude (DPI=100)")
-    
+
+        # If we didn't get enough pages, add some more by score order
+        if len(selected_pages) < 5:
+            for page_num, score, text_len in page_scores:
+                if page_num not in selected_pages and len(selected_pages) < max_pages:
+                    selected_pages.append(page_num)
+                if len(selected_pages) >= 10:
+                    break
+
+        # Sort selected pages back to original order for coherent reading
+        selected_pages.sort()
+
+        log.info(f"[V2] Selected {len(selected_pages)} of {total_pages} pages: {[p+1 for p in selected_pages]}")
+
+        # Render only the selected pages (on the render pool when there are
+        # enough of them), at DPI 100 instead of 200 to reduce file size
+        selected_images = pdf_doc.render_many(selected_pages, dpi=100)
+
+        log.info(f"[V2] Converted {len(selected_images)} pages to images for Claude (DPI=100)")
+
     return selected_images
 
 
@@ -506,21 +462,9 @@ async def rapid_fire_underwrite(
     min_coc = _num_or_default("minCoC", 8.0)
     min_cap = _num_or_default("minCapRate", 7.0)
 
-    def as_float(v):
-        if v is None:
-            return None
-        if isinstance(v, (int, float)):
-            return float(v)
-        s = str(v).strip().replace(",", "").replace("$", "").replace("%", "")
-        if not s:
-            return None
-        try:
-            return float(s)
-        except Exception:
-            return None
-
-    # Load tabular data from CSV or Excel into list of dicts.
+    # Load tabular data from CSV or Excel: header names plus one list of cells per data row.
     rows = []
+    headers = []
     filename = (file.filename or "").lower()
     try:
         if filename.endswith(".csv") or mime == "text/csv":
@@ -554,12 +498,7 @@ async def rapid_fire_underwrite(
                 seen_headers.add(col_name)
                 headers.append(col_name)
 
-            rows = []
-            for r in csv_rows[header_row_idx + 1 :]:
-                if not any(str(c).strip() for c in r):
-                    continue
-                row_dict = {headers[i]: (r[i] if i < len(r) else None) for i in range(len(headers))}
-                rows.append(row_dict)
+            rows = [r for r in csv_rows[header_row_idx + 1 :] if any(str(c).strip() for c in r)]
 
             log.info(
                 "[RapidFire] CSV header row index=%d, headers=%r, data_rows=%d",
@@ -605,13 +544,8 @@ async def rapid_fire_underwrite(
                 seen_headers.add(col_name)
                 headers.append(col_name)
 
-            rows = []
-            for r in values[header_row_idx + 1 :]:
-                if not r:  # Skip completely empty rows
-                    continue
-                # Safety check: handle rows with fewer cells than headers
-                row_dict = {headers[i]: (r[i] if i < len(r) else None) for i in range(len(headers))}
-                rows.append(row_dict)
+            # Skip completely empty rows; short rows are padded when columns are read
+            rows = [r for r in values[header_row_idx + 1 :] if r]
 
             log.info(
                 "[RapidFire] Excel header row index=%d, headers=%r, data_rows=%d",
@@ -652,10 +586,20 @@ async def rapid_fire_underwrite(
                         return h
         return None
 
-    # Build header normalization map from first row's keys.
+    # Column positions by header (a repeated name maps to its last column, as a row dict would).
+    col_index = {h: i for i, h in enumerate(headers)}
+
+    def column(header: str) -> list:
+        """Cells of `header` for every data row; None for short rows or an undetected column."""
+        if not header:
+            return [None] * len(rows)
+        i = col_index[header]
+        return [r[i] if i < len(r) else None for r in rows]
+
+    # Build header normalization map from the header row.
     header_map = {}
     if rows:
-        for k in rows[0].keys():
+        for k in headers:
             header_map[k] = norm(k)
     log.info(f"[RapidFire] ALL COLUMN HEADERS FOUND: {list(header_map.keys())}")
     log.info(f"[RapidFire] Normalized header map: {header_map}")
@@ -745,7 +689,8 @@ async def rapid_fire_underwrite(
         return detected
     
     # Run intelligent detection
-    detected_cols = detect_columns_by_data(rows, list(header_map.keys()))
+    sample_rows = [{h: (r[i] if i < len(r) else None) for i, h in enumerate(headers)} for r in rows[:20]]
+    detected_cols = detect_columns_by_data(sample_rows, list(header_map.keys()))
     
     # Use detected columns (fallback to empty string if not found)
     name_header = detected_cols.get("address", "")
@@ -777,9 +722,6 @@ async def rapid_fire_underwrite(
     if not total_price_header and not price_per_unit_header:
         log.warning("[RapidFire] No total price or price-per-unit column detected; rows may be skipped")
 
-    deals = []
-    skipped_no_price = 0
-
     # Preload external market data only when needed (Reonomy path)
     fmr_by_zip = None
     tax_by_county = None
@@ -787,231 +729,166 @@ async def rapid_fire_underwrite(
         fmr_by_zip = _load_fmr_by_zip()
         tax_by_county = _load_property_tax_by_county()
 
-    # Debt service helper (always based on TOTAL PRICE, never PPU)
-    def annual_debt_service(purchase_price):
-        loan_amount = purchase_price * (ltv_pct / 100.0)
-        r = (interest_rate_pct / 100.0) / 12.0
-        n = int(amort_years * 12)
-        if r <= 0 or n <= 0:
+    assumptions = {
+        "vacancy_rate": vacancy_rate,
+        "expense_ratio": expense_ratio,
+        "closing_costs_pct": closing_costs_pct,
+        "acquisition_fee_pct": acquisition_fee_pct,
+        "ltv_pct": ltv_pct,
+        "interest_rate_pct": interest_rate_pct,
+        "amort_years": amort_years,
+        "min_dscr": min_dscr,
+        "min_coc": min_coc,
+        "min_cap": min_cap,
+    }
+    ai_settings = {
+        "vacancyRate": vacancy_rate,
+        "expenseRatio": expense_ratio,
+        "closingCosts": closing_costs_pct,
+        "acquisitionFee": acquisition_fee_pct,
+        "ltv": ltv_pct,
+        "interestRate": interest_rate_pct,
+        "minDscr": min_dscr,
+        "minCoC": min_coc,
+        "minCapRate": min_cap,
+    }
+
+    def fmr_noi(zip_code, units, total_price):
+        """Basic FMR-based NOI for Reonomy rows the AI couldn't estimate."""
+        zip_row = fmr_by_zip.get(zip_code)
+        if zip_row is None:
             return None
         try:
-            payment = loan_amount * (r * (1 + r) ** n) / ((1 + r) ** n - 1)
-        except ZeroDivisionError:
+            # Prefer 2BR FMR as a proxy for per-unit rent
+            rent_2br = float(zip_row.get("fmr_2br") or 0.0)
+        except Exception:
+            rent_2br = 0.0
+        if rent_2br <= 0:
             return None
-        return payment * 12.0
-
-    for idx, row in enumerate(rows):
-        name = (row.get(name_header) if name_header else None) or ""
-        city = (row.get(city_header) if city_header else None) or ""
-        state = (row.get(state_header) if state_header else None) or ""
-        listing_url = (row.get(url_header) if url_header else None) or ""
-        owner_name = (row.get(owner_header) if owner_header else None) or ""
-
-        # Extract ZIP from explicit column or from address string (Reonomy path)
-        zip_code = None
-        if zip_header and row.get(zip_header):
-            zip_str = str(row.get(zip_header)).strip()
-            m = re.search(r"\b(\d{5})\b", zip_str)
-            if m:
-                zip_code = m.group(1)
-        if not zip_code and address_header and row.get(address_header):
-            addr_str = str(row.get(address_header))
-            m = re.search(r"\b(\d{5})\b", addr_str)
-            if m:
-                zip_code = m.group(1)
-
-        units = as_float(row.get(units_header)) if units_header else None
-        total_price = as_float(row.get(total_price_header)) if total_price_header else None
-        raw_price_per_unit = as_float(row.get(price_per_unit_header)) if price_per_unit_header else None
-        broker_cap = as_float(row.get(broker_cap_header)) if broker_cap_header else None
-        noi = as_float(row.get(noi_header)) if noi_header else None
-        gross_income = as_float(row.get(gross_income_header)) if gross_income_header else None
-
-        # Derive missing pricing fields according to explicit rules.
-        # 1) Try to get total_price from explicit total price columns.
-        # 2) If missing, but spreadsheet provides Price/Unit and Units, derive total_price.
-        if (total_price is None or total_price <= 0) and raw_price_per_unit is not None and units is not None and units > 0:
-            total_price = raw_price_per_unit * units
-
-        # If we still don't have a usable total price, we cannot underwrite this row.
-        if total_price is None or total_price <= 0:
-            skipped_no_price += 1
-            continue
 
-        # AI analysis vars - will be populated if AI is used
-        ai_reasoning = None
-        ai_confidence = None
-        use_ai_verdict = False
-        
-        # If NOI missing, approximate from gross income + settings, or from total price & broker cap.
-        if noi is None:
-            if gross_income is not None and gross_income > 0:
-                effective_income = gross_income * (1.0 - vacancy_rate / 100.0)
-                operating_expenses = effective_income * (expense_ratio / 100.0)
-                noi = effective_income - operating_expenses
-            elif broker_cap is not None and broker_cap > 0:
-                noi = total_price * (broker_cap / 100.0)
-            # Reonomy-style soft underwriting using FMR + taxes when NOI is missing
-            elif source_type == "reonomy" and fmr_by_zip is not None and zip_code and units not in (None, 0):
-                # Try AI-powered analysis for Reonomy deals with limited data
-                log.info(f"[AI] Using AI analysis for property: {name}")
-                
-                # Extract additional fields for AI context
-                sqft = as_float(row.get("total sqft")) if "total sqft" in row else None
-                mortgage_amt = as_float(row.get("last mortgage")) if "last mortgage" in row else None
-                
-                ai_analysis = analyze_property_with_ai(
-                    address=str(name or address_header),
-                    units=units,
-                    sale_price=total_price,
-                    sqft=sqft,
-                    mortgage_amount=mortgage_amt,
-                    zip_code=zip_code,
-                    fmr_data=fmr_by_zip,
-                    tax_by_county=tax_by_county,
-                    settings={
-                        "vacancyRate": vacancy_rate,
-                        "expenseRatio": expense_ratio,
-                        "closingCosts": closing_costs_pct,
-                        "acquisitionFee": acquisition_fee_pct,
-                        "ltv": ltv_pct,
-                        "interestRate": interest_rate_pct,
-                        "minDscr": min_dscr,
-                        "minCoC": min_coc,
-                        "minCapRate": min_cap,
-                    }
+        annual_gross_rent = rent_2br * float(units) * 12.0
+        effective_income = annual_gross_rent * (1.0 - vacancy_rate / 100.0)
+        base_operating_expenses = effective_income * (expense_ratio / 100.0)
+
+        tax_expense = 0.0
+        if tax_by_county is not None:
+            state_name = str(zip_row.get("state_name") or "").strip()
+            county_name = str(zip_row.get("county_name") or "").strip()
+            if state_name and county_name and total_price is not None:
+                key = (state_name.lower(), county_name.lower())
+                rate = tax_by_county.get(key)
+                if rate is not None and rate > 0:
+                    tax_expense = float(total_price) * rate
+
+        operating_expenses = base_operating_expenses + tax_expense
+        return effective_income - operating_expenses
+
+    # Typed columns; every napkin step below runs over whole columns.
+    units = float_column(column(units_header))
+    total_price = derive_total_price(
+        float_column(column(total_price_header)),
+        float_column(column(price_per_unit_header)),
+        units,
+    )
+
+    # Rows without a usable total price (even from Price/Unit x Units) can't be underwritten.
+    kept = np.flatnonzero(total_price > 0)
+    skipped_no_price = len(rows) - len(kept)
+    units = units[kept]
+    total_price = total_price[kept]
+    broker_cap = float_column(column(broker_cap_header))[kept]
+    # If NOI missing, approximate from gross income + settings, or from total price & broker cap.
+    noi = fallback_noi(
+        float_column(column(noi_header))[kept],
+        total_price,
+        float_column(column(gross_income_header))[kept],
+        broker_cap,
+        assumptions,
+    )
+    text = {}
+    for key, header in (("name", name_header), ("city", city_header), ("state", state_header),
+                        ("listing_url", url_header), ("owner_name", owner_header)):
+        cells = column(header)
+        text[key] = [cells[i] for i in kept.tolist()]
+
+    # Reonomy-style soft underwriting: rows still without NOI get Claude, then FMR + taxes.
+    ai_pos = []
+    ai_calls = []
+    ai_zips = []
+    if source_type == "reonomy" and fmr_by_zip is not None:
+        zip_cells = column(zip_header)
+        address_cells = column(address_header)
+        sqft_cells = column("total sqft") if "total sqft" in col_index else None
+        mortgage_cells = column("last mortgage") if "last mortgage" in col_index else None
+        candidates = np.flatnonzero(np.isnan(noi) & ~np.isnan(units) & (units != 0))
+        for pos in candidates.tolist():
+            i = int(kept[pos])
+            # Extract ZIP from explicit column or from address string
+            zip_code = None
+            for cell in (zip_cells[i], address_cells[i]):
+                m = re.search(r"\b(\d{5})\b", str(cell)) if cell else None
+                if m:
+                    zip_code = m.group(1)
+                    break
+            if not zip_code:
+                continue
+            name = text["name"][pos] or ""
+            log.info(f"[AI] Queued AI analysis for property: {name}")
+            ai_pos.append(pos)
+            ai_zips.append(zip_code)
+            ai_calls.append({
+                "address": str(name or address_header),
+                "units": float(units[pos]),
+                "sale_price": float(total_price[pos]),
+                "sqft": as_float(sqft_cells[i]) if sqft_cells is not None else None,
+                "mortgage_amount": as_float(mortgage_cells[i]) if mortgage_cells is not None else None,
+                "zip_code": zip_code,
+                "fmr_data": fmr_by_zip,
+                "tax_by_county": tax_by_county,
+                "settings": ai_settings,
+            })
+
+    def deals_at(pos, noi_values, ai=None):
+        """Deal dicts for the kept rows at positions `pos`, given their NOI."""
+        metrics = napkin_metrics(total_price[pos], units[pos], noi_values, assumptions)
+        subset = {key: [cells[p] for p in pos.tolist()] for key, cells in text.items()}
+        return build_deals(kept[pos].tolist(), subset, units[pos], total_price[pos], broker_cap[pos],
+                           noi_values, metrics, assumptions, ai)
+
+    # The AI calls run while the math-only rows are underwritten, and their
+    # deals are slotted back in row order afterwards.
+    ai_task = asyncio.ensure_future(analyze_concurrently(analyze_property_with_ai, ai_calls))
+    await asyncio.sleep(0)
+    math_pos = np.ones(len(kept), dtype=bool)
+    math_pos[ai_pos] = False
+    math_pos = np.flatnonzero(math_pos)
+    deals = [None] * len(kept)
+    for pos, deal in zip(math_pos.tolist(), deals_at(math_pos, noi[math_pos])):
+        deals[pos] = deal
+
+    analyses, ai_stats = await ai_task
+    if ai_pos:
+        ai_noi = np.full(len(ai_pos), np.nan)
+        ai_used = []
+        for j, ai_analysis in enumerate(analyses):
+            # Use AI results if available
+            estimated = as_float(ai_analysis.get("estimatedNOI")) if ai_analysis else None
+            if estimated:
+                ai_noi[j] = estimated
+                ai_used.append(ai_analysis)
+                log.info(
+                    f"[AI] Estimated NOI: ${estimated:,.0f}, Verdict: {ai_analysis.get('verdict', 'MAYBE').upper()}, "
+                    f"Confidence: {ai_analysis.get('confidence', 'medium')}"
                 )
-                
-                # Use AI results if available
-                if ai_analysis.get("estimatedNOI"):
-                    noi = ai_analysis["estimatedNOI"]
-                    ai_reasoning = ai_analysis.get("reasoning", "AI-powered analysis")
-                    ai_confidence = ai_analysis.get("confidence", "medium")
-                    use_ai_verdict = True
-                    
-                    # Use AI's verdict directly - don't override with math logic
-                    ai_verdict = ai_analysis.get("verdict", "MAYBE").upper()
-                    
-                    log.info(f"[AI] Estimated NOI: ${noi:,.0f}, Verdict: {ai_verdict}, Confidence: {ai_confidence}")
-                
-                # Fallback: Use basic FMR calculation if AI didn't produce NOI
-                if noi is None:
-                    zip_row = fmr_by_zip.get(zip_code)
-                    if zip_row is not None:
-                        try:
-                            # Prefer 2BR FMR as a proxy for per-unit rent
-                            rent_2br = float(zip_row.get("fmr_2br") or 0.0)
-                        except Exception:
-                            rent_2br = 0.0
-
-                        if rent_2br > 0:
-                            annual_gross_rent = rent_2br * float(units) * 12.0
-                            effective_income = annual_gross_rent * (1.0 - vacancy_rate / 100.0)
-                            base_operating_expenses = effective_income * (expense_ratio / 100.0)
-
-                            tax_expense = 0.0
-                            if tax_by_county is not None:
-                                state_name = str(zip_row.get("state_name") or "").strip()
-                                county_name = str(zip_row.get("county_name") or "").strip()
-                                if state_name and county_name and total_price is not None:
-                                    key = (state_name.lower(), county_name.lower())
-                                    rate = tax_by_county.get(key)
-                                    if rate is not None and rate > 0:
-                                        tax_expense = float(total_price) * rate
-
-                            operating_expenses = base_operating_expenses + tax_expense
-                            noi = effective_income - operating_expenses
-
-        calculated_cap_rate = None
-        if noi is not None and total_price > 0:
-            # Use totalPrice only; this is the underwriting cap rate.
-            calculated_cap_rate = (noi / total_price) * 100.0
-
-        ads = annual_debt_service(total_price)
-        dscr = None
-        if noi is not None and ads not in (None, 0):
-            dscr = noi / ads
-
-        # Simple equity + CoC calc, always based on TOTAL PRICE
-        equity = total_price * (1.0 - ltv_pct / 100.0)
-        equity += total_price * (closing_costs_pct / 100.0)
-        equity += total_price * (acquisition_fee_pct / 100.0)
-
-        cash_on_cash = None
-        monthly_cf = None
-        if noi is not None and ads is not None and equity > 0:
-            annual_cf = noi - ads
-            cash_on_cash = (annual_cf / equity) * 100.0
-            monthly_cf = annual_cf / 12.0
-
-        # Verdict classification with reasons
-        verdict_reasons = []
-
-        # If AI was used, trust its verdict instead of recalculating
-        if use_ai_verdict:
-            verdict = ai_verdict
-            verdict_reasons.append(ai_reasoning or "AI-powered analysis")
-        else:
-            # Traditional math-based verdict logic
-            missing_total = total_price is None or total_price <= 0
-            missing_noi = noi is None or noi <= 0
-            missing_units = units is None or units <= 0
-
-            if missing_total or missing_noi or missing_units:
-                verdict = "TRASH"
-                if missing_total:
-                    verdict_reasons.append("Missing or invalid total price")
-                if missing_noi:
-                    verdict_reasons.append("Missing or invalid NOI")
-                if missing_units:
-                    verdict_reasons.append("Missing or invalid units")
             else:
-                # DSCR gate
-                if dscr is not None and dscr < min_dscr:
-                    verdict = "TRASH"
-                    verdict_reasons.append(f"DSCR {dscr:.2f} below minimum {min_dscr:.2f}")
-                # Cash-on-cash gate
-                elif cash_on_cash is not None and cash_on_cash < min_coc:
-                    verdict = "TRASH"
-                    verdict_reasons.append(f"Cash-on-cash {cash_on_cash:.1f}% below minimum {min_coc:.1f}%")
-                # Cap rate gate
-                elif calculated_cap_rate is not None and calculated_cap_rate < min_cap:
-                    verdict = "MAYBE"
-                    verdict_reasons.append(f"Cap rate {calculated_cap_rate:.1f}% below minimum {min_cap:.1f}%")
-                else:
-                    verdict = "DEAL"
-                    verdict_reasons.append("Meets all minimum underwriting thresholds")
-
-        # Final price-per-unit for DTO: always derived from total price and units.
-        price_per_unit_dto = None
-        if total_price is not None and total_price > 0 and units is not None and units > 0:
-            price_per_unit_dto = total_price / units
-
-        deals.append({
-            "id": f"rf-{idx+1}",
-            "name": str(name) if name else "Unnamed Property",
-            "city": str(city) if city else "",
-            "state": str(state) if state else "",
-            "units": int(units) if units is not None else None,
-            # DTO fields for frontend
-            "totalPrice": float(total_price),
-            "pricePerUnit": float(price_per_unit_dto) if price_per_unit_dto is not None and price_per_unit_dto > 0 else None,
-            "brokerCapRate": float(broker_cap) if broker_cap is not None else None,
-            "noi": float(noi) if noi is not None else None,
-            "calculatedCapRate": float(calculated_cap_rate) if calculated_cap_rate is not None else None,
-            "dscr": float(dscr) if dscr is not None else None,
-            "cashOnCash": float(cash_on_cash) if cash_on_cash is not None else None,
-            "monthlyCashFlow": float(monthly_cf) if monthly_cf is not None else None,
-            "listingUrl": str(listing_url).strip() if listing_url else None,
-            "ownerName": str(owner_name).strip() if owner_name else None,
-            "verdict": verdict,
-            "verdictReasons": verdict_reasons,
-            "aiAnalysis": {
-                "used": use_ai_verdict,
-                "reasoning": ai_reasoning,
-                "confidence": ai_confidence,
-            } if use_ai_verdict else None,
-        })
+                # Fallback: Use basic FMR calculation if AI didn't produce NOI
+                fallback = fmr_noi(ai_zips[j], units[ai_pos[j]], total_price[ai_pos[j]])
+                if fallback is not None:
+                    ai_noi[j] = fallback
+                ai_used.append(None)
+        ai_pos = np.array(ai_pos)
+        for pos, deal in zip(ai_pos.tolist(), deals_at(ai_pos, ai_noi, ai_used)):
+            deals[pos] = deal
 
     log.info(
         "[RapidFire] Built %d deals (skipped_no_price=%d)",
@@ -1041,17 +918,17 @@ async def rapid_fire_underwrite(
         },
         "skipped_no_price": skipped_no_price,
         "returned_deals": len(deals),
+        "ai_enrichment": ai_stats,
     }
 
-    return {"deals": deals, "debug": debug}
+    # Deals are plain JSON types already; skip FastAPI's per-value encoder walk.
+    return JSONResponse(content={"deals": deals, "debug": debug})
 
 
 @router.post("/deals/parse")
 async def parse_deal_v2(file: UploadFile = File(...)):
     log.info(f"[V2] Parse request for file: {file.filename}")
     
-    # Import at module level to avoid reimporting App
-    from anthropic import Anthropic
     import base64
     
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY") or os.getenv("CLAUDE_API_KEY")
@@ -1075,41 +952,28 @@ async def parse_deal_v2(file: UploadFile = File(...)):
     try:
         log.info("[V2] Parsing with Claude vision API...")
         
-        anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        anthropic_client = get_anthropic_client(ANTHROPIC_API_KEY)
         
         # PDFs need to be converted to images for Claude vision
         if mime == "application/pdf":
-            # Use smart filtering to only process pages with financial data
-            try:
-                images = filter_pdf_pages_smart(data, min_score=15, max_pages=15)
-            except Exception as filter_err:
-                log.warning(f"[V2] Smart filter failed, falling back to limited pages: {filter_err}")
-                from pdf2image import convert_from_bytes
-                images = convert_from_bytes(data, dpi=100, first_page=1, last_page=10)
+            with PdfSession(data) as pdf:
+                # Use smart filtering to only process pages with financial data
+                try:
+                    images = filter_pdf_pages_smart(pdf, min_score=15, max_pages=15)
+                except Exception as filter_err:
+                    log.warning(f"[V2] Smart filter failed, falling back to limited pages: {filter_err}")
+                    images = pdf.render_many(range(min(10, pdf.page_count)), dpi=100)
             
             if not images:
                 raise HTTPException(status_code=400, detail="Could not extract images from PDF")
             
-            # Compress images to JPEG for smaller file sizes
-            import io
-            content_items = []
-            for img in images:
-                img_byte_arr = io.BytesIO()
-                # Convert to RGB if needed (JPEG doesn't support RGBA)
-                if img.mode == 'RGBA':
-                    img = img.convert('RGB')
-                # Save as JPEG with 75% quality - much smaller than PNG
-                img.save(img_byte_arr, format='JPEG', quality=75, optimize=True)
-                img_byte_arr = img_byte_arr.getvalue()
-                file_b64 = base64.b64encode(img_byte_arr).decode('utf-8')
-                content_items.append({
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": "image/jpeg",
-                        "data": file_b64
-                    }
-                })
+            # Size and compress pages to the token / payload budgets (text pages
+            # keep more resolution than photos), encoding in parallel
+            content_items, encode_stats = await run_blocking("vision", encode_pages, images)
+            log.info(
+                f"[V2] Encoded {encode_stats['pages']} pages: ~{encode_stats['est_tokens']} image tokens, "
+                f"{encode_stats['payload_bytes'] / 1024:.0f} KB base64, kinds={encode_stats['kinds']}"
+            )
         else:
             file_b64 = base64.b64encode(data).decode('utf-8')
             media_type_map = {
@@ -1202,7 +1066,9 @@ EXPENSE RATIO FIELD RULES:
             "content": content_items
         }]
         
-        response = anthropic_client.messages.create(
+        response = await run_blocking(
+            "anthropic",
+            anthropic_client.messages.create,
             model=ANTHROPIC_MODEL,
             max_tokens=4000,
             messages=messages
@@ -1456,7 +1322,9 @@ async def underwrite_deal(deal_id: str, request: Request):
             "content": "Use the system prompt, deal_json, calc_json, wizard_structure, and buy_box provided above. Do NOT recalculate numbers that already exist in calc_json. Produce the 1–8 section underwriting exactly in the required format."
         }
 
-        analysis_text = call_openai_chat(
+        analysis_text = await run_blocking(
+            "openai",
+            call_openai_chat,
             system_prompt=system_prompt,
             messages=[user_message],
             model="gpt-4o-mini",
@@ -1485,7 +1353,9 @@ async def underwrite_deal(deal_id: str, request: Request):
         )
 
         # Generate compact summary via OpenAI as well
-        summary_text = call_openai_chat(
+        summary_text = await run_blocking(
+            "openai",
+            call_openai_chat,
             system_prompt=summary_system_prompt,
             messages=[{"role": "user", "content": "Using only the data above, produce a 2–4 sentence, blunt summary for the Deal-or-No-Deal header. Do NOT compute any new numbers."}],
             model="gpt-4o-mini",
@@ -1633,7 +1503,9 @@ async def max_underwrite_deal(deal_id: str, request: Request):
             "content": f"Underwrite this deal:\n\n```json\n{json.dumps(input_json, indent=2)}\n```"
         }
 
-        analysis_text = call_openai_chat(
+        analysis_text = await run_blocking(
+            "openai",
+            call_openai_chat,
             system_prompt=system_prompt,
             messages=[user_message],
             model="gpt-4o-mini",
@@ -1753,7 +1625,9 @@ async def chat_with_deal(deal_id: str, request: ChatRequest):
         
         if request.llm == "openai":
             from .llm_client import client
-            response = client.chat.completions.create(
+            response = await run_blocking(
+                "openai",
+                client.chat.completions.create,
                 model=request.model,
                 messages=full_messages,
                 temperature=0.7,
@@ -1813,7 +1687,9 @@ async def chat_with_sheet(request: Request):
         full_messages.append({"role": role, "content": content})
 
     try:
-        response = client.chat.completions.create(
+        response = await run_blocking(
+            "openai",
+            client.chat.completions.create,
             model=os.getenv("OPENAI_SHEET_MODEL", "gpt-4o-mini"),
             messages=full_messages,
             temperature=0.3,
@@ -1861,7 +1737,9 @@ async def analyze_noi(deal_id: str, request: Request):
             "content": "Analyze this property's NOI engineering opportunities using the provided deal_json and calc_json. Follow the output structure exactly."
         }
 
-        analysis_text = call_openai_chat(
+        analysis_text = await run_blocking(
+            "openai",
+            call_openai_chat,
             system_prompt=system_prompt,
             messages=[user_message],
             model="gpt-4o-mini",
@@ -1924,7 +1802,9 @@ async def analyze_structure(deal_id: str, request: Request):
             "content": "Analyze this deal's structure and recommend the optimal financing approach using the provided data. Follow the output structure exactly."
         }
 
-        analysis_text = call_openai_chat(
+        analysis_text = await run_blocking(
+            "openai",
+            call_openai_chat,
             system_prompt=system_prompt,
             messages=[user_message],
             model="gpt-4o-mini",
@@ -1984,80 +1864,80 @@ async def get_rentcast_data(deal_id: str, request: Request):
         property_type = "Apartment"
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Build query parameters
-            params = {
-                "address": address,
-                "propertyType": property_type
-            }
-            if city:
-                params["city"] = city
-            if state:
-                params["state"] = state
-            if zipcode:
-                params["zipCode"] = zipcode
-            if bedrooms:
-                params["bedrooms"] = bedrooms
-            if bathrooms:
-                params["bathrooms"] = bathrooms
-            
-            headers = {
-                "X-Api-Key": RENTCAST_API_KEY,
-                "Accept": "application/json"
-            }
+        client = get_async_http_client("rentcast")
+        # Build query parameters
+        params = {
+            "address": address,
+            "propertyType": property_type
+        }
+        if city:
+            params["city"] = city
+        if state:
+            params["state"] = state
+        if zipcode:
+            params["zipCode"] = zipcode
+        if bedrooms:
+            params["bedrooms"] = bedrooms
+        if bathrooms:
+            params["bathrooms"] = bathrooms
+        
+        headers = {
+            "X-Api-Key": RENTCAST_API_KEY,
+            "Accept": "application/json"
+        }
+        
+        log.info(f"[V2] RentCast API call with params: {params}")
+        
+        # Call RentCast Rent Estimate API
+        response = await client.get(
+            "https://api.rentcast.io/v1/avm/rent/long-term",
+            params=params,
+            headers=headers,
+            timeout=30.0
+        )
+        
+        if response.status_code == 200:
+            rent_data = response.json()
+            log.info(f"[V2] RentCast success: {rent_data}")
             
-            log.info(f"[V2] RentCast API call with params: {params}")
+            # Also try to get comparable rentals
+            try:
+                comps_response = await client.get(
+                    "https://api.rentcast.io/v1/listings/rental/long-term",
+                    params={
+                        "latitude": rent_data.get("latitude"),
+                        "longitude": rent_data.get("longitude"),
+                        "radius": 1,  # 1 mile radius
+                        "limit": 10,
+                        "status": "Active"
+                    },
+                    headers=headers,
+                    timeout=30.0
+                )
+                if comps_response.status_code == 200:
+                    rent_data["comparables"] = comps_response.json()
+            except Exception as comp_err:
+                log.warning(f"[V2] Could not fetch comparables: {comp_err}")
+                rent_data["comparables"] = []
             
-            # Call RentCast Rent Estimate API
-            response = await client.get(
-                "https://api.rentcast.io/v1/avm/rent/long-term",
-                params=params,
-                headers=headers,
-                timeout=30.0
+            return JSONResponse({
+                "success": True,
+                "data": rent_data,
+                "address_searched": address
+            })
+        elif response.status_code == 404:
+            return JSONResponse({
+                "success": False,
+                "error": "No rent data found for this address",
+                "address_searched": address
+            }, status_code=404)
+        else:
+            log.error(f"[V2] RentCast API error: {response.status_code} - {response.text}")
+            raise HTTPException(
+                status_code=response.status_code, 
+                detail=f"RentCast API error: {response.text}"
             )
             
-            if response.status_code == 200:
-                rent_data = response.json()
-                log.info(f"[V2] RentCast success: {rent_data}")
-                
-                # Also try to get comparable rentals
-                try:
-                    comps_response = await client.get(
-                        "https://api.rentcast.io/v1/listings/rental/long-term",
-                        params={
-                            "latitude": rent_data.get("latitude"),
-                            "longitude": rent_data.get("longitude"),
-                            "radius": 1,  # 1 mile radius
-                            "limit": 10,
-                            "status": "Active"
-                        },
-                        headers=headers,
-                        timeout=30.0
-                    )
-                    if comps_response.status_code == 200:
-                        rent_data["comparables"] = comps_response.json()
-                except Exception as comp_err:
-                    log.warning(f"[V2] Could not fetch comparables: {comp_err}")
-                    rent_data["comparables"] = []
-                
-                return JSONResponse({
-                    "success": True,
-                    "data": rent_data,
-                    "address_searched": address
-                })
-            elif response.status_code == 404:
-                return JSONResponse({
-                    "success": False,
-                    "error": "No rent data found for this address",
-                    "address_searched": address
-                }, status_code=404)
-            else:
-                log.error(f"[V2] RentCast API error: {response.status_code} - {response.text}")
-                raise HTTPException(
-                    status_code=response.status_code, 
-                    detail=f"RentCast API error: {response.text}"
-                )
-                
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="RentCast API timeout")
     except HTTPException:
@@ -2258,6 +2138,92 @@ async def calculate_cost_segregation(deal_id: str, request: Request):
         raise HTTPException(status_code=500, detail=f"Cost seg calculation failed: {str(e)}")
 
 
+@router.post("/deals/{deal_id}/sensitivity")
+async def deal_sensitivity(deal_id: str, request: Request):
+    """
+    Price x interest rate x exit cap sensitivity grid for a deal.
+
+    Every axis is optional ({"values": [...]} or {"min", "max", "steps"};
+    omitted axes default to a band around the deal's own number):
+    {
+        "price": {"min": 5400000, "max": 6600000, "steps": 50},
+        "rate": {"values": [5.5, 6.0, 6.5, 7.0]},       # percent
+        "exit_cap": {"min": 6.0, "max": 8.0, "steps": 10},  # percent
+        "overrides": {"ltv": 75, "hold_years": 5, "income_growth": 3, ...}
+    }
+
+    Returns IRR and equity multiple as [price][rate][exit_cap] arrays and
+    year-1 cash-on-cash and DSCR as [price][rate] arrays, computed from the
+    saved scenario (or the parsed OM) in one vectorized pass.
+    """
+    deal = storage.get_deal(deal_id)
+    if not deal:
+        raise HTTPException(status_code=404, detail="Deal not found")
+    try:
+        body = await request.json()
+    except:
+        body = {}
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Body must be a JSON object")
+
+    deal_json = getattr(deal, "scenario_json", None) or deal.parsed_json
+    try:
+        result = await run_blocking("metrics", sensitivity_for_deal, deal_json, body)
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    log.info(f"[V2] Sensitivity grid for {deal_id}: {result['cells']} cells in {result['compute_ms']} ms")
+    return JSONResponse({"success": True, "deal_id": deal_id, **result})
+
+
+@router.post("/deals/{deal_id}/monte-carlo")
+async def deal_monte_carlo(deal_id: str, request: Request):
+    """
+    Seeded Monte Carlo simulation of a deal's returns.
+
+    Accepts (all optional):
+    {
+        "paths": 100000,
+        "seed": 42,
+        "distributions": {                       # percent units
+            "rent_growth": {"dist": "normal", "mean": 3, "sd": 1.5},
+            "expense_growth": {"dist": "uniform", "min": 1, "max": 4},
+            "vacancy": {"dist": "triangular", "min": 3, "mode": 5, "max": 12},
+            "exit_cap": {"dist": "normal", "mean": 7, "sd": 0.5},
+            "rate_reset": {"dist": "normal", "mean": 0.5, "sd": 1}   # change to the note rate
+        },
+        "reset_year": 6,                         # defaults to the loan term; no reset without one
+        "buy_box": {"minDscr": 1.25},            # defaults to the deal's buy box
+        "percentiles": [5, 50, 95],
+        "overrides": {"hold_years": 7, ...},
+        "parallel": true                         # process-pool mode; auto for large runs
+    }
+
+    Returns IRR, year-1 cash-on-cash and minimum-DSCR percentiles and the
+    probability of breaching the buy-box minimum DSCR. The same seed gives
+    the same answer with or without the process pool.
+    """
+    deal = storage.get_deal(deal_id)
+    if not deal:
+        raise HTTPException(status_code=404, detail="Deal not found")
+    try:
+        body = await request.json()
+    except:
+        body = {}
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Body must be a JSON object")
+
+    deal_json = getattr(deal, "scenario_json", None) or deal.parsed_json
+    try:
+        result = await run_blocking("metrics", run_monte_carlo, deal_json, body)
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    log.info(f"[V2] Monte Carlo for {deal_id}: {result['paths']} paths in {result['compute_ms']} ms "
+             f"(parallel={result['parallel']})")
+    return JSONResponse({"success": True, "deal_id": deal_id, **result})
+
+
 # ============================================================================
 # Market Research Endpoints (Perplexity Integration)
 # ============================================================================
@@ -2623,8 +2589,6 @@ async def get_market_cap_rate(request: Request):
     Get market cap rate estimate for a property based on location and characteristics.
     Uses Claude to research and estimate prevailing market cap rates.
     """
-    from anthropic import Anthropic
-    
     try:
         body = await request.json()
     except:
@@ -2674,9 +2638,11 @@ Based on current market conditions and comparable transactions, what is the prev
         raise HTTPException(status_code=503, detail="Claude/Anthropic API key not configured")
     
     try:
-        anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        anthropic_client = get_anthropic_client(ANTHROPIC_API_KEY)
         
-        response = anthropic_client.messages.create(
+        response = await run_blocking(
+            "anthropic",
+            anthropic_client.messages.create,
             model="claude-sonnet-4-5-20250929",
             max_tokens=1000,
             system=MARKET_CAP_RATE_SYSTEM_PROMPT,
@@ -2809,8 +2775,6 @@ async def generate_loi(request: Request):
         }
     }
     """
-    from anthropic import Anthropic
-    
     log.info("[V2] LOI generation request received")
     
     # Check if user has tokens BEFORE processing
@@ -2956,9 +2920,11 @@ Generate a complete, professional LOI ready for submission. Include appropriate
         raise HTTPException(status_code=503, detail="Claude/Anthropic API key not configured")
     
     try:
-        anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        anthropic_client = get_anthropic_client(ANTHROPIC_API_KEY)
         
-        response = anthropic_client.messages.create(
+        response = await run_blocking(
+            "anthropic",
+            anthropic_client.messages.create,
             model="claude-sonnet-4-5-20250929",
             max_tokens=3000,
             system=LOI_SYSTEM_PROMPT,
@@ -3128,8 +3094,6 @@ async def generate_pitch_deck(request: Request, deal_id: str):
       "maxSections": int (optional, default 7)
     }
     """
-    from anthropic import Anthropic
-
     log.info(f"[V2] Pitch deck generation request received for deal {deal_id}")
 
     # Token check
@@ -3310,9 +3274,11 @@ STRUCTURE & CONSTRAINTS:
         raise HTTPException(status_code=503, detail="Claude/Anthropic API key not configured")
 
     try:
-        anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        anthropic_client = get_anthropic_client(ANTHROPIC_API_KEY)
 
-        response = anthropic_client.messages.create(
+        response = await run_blocking(
+            "anthropic",
+            anthropic_client.messages.create,
             model="claude-sonnet-4-5-20250929",
             max_tokens=8000,
             system=PITCH_DECK_SYSTEM_PROMPT,
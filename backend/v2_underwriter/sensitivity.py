@@ -0,0 +1,228 @@
+# Sensitivity Grid Module
+# Price x interest rate x exit cap tables for a stored deal, in one vectorized pass
+
+from typing import Dict, Any, List, Optional
+import os
+import time
+
+import numpy as np
+
+from amortization import pmti, remaining_balance
+from returns import irr, equity_multiple
+
+SENSITIVITY_MAX_CELLS = int(os.getenv("SENSITIVITY_MAX_CELLS", "250000"))
+
+# Defaults for assumptions the deal leaves out, matching the client's pro forma
+# (client/src/utils/realEstateCalculations.js) so the base cell reproduces its IRR
+DEFAULT_INCOME_GROWTH = 0.0
+DEFAULT_EXPENSE_GROWTH = 3.0
+DEFAULT_EXIT_CAP = 7.25
+MAX_EXIT_CAP = 20.0
+
+# Axis defaults when the request leaves an axis out: (half-width, steps) around the base value
+DEFAULT_AXES = {
+    "price": (0.10, 11),      # +/-10% of the deal price
+    "rate": (1.5, 7),         # +/-150 bps
+    "exit_cap": (1.0, 5),     # +/-100 bps
+}
+
+
+def _num(value: Any, default: Optional[float] = None) -> Optional[float]:
+    try:
+        if value is None or value == "":
+            return default
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _pct(value: Any, default: Optional[float] = None) -> Optional[float]:
+    """Percent figure for fields that are always percentages (0 and 0.5 mean 0% and 0.5%)."""
+    return _num(value, default)
+
+
+def _rate_pct(value: Any, default: Optional[float] = None) -> Optional[float]:
+    """Percent figure (6.5) from either 6.5 or 0.065, for LTVs and note rates."""
+    v = _num(value)
+    if v is None:
+        return default
+    return v * 100 if 0 < abs(v) < 1 else v
+
+
+def _first(*values: Optional[float]) -> Optional[float]:
+    return next((v for v in values if v is not None), None)
+
+
+def extract_sensitivity_inputs(deal_json: Dict[str, Any], overrides: Dict[str, Any] = None) -> Dict[str, float]:
+    """
+    Base-case inputs for the grid from a scenario/parsed deal JSON.
+    Wizard financing (`financing`) wins over the OM's `pricing_financing`;
+    anything in `overrides` wins over both.
+    """
+    pricing = deal_json.get("pricing_financing") or {}
+    financing = deal_json.get("financing") or {}
+    pnl = deal_json.get("pnl") or {}
+    uw = deal_json.get("underwriting") or {}
+
+    price = _num(pricing.get("price")) or _num(pricing.get("purchase_price")) or 0.0
+    egi = _num(pnl.get("effective_gross_income"))
+    opex = _num(pnl.get("operating_expenses"))
+    noi = _num(pnl.get("noi"))
+    if noi is None and egi is not None and opex is not None:
+        noi = egi - opex
+
+    loan = _num(pricing.get("loan_amount"))
+    ltv = _first(_rate_pct(financing.get("ltv")), _rate_pct(pricing.get("ltv")))
+    if ltv is None and loan and price:
+        ltv = loan / price * 100
+    interest_rate = _first(_rate_pct(financing.get("interest_rate")), _rate_pct(pricing.get("interest_rate")))
+
+    inputs = {
+        "price": price,
+        "noi": noi or 0.0,
+        "egi": egi or 0.0,
+        "opex": opex or 0.0,
+        "ltv": ltv if ltv is not None else 75.0,
+        "interest_rate": interest_rate if interest_rate is not None else 6.5,
+        "amortization_years": _num(financing.get("amortization_years")) or _num(pricing.get("amortization_years")) or 30,
+        "io_years": _num(financing.get("io_years"), 0.0),
+        "loan_fees_percent": _num(financing.get("loan_fees_percent"), 0.0),
+        "closing_costs": _num(pricing.get("closing_costs"), 0.0),
+        "hold_years": (_num(uw.get("holding_period")) or _num(financing.get("holding_period"))
+                       or _num(pricing.get("hold_period")) or 5),
+        "income_growth": _pct(uw.get("income_growth_rate"), DEFAULT_INCOME_GROWTH),
+        "expense_growth": _pct(uw.get("expense_growth_rate"), DEFAULT_EXPENSE_GROWTH),
+        "selling_costs_percent": _pct(uw.get("selling_costs_percent"), 0.0),
+        "exit_cap_rate": _first(_pct(uw.get("exit_cap_rate")), _pct(financing.get("exit_cap_rate"))),
+    }
+    if overrides:
+        for key, value in overrides.items():
+            if key in inputs and value is not None:
+                inputs[key] = float(value)
+    exit_cap = inputs["exit_cap_rate"]
+    if exit_cap is None or not 0 < exit_cap <= MAX_EXIT_CAP:
+        inputs["exit_cap_rate"] = DEFAULT_EXIT_CAP
+    inputs["hold_years"] = int(max(1, min(30, round(inputs["hold_years"]))))
+    return inputs
+
+
+def build_axis(spec: Any, base: float, name: str) -> np.ndarray:
+    """
+    Axis values from {"values": [...]}, {"min", "max", "steps"} or nothing
+    (DEFAULT_AXES around the base value).
+    """
+    spec = spec or {}
+    if isinstance(spec, list):
+        spec = {"values": spec}
+    if spec.get("values") is not None:
+        values = np.asarray([float(v) for v in spec["values"]], dtype=np.float64)
+    else:
+        half, steps = DEFAULT_AXES[name]
+        width = base * half if name == "price" else half
+        lo = float(spec["min"]) if spec.get("min") is not None else base - width
+        hi = float(spec["max"]) if spec.get("max") is not None else base + width
+        steps = int(spec.get("steps") or steps)
+        if not 1 <= steps <= SENSITIVITY_MAX_CELLS:
+            raise ValueError(f"{name}.steps must be between 1 and {SENSITIVITY_MAX_CELLS}")
+        values = np.linspace(lo, hi, steps)
+    if values.size == 0:
+        raise ValueError(f"{name} axis is empty")
+    if not np.all(np.isfinite(values)) or np.any(values <= 0):
+        raise ValueError(f"{name} values must be positive numbers")
+    return values
+
+
+def _noi_by_year(inputs: Dict[str, float], years: int) -> np.ndarray:
+    """NOI for years 1..years; income and expenses grow separately when both are known."""
+    t = np.arange(years, dtype=np.float64)
+    income_growth = (1 + inputs["income_growth"] / 100) ** t
+    if inputs["egi"] and inputs["opex"]:
+        return inputs["egi"] * income_growth - inputs["opex"] * (1 + inputs["expense_growth"] / 100) ** t
+    return inputs["noi"] * income_growth
+
+
+def compute_sensitivity_grid(inputs: Dict[str, float], prices: np.ndarray, rates: np.ndarray,
+                             exit_caps: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    IRR / equity multiple on the full (price, rate, exit cap) grid, and
+    year-1 cash-on-cash / DSCR on (price, rate) since they don't depend on
+    the exit. Percent figures are percentages; missing values are NaN.
+    """
+    hold = inputs["hold_years"]
+    io_years = min(int(inputs["io_years"]), hold)
+    amort_months = int(inputs["amortization_years"] * 12)
+
+    noi = _noi_by_year(inputs, hold + 1)                          # (H+1,), last year is the buyer's
+    loan = prices * (inputs["ltv"] / 100)                         # (P,)
+    equity = prices - loan + loan * inputs["loan_fees_percent"] / 100 + inputs["closing_costs"]
+
+    L, R = loan[:, None], rates[None, :]
+    io_debt = L * (R / 100)                                       # (P, R) annual interest-only payment
+    amort_debt = pmti(L, R, amort_months) * 12                    # (P, R)
+    year = np.arange(1, hold + 1)
+    debt = np.where(year <= io_years, io_debt[..., None], amort_debt[..., None])   # (P, R, H)
+    balance = remaining_balance(L, R, amort_months, (hold - io_years) * 12)         # (P, R)
+
+    cash_flow = noi[:hold] - debt                                 # (P, R, H)
+    sale = noi[hold] / (exit_caps / 100) * (1 - inputs["selling_costs_percent"] / 100)   # (C,)
+
+    P, Rn, C = prices.size, rates.size, exit_caps.size
+    flows = np.empty((P, Rn, C, hold + 1))
+    flows[..., 0] = -equity[:, None, None]
+    flows[..., 1:] = cash_flow[:, :, None, :]
+    flows[..., -1] += sale[None, None, :] - balance[..., None]
+    flat = flows.reshape(-1, hold + 1)
+
+    with np.errstate(all="ignore"):
+        coc = np.where(equity[:, None] > 0, cash_flow[..., 0] / equity[:, None] * 100, np.nan)
+        dscr = np.where(debt[..., 0] > 0, noi[0] / debt[..., 0], np.nan)
+    return {
+        "irr": (irr(flat) * 100).reshape(P, Rn, C),
+        "equity_multiple": equity_multiple(flat, invested=equity.repeat(Rn * C)).reshape(P, Rn, C),
+        "cash_on_cash": coc,
+        "dscr": dscr,
+    }
+
+
+def _jsonable(a: np.ndarray, places: int) -> List[Any]:
+    rounded = np.round(a, places)
+    return np.where(np.isfinite(rounded), rounded, None).tolist()
+
+
+def sensitivity_for_deal(deal_json: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Request body -> response payload for /v2/deals/{deal_id}/sensitivity.
+    Raises ValueError on bad axes or a grid larger than SENSITIVITY_MAX_CELLS.
+    """
+    started = time.perf_counter()
+    inputs = extract_sensitivity_inputs(deal_json, body.get("overrides"))
+    if not inputs["price"]:
+        raise ValueError("Deal has no purchase price")
+    prices = build_axis(body.get("price"), inputs["price"], "price")
+    rates = build_axis(body.get("rate"), inputs["interest_rate"], "rate")
+    exit_caps = build_axis(body.get("exit_cap"), inputs["exit_cap_rate"], "exit_cap")
+    cells = prices.size * rates.size * exit_caps.size
+    if cells > SENSITIVITY_MAX_CELLS:
+        raise ValueError(f"Grid has {cells} cells; at most {SENSITIVITY_MAX_CELLS} allowed")
+
+    grid = compute_sensitivity_grid(inputs, prices, rates, exit_caps)
+    return {
+        "inputs": inputs,
+        "axes": {
+            "price": prices.round(2).tolist(),
+            "rate": rates.round(4).tolist(),
+            "exit_cap": exit_caps.round(4).tolist(),
+        },
+        "dims": {
+            "irr": ["price", "rate", "exit_cap"],
+            "equity_multiple": ["price", "rate", "exit_cap"],
+            "cash_on_cash": ["price", "rate"],
+            "dscr": ["price", "rate"],
+        },
+        "irr": _jsonable(grid["irr"], 2),
+        "equity_multiple": _jsonable(grid["equity_multiple"], 3),
+        "cash_on_cash": _jsonable(grid["cash_on_cash"], 2),
+        "dscr": _jsonable(grid["dscr"], 3),
+        "cells": cells,
+        "compute_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
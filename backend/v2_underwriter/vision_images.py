@@ -0,0 +1,183 @@
+# Vision Images Module
+# Budget-aware, parallel JPEG encoding of page images for Claude vision
+#
+# Sizes are planned against VISION_TOKEN_BUDGET (Claude bills about one
+# token per 750 pixels): pages never exceed VISION_MAX_EDGE, and when the
+# total is over budget each page is classified from a small thumbnail
+# (mostly light, unsaturated pixels means a text/table page, anything else
+# a photo page). Photo pages then shrink first (by a common factor, down to
+# their minimum edge), and only then the text pages; a kind that would
+# shrink by less than NO_RESAMPLE_SCALE is left as it is, so the budget can
+# be overshot by up to 1 / NO_RESAMPLE_SCALE**2. Text pages (and every page
+# when nothing needed classifying) are encoded at VISION_TEXT_QUALITY,
+# photos at VISION_PHOTO_QUALITY; if the base64 payload is still over
+# VISION_PAYLOAD_BUDGET_MB, photo quality drops first, then text quality
+# (to a floor that keeps tables legible), then sizes. Classification and
+# encoding run on the "image-encode" thread pool (Pillow releases the GIL
+# while resizing and encoding).
+
+from typing import Any, Dict, List, Sequence, Tuple
+import io
+import os
+import math
+import base64
+
+from provider_pool import get_pool
+
+VISION_TOKEN_BUDGET = int(os.getenv("VISION_TOKEN_BUDGET", "16000"))
+VISION_PAYLOAD_BUDGET_MB = float(os.getenv("VISION_PAYLOAD_BUDGET_MB", "4"))
+VISION_MAX_EDGE = int(os.getenv("VISION_MAX_EDGE", "1568"))
+VISION_TEXT_QUALITY = int(os.getenv("VISION_TEXT_QUALITY", "75"))
+VISION_PHOTO_QUALITY = int(os.getenv("VISION_PHOTO_QUALITY", "60"))
+
+PIXELS_PER_TOKEN = 750
+MIN_EDGE = {"text": 1000, "photo": 512}
+MIN_QUALITY = {"text": 60, "photo": 35}
+SHRINK_ORDER = ("photo", "text")
+# Pages that would shrink (linearly) by less than this are sent as they are:
+# a LANCZOS resample costs more time and sharpness than the tokens it saves
+NO_RESAMPLE_SCALE = 0.9
+# Larger shrinks resample from a box-reduced copy at this multiple of the target
+REDUCING_GAP = 2.0
+# Share of near-white, low-saturation pixels above which a page counts as text
+TEXT_PAGE_LIGHT_SHARE = 0.45
+MAX_ROUNDS = 6
+
+
+def classify(img) -> str:
+    """'text' for pages that are mostly paper, 'photo' otherwise."""
+    from PIL import ImageChops
+
+    small = img.convert("RGB")
+    small.thumbnail((160, 160))
+    _, s, v = small.convert("HSV").split()
+    # Paper: bright (V >= 200) and unsaturated (S < 40)
+    paper = ImageChops.multiply(v.point(lambda x: 255 if x >= 200 else 0), s.point(lambda x: 255 if x < 40 else 0))
+    share = paper.histogram()[255] / max(1, small.size[0] * small.size[1])
+    return "text" if share >= TEXT_PAGE_LIGHT_SHARE else "photo"
+
+
+def _fit(w: int, h: int, max_edge: int) -> Tuple[int, int]:
+    scale = min(1.0, max_edge / max(w, h))
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+def _linear(size: Tuple[int, int], kind: str, s: float) -> float:
+    """Edge factor for scaling the area of `size` by `s`, not below the kind's minimum edge."""
+    return max(math.sqrt(min(1.0, s)), min(1.0, MIN_EDGE[kind] / max(size)))
+
+
+def _scaled(size: Tuple[int, int], kind: str, s: float) -> Tuple[int, int]:
+    """`size` with its area scaled by `s`; unchanged if that would shrink it by less than NO_RESAMPLE_SCALE."""
+    linear = _linear(size, kind, s)
+    if linear >= NO_RESAMPLE_SCALE:
+        return size
+    return max(1, round(size[0] * linear)), max(1, round(size[1] * linear))
+
+
+def tokens(size: Tuple[int, int]) -> int:
+    return math.ceil(size[0] * size[1] / PIXELS_PER_TOKEN)
+
+
+def plan_sizes(sizes: Sequence[Tuple[int, int]], kinds: Sequence[str],
+               token_budget: int = VISION_TOKEN_BUDGET) -> List[Tuple[int, int]]:
+    """
+    Target size per page so the estimated image tokens fit `token_budget`,
+    as far as the minimum edges allow (and within NO_RESAMPLE_SCALE).
+    `sizes` should already be fitted to VISION_MAX_EDGE.
+    """
+    planned = list(sizes)
+    # Photo pages shrink first; text pages only once every photo is at its minimum
+    for kind in SHRINK_ORDER:
+        total = sum(tokens(p) for p in planned)
+        if total <= token_budget:
+            break
+        idx = [i for i, k in enumerate(kinds) if k == kind]
+        native = {i: planned[i] for i in idx}
+        lo, hi = 0.0, 1.0
+        for _ in range(30):
+            mid = (lo + hi) / 2
+            trial = total - sum(tokens(native[i]) for i in idx) + sum(
+                tokens(native[i]) * _linear(native[i], kind, mid) ** 2 for i in idx)
+            if trial <= token_budget:
+                lo = mid
+            else:
+                hi = mid
+        for i in idx:
+            planned[i] = _scaled(native[i], kind, lo)
+    return planned
+
+
+def resize_rgb(img, size: Tuple[int, int]):
+    from PIL import Image
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img if img.size == tuple(size) else img.resize(size, Image.LANCZOS, reducing_gap=REDUCING_GAP)
+
+
+def encode_jpeg(img, quality: int) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def _b64_len(n: int) -> int:
+    return 4 * math.ceil(n / 3)
+
+
+def encode_pages(images: Sequence[Any], token_budget: int = VISION_TOKEN_BUDGET,
+                 payload_budget_mb: float = VISION_PAYLOAD_BUDGET_MB) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Claude image content items for `images` (PIL), in order, plus encoding
+    stats (pages, kinds, sizes, qualities, estimated tokens, payload bytes).
+    """
+    if not images:
+        return [], {"pages": 0, "payload_bytes": 0, "est_tokens": 0}
+    pool = get_pool("image-encode")
+    sizes = [_fit(w, h, VISION_MAX_EDGE) for w, h in (im.size for im in images)]
+    kinds = None
+    if sum(tokens(s) for s in sizes) > token_budget:
+        kinds = list(pool.map(classify, images))
+        sizes = plan_sizes(sizes, kinds, token_budget)
+        qualities = [VISION_TEXT_QUALITY if k == "text" else VISION_PHOTO_QUALITY for k in kinds]
+    else:
+        qualities = [VISION_TEXT_QUALITY] * len(images)
+    resized = list(pool.map(resize_rgb, images, sizes))
+    encoded = list(pool.map(encode_jpeg, resized, qualities))
+    budget = int(payload_budget_mb * 1024 * 1024)
+
+    for _ in range(MAX_ROUNDS):
+        if sum(_b64_len(len(e)) for e in encoded) <= budget:
+            break
+        if kinds is None:
+            kinds = list(pool.map(classify, images))
+        changed = []
+        for kind, step in (("photo", 15), ("text", 5)):
+            changed = [i for i, k in enumerate(kinds) if k == kind and qualities[i] > MIN_QUALITY[kind]]
+            for i in changed:
+                qualities[i] = max(MIN_QUALITY[kind], qualities[i] - step)
+            if changed:
+                break
+        if not changed:
+            # Every page is at its quality floor: shrink them all
+            sizes = [(max(1, round(w * 0.85)), max(1, round(h * 0.85))) for w, h in sizes]
+            resized = list(pool.map(resize_rgb, images, sizes))
+            changed = list(range(len(images)))
+        redone = pool.map(encode_jpeg, [resized[i] for i in changed], [qualities[i] for i in changed])
+        for i, data in zip(changed, redone):
+            encoded[i] = data
+
+    items = [{
+        "type": "image",
+        "source": {"type": "base64", "media_type": "image/jpeg", "data": base64.b64encode(data).decode("utf-8")},
+    } for data in encoded]
+    stats = {
+        "pages": len(images),
+        "kinds": kinds,
+        "sizes": [list(s) for s in sizes],
+        "qualities": qualities,
+        "est_tokens": sum(tokens(s) for s in sizes),
+        "payload_bytes": sum(_b64_len(len(e)) for e in encoded),
+    }
+    return items, stats
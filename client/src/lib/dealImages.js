@@ -0,0 +1,30 @@
+// Deal Images - pick thumbnail URLs for extracted OM images
+
+/**
+ * Smallest stored thumbnail at least `size` px on its longest side, falling
+ * back to the largest thumbnail and then the original (older deals saved
+ * before thumbnails existed only have `url`).
+ * @param {Object} img - Image reference from the backend ({ url, thumbnails, thumb_url })
+ * @param {number} size - Rendered size in CSS px
+ * @returns {string}
+ */
+export function thumbnailUrl(img, size = 480) {
+  const thumbs = img?.thumbnails || {};
+  const sizes = Object.keys(thumbs).map(Number).sort((a, b) => a - b);
+  const wanted = size * (window.devicePixelRatio || 1);
+  const fit = sizes.find((s) => s >= wanted) || sizes[sizes.length - 1];
+  if (fit) return thumbs[String(fit)];
+  return img?.thumb_url || img?.url || img?.publicUrl || '';
+}
+
+/**
+ * srcSet string over the stored thumbnails ("url 160w, url 480w, ...").
+ * @param {Object} img
+ * @returns {string|undefined}
+ */
+export function thumbnailSrcSet(img) {
+  const thumbs = img?.thumbnails || {};
+  const entries = Object.keys(thumbs).map(Number).sort((a, b) => a - b);
+  if (!entries.length) return undefined;
+  return entries.map((s) => `${thumbs[String(s)]} ${s}w`).join(', ');
+}
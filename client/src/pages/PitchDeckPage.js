@@ -3,6 +3,7 @@ import { useSearchParams, useNavigate } from 'react-router-dom';
 import { ArrowLeft, Sparkles, Download, Users, Building2 } from 'lucide-react';
 import DashboardShell from '../components/DashboardShell';
 import { loadDeal } from '../lib/dealsService';
+import { thumbnailUrl, thumbnailSrcSet } from '../lib/dealImages';
 import html2canvas from 'html2canvas';
 import jsPDF from 'jspdf';
 
@@ -444,6 +445,21 @@ function PitchDeckPage() {
                 <p style={{ margin: 0, fontSize: '14px', color: '#6b7280' }}>
                   {selectedDeal.address} • {selectedDeal.units} Units
                 </p>
+                {selectedDeal.images?.length > 0 && (
+                  <div style={{ display: 'flex', gap: '8px', marginTop: '12px', overflowX: 'auto' }}>
+                    {selectedDeal.images.map((img, idx) => (
+                      <img
+                        key={img.storage_path || img.url || idx}
+                        src={thumbnailUrl(img, 96)}
+                        srcSet={thumbnailSrcSet(img)}
+                        sizes="96px"
+                        loading="lazy"
+                        alt={img.filename || `Property image ${idx + 1}`}
+                        style={{ width: '96px', height: '64px', objectFit: 'cover', borderRadius: '6px', border: '1px solid #e5e7eb', flexShrink: 0 }}
+                      />
+                    ))}
+                  </div>
+                )}
               </div>
               <button
                 onClick={() => navigate('/pipeline')}
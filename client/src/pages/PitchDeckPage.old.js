@@ -3,6 +3,7 @@ import { useSearchParams, useNavigate } from 'react-router-dom';
 import { Upload, FileText, Building2, Layers, Sparkles, ArrowLeft, Users } from 'lucide-react';
 import DashboardShell from '../components/DashboardShell';
 import { loadPipelineDeals, loadDeal } from '../lib/dealsService';
+import { thumbnailUrl, thumbnailSrcSet } from '../lib/dealImages';
 
 function PitchDeckPage() {
   const [searchParams] = useSearchParams();
@@ -532,7 +533,10 @@ function PitchDeckPage() {
                             }}
                           >
                             <img
-                              src={img.url || img.publicUrl}
+                              src={thumbnailUrl(img, 160)}
+                              srcSet={thumbnailSrcSet(img)}
+                              sizes="160px"
+                              loading="lazy"
                               alt={img.filename || `Property image ${idx + 1}`}
                               style={{ width: '100%', height: '80px', objectFit: 'cover', display: 'block' }}
                             />
@@ -1,6 +1,7 @@
 
 import React, { useState } from "react";
 import { useNavigate } from 'react-router-dom';
+import { supabase } from '../lib/supabase';
 import {
   Upload, ArrowRight, ArrowLeft, AlertCircle, Loader, Check, TrendingUp,
   DollarSign, Building, FileText, ThumbsUp, AlertTriangle,
@@ -456,52 +457,174 @@ const EnhancedUploadPage = () => {
       console.log("[DEBUG] Selected pages:", selectedPages.size);
 
 
-      // Add a timeout to the fetch request (60 seconds)
-      const fetchWithTimeout = (url, options, timeout = 60000) => {
-        return Promise.race([
-          fetch(url, options),
-          new Promise((_, reject) =>
-            setTimeout(() => reject(new Error("Request timed out. The backend may be sleeping or slow. Please retry in 30 seconds or check system status.")), timeout)
-          )
-        ]);
+      // Submit as a background job, then poll until the pipeline finishes.
+      fd.append("async_job", "true");
+
+      const readError = async (res) => {
+        const errorData = await res.json().catch(() => ({}));
+        if (res.status === 403 && errorData.detail?.upgrade_required) {
+          return errorData.detail.error + " Please upgrade your plan.";
+        }
+        const errorText = typeof errorData.detail === "string" ? errorData.detail : JSON.stringify(errorData.detail || "");
+        return `Backend ${res.status}: ${errorText || res.statusText}`;
       };
 
+      // Per-profile admission limits key on this; anonymous uploads share only the global limit
+      const headers = {};
+      try {
+        const userRes = await supabase.auth.getUser();
+        const uid = userRes?.data?.user?.id;
+        if (uid) headers["X-Profile-ID"] = uid;
+      } catch {}
+
       let res;
       try {
-        res = await fetchWithTimeout(`${API_BASE}/ocr/underwrite`, {
+        res = await fetch(`${API_BASE}/ocr/underwrite`, {
           method: "POST",
+          headers,
           body: fd,
         });
-      } catch (timeoutErr) {
-        setError(timeoutErr.message || "Request timed out. Please try again later.");
+      } catch (networkErr) {
+        setError("Could not reach the backend. It may be sleeping or slow. Please retry in 30 seconds or check system status.");
         setStep("pageSelect");
         return;
       }
 
-      setProgress(60);
-      setProcessingMsg("AI analyzing deal with Claude...");
-
       console.log("[DEBUG] Backend response status:", res.status);
-      console.log("[DEBUG] Backend response ok:", res.ok);
-
       if (!res.ok) {
-        const errorData = await res.json().catch(() => ({}));
-        
-        if (res.status === 403 && errorData.detail?.upgrade_required) {
-          setError(errorData.detail.error + " Please upgrade your plan.");
+        throw new Error(await readError(res));
+      }
+
+      const { job_id: jobId } = await res.json();
+      const stageMessages = {
+        queued: [30, "Waiting for an available worker..."],
+        ocr: [35, "OCR processing with Mistral..."],
+        parse: [50, "AI analyzing deal with Claude..."],
+        enrich: [60, "Extracting pricing and operating data..."],
+        underwrite: [65, "Running underwriting..."],
+        recovery: [70, "Searching the full document for missing data..."],
+        metrics: [75, "Calculating deal metrics..."],
+        done: [85, "Finishing up..."],
+      };
+
+      const showStage = (stage, detail) => {
+        const [pct, msg] = stageMessages[stage] || [];
+        if (pct) {
+          setProgress(pct);
+          setProcessingMsg(detail ? `${msg} ${detail}` : msg);
+        }
+      };
+
+      // Follow the job's progress stream; partial results show up as soon as
+      // each stage produces them.
+      const followEvents = () => new Promise((resolve, reject) => {
+        if (typeof EventSource === "undefined") {
+          reject(new Error("EventSource unsupported"));
           return;
         }
-        
-        const errorText = errorData.detail || await res.text().catch(() => "");
-        throw new Error(`Backend ${res.status}: ${errorText || res.statusText}`);
+        const source = new EventSource(`${API_BASE}/ocr/jobs/${jobId}/events`);
+        let gotEvent = false;
+        const parse = (e) => {
+          gotEvent = true;
+          try { return JSON.parse(e.data); } catch { return {}; }
+        };
+        source.addEventListener("stage_start", (e) => showStage(parse(e).stage));
+        source.addEventListener("partial", (e) => {
+          const data = parse(e);
+          if (data.stage === "ocr" && data.ocr_page_count) {
+            showStage("ocr", `${data.ocr_page_count} page(s) read.`);
+          } else if (data.stage === "enrich" && data.property?.address) {
+            showStage("enrich", `Found ${data.property.address}${data.property.units ? ` (${data.property.units} units)` : ""}.`);
+          }
+        });
+        source.addEventListener("succeeded", (e) => { parse(e); source.close(); resolve("succeeded"); });
+        source.addEventListener("failed", (e) => { parse(e); source.close(); resolve("failed"); });
+        source.onerror = () => {
+          // EventSource reconnects on its own once it has a stream going;
+          // if the stream never opened, fall back to polling.
+          if (!gotEvent) {
+            source.close();
+            reject(new Error("Progress stream unavailable"));
+          }
+        };
+      });
+
+      const pollStatus = async () => {
+        const POLL_MS = 2000;
+        const MAX_WAIT_MS = 15 * 60 * 1000;
+        const startedAt = Date.now();
+        while (Date.now() - startedAt < MAX_WAIT_MS) {
+          await new Promise((resolve) => setTimeout(resolve, POLL_MS));
+          const statusRes = await fetch(`${API_BASE}/ocr/jobs/${jobId}`).catch(() => null);
+          if (!statusRes || !statusRes.ok) continue;
+          const { job } = await statusRes.json();
+          showStage(job.stage);
+          if (job.status === "succeeded" || job.status === "failed") return job.status;
+        }
+        throw new Error("Processing is taking longer than expected. Please try again later.");
+      };
+
+      await followEvents().catch(() => pollStatus());
+
+      res = await fetch(`${API_BASE}/ocr/jobs/${jobId}/result`);
+      if (!res.ok) {
+        throw new Error(await readError(res));
       }
 
-      setProgress(80);
+      setProgress(90);
       setProcessingMsg("Preparing data for verification...");
 
       const json = await res.json();
       setBackendData(json);
 
+      // The investment opinion (verdict, pros/cons) is generated after the
+      // metrics are returned; merge it in when it's ready.
+      const opinionUrl = json.parsed?.deal_analysis?.opinion_url;
+      if (json.parsed?.deal_analysis?.opinion_status === "pending" && opinionUrl) {
+        (async () => {
+          for (let attempt = 0; attempt < 40; attempt++) {
+            await new Promise((resolve) => setTimeout(resolve, 1500));
+            const opRes = await fetch(`${API_BASE}${opinionUrl}`).catch(() => null);
+            if (!opRes || !opRes.ok) continue;
+            const state = await opRes.json();
+            if (state.status === "pending") continue;
+            setBackendData((prev) => prev && prev.deal_id === json.deal_id ? {
+              ...prev,
+              parsed: {
+                ...prev.parsed,
+                deal_analysis: {
+                  ...prev.parsed?.deal_analysis,
+                  ...(state.opinion || {}),
+                  opinion_status: state.status,
+                },
+              },
+            } : prev);
+            return;
+          }
+        })();
+      }
+
+      // Property images are extracted after the result is returned; pick
+      // them up in the background without holding the verify step.
+      if (json.images_status === "pending" && json.images_url) {
+        (async () => {
+          for (let attempt = 0; attempt < 60; attempt++) {
+            await new Promise((resolve) => setTimeout(resolve, 3000));
+            const imgRes = await fetch(`${API_BASE}${json.images_url}`).catch(() => null);
+            if (!imgRes || !imgRes.ok) continue;
+            const record = await imgRes.json();
+            if (record.status === "pending") continue;
+            setBackendData((prev) => prev && prev.deal_id === json.deal_id ? {
+              ...prev,
+              images: record.images || [],
+              image_count: record.image_count || 0,
+              images_status: record.status,
+            } : prev);
+            return;
+          }
+        })();
+      }
+
       // Build pricing_financing with calculated loan_amount
       const parsedPricing = json.parsed?.pricing_financing || {};
       const price = parsedPricing.price || parsedPricing.purchase_price || 0;